@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Team rollups through EmployeeClosure against a recursive walk of SupervisorID.
+
+Builds a SQLite database with an org chart of --employees people (every
+manager has up to --branching reports, so the tree is several levels deep)
+and --bookings bookings spread over them, with a review on every other one.
+For managers at each level it then times the team's bookings and revenue:
+
+    recursive  WITH RECURSIVE over Employee.SupervisorID, then Booking
+    closure    EmployeeClosure rows of the manager joined with Booking
+
+plus the whole of hierarchy.team_performance() (own bookings, each direct
+report's team and ratings). Reported are p50 latency and SQLite VM steps, and
+the cost of the closure triggers: inserting employees one by one and moving
+a team to another manager.
+
+No database server is needed.
+
+Usage (from the project root):
+    python benchmarks/bench_hierarchy.py --employees 5000 --branching 6 --bookings 200000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from run_benchmarks import SQLiteWork
+from src import hierarchy
+from src.backend import SQLiteBackend
+
+RECURSIVE_TEAM_SQL = """
+    WITH RECURSIVE team (EmployeeID) AS (
+        SELECT %s
+        UNION ALL
+        SELECT e.EmployeeID FROM Employee e JOIN team t ON e.SupervisorID = t.EmployeeID
+    )
+    SELECT COUNT(b.BookingID), SUM(b.TotalCost)
+    FROM team
+    JOIN Booking b ON b.EmployeeID = team.EmployeeID
+"""
+
+CLOSURE_TEAM_SQL = """
+    SELECT COUNT(b.BookingID), SUM(b.TotalCost)
+    FROM EmployeeClosure c
+    JOIN Booking b ON b.EmployeeID = c.DescendantID
+    WHERE c.AncestorID = %s
+"""
+
+
+def fetch(conn, sql, params=()):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def build(conn, employees, branching, bookings, rng):
+    """Inserts the org chart row by row (so the triggers run) and the bookings in bulk; returns ms per employee."""
+    cursor = conn.cursor()
+    started = time.perf_counter()
+    for employee_id in range(1, employees + 1):
+        # Breadth-first numbering: employee n reports to (n - 2) // branching + 1
+        supervisor_id = (employee_id - 2) // branching + 1 if employee_id > 1 else None
+        cursor.execute("INSERT INTO Employee (EmployeeID, Name, Role, SupervisorID) VALUES (%s, %s, %s, %s)",
+                       (employee_id, f"Employee {employee_id}", "Manager" if employee_id <= employees // branching
+                        else "Agent", supervisor_id))
+    insert_ms = (time.perf_counter() - started) * 1000 / employees
+    cursor.executemany("INSERT INTO Booking (BookingID, GroupName, Purpose, EmployeeID, BookingDate, TotalCost) "
+                       "VALUES (%s, %s, %s, %s, %s, %s)",
+                       [(i, f"Group {i}", "Business", rng.randint(1, employees), "2024-06-01",
+                         round(rng.uniform(100, 5000), 2)) for i in range(1, bookings + 1)])
+    cursor.execute("INSERT INTO Passenger (PassengerID, Name, Email) VALUES (1, 'Reviewer', 'reviewer@example.com')")
+    cursor.executemany("INSERT INTO Review (BookingID, PassengerID, Rating) VALUES (%s, %s, %s)",
+                       [(i, 1, rng.randint(1, 5)) for i in range(1, bookings + 1, 2)])
+    cursor.close()
+    conn.commit()
+    conn.cursor().execute("ANALYZE")
+    return insert_ms
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=5000)
+    parser.add_argument("--branching", type=int, default=6, help="reports per manager")
+    parser.add_argument("--bookings", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per query")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = SQLiteBackend(os.path.join(tmp, "bench.db")).open_connection()
+        insert_ms = build(conn, args.employees, args.branching, args.bookings, rng)
+        closure_rows = fetch(conn, "SELECT COUNT(*) FROM EmployeeClosure")[0][0]
+        print(f"{args.employees} employees (branching {args.branching}), {args.bookings} bookings, "
+              f"{closure_rows} closure rows\n")
+        work = SQLiteWork(conn)
+
+        # The first manager on each level of the tree
+        managers, first, width = [], 1, 1
+        while first <= args.employees // args.branching:
+            managers.append(first)
+            first, width = first + width, width * args.branching
+
+        print(f"{'manager':>8} {'team':>6} {'recursive ms':>13} {'steps':>11} {'closure ms':>11} {'steps':>9} "
+              f"{'team_performance() ms':>22}")
+        for manager in managers:
+            team_size = fetch(conn, "SELECT COUNT(*) FROM EmployeeClosure WHERE AncestorID = %s", (manager,))[0][0]
+            assert fetch(conn, RECURSIVE_TEAM_SQL, (manager,)) == fetch(conn, CLOSURE_TEAM_SQL, (manager,))
+            recursive_ms = timed(lambda: fetch(conn, RECURSIVE_TEAM_SQL, (manager,)), args.repeat)
+            recursive_steps = work.measure(lambda: fetch(conn, RECURSIVE_TEAM_SQL, (manager,)))
+            closure_ms = timed(lambda: fetch(conn, CLOSURE_TEAM_SQL, (manager,)), args.repeat)
+            closure_steps = work.measure(lambda: fetch(conn, CLOSURE_TEAM_SQL, (manager,)))
+            report_ms = timed(lambda: hierarchy.team_performance(conn, manager), args.repeat)
+            print(f"{manager:>8} {team_size:>6} {recursive_ms:>13.2f} {recursive_steps:>11,} "
+                  f"{closure_ms:>11.2f} {closure_steps:>9,} {report_ms:>22.2f}")
+
+        # Move the second manager's team under the last manager of the next level and back
+        target = managers[2] if len(managers) > 2 else args.employees
+        moves = []
+        for _ in range(args.repeat):
+            for supervisor_id in (target, 1):
+                started = time.perf_counter()
+                conn.cursor().execute("UPDATE Employee SET SupervisorID = %s WHERE EmployeeID = %s",
+                                      (supervisor_id, managers[1] + 1))
+                conn.commit()
+                moves.append((time.perf_counter() - started) * 1000)
+        moved = fetch(conn, "SELECT COUNT(*) FROM EmployeeClosure WHERE AncestorID = %s", (managers[1] + 1,))[0][0]
+        print(f"\ninsert an employee       {insert_ms:8.3f} ms")
+        print(f"move a team of {moved:<6}   {statistics.median(moves):8.3f} ms")
+        print(f"closure drift            {len(hierarchy.find_drift(conn))} rows")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
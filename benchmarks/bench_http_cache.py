@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Repeat views of the SQL script pages and browse pages, with and without src/http_cache.py.
+
+Loads a generated dataset (like run_benchmarks.py) into a scratch SQLite
+file, imports the app on it and requests each page through the Flask test
+client in four ways:
+
+    render       the cache emptied before every request: read the file or
+                 query, render, and compress for the cache
+    cached       a repeat view served from the cache
+    cached gzip  the same with Accept-Encoding: gzip
+    revalidate   a conditional request with the page's ETag (304, no body)
+
+Reported are p50 latency and the bytes sent. Before timing, it checks that
+a console UPDATE of a booking's accommodation cost retires the cached
+/bookings page, whose TotalCost the delta triggers change.
+
+No database server is needed.
+
+Usage (from the project root):
+    python benchmarks/bench_http_cache.py --scale 100 --repeat 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from run_benchmarks import load_sqlite
+
+PAGES = ["/schema", "/populate", "/queries", "/bookings", "/passengers?sort=Name&limit=500", "/flights?limit=500"]
+
+
+def timed_get(client, url, headers, repeat, before=None):
+    """p50 ms of GET url (body read in full) and the last response."""
+    samples = []
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        response = client.get(url, headers=headers)
+        response.get_data()
+        samples.append((time.perf_counter() - started) * 1000)
+    if response.status_code not in (200, 304):
+        raise SystemExit(f"{response.status_code} from {url}")
+    return statistics.median(samples), response
+
+
+def check_write_invalidates(client, conn):
+    """A leg cost changed from the console must show up on the next /bookings view."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT MIN(BookingID) FROM BookingAccommodation")
+    booking_id = cursor.fetchone()[0]
+    cursor.close()
+    url = "/bookings"  # the first page, in BookingID order
+    client.get(url).get_data()  # rendered and cached
+    cached = client.get(url)
+    cached.get_data()
+    client.post("/execute_sql", data={
+        "sql_command": f"UPDATE BookingAccommodation SET Cost = Cost + 1000 WHERE BookingID = {booking_id}",
+        "action": "execute_query"}).get_data()
+    after = client.get(url)
+    cursor = conn.cursor()
+    cursor.execute("SELECT TotalCost FROM Booking WHERE BookingID = %s", (booking_id,))
+    total = cursor.fetchone()[0]
+    cursor.close()
+    if after.get_etag()[0] == cached.get_etag()[0] or f"<td>{total}</td>" not in after.get_data(as_text=True):
+        raise SystemExit(f"/bookings still shows booking {booking_id} as it was before the console update")
+    print(f"Console update of booking {booking_id}'s accommodation: /bookings shows the new total {total}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=100.0, help="dataset scale factor")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--today", default="2025-01-01", help="generator reference date")
+    parser.add_argument("--repeat", type=int, default=50, help="timed requests per page and variant")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        print(f"Loading scale {args.scale:g} into sqlite...")
+        conn = load_sqlite(path, args.scale, args.seed, args.today)
+        # The app reads its settings on import
+        os.environ.update(DB_BACKEND="sqlite", SQLITE_PATH=path)
+        from src import http_cache
+        from src.main import app
+
+        client = app.test_client()
+        client.get("/")  # first request: database check and pool start-up
+        check_write_invalidates(client, conn)
+        conn.close()
+        print(f"\n{'page':32} {'render ms':>10} {'cached ms':>10} {'gzip ms':>8} {'304 ms':>7} "
+              f"{'bytes':>9} {'gzip bytes':>11}")
+        for url in PAGES:
+            render_ms, plain = timed_get(client, url, {}, args.repeat, before=http_cache.clear)
+            client.get(url).get_data()  # fill the cache
+            cached_ms, _ = timed_get(client, url, {}, args.repeat)
+            gzip_ms, packed = timed_get(client, url, {"Accept-Encoding": "gzip"}, args.repeat)
+            etag = packed.headers.get("ETag")
+            if etag is None:
+                raise SystemExit(f"{url} was not served from the cache")
+            revalidate_ms, not_modified = timed_get(client, url, {"Accept-Encoding": "gzip", "If-None-Match": etag},
+                                                    args.repeat)
+            if not_modified.status_code != 304:
+                raise SystemExit(f"{url} did not revalidate")
+            print(f"{url:32} {render_ms:>10.2f} {cached_ms:>10.2f} {gzip_ms:>8.2f} {revalidate_ms:>7.2f} "
+                  f"{len(plain.get_data()):>9,} {len(packed.get_data()):>11,}")
+
+
+if __name__ == "__main__":
+    main()
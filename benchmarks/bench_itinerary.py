@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""Compares the old single-join itinerary query with the per-component loader.
+
+Creates a few "frequent traveller" passengers with many bookings (each with
+several accommodations and transport legs) inside a transaction, times both
+approaches against them, checks they return the same itinerary, and rolls
+everything back so the database is left untouched.
+
+Usage (from the project root, against the database configured in src/database.py):
+    python benchmarks/bench_itinerary.py --bookings 60 --accommodations 3 --transports 4 --repeat 20
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import create_connection
+from src.itinerary import load_itinerary
+
+# The original 17-way join from passenger_itinerary(), kept here as the baseline
+LEGACY_SQL = """
+SELECT
+    b.BookingID, b.GroupName, b.Purpose, b.BookingDate, b.TotalCost, b.Status,
+    e.Name AS AgentName,
+    ba.BookingAccommodationID, ba.CheckInDate, ba.CheckOutDate, ba.Cost AS AccommodationCost,
+    acc.Name AS AccommodationName, acc.Type AS AccommodationType,
+    acc_loc.City AS AccommodationCity, acc_loc.Country AS AccommodationCountry,
+    bt.BookingTransportationID, bt.Cost AS TransportCost,
+    tt.Name AS TransportType,
+    f.FlightID, f.FlightNumber, f.Carrier, f.DepartureDateTime AS FlightDeparture, f.ArrivalDateTime AS FlightArrival, f.Class AS FlightClass, f.Fare AS FlightFare,
+    fl_src.City AS FlightSourceCity, fl_src.Country AS FlightSourceCountry,
+    fl_dest.City AS FlightDestCity, fl_dest.Country AS FlightDestCountry,
+    cr.CarRentalID, cr.Company AS CarCompany, cr.CarType, cr.PickupDateTime AS CarPickup, cr.DropoffDateTime AS CarDropoff, cr.Rent AS CarRent,
+    cr_pick.City AS CarPickupCity, cr_pick.Country AS CarPickupCountry,
+    cr_drop.City AS CarDropoffCity, cr_drop.Country AS CarDropoffCountry,
+    cru.CruiseID, cru.CruiseName, cru.Line AS CruiseLine, cru.DepartureDate AS CruiseDeparture, cru.ReturnDate AS CruiseReturn, cru.Fare AS CruiseFare,
+    cru_src.City AS CruiseSourceCity, cru_src.Country AS CruiseSourceCountry,
+    cru_dest.City AS CruiseDestCity, cru_dest.Country AS CruiseDestCountry
+FROM Passenger p
+JOIN BookingPassenger bp ON p.PassengerID = bp.PassengerID
+JOIN Booking b ON bp.BookingID = b.BookingID
+LEFT JOIN Employee e ON b.EmployeeID = e.EmployeeID
+LEFT JOIN BookingAccommodation ba ON b.BookingID = ba.BookingID
+LEFT JOIN Accommodation acc ON ba.AccommodationID = acc.AccommodationID
+LEFT JOIN Location acc_loc ON acc.LocationID = acc_loc.LocationID
+LEFT JOIN BookingTransportation bt ON b.BookingID = bt.BookingID
+LEFT JOIN TransportationType tt ON bt.TransportTypeID = tt.TransportTypeID
+LEFT JOIN Flight f ON bt.FlightID = f.FlightID
+LEFT JOIN Location fl_src ON f.SourceLocationID = fl_src.LocationID
+LEFT JOIN Location fl_dest ON f.DestLocationID = fl_dest.LocationID
+LEFT JOIN CarRental cr ON bt.CarRentalID = cr.CarRentalID
+LEFT JOIN Location cr_pick ON cr.PickupLocationID = cr_pick.LocationID
+LEFT JOIN Location cr_drop ON cr.DropoffLocationID = cr_drop.LocationID
+LEFT JOIN Cruise cru ON bt.CruiseID = cru.CruiseID
+LEFT JOIN Location cru_src ON cru.SourceLocationID = cru_src.LocationID
+LEFT JOIN Location cru_dest ON cru.DestLocationID = cru_dest.LocationID
+WHERE p.PassengerID = %s
+ORDER BY b.BookingDate DESC, b.BookingID, ba.CheckInDate, bt.BookingTransportationID
+"""
+
+
+def load_itinerary_legacy(conn, passenger_id):
+    """The previous implementation: one fanned-out join, de-duplicated in Python."""
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(LEGACY_SQL, (passenger_id,))
+    results = cursor.fetchall()
+    cursor.close()
+
+    bookings_data = defaultdict(lambda: {"details": None, "accommodations": [], "transportations": []})
+    processed_acc_ids = set()
+    processed_trans_ids = set()
+    for row in results:
+        booking_id = row["BookingID"]
+        if bookings_data[booking_id]["details"] is None:
+            bookings_data[booking_id]["details"] = {
+                "BookingID": booking_id, "GroupName": row["GroupName"], "Purpose": row["Purpose"],
+                "BookingDate": row["BookingDate"], "TotalCost": row["TotalCost"], "Status": row["Status"],
+                "AgentName": row["AgentName"]
+            }
+        acc_id = row["BookingAccommodationID"]
+        if acc_id is not None and acc_id not in processed_acc_ids:
+            bookings_data[booking_id]["accommodations"].append({
+                "Name": row["AccommodationName"], "Type": row["AccommodationType"],
+                "City": row["AccommodationCity"], "Country": row["AccommodationCountry"],
+                "CheckInDate": row["CheckInDate"], "CheckOutDate": row["CheckOutDate"],
+                "Cost": row["AccommodationCost"]
+            })
+            processed_acc_ids.add(acc_id)
+        trans_id = row["BookingTransportationID"]
+        if trans_id is not None and trans_id not in processed_trans_ids:
+            transport_details = {"TransportType": row["TransportType"], "Cost": row["TransportCost"]}
+            if row["TransportType"] == "Flight" and row["FlightID"] is not None:
+                transport_details.update({
+                    "FlightNumber": row["FlightNumber"], "Carrier": row["Carrier"],
+                    "SourceCity": row["FlightSourceCity"], "SourceCountry": row["FlightSourceCountry"],
+                    "DestCity": row["FlightDestCity"], "DestCountry": row["FlightDestCountry"],
+                    "DepartureDateTime": row["FlightDeparture"], "ArrivalDateTime": row["FlightArrival"],
+                    "Class": row["FlightClass"], "Fare": row["FlightFare"]
+                })
+            elif row["TransportType"] == "Car Rental" and row["CarRentalID"] is not None:
+                transport_details.update({
+                    "Company": row["CarCompany"], "CarType": row["CarType"],
+                    "PickupCity": row["CarPickupCity"], "PickupCountry": row["CarPickupCountry"],
+                    "DropoffCity": row["CarDropoffCity"], "DropoffCountry": row["CarDropoffCountry"],
+                    "PickupDateTime": row["CarPickup"], "DropoffDateTime": row["CarDropoff"],
+                    "Rent": row["CarRent"]
+                })
+            elif row["TransportType"] == "Cruise" and row["CruiseID"] is not None:
+                transport_details.update({
+                    "CruiseName": row["CruiseName"], "Line": row["CruiseLine"],
+                    "SourceCity": row["CruiseSourceCity"], "SourceCountry": row["CruiseSourceCountry"],
+                    "DestCity": row["CruiseDestCity"], "DestCountry": row["CruiseDestCountry"],
+                    "DepartureDate": row["CruiseDeparture"], "ReturnDate": row["CruiseReturn"],
+                    "Fare": row["CruiseFare"]
+                })
+            bookings_data[booking_id]["transportations"].append(transport_details)
+            processed_trans_ids.add(trans_id)
+
+    bookings = [data["details"] | {"accommodations": data["accommodations"], "transportations": data["transportations"]}
+                for data in bookings_data.values() if data["details"]]
+    return bookings, len(results)
+
+
+def fetch_ids(cursor, sql):
+    cursor.execute(sql)
+    return [row[0] for row in cursor.fetchall()]
+
+
+def create_frequent_travellers(conn, n_passengers, n_bookings, n_acc, n_trans, rng):
+    """Inserts synthetic passengers with many multi-leg bookings (left uncommitted)."""
+    cursor = conn.cursor()
+    employees = fetch_ids(cursor, "SELECT EmployeeID FROM Employee")
+    accommodations = fetch_ids(cursor, "SELECT AccommodationID FROM Accommodation")
+    flights = fetch_ids(cursor, "SELECT FlightID FROM Flight")
+    cars = fetch_ids(cursor, "SELECT CarRentalID FROM CarRental")
+    cruises = fetch_ids(cursor, "SELECT CruiseID FROM Cruise")
+    cursor.execute("SELECT Name, TransportTypeID FROM TransportationType")
+    type_ids = dict(cursor.fetchall())
+    if not (accommodations and flights and cars and cruises):
+        raise SystemExit("The database needs accommodations, flights, car rentals and cruises; load the sample data first.")
+
+    kinds = [("Flight", "FlightID", flights), ("Car Rental", "CarRentalID", cars), ("Cruise", "CruiseID", cruises)]
+    passenger_ids = []
+    for p in range(n_passengers):
+        cursor.execute("INSERT INTO Passenger (Name, Gender, Age, Email) VALUES (%s, %s, %s, %s)",
+                       (f"Bench Traveller {p}", "Other", 40, f"bench.traveller.{p}.{rng.random()}@example.com"))
+        passenger_id = cursor.lastrowid
+        passenger_ids.append(passenger_id)
+        for b in range(n_bookings):
+            booking_date = datetime(2024, 1, 1) + timedelta(days=rng.randint(0, 700))
+            cursor.execute(
+                "INSERT INTO Booking (GroupName, Purpose, BookingDate, EmployeeID, TotalCost, Status) "
+                "VALUES (%s, %s, %s, %s, %s, %s)",
+                (f"Bench trip {b}", "Business", booking_date, rng.choice(employees) if employees else None, 0, "Confirmed"))
+            booking_id = cursor.lastrowid
+            cursor.execute("INSERT INTO BookingPassenger (BookingID, PassengerID, IsPrimary) VALUES (%s, %s, TRUE)",
+                           (booking_id, passenger_id))
+            for _ in range(n_acc):
+                check_in = booking_date.date() + timedelta(days=rng.randint(1, 60))
+                cursor.execute(
+                    "INSERT INTO BookingAccommodation (BookingID, AccommodationID, CheckInDate, CheckOutDate, Cost) "
+                    "VALUES (%s, %s, %s, %s, %s)",
+                    (booking_id, rng.choice(accommodations), check_in, check_in + timedelta(days=3), 300))
+            for t in range(n_trans):
+                kind, column, ids = kinds[t % len(kinds)]
+                cursor.execute(
+                    f"INSERT INTO BookingTransportation (BookingID, TransportTypeID, {column}, Cost) VALUES (%s, %s, %s, %s)",
+                    (booking_id, type_ids[kind], rng.choice(ids), 150))
+    cursor.close()
+    return passenger_ids
+
+
+# Key columns the split loader's records carry and the legacy dicts leave out
+KEY_COLUMNS = ("BookingAccommodationID", "BookingTransportationID", "BookingID")
+
+
+def _as_dict(row):
+    return row if isinstance(row, dict) else row._asdict()
+
+
+def normalise(bookings):
+    """Order-insensitive view of an itinerary for comparing the two loaders (dicts or records)."""
+    key = repr
+    view = []
+    for b in map(_as_dict, bookings):
+        children = [sorted(key(sorted((k, v) for k, v in _as_dict(row).items() if k not in KEY_COLUMNS))
+                           for row in b[name]) for name in ("accommodations", "transportations")]
+        view.append((key(sorted((k, v) for k, v in b.items() if k not in ("accommodations", "transportations"))),
+                     *children))
+    return sorted(view)
+
+
+def time_calls(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "mean_ms": statistics.fmean(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--passengers", type=int, default=3, help="synthetic frequent travellers to create")
+    parser.add_argument("--bookings", type=int, default=60, help="bookings per traveller")
+    parser.add_argument("--accommodations", type=int, default=3, help="accommodations per booking")
+    parser.add_argument("--transports", type=int, default=4, help="transport legs per booking")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per approach and passenger")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    conn = create_connection()
+    conn.autocommit = False
+    try:
+        rng = random.Random(args.seed)
+        passenger_ids = create_frequent_travellers(conn, args.passengers, args.bookings,
+                                                   args.accommodations, args.transports, rng)
+        print(f"{args.passengers} travellers x {args.bookings} bookings "
+              f"({args.accommodations} accommodations, {args.transports} transport legs each)\n")
+        print(f"{'passenger':>10} {'approach':>10} {'rows':>8} {'p50 ms':>9} {'p95 ms':>9} {'mean ms':>9}")
+        for passenger_id in passenger_ids:
+            legacy, legacy_rows = load_itinerary_legacy(conn, passenger_id)
+            split = load_itinerary(conn, passenger_id)
+            if normalise(legacy) != normalise(split):
+                raise SystemExit(f"Itinerary mismatch for passenger {passenger_id}")
+            split_rows = len(split) + sum(len(b.accommodations) + 2 * len(b.transportations) for b in split)
+
+            for name, fn, rows in (("join", lambda: load_itinerary_legacy(conn, passenger_id), legacy_rows),
+                                   ("split", lambda: load_itinerary(conn, passenger_id), split_rows)):
+                stats = time_calls(fn, args.repeat)
+                print(f"{passenger_id:>10} {name:>10} {rows:>8} {stats['p50_ms']:>9.2f} "
+                      f"{stats['p95_ms']:>9.2f} {stats['mean_ms']:>9.2f}")
+    finally:
+        conn.rollback()  # leave the database exactly as we found it
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Throughput of the vectorised package quote engine at several catalog sizes.
+
+For each size a synthetic catalog is generated (flights, accommodations, car
+rentals and cruises spread over --locations locations and --days days), then
+random origin/destination/week requests are quoted twice: by
+QuoteCatalog.quote, and by a plain Python loop over every flight x hotel x
+car combination with the same rules. Both must return the same cheapest
+totals. Reported are requests per second and quotes (priced combinations)
+per second for each approach.
+
+The catalog is built in memory from row tuples, so no database is needed.
+
+Usage (from the project root):
+    python benchmarks/bench_quotes.py --sizes 1000,10000,50000 --queries 30
+"""
+import argparse
+import heapq
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.quotes import CAR_PICKUP_HOURS, QuoteCatalog
+
+
+def create_catalog(size, n_locations, n_days, start, rng):
+    """A catalog with ``size`` flights and size // 4 each of accommodations, cars and cruises."""
+    locations = [(i, f"Bench City {i}", "Benchland") for i in range(1, n_locations + 1)]
+    ids = [row[0] for row in locations]
+
+    def moment():
+        return start + timedelta(minutes=rng.randrange(n_days * 24 * 60 // 5) * 5)
+
+    flights = []
+    for i in range(size):
+        source, dest = rng.sample(ids, 2)
+        departure = moment()
+        flights.append((i + 1, f"BX{i:05d}", "Bench Air", source, dest, departure,
+                        departure + timedelta(minutes=rng.randint(45, 600)), round(rng.uniform(40, 900), 2)))
+    accommodations = [(i + 1, f"Bench Hotel {i}", "Hotel", rng.choice(ids),
+                       round(rng.uniform(40, 400) * (1 - rng.choice([0, 0, 0.1, 0.25])), 2))
+                      for i in range(size // 4)]
+    cars = []
+    for i in range(size // 4):
+        pickup = moment()
+        cars.append((i + 1, "Bench Cars", "Compact", rng.choice(ids), pickup,
+                     pickup + timedelta(days=rng.randint(1, 7)), round(rng.uniform(30, 600), 2)))
+    cruises = []
+    for i in range(size // 4):
+        departure = moment().date()
+        cruises.append((i + 1, f"Bench Cruise {i}", "Bench Line", rng.choice(ids), departure,
+                        departure + timedelta(days=rng.randint(1, 5)), round(rng.uniform(200, 3000), 2)))
+    return QuoteCatalog(locations, accommodations, flights, cars, cruises)
+
+
+def loop_quote(catalog, origin, dest, depart_from, depart_to, nights, limit):
+    """The same flight + hotel + car rules as QuoteCatalog.quote, one combination at a time."""
+    hotels = [row for row in catalog.accommodation_rows if row[3] == dest]
+    cars = [row for row in catalog.car_rows if row[3] == dest]
+    totals = []
+    candidates = 0
+    for flight in catalog.flight_rows:
+        if flight[3] != origin or flight[4] != dest or not depart_from <= flight[5].date() <= depart_to:
+            continue
+        arrival = flight[6]
+        check_out = datetime.combine(arrival.date() + timedelta(days=nights + 1), datetime.min.time())
+        for hotel in hotels:
+            hotel_price = float(hotel[4]) * nights
+            for car in cars:
+                candidates += 1
+                if arrival <= car[4] <= arrival + timedelta(hours=CAR_PICKUP_HOURS) and car[5] <= check_out:
+                    totals.append(float(flight[7]) + hotel_price + float(car[6]))
+    return heapq.nsmallest(limit, totals), candidates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,50000", help="flights per catalog, comma-separated")
+    parser.add_argument("--locations", type=int, default=20, help="synthetic locations")
+    parser.add_argument("--days", type=int, default=60, help="days the catalog is spread over")
+    parser.add_argument("--queries", type=int, default=30, help="random requests per size")
+    parser.add_argument("--loop-queries", type=int, default=None,
+                        help="requests also run through the Python loop (default: --queries)")
+    parser.add_argument("--nights", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    start = datetime(2025, 3, 1)
+    print(f"{'flights':>8} {'approach':>9} {'requests':>9} {'quotes/req':>11} {'p50 ms':>9} "
+          f"{'req/s':>9} {'quotes/s':>13}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        rng = random.Random(args.seed)
+        catalog = create_catalog(size, args.locations, args.days, start, rng)
+        requests = []
+        for _ in range(args.queries):
+            origin, dest = rng.sample(range(1, args.locations + 1), 2)
+            depart_from = (start + timedelta(days=rng.randrange(args.days - 7))).date()
+            requests.append((origin, dest, depart_from, depart_from + timedelta(days=6)))
+        loop_count = args.queries if args.loop_queries is None else min(args.loop_queries, args.queries)
+
+        vector_ms, vector_candidates, vector_totals = [], 0, []
+        for origin, dest, depart_from, depart_to in requests:
+            started = time.perf_counter()
+            packages, candidates = catalog.quote({origin}, {dest}, depart_from, depart_to, args.nights,
+                                                 car=True, limit=args.limit)
+            vector_ms.append((time.perf_counter() - started) * 1000)
+            vector_candidates += candidates
+            vector_totals.append([round(p["total"], 2) for p in packages])
+
+        loop_ms, loop_candidates = [], 0
+        for i, (origin, dest, depart_from, depart_to) in enumerate(requests[:loop_count]):
+            started = time.perf_counter()
+            totals, candidates = loop_quote(catalog, origin, dest, depart_from, depart_to, args.nights, args.limit)
+            loop_ms.append((time.perf_counter() - started) * 1000)
+            loop_candidates += candidates
+            if [round(t, 2) for t in totals] != vector_totals[i]:
+                raise SystemExit(f"mismatch for {origin} -> {dest} from {depart_from}: "
+                                 f"vectorised {vector_totals[i]}, loop {totals}")
+
+        for name, samples, candidates in (("numpy", vector_ms, vector_candidates),
+                                          ("loop", loop_ms, loop_candidates)):
+            if not samples:
+                continue
+            seconds = sum(samples) / 1000
+            print(f"{size:>8} {name:>9} {len(samples):>9} {candidates // len(samples):>11,} "
+                  f"{statistics.median(samples):>9.2f} {len(samples) / seconds:>9.1f} "
+                  f"{candidates / seconds:>13,.0f}")
+
+
+if __name__ == "__main__":
+    main()
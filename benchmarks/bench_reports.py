@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""Period report queries with YEAR()/MONTH() filters against BookingDate ranges.
+
+Loads a generated dataset (like run_benchmarks.py) and runs each report query
+twice:
+
+    before  idx_booking_date (BookingDate) and the period as YEAR(BookingDate) = ...
+            AND MONTH(BookingDate) = ..., grouped by MONTH()/QUARTER(), the way
+            GenerateMonthlyReport and complex_queries.sql did it
+    after   idx_booking_date_purpose_cost (BookingDate, Purpose, TotalCost) and the
+            period as a BookingDate range looked up in DimDate, grouped through
+            DimDate (src/period_reports.py)
+
+For each it prints the query plan, p50 latency and the work done (SQLite VM
+steps, or MySQL rows examined), and checks both return the same rows.
+
+Usage (from the project root):
+    python benchmarks/bench_reports.py --scale 100
+    python benchmarks/bench_reports.py --backend mysql --scale 100   # scratch DB travel_agency_bench
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from run_benchmarks import MySQLWork, SQLiteWork, load_mysql, load_sqlite, split_sql_script
+from src import period_reports
+
+DATE_DIMENSION_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                   "sql", "date_dimension.sql")
+
+LEGACY_MONTH_BY_PURPOSE_SQL = """
+    SELECT b.Purpose, COUNT(*) AS Bookings, SUM(b.TotalCost) AS Revenue, AVG(b.TotalCost) AS AverageValue
+    FROM Booking b
+    WHERE YEAR(b.BookingDate) = %s AND MONTH(b.BookingDate) = %s
+    GROUP BY b.Purpose
+    ORDER BY Bookings DESC, b.Purpose
+"""
+
+# GenerateMonthlyReport before this change
+LEGACY_MONTH_TOP_BOOKINGS_SQL = """
+    SELECT b.BookingID, b.GroupName, b.BookingDate, b.TotalCost,
+           p.Name AS PrimaryPassenger, e.Name AS AgentName
+    FROM Booking b
+    JOIN BookingPassenger bp ON bp.BookingID = b.BookingID AND bp.IsPrimary = TRUE
+    JOIN Passenger p ON bp.PassengerID = p.PassengerID
+    LEFT JOIN Employee e ON b.EmployeeID = e.EmployeeID
+    WHERE YEAR(b.BookingDate) = %s AND MONTH(b.BookingDate) = %s
+    ORDER BY b.TotalCost DESC, b.BookingID
+    LIMIT %s
+"""
+
+# complex_queries.sql query 8, for the two years the quarterly report reads
+LEGACY_MONTHS_BY_PURPOSE_SQL = """
+    SELECT YEAR(b.BookingDate), MONTH(b.BookingDate), b.Purpose, COUNT(*) AS Bookings, SUM(b.TotalCost) AS Revenue
+    FROM Booking b
+    WHERE YEAR(b.BookingDate) IN (%s, %s)
+    GROUP BY YEAR(b.BookingDate), MONTH(b.BookingDate), b.Purpose
+"""
+
+SQLITE_BEFORE = ["DROP INDEX IF EXISTS idx_booking_date_purpose_cost",
+                 "CREATE INDEX IF NOT EXISTS idx_booking_date ON Booking(BookingDate)", "ANALYZE"]
+SQLITE_AFTER = ["DROP INDEX IF EXISTS idx_booking_date",
+                "CREATE INDEX IF NOT EXISTS idx_booking_date_purpose_cost ON Booking(BookingDate, Purpose, TotalCost)",
+                "ANALYZE"]
+MYSQL_BEFORE = ["ALTER TABLE Booking ADD INDEX idx_booking_date (BookingDate), DROP INDEX idx_booking_date_purpose_cost",
+                "ANALYZE TABLE Booking"]
+MYSQL_AFTER = ["ALTER TABLE Booking ADD INDEX idx_booking_date_purpose_cost (BookingDate, Purpose, TotalCost), "
+               "DROP INDEX idx_booking_date", "ANALYZE TABLE Booking"]
+
+
+def fetch(conn, sql, params=()):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def apply_date_dimension(conn):
+    """Runs sql/date_dimension.sql in the scratch MySQL database."""
+    with open(DATE_DIMENSION_PATH, "r") as f:
+        # The script selects the app's database; stay in the scratch one
+        run_statements(conn, [statement for statement in split_sql_script(f.read())
+                              if not re.match(r"USE\b", statement, re.I)])
+
+
+def run_statements(conn, statements):
+    for statement in statements:
+        cursor = conn.cursor()
+        cursor.execute(statement)
+        if cursor.description:
+            cursor.fetchall()
+        cursor.close()
+    conn.commit()
+
+
+def query_plan(conn, backend, sql, params):
+    if backend == "sqlite":
+        return [row[-1] for row in fetch(conn, "EXPLAIN QUERY PLAN " + sql, params)]
+    return [f"{row[2]}: type={row[4]} key={row[6]} rows={row[9]} {row[11] or ''}".rstrip()
+            for row in fetch(conn, "EXPLAIN " + sql, params)]
+
+
+def normalized(rows):
+    """Rows with floats rounded, so sums added up in another order compare equal."""
+    return sorted(tuple(round(float(v), 2) if isinstance(v, float) or hasattr(v, "quantize") else str(v)
+                        for v in row) for row in rows)
+
+
+def measure(conn, work, sql, params, repeat, warmup):
+    for _ in range(warmup):
+        fetch(conn, sql, params)
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = fetch(conn, sql, params)
+        samples.append((time.perf_counter() - started) * 1000)
+    steps = work.measure(lambda: fetch(conn, sql, params))
+    return rows, statistics.median(samples), steps
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["sqlite", "mysql"], default="sqlite")
+    parser.add_argument("--scale", type=float, default=100.0, help="dataset scale factor")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--today", default="2025-01-01", help="generator reference date")
+    parser.add_argument("--database", default="travel_agency_bench", help="scratch MySQL database (dropped first)")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per query")
+    parser.add_argument("--warmup", type=int, default=2, help="untimed runs before timing")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Loading scale {args.scale:g} into {args.backend}...")
+        if args.backend == "sqlite":
+            conn = load_sqlite(os.path.join(tmp, "bench.db"), args.scale, args.seed, args.today)
+            work, before, after = SQLiteWork(conn), SQLITE_BEFORE, SQLITE_AFTER
+        else:
+            conn = load_mysql(args.database, args.scale, args.seed, args.today)
+            apply_date_dimension(conn)
+            work, before, after = MySQLWork(conn), MYSQL_BEFORE, MYSQL_AFTER
+        bookings = fetch(conn, "SELECT COUNT(*) FROM Booking")[0][0]
+        year, month = period_reports.latest_booking_month(conn)
+        month_start, month_end = period_reports.period_range(conn, year, month)
+        quarters_start = period_reports.period_range(conn, year - 1, 10)[0]
+        year_end = period_reports.period_range(conn, year)[1]
+        top = period_reports.MONTHLY_TOP_BOOKINGS
+        print(f"{bookings} bookings; report period {year}-{month:02d}\n")
+
+        queries = [
+            ("month by purpose",
+             LEGACY_MONTH_BY_PURPOSE_SQL, (year, month),
+             period_reports.MONTH_BY_PURPOSE_SQL, (month_start, month_end)),
+            ("month top bookings",
+             LEGACY_MONTH_TOP_BOOKINGS_SQL, (year, month, top),
+             period_reports.MONTH_TOP_BOOKINGS_SQL, (month_start, month_end, top)),
+            ("quarters by month and purpose",
+             LEGACY_MONTHS_BY_PURPOSE_SQL, (year - 1, year),
+             period_reports.MONTHS_BY_PURPOSE_SQL, (quarters_start, year_end)),
+        ]
+        results = {}
+        for phase, statements in (("before", before), ("after", after)):
+            run_statements(conn, statements)
+            for name, old_sql, old_params, new_sql, new_params in queries:
+                sql, params = (old_sql, old_params) if phase == "before" else (new_sql, new_params)
+                rows, p50, steps = measure(conn, work, sql, params, args.repeat, args.warmup)
+                results[(name, phase)] = (rows, p50, steps, query_plan(conn, args.backend, sql, params))
+
+        for name, *_ in queries:
+            print(f"== {name}")
+            for phase in ("before", "after"):
+                _, p50, steps, plan = results[(name, phase)]
+                print(f"  {phase:6} p50 {p50:8.2f} ms  {steps:>12,} {work.unit}")
+                for line in plan:
+                    print(f"         {line}")
+            same = normalized(results[(name, "before")][0]) == normalized(results[(name, "after")][0])
+            print(f"  same rows: {'yes' if same else 'NO'}\n")
+
+        for label, report in (("monthly_report()", lambda: period_reports.monthly_report(conn, year, month)),
+                              ("quarterly_report()", lambda: period_reports.quarterly_report(conn, year))):
+            samples = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                report()
+                samples.append((time.perf_counter() - started) * 1000)
+            print(f"{label:20} p50 {statistics.median(samples):8.2f} ms")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
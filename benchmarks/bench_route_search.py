@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""Compares the in-memory route index with the equivalent self-join SQL.
+
+Builds a synthetic flight network (a few hub airports plus many spokes,
+flights spread over --days days), then for random origin/destination/day
+triples asks both for the earliest-arriving and the cheapest itinerary with
+up to two connections. The SQL baseline is a UNION of 1-, 2- and 3-leg
+self-joins of Flight with the same layover window; both sides must agree on
+the best arrival and fare. Also reports the index build time and the cost of
+catching the index up after a batch of new flights.
+
+By default everything runs in an in-memory SQLite database with the
+project's schema. With --backend mysql the flights are inserted into the
+database configured in src/database.py inside a transaction that is rolled
+back at the end.
+
+Usage (from the project root):
+    python benchmarks/bench_route_search.py --flights 20000 --locations 100 --queries 50
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import sqlite_dialect
+from src.route_search import FlightGraph
+
+SCHEMA_SQLITE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sql",
+                             "create_schema_sqlite.sql")
+
+# Arrival and total fare of the best itinerary with up to two connections, for the same
+# rules as the index: layover window, no city visited twice, origin/destination not transited.
+ROUTES_SQL = """
+SELECT Arrival, Fare FROM (
+    SELECT f1.ArrivalDateTime AS Arrival, f1.Fare AS Fare
+    FROM Flight f1
+    WHERE f1.SourceLocationID = %(origin)s AND f1.DestLocationID = %(dest)s
+      AND f1.DepartureDateTime BETWEEN %(after)s AND %(before)s
+    UNION ALL
+    SELECT f2.ArrivalDateTime, f1.Fare + f2.Fare
+    FROM Flight f1
+    JOIN Flight f2 ON f2.SourceLocationID = f1.DestLocationID
+     AND f2.DepartureDateTime BETWEEN ADDTIME(f1.ArrivalDateTime, %(min_wait)s)
+                                  AND ADDTIME(f1.ArrivalDateTime, %(max_wait)s)
+    WHERE f1.SourceLocationID = %(origin)s AND f2.DestLocationID = %(dest)s
+      AND f1.DepartureDateTime BETWEEN %(after)s AND %(before)s
+      AND f1.DestLocationID NOT IN (%(origin)s, %(dest)s)
+    UNION ALL
+    SELECT f3.ArrivalDateTime, f1.Fare + f2.Fare + f3.Fare
+    FROM Flight f1
+    JOIN Flight f2 ON f2.SourceLocationID = f1.DestLocationID
+     AND f2.DepartureDateTime BETWEEN ADDTIME(f1.ArrivalDateTime, %(min_wait)s)
+                                  AND ADDTIME(f1.ArrivalDateTime, %(max_wait)s)
+    JOIN Flight f3 ON f3.SourceLocationID = f2.DestLocationID
+     AND f3.DepartureDateTime BETWEEN ADDTIME(f2.ArrivalDateTime, %(min_wait)s)
+                                  AND ADDTIME(f2.ArrivalDateTime, %(max_wait)s)
+    WHERE f1.SourceLocationID = %(origin)s AND f3.DestLocationID = %(dest)s
+      AND f1.DepartureDateTime BETWEEN %(after)s AND %(before)s
+      AND f1.DestLocationID NOT IN (%(origin)s, %(dest)s)
+      AND f2.DestLocationID NOT IN (%(origin)s, %(dest)s, f1.DestLocationID)
+) routes
+ORDER BY {order}
+LIMIT 1
+"""
+
+ORDER_BY = {"earliest": "Arrival, Fare", "cheapest": "Fare, Arrival"}
+
+
+def hhmmss(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}:00"
+
+
+def create_network(conn, n_locations, n_flights, n_days, start, rng):
+    """Inserts locations and flights (left uncommitted); returns the new LocationIDs."""
+    cursor = conn.cursor()
+    location_ids = []
+    for i in range(n_locations):
+        cursor.execute("INSERT INTO Location (City, State, Country) VALUES (%s, %s, %s)",
+                       (f"Bench City {i}", None, "Benchland"))
+        location_ids.append(cursor.lastrowid)
+    hubs = location_ids[:max(2, n_locations // 20)]
+
+    rows = []
+    for i in range(n_flights):
+        # Most flights touch a hub, so multi-leg routes exist between most spokes
+        source = rng.choice(hubs if rng.random() < 0.5 else location_ids)
+        dest = rng.choice(location_ids if source in hubs else hubs)
+        if dest == source:
+            dest = location_ids[(location_ids.index(source) + 1) % n_locations]
+        departure = start + timedelta(minutes=rng.randrange(n_days * 24 * 60 // 5) * 5)
+        arrival = departure + timedelta(minutes=rng.randint(45, 600))
+        rows.append((f"BX{i:05d}", rng.choice(["Bench Air", "Test Wings", "Sample Jet"]), source, dest,
+                     departure, arrival, "Economy", round(rng.uniform(40, 900), 2)))
+    cursor.executemany(
+        "INSERT INTO Flight (FlightNumber, Carrier, SourceLocationID, DestLocationID, "
+        "DepartureDateTime, ArrivalDateTime, Class, Fare) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)", rows)
+    cursor.close()
+    return location_ids
+
+
+def sql_best(conn, optimize, origin, dest, after, before, min_layover, max_layover):
+    params = {"origin": origin, "dest": dest, "after": after, "before": before,
+              "min_wait": hhmmss(min_layover), "max_wait": hhmmss(max_layover)}
+    sql = ROUTES_SQL.format(order=ORDER_BY[optimize])
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    row = cursor.fetchone()
+    cursor.close()
+    if row is None:
+        return None
+    arrival = row[0] if isinstance(row[0], datetime) else datetime.fromisoformat(str(row[0]))
+    return arrival, round(float(row[1]), 2)
+
+
+def graph_best(graph, optimize, origin, dest, after, before, min_layover, max_layover):
+    routes = graph.search({origin}, {dest}, after, before, optimize, 2, min_layover, max_layover, limit=1)
+    if not routes:
+        return None
+    legs = routes[0]
+    return legs[-1].arrival, round(float(sum(leg.fare for leg in legs)), 2)
+
+
+def summarise(samples):
+    samples = sorted(samples)
+    return {
+        "p50_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "mean_ms": statistics.fmean(samples),
+    }
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("sqlite", "mysql"), default="sqlite")
+    parser.add_argument("--locations", type=int, default=100, help="synthetic locations to create")
+    parser.add_argument("--flights", type=int, default=20000, help="synthetic flights to create")
+    parser.add_argument("--days", type=int, default=30, help="days the flights are spread over")
+    parser.add_argument("--queries", type=int, default=50, help="random searches per approach")
+    parser.add_argument("--sql-queries", type=int, default=None,
+                        help="searches run through the SQL baseline (default: --queries)")
+    parser.add_argument("--min-layover", type=int, default=45, help="minutes")
+    parser.add_argument("--max-layover", type=int, default=12 * 60, help="minutes")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    start = datetime(2025, 3, 1)
+    if args.backend == "sqlite":
+        conn = sqlite_dialect.connect(":memory:")
+        with open(SCHEMA_SQLITE, "r") as f:
+            conn.executescript(f.read())
+    else:
+        from src.database import create_connection
+        conn = create_connection()
+        conn.autocommit = False
+
+    try:
+        location_ids = create_network(conn, args.locations, args.flights, args.days, start, rng)
+        if args.backend == "sqlite":
+            conn.commit()
+            conn.executescript("ANALYZE;")
+        print(f"{args.flights:,} flights between {args.locations} locations over {args.days} days "
+              f"({args.backend})\n")
+
+        graph = FlightGraph()
+        _, build_ms = timed(lambda: graph.load(conn))
+        print(f"index build: {build_ms:.1f} ms for {len(graph):,} flights")
+
+        queries = []
+        for _ in range(args.queries):
+            origin, dest = rng.sample(location_ids, 2)
+            after = start + timedelta(days=rng.randrange(max(1, args.days - 2)), hours=rng.randrange(24))
+            queries.append((origin, dest, after, after + timedelta(hours=24)))
+
+        layovers = (args.min_layover, args.max_layover)
+        sql_count = args.queries if args.sql_queries is None else min(args.sql_queries, args.queries)
+        print(f"\n{'optimize':>10} {'approach':>8} {'queries':>8} {'found':>6} {'p50 ms':>9} {'p95 ms':>9} {'mean ms':>9}")
+        for optimize in ("earliest", "cheapest"):
+            graph_results, graph_ms = [], []
+            for origin, dest, after, before in queries:
+                result, ms = timed(lambda: graph_best(graph, optimize, origin, dest, after, before, *layovers))
+                graph_results.append(result)
+                graph_ms.append(ms)
+            sql_ms = []
+            for i, (origin, dest, after, before) in enumerate(queries[:sql_count]):
+                result, ms = timed(lambda: sql_best(conn, optimize, origin, dest, after, before,
+                                                   *layovers))
+                sql_ms.append(ms)
+                if result != graph_results[i]:
+                    raise SystemExit(f"{optimize} mismatch for {origin} -> {dest} after {after}: "
+                                     f"index {graph_results[i]}, SQL {result}")
+            for name, samples, found in (
+                    ("index", graph_ms, sum(r is not None for r in graph_results)),
+                    ("sql", sql_ms, sum(r is not None for r in graph_results[:sql_count]))):
+                if samples:
+                    stats = summarise(samples)
+                    print(f"{optimize:>10} {name:>8} {len(samples):>8} {found:>6} {stats['p50_ms']:>9.2f} "
+                          f"{stats['p95_ms']:>9.2f} {stats['mean_ms']:>9.2f}")
+
+        # Catching the index up after new flights only touches the changed departures lists
+        create_network(conn, 2, 200, args.days, start, rng)
+        _, sync_ms = timed(lambda: graph.load(conn))
+        print(f"\nincremental catch-up after 200 new flights: {sync_ms:.1f} ms (full re-read of Flight included)")
+    finally:
+        if args.backend == "mysql":
+            conn.rollback()  # leave the database exactly as we found it
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
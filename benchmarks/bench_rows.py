@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""Rows per second and peak memory of dict rows, plain tuples and records.
+
+Loads a generated dataset (like run_benchmarks.py) into SQLite and measures
+two paths the web pages take:
+
+    browse     every keyset page (src/browse.py) of a table, each page kept
+               as a list: dict cursor, tuple cursor, and records (src/rows.py)
+    itinerary  load_itinerary() for the busiest passengers: the previous
+               dict cursors plus dict copies, against the records it builds now
+
+Reported are rows per second (best of --repeat runs) and the peak memory
+tracemalloc sees while one full result is built and held: the whole table
+for browse, all the passengers' itineraries for itinerary.
+
+No database server is needed.
+
+Usage (from the project root):
+    python benchmarks/bench_rows.py --scale 200 --table Booking --passengers 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from run_benchmarks import load_sqlite
+from src import itinerary
+from src.browse import MAX_PAGE_SIZE, TABLES, build_page_query
+from src.rows import fetch_records
+
+
+def fetch_all(cursor):
+    return cursor.fetchall()
+
+
+# (name, dictionary cursor?, how a page is fetched)
+BROWSE_VARIANTS = [("dict", True, fetch_all), ("tuple", False, fetch_all), ("record", False, fetch_records)]
+
+
+def browse_table(conn, table_name, dictionary, fetch):
+    """Walks every page of a table in primary key order; returns the pages."""
+    spec = TABLES[table_name]
+    pk = spec["pk"]
+    pages, after = [], None
+    while True:
+        sql, params = build_page_query(table_name, spec["columns"], pk, after=after, page_size=MAX_PAGE_SIZE)
+        cursor = conn.cursor(dictionary=dictionary)
+        try:
+            cursor.execute(sql, params)
+            page = fetch(cursor)
+        finally:
+            cursor.close()
+        if len(page) <= MAX_PAGE_SIZE:
+            pages.append(page)
+            return pages
+        page = page[:MAX_PAGE_SIZE]
+        pages.append(page)
+        last_pk = page[-1][pk] if dictionary else page[-1][spec["columns"].index(pk)]
+        after = (last_pk, last_pk)
+
+
+# --- load_itinerary() before src/rows.py: dict cursors, then a dict per booking, accommodation and leg ---
+
+def _fetch_dicts(conn, sql, passenger_id):
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(sql, (passenger_id,))
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def load_itinerary_dicts(conn, passenger_id):
+    booking_rows = _fetch_dicts(conn, itinerary.BOOKINGS_SQL, passenger_id)
+    if not booking_rows:
+        return []
+    accommodation_rows = _fetch_dicts(conn, itinerary.ACCOMMODATIONS_SQL, passenger_id)
+    legs = _fetch_dicts(conn, itinerary.TRANSPORTATIONS_SQL, passenger_id)
+    details = {}
+    for kind in {leg["TransportType"] for leg in legs} & itinerary.DETAIL_QUERIES.keys():
+        for row in _fetch_dicts(conn, itinerary.DETAIL_QUERIES[kind], passenger_id):
+            details[(kind, row.pop("BookingTransportationID"))] = row
+
+    bookings = []
+    by_id = {}
+    for row in booking_rows:
+        booking = dict(row, accommodations=[], transportations=[])
+        bookings.append(booking)
+        by_id[row["BookingID"]] = booking
+    for row in accommodation_rows:
+        by_id[row["BookingID"]]["accommodations"].append({
+            "Name": row["Name"], "Type": row["Type"], "City": row["City"], "Country": row["Country"],
+            "CheckInDate": row["CheckInDate"], "CheckOutDate": row["CheckOutDate"], "Cost": row["Cost"]
+        })
+    for leg in legs:
+        transport_details = {"TransportType": leg["TransportType"], "Cost": leg["Cost"]}
+        extra = details.get((leg["TransportType"], leg["BookingTransportationID"]))
+        if extra is not None:
+            transport_details.update(extra)
+        by_id[leg["BookingID"]]["transportations"].append(transport_details)
+    return bookings
+
+
+ITINERARY_VARIANTS = [("dict", load_itinerary_dicts), ("record", itinerary.load_itinerary)]
+
+
+def itinerary_row_count(bookings):
+    if bookings and isinstance(bookings[0], dict):
+        return len(bookings) + sum(len(b["accommodations"]) + len(b["transportations"]) for b in bookings)
+    return len(bookings) + sum(len(b.accommodations) + len(b.transportations) for b in bookings)
+
+
+def best_seconds(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def peak_bytes(fn):
+    """Peak traced allocation while fn() runs and its result is still referenced."""
+    tracemalloc.start()
+    try:
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak
+
+
+def report(label, variants, rows, repeat):
+    """variants: [(name, fn)]; prints rows/s and peak memory, relative to the first variant."""
+    print(f"== {label} ({rows:,} rows)")
+    print(f"  {'variant':8} {'rows/s':>12} {'peak MB':>9} {'bytes/row':>10} {'vs ' + variants[0][0]:>9}")
+    baseline = None
+    for name, fn in variants:
+        seconds = best_seconds(fn, repeat)
+        peak = peak_bytes(fn)
+        baseline = baseline or peak
+        print(f"  {name:8} {rows / seconds:>12,.0f} {peak / 2 ** 20:>9.2f} {peak / rows:>10.0f} "
+              f"{peak / baseline:>8.0%}")
+    print()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=200.0, help="dataset scale factor")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--today", default="2025-01-01", help="generator reference date")
+    parser.add_argument("--table", choices=sorted(TABLES), default="Booking", help="table to browse")
+    parser.add_argument("--passengers", type=int, default=200, help="busiest passengers whose itineraries are loaded")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per variant (best is kept)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Loading scale {args.scale:g} into sqlite...")
+        conn = load_sqlite(os.path.join(tmp, "bench.db"), args.scale, args.seed, args.today)
+        print()
+
+        pages = {name: browse_table(conn, args.table, dictionary, fetch)
+                 for name, dictionary, fetch in BROWSE_VARIANTS}
+        flat = {name: [tuple(row.values()) if isinstance(row, dict) else tuple(row)
+                       for page in result for row in page]
+                for name, result in pages.items()}
+        if not flat["dict"] == flat["tuple"] == flat["record"]:
+            raise SystemExit(f"Browse variants returned different rows for {args.table}")
+        report(f"browse {args.table}, {MAX_PAGE_SIZE} rows a page",
+               [(name, lambda d=dictionary, f=fetch: browse_table(conn, args.table, d, f))
+                for name, dictionary, fetch in BROWSE_VARIANTS],
+               len(flat["dict"]), args.repeat)
+
+        cursor = conn.cursor()
+        cursor.execute("SELECT PassengerID FROM BookingPassenger GROUP BY PassengerID "
+                       "ORDER BY COUNT(*) DESC, PassengerID LIMIT %s", (args.passengers,))
+        passenger_ids = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+        rows = sum(itinerary_row_count(itinerary.load_itinerary(conn, pid)) for pid in passenger_ids)
+        report(f"itinerary of the {len(passenger_ids)} busiest passengers",
+               [(name, lambda load=load: [load(conn, pid) for pid in passenger_ids])
+                for name, load in ITINERARY_VARIANTS],
+               rows, args.repeat)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
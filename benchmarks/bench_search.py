@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Latency of the full-text search index against a LIKE '%...%' scan.
+
+Builds a SearchIndex over --reviews synthetic review texts (words drawn from
+a Zipf-shaped vocabulary, like real text) and times exact, prefix, typo and
+multi-word queries through SearchIndex.search. The same texts are loaded
+into an in-memory SQLite table and the exact queries are also run as
+``WHERE Text LIKE '%word%'``, the way they would be typed into /execute_sql.
+Reported are the build time and p50/p95 latency per kind of query.
+
+No database server is needed.
+
+Usage (from the project root):
+    python benchmarks/bench_search.py --reviews 200000 --queries 50
+    python benchmarks/bench_search.py --reviews 2000000 --like-queries 3
+"""
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.search import SearchIndex
+
+SYLLABLES = ["ka", "lo", "mi", "ne", "po", "ra", "si", "tu", "ve", "zo", "ber", "dan", "fel", "gor", "hin", "pul"]
+
+
+def create_vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def typo(word, rng):
+    i = rng.randrange(len(word))
+    return word[:i] + ("x" if word[i] != "x" else "q") + word[i + 1:]
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=200000, help="synthetic review texts to index")
+    parser.add_argument("--vocabulary", type=int, default=50000, help="distinct words")
+    parser.add_argument("--words", type=int, default=25, help="words per review")
+    parser.add_argument("--queries", type=int, default=50, help="queries per kind")
+    parser.add_argument("--like-queries", type=int, default=10, help="queries also run as a LIKE scan")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = create_vocabulary(args.vocabulary, rng)
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    texts = [" ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=args.words)) for _ in range(args.reviews)]
+
+    index = SearchIndex()
+    started = time.perf_counter()
+    for key, text in enumerate(texts, 1):
+        index.upsert("review", key, (text,))
+    index.merge()
+    build = time.perf_counter() - started
+    print(f"indexed {args.reviews:,} reviews, {len(index.terms):,} terms in {build:.1f}s")
+
+    # Mid-frequency words: common enough to match many rows, rare enough to be selective
+    pool = vocabulary[50:5000]
+    queries = {
+        "exact": [rng.choice(pool) for _ in range(args.queries)],
+        "prefix": [rng.choice(pool)[:4] for _ in range(args.queries)],
+        "typo": [typo(rng.choice(pool), rng) for _ in range(args.queries)],
+        "2 words": [f"{rng.choice(vocabulary[:500])} {rng.choice(pool)}" for _ in range(args.queries)],
+        "3 words": [" ".join(rng.choice(vocabulary[:200]) for _ in range(3)) for _ in range(args.queries)],
+    }
+
+    print(f"{'query':>10} {'approach':>9} {'queries':>8} {'avg hits':>10} {'p50 ms':>9} {'p95 ms':>9}")
+    for kind, words in queries.items():
+        samples, hits = [], 0
+        for query in words:
+            started = time.perf_counter()
+            total, _, _ = index.search(query, offset=0, limit=20)
+            samples.append((time.perf_counter() - started) * 1000)
+            hits += total
+        p50, p95 = percentiles(samples)
+        print(f"{kind:>10} {'index':>9} {len(samples):>8} {hits // len(samples):>10,} {p50:>9.2f} {p95:>9.2f}")
+
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE Review (ReviewID INTEGER PRIMARY KEY, Text TEXT)")
+    db.executemany("INSERT INTO Review (ReviewID, Text) VALUES (?, ?)", enumerate(texts, 1))
+    samples, hits = [], 0
+    for query in queries["exact"][:args.like_queries]:
+        started = time.perf_counter()
+        hits += db.execute("SELECT COUNT(*) FROM Review WHERE Text LIKE ?", (f"%{query}%",)).fetchone()[0]
+        samples.append((time.perf_counter() - started) * 1000)
+    if samples:
+        p50, p95 = percentiles(samples)
+        print(f"{'exact':>10} {'LIKE':>9} {len(samples):>8} {hits // len(samples):>10,} {p50:>9.2f} {p95:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Start-up time of the web app: cold imports and a simulated pre-fork server.
+
+Each run is a fresh Python process that imports src.main and serves one
+request (--path) through the Flask test client, like a worker's first page
+view. Reported are the time to import the app, the time the first request
+took (it checks the database and opens the first pooled connection) and
+the whole process, p50 and max over --runs runs.
+
+With --workers N the process instead imports the app once and forks N
+workers, as ``gunicorn --preload -w N`` does; each serves its first request
+and the time until all N have answered is reported. Forking needs a POSIX
+system.
+
+The SQLite backend (a scratch file, created with the schema) is used unless
+--backend mysql is given, which uses the server configured in src/database.py.
+
+Usage (from the project root):
+    python benchmarks/bench_startup.py --runs 10 --workers 4
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, os, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+from src.main import app
+imported = time.perf_counter()
+workers = {workers}
+
+def first_request():
+    began = time.perf_counter()
+    response = app.test_client().get({path!r})
+    if response.status_code >= 400:
+        raise SystemExit(f"{{response.status_code}} from {path!r}")
+    return time.perf_counter() - began
+
+if not workers:
+    request = first_request()
+    print(json.dumps({{"import": imported - started, "request": request,
+                      "total": time.perf_counter() - started}}))
+else:
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                first_request()
+                os._exit(0)
+            except BaseException:
+                os._exit(1)
+        children.append(pid)
+    failed = sum(os.waitpid(pid, 0)[1] != 0 for pid in children)
+    print(json.dumps({{"import": imported - started, "total": time.perf_counter() - started,
+                      "failed": failed}}))
+"""
+
+
+def run(args, env, workers):
+    code = CHILD.format(root=ROOT, path=args.path, workers=workers)
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        raise SystemExit(f"start-up run failed:\n{result.stderr}")
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["process"] = wall
+    return timings
+
+
+def report(label, samples):
+    ms = [s * 1000 for s in samples]
+    print(f"{label:>28} {statistics.median(ms):>9.1f} {max(ms):>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("sqlite", "mysql"), default="sqlite")
+    parser.add_argument("--runs", type=int, default=10, help="fresh processes per measurement")
+    parser.add_argument("--workers", type=int, default=4, help="forked workers (0 skips the pre-fork run)")
+    parser.add_argument("--path", default="/passengers", help="first request each process serves")
+    args = parser.parse_args()
+
+    env = dict(os.environ, DB_BACKEND=args.backend, PYTHONDONTWRITEBYTECODE="1")
+    scratch = tempfile.TemporaryDirectory()
+    if args.backend == "sqlite":
+        env["SQLITE_PATH"] = os.path.join(scratch.name, "startup.db")
+        run(args, env, 0)  # creates the file, so the runs below measure opening an existing one
+
+    print(f"{'':>28} {'p50 ms':>9} {'max ms':>9}")
+    cold = [run(args, env, 0) for _ in range(args.runs)]
+    report("import src.main", [t["import"] for t in cold])
+    report(f"first request {args.path}", [t["request"] for t in cold])
+    report("process start to response", [t["process"] for t in cold])
+
+    if args.workers:
+        forked = [run(args, env, args.workers) for _ in range(args.runs)]
+        failed = sum(t["failed"] for t in forked)
+        if failed:
+            raise SystemExit(f"{failed} forked worker(s) failed their first request")
+        report(f"{args.workers} forked workers ready", [t["process"] for t in forked])
+    scratch.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""Reproducible query benchmark suite.
+
+Loads a generated dataset (generate_data.py, fixed seed and date) at one or more
+scale factors into a scratch database, then times:
+
+    query.N        each numbered query in sql/complex_queries.sql
+    itinerary.*    load_itinerary() for the busiest and a typical passenger
+    browse.*       the fetch_table_data() path (SELECT * ... LIMIT 100) per table
+    page.*         keyset pages (first page and one 90% of the way in) per table
+
+For every workload it records p50/p95/p99/mean latency, the result size (rows and
+approximate bytes) and the work the engine did, measured on one extra untimed run:
+the sum of the Handler_read_* counters on MySQL/MariaDB ("rows_examined") or the
+number of virtual machine steps on SQLite ("vm_steps").
+
+The report is JSON with sorted keys, so two runs can be diffed directly or with
+--compare. Usage (from the project root):
+
+    python benchmarks/run_benchmarks.py                                  # SQLite, scale 1
+    python benchmarks/run_benchmarks.py --scale 1 10 --repeat 30 --output before.json
+    python benchmarks/run_benchmarks.py --scale 1 10 --compare before.json
+    python benchmarks/run_benchmarks.py --compare before.json after.json # diff two reports, no run
+    python benchmarks/run_benchmarks.py --backend mysql --scale 10       # scratch DB travel_agency_bench
+
+The MySQL backend uses the credentials in src/database.py and drops and
+recreates the scratch database (--mysql-database); it never touches the app's
+own database unless --existing is given. The SQLite file is opened the way the
+app's DB_BACKEND=sqlite opens it (src/backend.py: WAL, mmap, statement cache),
+so the two backends are compared running the same code.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+import generate_data
+from src.backend import SQLiteBackend
+from src.browse import TABLES as BROWSE_TABLES, TablePage
+from src.itinerary import load_itinerary
+from src.rollups import parse_numbered_sql
+
+QUERIES_PATH = os.path.join(PROJECT_DIR, "sql", "complex_queries.sql")
+MYSQL_SCHEMA_PATH = os.path.join(PROJECT_DIR, "sql", "create_schema_mysql.sql")
+DEFAULT_OUTPUT = os.path.join(PROJECT_DIR, "benchmarks", "results", "latest.json")
+
+DATASET_TABLES = ["Location", "Passenger", "Employee", "Accommodation", "Flight", "CarRental", "Cruise",
+                  "Booking", "BookingPassenger", "BookingAccommodation", "BookingTransportation",
+                  "Payment", "Review"]
+
+
+# --- Loading the dataset ---
+
+def split_sql_script(text):
+    """Splits a MySQL script into statements, honouring DELIMITER, quotes and comments."""
+    statements = []
+    delimiter = ";"
+    start = 0
+    i = 0
+    n = len(text)
+    quote = None
+    while i < n:
+        c = text[i]
+        if quote:
+            if c == "\\":
+                i += 2
+                continue
+            if c == quote:
+                if text.startswith(quote, i + 1):
+                    i += 2
+                    continue
+                quote = None
+            i += 1
+            continue
+        if c in "'\"`":
+            quote = c
+        elif text.startswith("--", i) or c == "#":
+            end = text.find("\n", i)
+            i = n if end == -1 else end
+            continue
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+            continue
+        elif (i == 0 or text[i - 1] == "\n") and text[i:i + 10].upper().startswith("DELIMITER "):
+            end = text.find("\n", i)
+            end = n if end == -1 else end
+            delimiter = text[i + 10:end].strip()
+            i = start = end
+            continue
+        elif text.startswith(delimiter, i):
+            statements.append(text[start:i])
+            i += len(delimiter)
+            start = i
+            continue
+        i += 1
+    statements.append(text[start:])
+    # Drop what is left of comment-only chunks
+    return [s.strip() for s in statements
+            if re.sub(r"/\*.*?\*/|--[^\n]*|#[^\n]*", "", s, flags=re.S).strip()]
+
+
+def generate_script(scale, seed, today, dialect, path):
+    generate_data.main(["--scale", str(scale), "--seed", str(seed), "--today", today,
+                        "--format", "sql", "--dialect", dialect, "--output", path])
+
+
+def load_sqlite(path, scale, seed, today):
+    for leftover in (path, path + "-wal", path + "-shm"):
+        if os.path.exists(leftover):
+            os.unlink(leftover)
+    conn = SQLiteBackend(path).open_connection()  # creates the schema
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, "data.sql")
+        generate_script(scale, seed, today, "sqlite", script)
+        with open(script, "r", encoding="utf-8") as f:
+            conn.executescript(f.read())
+    conn.executescript("ANALYZE;")
+    return conn
+
+
+def mysql_connect(database=None):
+    import mysql.connector
+    from src.database import MYSQL_HOST, MYSQL_PASSWORD, MYSQL_PORT, MYSQL_USER
+    return mysql.connector.connect(host=MYSQL_HOST, user=MYSQL_USER, password=MYSQL_PASSWORD,
+                                   port=MYSQL_PORT, database=database)
+
+
+def load_mysql(database, scale, seed, today):
+    conn = mysql_connect()
+    cursor = conn.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS `{database}`")
+    cursor.execute(f"CREATE DATABASE `{database}` CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
+    cursor.execute(f"USE `{database}`")
+    with open(MYSQL_SCHEMA_PATH, "r") as f:
+        schema = f.read()
+    for statement in split_sql_script(schema):
+        # The schema script selects the app's database; stay in the scratch one
+        if re.match(r"(CREATE\s+DATABASE|USE)\b", statement, re.I):
+            continue
+        cursor.execute(statement)
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, "data.sql")
+        generate_script(scale, seed, today, "mysql", script)
+        with open(script, "r", encoding="utf-8") as f:
+            for statement in split_sql_script(f.read()):
+                cursor.execute(statement)
+    conn.commit()
+    for table in DATASET_TABLES:
+        cursor.execute(f"ANALYZE TABLE `{table}`")
+        cursor.fetchall()
+    cursor.close()
+    return conn
+
+
+def dataset_counts(conn):
+    cursor = conn.cursor()
+    counts = {}
+    for table in DATASET_TABLES:
+        cursor.execute(f"SELECT COUNT(*) FROM `{table}`")
+        counts[table] = cursor.fetchone()[0]
+    cursor.close()
+    return counts
+
+
+# --- Measuring engine work ---
+
+class MySQLWork:
+    """Rows examined, as the change in the session's Handler_read_* counters."""
+    unit = "rows_examined"
+
+    def __init__(self, conn):
+        self.conn = conn
+        # SHOW STATUS bumps the counters itself; measure that once and subtract it
+        self.overhead = 0
+        self.overhead = self.measure(lambda: None)
+
+    def _counters(self):
+        cursor = self.conn.cursor()
+        cursor.execute("SHOW SESSION STATUS LIKE 'Handler_read%'")
+        total = sum(int(value) for _, value in cursor.fetchall())
+        cursor.close()
+        return total
+
+    def measure(self, fn):
+        before = self._counters()
+        fn()
+        return max(0, self._counters() - before - self.overhead)
+
+
+class SQLiteWork:
+    """Virtual machine instructions executed, counted with a progress handler."""
+    unit = "vm_steps"
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def measure(self, fn):
+        steps = [0]
+
+        def count():
+            steps[0] += 1
+            return 0
+        self.conn.set_progress_handler(count, 1)
+        try:
+            fn()
+        finally:
+            self.conn.set_progress_handler(None, 1)
+        return steps[0]
+
+
+# --- Workloads: name -> callable(conn) returning the result rows ---
+
+def run_query(conn, sql):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def itinerary_rows(conn, passenger_id):
+    bookings = load_itinerary(conn, passenger_id)
+    rows = list(bookings)
+    for booking in bookings:
+        rows.extend(booking.accommodations)
+        rows.extend(booking.transportations)
+    return rows
+
+
+class _Borrowed:
+    """Connection proxy whose close() is a no-op; TablePage closes the connection it is given."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return self._conn.cursor(*args, **kwargs)
+
+    def close(self):
+        pass
+
+
+def page_rows(conn, table_name, after):
+    spec = BROWSE_TABLES[table_name]
+    page = TablePage(_Borrowed(conn), table_name, spec["columns"], spec["pk"], after=after)
+    try:
+        return list(page)
+    finally:
+        page.close()
+
+
+def build_workloads(conn):
+    workloads = {}
+    with open(QUERIES_PATH, "r") as f:
+        for query in parse_numbered_sql(f.read()):
+            workloads[f"query.{query['number']:02d}"] = (lambda c, sql=query["sql"]: run_query(c, sql))
+
+    # Busiest passenger and the median one by booking count (deterministic for a given dataset)
+    passengers = run_query(conn, """
+        SELECT PassengerID, COUNT(*) AS Bookings FROM BookingPassenger
+        GROUP BY PassengerID ORDER BY Bookings DESC, PassengerID
+    """)
+    if passengers:
+        for label, (passenger_id, _) in (("busiest", passengers[0]), ("median", passengers[len(passengers) // 2])):
+            workloads[f"itinerary.{label}"] = (lambda c, pid=passenger_id: itinerary_rows(c, pid))
+
+    for table_name, spec in BROWSE_TABLES.items():
+        workloads[f"browse.{table_name}"] = (
+            lambda c, t=table_name: run_query(c, f"SELECT * FROM `{t}` LIMIT 100"))
+        workloads[f"page.{table_name}.first"] = (lambda c, t=table_name: page_rows(c, t, None))
+        count = run_query(conn, f"SELECT COUNT(*) FROM `{table_name}`")[0][0]
+        deep = run_query(conn, f"SELECT `{spec['pk']}` FROM `{table_name}` ORDER BY `{spec['pk']}` "
+                               f"LIMIT 1 OFFSET {int(count * 0.9)}")
+        if deep:
+            pk = deep[0][0]
+            workloads[f"page.{table_name}.deep"] = (lambda c, t=table_name, pk=pk: page_rows(c, t, (pk, pk)))
+    return workloads
+
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(sorted_samples) - 1, int(round(pct / 100 * len(sorted_samples))) - 1))
+    return sorted_samples[index]
+
+
+def benchmark(conn, work, name, fn, repeat, warmup):
+    for _ in range(warmup):
+        fn(conn)
+    samples = []
+    rows = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = fn(conn)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    examined = work.measure(lambda: fn(conn))
+    return {
+        "p50_ms": round(percentile(samples, 50), 4),
+        "p95_ms": round(percentile(samples, 95), 4),
+        "p99_ms": round(percentile(samples, 99), 4),
+        "mean_ms": round(sum(samples) / len(samples), 4),
+        "result_rows": len(rows),
+        "result_bytes": len(repr(rows).encode("utf-8")),
+        work.unit: examined,
+    }
+
+
+# --- Reporting ---
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_reports(old, new):
+    """Prints p50 and engine-work changes for every workload present in both reports."""
+    print(f"\n{'scale':>6} {'workload':<28} {'p50 old':>9} {'p50 new':>9} {'change':>8} "
+          f"{'work old':>12} {'work new':>12}")
+    for scale, run in sorted(new["scales"].items(), key=lambda kv: float(kv[0])):
+        old_run = old.get("scales", {}).get(scale)
+        if not old_run:
+            print(f"{scale:>6} (not in the baseline)")
+            continue
+        for name, result in sorted(run["results"].items()):
+            before = old_run["results"].get(name)
+            if not before:
+                continue
+            change = (result["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100 if before["p50_ms"] else 0.0
+            unit = "rows_examined" if "rows_examined" in result else "vm_steps"
+            print(f"{scale:>6} {name:<28} {before['p50_ms']:>9.3f} {result['p50_ms']:>9.3f} {change:>+7.1f}% "
+                  f"{before.get(unit, 0):>12} {result.get(unit, 0):>12}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["sqlite", "mysql"], default="sqlite")
+    parser.add_argument("--scale", type=float, nargs="+", default=[1.0], help="dataset scale factors to run")
+    parser.add_argument("--seed", type=int, default=42, help="generator seed (keep fixed across compared runs)")
+    parser.add_argument("--today", default="2025-01-01", help="generator reference date (keep fixed too)")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per workload")
+    parser.add_argument("--warmup", type=int, default=2, help="untimed runs before timing")
+    parser.add_argument("--only", default=None, help="regular expression selecting workload names")
+    parser.add_argument("--existing", action="store_true",
+                        help="benchmark the existing database instead of loading a dataset (single run)")
+    parser.add_argument("--sqlite-path", default=os.path.join(tempfile.gettempdir(), "travel_agency_bench.db"))
+    parser.add_argument("--mysql-database", default="travel_agency_bench")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="where to write the JSON report")
+    parser.add_argument("--compare", nargs="+", metavar="REPORT",
+                        help="baseline report to compare against; with two reports, just diff them")
+    args = parser.parse_args(argv)
+
+    if args.compare and len(args.compare) == 2:
+        with open(args.compare[0]) as f_old, open(args.compare[1]) as f_new:
+            compare_reports(json.load(f_old), json.load(f_new))
+        return 0
+
+    report = {
+        "meta": {
+            "backend": args.backend,
+            "seed": args.seed,
+            "today": args.today,
+            "repeat": args.repeat,
+            "warmup": args.warmup,
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "started_at": datetime.now().replace(microsecond=0).isoformat(),
+        },
+        "scales": {},
+    }
+    only = re.compile(args.only) if args.only else None
+
+    for scale in ([None] if args.existing else args.scale):
+        label = "existing" if scale is None else f"{scale:g}"
+        print(f"\n== {args.backend} dataset at scale {label} ==")
+        if args.backend == "sqlite":
+            conn = SQLiteBackend(args.sqlite_path).open_connection() if scale is None else \
+                load_sqlite(args.sqlite_path, scale, args.seed, args.today)
+            work = SQLiteWork(conn)
+        else:
+            if scale is None:
+                from src.database import DATABASE_NAME
+                conn = mysql_connect(DATABASE_NAME)
+            else:
+                conn = load_mysql(args.mysql_database, scale, args.seed, args.today)
+            work = MySQLWork(conn)
+
+        try:
+            results = {}
+            for name, fn in build_workloads(conn).items():
+                if only and not only.search(name):
+                    continue
+                results[name] = benchmark(conn, work, name, fn, args.repeat, args.warmup)
+                r = results[name]
+                print(f"  {name:<28} p50 {r['p50_ms']:>9.3f} ms  p95 {r['p95_ms']:>9.3f} ms  "
+                      f"p99 {r['p99_ms']:>9.3f} ms  rows {r['result_rows']:>6}  {work.unit} {r[work.unit]}")
+            report["scales"][label] = {"dataset": dataset_counts(conn), "results": results}
+        finally:
+            conn.close()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True, default=str)
+        f.write("\n")
+    print(f"\nReport written to {args.output}")
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            compare_reports(json.load(f), report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
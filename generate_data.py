@@ -1,13 +1,39 @@
 #!/usr/bin/env python3.11
-import sqlite3
-import random
-from faker import Faker
-from datetime import datetime, timedelta
+"""Generates sample data for the travel agency database at any scale.
+
+Rows are produced table by table and written out as they are generated, so
+memory stays flat no matter how many rows are requested. Output is either
+batched multi-row INSERT statements (MySQL or SQLite dialect) or one
+LOAD DATA-compatible CSV/TSV file per table plus a companion `load_data.sql`
+that loads them with key and constraint checks switched off.
+
+Every table is cut into fixed-size chunks of rows. Each chunk gets its own
+random seed derived from (--seed, table, chunk number) and is generated
+independently, so chunks can run in a process pool (--workers) and the output
+is byte-for-byte the same for a given seed whatever the worker count.
+Booking-dependent tables (BookingPassenger, BookingAccommodation,
+BookingTransportation, Payment, Review) are generated in the same chunk as
+their bookings, so they only ever need that chunk's state.
+
+Examples:
+    python generate_data.py                                  # tens of rows, SQLite INSERTs (as before)
+    python generate_data.py --scale 100 --dialect mysql      # multi-row MySQL INSERTs
+    python generate_data.py --scale 12500 --format tsv -j 8  # ~1M bookings as TSV + load_data.sql
+"""
+import argparse
 import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
 
-fake = Faker()
+from faker import Faker
 
-# Configuration
+# Configuration (row counts at --scale 1)
 NUM_LOCATIONS = 40
 NUM_PASSENGERS = 50
 NUM_EMPLOYEES = 15 # Fewer employees
@@ -21,312 +47,576 @@ AVG_ACCOMMODATIONS_PER_BOOKING = 0.8
 AVG_TRANSPORTS_PER_BOOKING = 1.2
 AVG_PAYMENTS_PER_BOOKING = 1.1
 AVG_REVIEWS_PER_BOOKING = 0.7
+CHUNK_ROWS = 50_000 # Rows of the driving table per chunk (bounds per-chunk memory)
+
+# Columns written per table, in load order (parents before children)
+TABLE_COLUMNS = {
+    "Location": ["LocationID", "City", "State", "Country"],
+    "Passenger": ["PassengerID", "Name", "Gender", "Age", "Email", "Phone"],
+    "Employee": ["EmployeeID", "Name", "Role", "JoinDate", "SupervisorID"],
+    "Accommodation": ["AccommodationID", "Name", "Type", "Rate", "Facilities", "Discount", "LocationID"],
+    "Flight": ["FlightID", "FlightNumber", "Carrier", "SourceLocationID", "DestLocationID", "DepartureDateTime", "ArrivalDateTime", "Class", "Fare"],
+    "CarRental": ["CarRentalID", "Company", "CarType", "PickupLocationID", "DropoffLocationID", "PickupDateTime", "DropoffDateTime", "Rent"],
+    "Cruise": ["CruiseID", "CruiseName", "Line", "SourceLocationID", "DestLocationID", "DepartureDate", "ReturnDate", "Fare"],
+    "Booking": ["BookingID", "GroupName", "Purpose", "BookingDate", "EmployeeID", "TotalCost", "Status"],
+    "BookingPassenger": ["BookingID", "PassengerID", "IsPrimary"],
+    "BookingAccommodation": ["BookingID", "AccommodationID", "CheckInDate", "CheckOutDate", "Cost"],
+    "BookingTransportation": ["BookingID", "TransportTypeID", "FlightID", "CarRentalID", "CruiseID", "Cost"],
+    "Payment": ["BookingID", "PaymentDate", "Amount", "PaymentType", "CardLastFour", "ExpiryDate"],
+    "Review": ["BookingID", "PassengerID", "Rating", "Text", "ReviewDate"],
+}
+
+# Tables generated from the booking range of a chunk
+BOOKING_TABLES = ["Booking", "BookingPassenger", "BookingAccommodation", "BookingTransportation", "Payment", "Review"]
+
+# Enum values accepted by sql/create_schema_mysql.sql
+ACCOMMODATION_TYPES = ["Hotel", "Resort", "Airbnb", "Guesthouse", "Inn", "Suites"]
+PURPOSES = ["Leisure", "Business", "Family", "Honeymoon", "Adventure"]
+STATUSES = ["Pending", "Confirmed", "Confirmed", "Completed", "Cancelled"]
+PAYMENT_TYPES = ["Credit Card", "Debit Card", "Bank Transfer", "Cash"]
+TRANSPORT_FLIGHT, TRANSPORT_CAR, TRANSPORT_CRUISE = 1, 2, 4 # TransportationType IDs inserted by the schema
+
+# Per-chunk generation state, (re)initialised by start_chunk() in whichever process runs the chunk
+fake = Faker()
+rng = random.Random()
+counts = {}
+today = date.today()
+names = {} # carrier / rental company / cruise line names, identical in every chunk
+
+
+def start_chunk(config, table, chunk_index):
+    """Seeds the generators for one chunk: same (seed, table, chunk) -> same rows."""
+    global today
+    chunk_seed = f"{config['seed']}:{table}:{chunk_index}"
+    rng.seed(chunk_seed)
+    fake.seed_instance(chunk_seed)
+    counts.clear()
+    counts.update(config["counts"])
+    today = config["today"]
+    if names.get("seed") != config["seed"]:
+        # Shared catalogs must not depend on which chunk asked for them
+        names["seed"] = config["seed"]
+        name_fake = Faker()
+        name_fake.seed_instance(f"{config['seed']}:names")
+        names["carriers"] = [name_fake.company() + " Airlines" for _ in range(10)]
+        names["rental_companies"] = [name_fake.company() + " Rentals" for _ in range(8)]
+        names["cruise_lines"] = [name_fake.company() + " Cruises" for _ in range(5)]
+
+
+def random_date(start, end):
+    """Uniform random date between two dates (inclusive)."""
+    return start + timedelta(days=rng.randint(0, max(0, (end - start).days)))
+
+
+def random_datetime(start, end):
+    """Uniform random datetime (whole seconds) between two dates."""
+    span = int((end - start).total_seconds())
+    return datetime.combine(start, datetime.min.time()) + timedelta(seconds=rng.randint(0, max(0, span)))
+
+
+# --- Data Generation Functions (each yields the rows of one table for an ID range) ---
 
-# Database file path
-db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "travel_agency.db")
-output_sql_path = os.path.join(os.path.dirname(__file__), "sql", "populate_data.sql")
-
-# Ensure the sql directory exists
-os.makedirs(os.path.dirname(output_sql_path), exist_ok=True)
-
-# Data storage
-locations = []
-passengers = []
-employees = []
-accommodations = []
-flights = []
-car_rentals = []
-cruises = []
-bookings = []
-booking_passengers = []
-booking_accommodations = []
-booking_transportations = []
-payments = []
-reviews = []
-
-# --- Data Generation Functions ---
-
-def generate_locations(n):
-    for _ in range(n):
+def generate_locations(start, end):
+    for location_id in range(start, end):
         city = fake.city()
         country = fake.country()
         state = fake.state() if country == "United States" else None
-        locations.append((city, state, country))
+        yield (location_id, city, state, country)
 
-def generate_passengers(n):
-    for _ in range(n):
+def generate_passengers(start, end):
+    for passenger_id in range(start, end):
         name = fake.name()
-        gender = random.choice(["Male", "Female", "Other"])
-        age = random.randint(18, 80)
-        email = fake.unique.email()
-        phone = fake.phone_number()
-        passengers.append((name, gender, age, email, phone))
-
-def generate_employees(n):
-    # Generate initial employees without supervisor
-    for i in range(n):
+        gender = rng.choice(["Male", "Female", "Other"])
+        age = rng.randint(18, 80)
+        # The row number keeps emails unique without remembering every email generated so far
+        email = f"{fake.user_name()}.{passenger_id}@{fake.free_email_domain()}"
+        phone = fake.phone_number()[:20]
+        yield (passenger_id, name, gender, age, email, phone)
+
+def generate_employees(start, end):
+    # Roles are drawn up front so non-managers can be assigned a supervisor as they are written
+    roles = [rng.choice(["Agent", "Manager", "Admin", "Support"]) for _ in range(start, end)]
+    manager_ids = [start + i for i, role in enumerate(roles) if role == "Manager"]
+    for employee_id in range(start, end):
         name = fake.name()
-        role = random.choice(["Agent", "Manager", "Admin", "Support"])
-        join_date = fake.date_between(start_date="-5y", end_date="today").isoformat()
-        employees.append((name, role, join_date, None)) # SupervisorID initially None
-
-def generate_accommodations(n):
-    if not locations:
-        print("Error: Need locations to generate accommodations.")
-        return
-    location_ids = list(range(1, len(locations) + 1))
-    for _ in range(n):
-        name = fake.company() + " " + random.choice(["Hotel", "Resort", "Inn", "Suites"])
-        acc_type = random.choice(["Hotel", "Hostel", "Resort", "Airbnb", "Guesthouse"])
-        rate = round(random.uniform(50, 500), 2)
-        facilities = ", ".join(fake.words(nb=random.randint(3, 7)))
-        discount = round(random.choice([0.0, 0.05, 0.1, 0.15, 0.2]), 2)
-        location_id = random.choice(location_ids)
-        accommodations.append((name, acc_type, rate, facilities, discount, location_id))
-
-def generate_flights(n):
-    if not locations:
-        print("Error: Need locations to generate flights.")
-        return
-    location_ids = list(range(1, len(locations) + 1))
-    carriers = [fake.company() + " Airlines" for _ in range(10)]
-    for _ in range(n):
+        role = roles[employee_id - start]
+        join_date = random_date(today - timedelta(days=5 * 365), today)
+        # Simple hierarchy: managers supervise agents/support
+        supervisor_id = rng.choice(manager_ids) if manager_ids and role != "Manager" else None
+        yield (employee_id, name, role, join_date, supervisor_id)
+
+def generate_accommodations(start, end):
+    num_locations = counts["Location"]
+    for accommodation_id in range(start, end):
+        name = fake.company() + " " + rng.choice(["Hotel", "Resort", "Inn", "Suites"])
+        acc_type = rng.choice(ACCOMMODATION_TYPES)
+        rate = round(rng.uniform(50, 500), 2)
+        facilities = ", ".join(fake.words(nb=rng.randint(3, 7)))
+        discount = rng.choice([0.0, 0.05, 0.1, 0.15, 0.2])
+        location_id = rng.randint(1, num_locations)
+        yield (accommodation_id, name, acc_type, rate, facilities, discount, location_id)
+
+def generate_flights(start, end):
+    num_locations = counts["Location"]
+    carriers = names["carriers"]
+    for flight_id in range(start, end):
         flight_number = fake.bothify(text="??####", letters="ABCDEFGHIJKLMNOPQRSTUVWXYZ")
-        carrier = random.choice(carriers)
-        source_id, dest_id = random.sample(location_ids, 2)
-        departure_dt = fake.date_time_between(start_date="+1d", end_date="+1y")
-        duration = timedelta(hours=random.uniform(1, 15))
-        arrival_dt = departure_dt + duration
-        flight_class = random.choice(["Economy", "Business", "First"])
-        fare = round(random.uniform(100, 2000), 2)
-        flights.append((flight_number, carrier, source_id, dest_id, departure_dt.isoformat(), arrival_dt.isoformat(), flight_class, fare))
-
-def generate_car_rentals(n):
-    if not locations:
-        print("Error: Need locations to generate car rentals.")
-        return
-    location_ids = list(range(1, len(locations) + 1))
-    companies = [fake.company() + " Rentals" for _ in range(8)]
+        carrier = rng.choice(carriers)
+        source_id, dest_id = rng.sample(range(1, num_locations + 1), 2)
+        departure_dt = random_datetime(today + timedelta(days=1), today + timedelta(days=365))
+        duration = timedelta(hours=rng.uniform(1, 15))
+        arrival_dt = (departure_dt + duration).replace(microsecond=0)
+        flight_class = rng.choice(["Economy", "Business", "First"])
+        fare = round(rng.uniform(100, 2000), 2)
+        yield (flight_id, flight_number, carrier, source_id, dest_id, departure_dt, arrival_dt, flight_class, fare)
+
+def generate_car_rentals(start, end):
+    num_locations = counts["Location"]
+    companies = names["rental_companies"]
     car_types = ["Sedan", "SUV", "Convertible", "Van", "Truck", "Compact"]
-    for _ in range(n):
-        company = random.choice(companies)
-        car_type = random.choice(car_types)
-        pickup_loc_id = random.choice(location_ids)
-        dropoff_loc_id = random.choice(location_ids) # Can be same or different
-        pickup_dt = fake.date_time_between(start_date="+1d", end_date="+1y")
-        rental_days = random.randint(1, 14)
+    for car_rental_id in range(start, end):
+        company = rng.choice(companies)
+        car_type = rng.choice(car_types)
+        pickup_loc_id = rng.randint(1, num_locations)
+        dropoff_loc_id = rng.randint(1, num_locations) # Can be same or different
+        pickup_dt = random_datetime(today + timedelta(days=1), today + timedelta(days=365))
+        rental_days = rng.randint(1, 14)
         dropoff_dt = pickup_dt + timedelta(days=rental_days)
-        rent = round(random.uniform(30, 150) * rental_days, 2)
-        car_rentals.append((company, car_type, pickup_loc_id, dropoff_loc_id, pickup_dt.isoformat(), dropoff_dt.isoformat(), rent))
-
-def generate_cruises(n):
-    if not locations:
-        print("Error: Need locations to generate cruises.")
-        return
-    location_ids = list(range(1, len(locations) + 1))
-    lines = [fake.company() + " Cruises" for _ in range(5)]
-    for _ in range(n):
-        cruise_name = random.choice(["Caribbean Explorer", "Mediterranean Dream", "Alaskan Wonder", "Pacific Paradise", "European Voyage"])
-        line = random.choice(lines)
-        source_id, dest_id = random.sample(location_ids, 2)
-        departure_date = fake.date_between(start_date="+1m", end_date="+2y")
-        duration_days = random.randint(5, 21)
+        rent = round(rng.uniform(30, 150) * rental_days, 2)
+        yield (car_rental_id, company, car_type, pickup_loc_id, dropoff_loc_id, pickup_dt, dropoff_dt, rent)
+
+def generate_cruises(start, end):
+    num_locations = counts["Location"]
+    lines = names["cruise_lines"]
+    for cruise_id in range(start, end):
+        cruise_name = rng.choice(["Caribbean Explorer", "Mediterranean Dream", "Alaskan Wonder", "Pacific Paradise", "European Voyage"])
+        line = rng.choice(lines)
+        source_id, dest_id = rng.sample(range(1, num_locations + 1), 2)
+        departure_date = random_date(today + timedelta(days=30), today + timedelta(days=730))
+        duration_days = rng.randint(5, 21)
         return_date = departure_date + timedelta(days=duration_days)
-        fare = round(random.uniform(500, 5000), 2)
-        cruises.append((cruise_name, line, source_id, dest_id, departure_date.isoformat(), return_date.isoformat(), fare))
-
-def generate_bookings(n):
-    if not employees:
-        print("Error: Need employees to generate bookings.")
-        return
-    employee_ids = list(range(1, len(employees) + 1))
-    for _ in range(n):
-        group_name = fake.catch_phrase() + " Trip" if random.random() > 0.3 else None
-        purpose = random.choice(["Leisure", "Business", "Honeymoon", "Family Vacation", "Adventure"])
-        booking_date = fake.date_between(start_date="-1y", end_date="today").isoformat()
-        employee_id = random.choice(employee_ids) if random.random() > 0.1 else None # Some bookings might not have an assigned employee
-        # TotalCost will be calculated later or set approximately
-        total_cost = round(random.uniform(200, 10000), 2)
-        bookings.append((group_name, purpose, booking_date, employee_id, total_cost))
-
-def generate_booking_passengers():
-    if not bookings or not passengers:
-        print("Error: Need bookings and passengers.")
-        return
-    booking_ids = list(range(1, len(bookings) + 1))
-    passenger_ids = list(range(1, len(passengers) + 1))
-    for booking_id in booking_ids:
-        num_pass = max(1, int(random.gauss(AVG_PASSENGERS_PER_BOOKING, 1)))
-        selected_passengers = random.sample(passenger_ids, min(num_pass, len(passenger_ids)))
-        for passenger_id in selected_passengers:
-            if (booking_id, passenger_id) not in booking_passengers:
-                 booking_passengers.append((booking_id, passenger_id))
-
-def generate_booking_accommodations():
-    if not bookings or not accommodations:
-        print("Error: Need bookings and accommodations.")
-        return
-    booking_ids = list(range(1, len(bookings) + 1))
-    accommodation_ids = list(range(1, len(accommodations) + 1))
-    for booking_id in booking_ids:
-        if random.random() < AVG_ACCOMMODATIONS_PER_BOOKING:
-            num_acc = random.randint(1, 2)
-            selected_accs = random.sample(accommodation_ids, min(num_acc, len(accommodation_ids)))
-            for acc_id in selected_accs:
-                # Find related accommodation to get rate for cost calculation
-                # In a real scenario, connect to DB or use stored data
-                # Here, we estimate cost based on typical rates
-                check_in_date = fake.date_between(start_date="+1d", end_date="+1y")
-                duration = random.randint(2, 14)
+        fare = round(rng.uniform(500, 5000), 2)
+        yield (cruise_id, cruise_name, line, source_id, dest_id, departure_date, return_date, fare)
+
+
+class BookingChunk:
+    """Chunk-local state linking a range of bookings to their dependent tables.
+
+    Costs and the booking/passenger link table live in flat arrays indexed
+    from the chunk start, so payments and reviews do direct lookups instead
+    of scanning Python lists of tuples.
+    """
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        self.costs = array("d")             # TotalCost of booking (start + i)
+        self.link_booking = array("l")      # BookingPassenger rows, column-wise
+        self.link_passenger = array("l")
+
+def generate_bookings(chunk):
+    num_employees = counts["Employee"]
+    for booking_id in range(chunk.start, chunk.end):
+        group_name = fake.catch_phrase() + " Trip" if rng.random() > 0.3 else None
+        purpose = rng.choice(PURPOSES)
+        booking_date = random_datetime(today - timedelta(days=365), today)
+        employee_id = rng.randint(1, num_employees) if num_employees and rng.random() > 0.1 else None # Some bookings might not have an assigned employee
+        # TotalCost is a placeholder; the SQL scripts recalculate it from the legs once loaded
+        total_cost = round(rng.uniform(200, 10000), 2)
+        status = rng.choice(STATUSES)
+        chunk.costs.append(total_cost)
+        yield (booking_id, group_name, purpose, booking_date, employee_id, total_cost, status)
+
+def generate_booking_passengers(chunk):
+    num_passengers = counts["Passenger"]
+    for booking_id in range(chunk.start, chunk.end):
+        num_pass = max(1, int(rng.gauss(AVG_PASSENGERS_PER_BOOKING, 1)))
+        # sample() never repeats a passenger and each booking is visited once, so the
+        # (BookingID, PassengerID) pairs are unique without checking earlier rows
+        selected_passengers = rng.sample(range(1, num_passengers + 1), min(num_pass, num_passengers))
+        for position, passenger_id in enumerate(selected_passengers):
+            chunk.link_booking.append(booking_id)
+            chunk.link_passenger.append(passenger_id)
+            yield (booking_id, passenger_id, 1 if position == 0 else 0)
+
+def generate_booking_accommodations(chunk):
+    num_accommodations = counts["Accommodation"]
+    for booking_id in range(chunk.start, chunk.end):
+        if rng.random() < AVG_ACCOMMODATIONS_PER_BOOKING:
+            num_acc = rng.randint(1, 2)
+            for acc_id in rng.sample(range(1, num_accommodations + 1), min(num_acc, num_accommodations)):
+                check_in_date = random_date(today + timedelta(days=1), today + timedelta(days=365))
+                duration = rng.randint(2, 14)
                 check_out_date = check_in_date + timedelta(days=duration)
-                cost = round(random.uniform(50, 500) * duration, 2) # Estimated cost
-                booking_accommodations.append((booking_id, acc_id, check_in_date.isoformat(), check_out_date.isoformat(), cost))
-
-def generate_booking_transportations():
-    if not bookings or not (flights or car_rentals or cruises):
-        print("Error: Need bookings and transport options.")
-        return
-    booking_ids = list(range(1, len(bookings) + 1))
-    flight_ids = list(range(1, len(flights) + 1))
-    car_ids = list(range(1, len(car_rentals) + 1))
-    cruise_ids = list(range(1, len(cruises) + 1))
-
-    for booking_id in booking_ids:
-        if random.random() < AVG_TRANSPORTS_PER_BOOKING:
-            num_trans = random.randint(1, 3)
-            for _ in range(num_trans):
-                transport_type = random.choice([1, 2, 4]) # 1:Flight, 2:Car, 4:Cruise (No Bus link table)
+                cost = round(rng.uniform(50, 500) * duration, 2) # Estimated cost
+                yield (booking_id, acc_id, check_in_date, check_out_date, cost)
+
+def generate_booking_transportations(chunk):
+    num_flights, num_cars, num_cruises = counts["Flight"], counts["CarRental"], counts["Cruise"]
+    for booking_id in range(chunk.start, chunk.end):
+        if rng.random() < AVG_TRANSPORTS_PER_BOOKING:
+            for _ in range(rng.randint(1, 3)):
+                transport_type = rng.choice([TRANSPORT_FLIGHT, TRANSPORT_CAR, TRANSPORT_CRUISE])
                 flight_id, car_id, cruise_id = None, None, None
-                cost = 0
-
-                if transport_type == 1 and flight_ids:
-                    flight_id = random.choice(flight_ids)
-                    cost = round(random.uniform(100, 2000), 2) # Estimate
-                elif transport_type == 2 and car_ids:
-                    car_id = random.choice(car_ids)
-                    cost = round(random.uniform(100, 1000), 2) # Estimate
-                elif transport_type == 4 and cruise_ids:
-                    cruise_id = random.choice(cruise_ids)
-                    cost = round(random.uniform(500, 5000), 2) # Estimate
+                if transport_type == TRANSPORT_FLIGHT and num_flights:
+                    flight_id = rng.randint(1, num_flights)
+                    cost = round(rng.uniform(100, 2000), 2) # Estimate
+                elif transport_type == TRANSPORT_CAR and num_cars:
+                    car_id = rng.randint(1, num_cars)
+                    cost = round(rng.uniform(100, 1000), 2) # Estimate
+                elif transport_type == TRANSPORT_CRUISE and num_cruises:
+                    cruise_id = rng.randint(1, num_cruises)
+                    cost = round(rng.uniform(500, 5000), 2) # Estimate
                 else:
                     continue # Skip if no transport of this type available
+                yield (booking_id, transport_type, flight_id, car_id, cruise_id, cost)
+
+def generate_payments(chunk):
+    for booking_id in range(chunk.start, chunk.end):
+        if rng.random() < AVG_PAYMENTS_PER_BOOKING:
+            payment_date = random_datetime(today - timedelta(days=365), today)
+            booking_cost = chunk.costs[booking_id - chunk.start] # direct indexed lookup
+            amount = round(booking_cost * rng.uniform(0.8, 1.1), 2) # Payment amount around booking cost
+            payment_type = rng.choice(PAYMENT_TYPES)
+            # Store only the last 4 digits for safety
+            card_last_four = f"{rng.randint(0, 9999):04d}" if "Card" in payment_type else None
+            expiry_date = f"{rng.randint(1, 12):02d}/{today.year + rng.randint(1, 5)}" if card_last_four else None
+            yield (booking_id, payment_date, amount, payment_type, card_last_four, expiry_date)
+
+def generate_reviews(chunk):
+    for booking_id, passenger_id in zip(chunk.link_booking, chunk.link_passenger):
+        if rng.random() < AVG_REVIEWS_PER_BOOKING:
+            rating = rng.randint(1, 5)
+            text = fake.paragraph(nb_sentences=rng.randint(2, 5))
+            review_date = random_datetime(today - timedelta(days=182), today)
+            yield (booking_id, passenger_id, rating, text, review_date)
+
+# Independent tables: name -> generator over an ID range
+ENTITY_GENERATORS = {
+    "Location": generate_locations,
+    "Passenger": generate_passengers,
+    "Employee": generate_employees,
+    "Accommodation": generate_accommodations,
+    "Flight": generate_flights,
+    "CarRental": generate_car_rentals,
+    "Cruise": generate_cruises,
+}
+
+BOOKING_GENERATORS = {
+    "Booking": generate_bookings,
+    "BookingPassenger": generate_booking_passengers,
+    "BookingAccommodation": generate_booking_accommodations,
+    "BookingTransportation": generate_booking_transportations,
+    "Payment": generate_payments,
+    "Review": generate_reviews,
+}
+
+
+# --- Output formats ---
+
+def sql_literal(value, dialect):
+    if value is None:
+        return "NULL"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    text = value.isoformat(sep=" ") if isinstance(value, datetime) else str(value)
+    if dialect == "mysql":
+        text = text.replace("\\", "\\\\")
+    return "'" + text.replace("'", "''") + "'"
+
+
+# SQLite counterpart of CALL RecalculateBookingTotals(NULL): one pass instead of one update per leg
+SQLITE_RECALCULATE_TOTALS = """UPDATE Booking SET TotalCost = (
+    SELECT CASE WHEN COUNT(*) = 0 THEN NULL ELSE ROUND(IFNULL(SUM(Cost), 0), 2) END FROM (
+        SELECT Cost FROM BookingAccommodation WHERE BookingID = Booking.BookingID
+        UNION ALL
+        SELECT Cost FROM BookingTransportation WHERE BookingID = Booking.BookingID));
+"""
+
+
+# SQLite counterpart of CALL RebuildEmployeeClosure(): employees can be written before their supervisors
+SQLITE_REBUILD_EMPLOYEE_CLOSURE = """DELETE FROM EmployeeClosure;
+INSERT INTO EmployeeClosure (AncestorID, DescendantID, Depth)
+WITH RECURSIVE paths (AncestorID, DescendantID, Depth) AS (
+    SELECT EmployeeID, EmployeeID, 0 FROM Employee
+    UNION ALL
+    SELECT paths.AncestorID, e.EmployeeID, paths.Depth + 1 FROM paths JOIN Employee e ON e.SupervisorID = paths.DescendantID)
+SELECT AncestorID, DescendantID, Depth FROM paths;
+"""
+
+
+class SqlFormat:
+    """Batched multi-row INSERT statements, all tables in a single .sql file."""
+
+    def __init__(self, dialect="sqlite", batch_size=1000, max_statement_bytes=1_000_000):
+        self.dialect = dialect
+        self.batch_size = batch_size
+        self.max_statement_bytes = max_statement_bytes # stay well under max_allowed_packet
+
+    def write_rows(self, f, table_name, columns, rows):
+        prefix = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES\n"
+        batch, size, written = [], 0, 0
+        for row in rows:
+            values = "(" + ", ".join(sql_literal(v, self.dialect) for v in row) + ")"
+            batch.append(values)
+            size += len(values)
+            written += 1
+            if len(batch) >= self.batch_size or size >= self.max_statement_bytes:
+                f.write(prefix + ",\n".join(batch) + ";\n")
+                batch, size = [], 0
+        if batch:
+            f.write(prefix + ",\n".join(batch) + ";\n")
+        return written
+
+    def assemble(self, output, parts_by_table):
+        """Concatenates the per-chunk part files into the final script."""
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w", encoding="utf-8") as out:
+            if self.dialect == "mysql":
+                out.write("-- Travel Agency Data Population Script (MySQL)\n")
+                out.write("SET FOREIGN_KEY_CHECKS = 0;\nSET UNIQUE_CHECKS = 0;\nSET AUTOCOMMIT = 0;\n")
+                out.write("SET @defer_booking_totals = 1; -- Skip per-leg total triggers\n\n")
+            else:
+                out.write("-- Travel Agency Data Population Script (SQLite)\n")
+                out.write("PRAGMA foreign_keys = OFF; -- Disable FKs during bulk insert\nBEGIN;\n")
+                out.write("INSERT OR IGNORE INTO BookingTotalsDeferred VALUES (1); -- Skip per-leg total triggers\n\n")
+            for table_name, parts in parts_by_table.items():
+                out.write(f"-- Data for {table_name}\n")
+                if self.dialect == "mysql":
+                    out.write(f"ALTER TABLE {table_name} DISABLE KEYS;\n")
+                append_files(out, parts)
+                if self.dialect == "mysql":
+                    out.write(f"ALTER TABLE {table_name} ENABLE KEYS;\n")
+                out.write("\n")
+            if self.dialect == "mysql":
+                out.write("CALL RecalculateBookingTotals(NULL); -- One pass instead of one update per leg\n")
+                out.write("CALL RebuildEmployeeClosure(); -- Supervisors may come after their reports\n")
+                out.write("SET @defer_booking_totals = NULL;\n")
+                out.write("COMMIT;\nSET UNIQUE_CHECKS = 1;\nSET FOREIGN_KEY_CHECKS = 1;\n")
+            else:
+                out.write(SQLITE_RECALCULATE_TOTALS)
+                out.write(SQLITE_REBUILD_EMPLOYEE_CLOSURE)
+                out.write("DELETE FROM BookingTotalsDeferred;\n")
+                out.write("COMMIT;\nPRAGMA foreign_keys = ON; -- Re-enable FKs\n")
+
+
+class DelimitedFormat:
+    """One LOAD DATA-compatible CSV/TSV file per table plus a load_data.sql loader."""
+
+    def __init__(self, fmt="csv"):
+        self.fmt = fmt
+        self.delimiter = "," if fmt == "csv" else "\t"
+        self.escape = self._escape_csv if fmt == "csv" else self._escape_tsv
+
+    @staticmethod
+    def _field(value):
+        if value is None:
+            return "\\N" # LOAD DATA's NULL marker
+        if isinstance(value, datetime):
+            return value.isoformat(sep=" ")
+        return value
+
+    @staticmethod
+    def _escape_csv(value):
+        text = str(value)
+        if text == "\\N":
+            return text
+        if any(c in text for c in ',"\\\n\r'):
+            return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+        return text
+
+    @staticmethod
+    def _escape_tsv(value):
+        text = str(value)
+        if text == "\\N":
+            return text
+        return text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+    def write_rows(self, f, table_name, columns, rows):
+        written = 0
+        for row in rows:
+            f.write(self.delimiter.join(self.escape(self._field(v)) for v in row) + "\n")
+            written += 1
+        return written
+
+    def assemble(self, directory, parts_by_table):
+        """Concatenates part files into <Table>.<fmt> and writes load_data.sql."""
+        os.makedirs(directory, exist_ok=True)
+        for table_name, parts in parts_by_table.items():
+            with open(os.path.join(directory, f"{table_name}.{self.fmt}"), "w", encoding="utf-8") as out:
+                append_files(out, parts)
+
+        if self.fmt == "csv":
+            fields = "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '\\\\'"
+        else:
+            fields = "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'"
+        with open(os.path.join(directory, "load_data.sql"), "w", encoding="utf-8") as f:
+            f.write("-- Bulk loader for the generated data files (run from this directory):\n")
+            f.write("--   mysql --local-infile=1 -u <user> -p travel_agency_db < load_data.sql\n")
+            f.write("-- DISABLE KEYS defers non-unique index maintenance on MyISAM; for InnoDB the\n")
+            f.write("-- unique/foreign key check switches and the single commit do the heavy lifting.\n")
+            f.write("SET FOREIGN_KEY_CHECKS = 0;\nSET UNIQUE_CHECKS = 0;\nSET AUTOCOMMIT = 0;\n")
+            f.write("SET @defer_booking_totals = 1; -- Skip per-leg total triggers\n\n")
+            for table_name in parts_by_table:
+                f.write(f"ALTER TABLE {table_name} DISABLE KEYS;\n")
+                f.write(f"LOAD DATA LOCAL INFILE '{table_name}.{self.fmt}' INTO TABLE {table_name}\n"
+                        f"    CHARACTER SET utf8mb4 {fields}\n"
+                        f"    LINES TERMINATED BY '\\n'\n"
+                        f"    ({', '.join(TABLE_COLUMNS[table_name])});\n")
+                f.write(f"ALTER TABLE {table_name} ENABLE KEYS;\n\n")
+            f.write("CALL RecalculateBookingTotals(NULL); -- One pass instead of one update per leg\n")
+            f.write("CALL RebuildEmployeeClosure(); -- Supervisors may come after their reports\n")
+            f.write("SET @defer_booking_totals = NULL;\n")
+            f.write("COMMIT;\nSET UNIQUE_CHECKS = 1;\nSET FOREIGN_KEY_CHECKS = 1;\nSET AUTOCOMMIT = 1;\n")
+
+
+def append_files(out, paths):
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as part:
+            shutil.copyfileobj(part, out, 1 << 20)
+
+
+def make_format(config):
+    if config["format"] == "sql":
+        return SqlFormat(dialect=config["dialect"], batch_size=config["batch_size"])
+    return DelimitedFormat(config["format"])
+
+
+# --- Chunked, parallel generation ---
+
+def plan_chunks(config):
+    """Splits every table into (group, chunk_index, start_id, end_id) tasks."""
+    chunk_rows = config["chunk_rows"]
+    tasks = []
+    for group in list(ENTITY_GENERATORS) + ["Booking"]:
+        total = config["counts"][group]
+        # Employees are assigned supervisors from the same table, so they stay in one chunk
+        step = total if group == "Employee" else chunk_rows
+        for index, start in enumerate(range(1, total + 1, max(1, step))):
+            tasks.append((group, index, start, min(start + step, total + 1)))
+    return tasks
+
+
+def run_chunk(config, task):
+    """Generates one chunk into part files; returns {table: (part_path, rows, seconds)}."""
+    group, index, start, end = task
+    fmt = make_format(config)
+    results = {}
+    start_chunk(config, group, index)
+    if group == "Booking":
+        chunk = BookingChunk(start, end)
+        steps = [(table, BOOKING_GENERATORS[table](chunk)) for table in BOOKING_TABLES]
+    else:
+        steps = [(group, ENTITY_GENERATORS[group](start, end))]
+    for table_name, rows in steps:
+        part_path = os.path.join(config["parts_dir"], f"{table_name}.{index:06d}.part")
+        began = time.perf_counter()
+        with open(part_path, "w", encoding="utf-8") as f:
+            written = fmt.write_rows(f, table_name, TABLE_COLUMNS[table_name], rows)
+        results[table_name] = (part_path, written, time.perf_counter() - began)
+    return results
+
+
+def print_timing_report(stats, wall_seconds, workers):
+    print(f"\n{'table':<22} {'rows':>12} {'chunks':>7} {'cpu s':>9} {'rows/s':>12}")
+    total_rows = total_cpu = 0
+    for table_name in TABLE_COLUMNS:
+        if table_name not in stats:
+            continue
+        rows, chunks, seconds = stats[table_name]
+        total_rows += rows
+        total_cpu += seconds
+        rate = rows / seconds if seconds else float("inf")
+        print(f"{table_name:<22} {rows:>12,} {chunks:>7} {seconds:>9.2f} {rate:>12,.0f}")
+    print(f"{'total':<22} {total_rows:>12,} {'':>7} {total_cpu:>9.2f} {total_rows / max(total_cpu, 1e-9):>12,.0f}")
+    print(f"\nWall time {wall_seconds:.2f}s with {workers} worker(s): {total_rows / max(wall_seconds, 1e-9):,.0f} rows/s overall")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="multiplies every base row count (1 = 80 bookings, 12500 = 1M bookings)")
+    for table, base in (("locations", NUM_LOCATIONS), ("passengers", NUM_PASSENGERS), ("employees", NUM_EMPLOYEES),
+                        ("accommodations", NUM_ACCOMMODATIONS), ("flights", NUM_FLIGHTS),
+                        ("car-rentals", NUM_CAR_RENTALS), ("cruises", NUM_CRUISES), ("bookings", NUM_BOOKINGS)):
+        parser.add_argument(f"--{table}", type=int, default=None, help=f"override the {table} count (base {base})")
+    parser.add_argument("--format", choices=["sql", "csv", "tsv"], default="sql",
+                        help="multi-row INSERTs in one file, or one LOAD DATA file per table")
+    parser.add_argument("--dialect", choices=["sqlite", "mysql"], default="sqlite", help="SQL dialect for --format sql")
+    parser.add_argument("--batch-size", type=int, default=1000, help="rows per INSERT statement")
+    parser.add_argument("--output", default=None,
+                        help="output .sql file (--format sql) or directory (csv/tsv)")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible output (printed if omitted)")
+    parser.add_argument("--today", type=date.fromisoformat, default=None,
+                        help="date the generated bookings are relative to (YYYY-MM-DD, default: today)")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="generator processes (default: one per CPU); does not change the output")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS,
+                        help="rows per chunk; part of the seed, so keep it fixed to reproduce a dataset")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    def scaled(override, base):
+        return override if override is not None else max(1, round(base * args.scale))
+
+    seed = args.seed if args.seed is not None else random.SystemRandom().randrange(2 ** 31)
+    project_dir = os.path.dirname(os.path.abspath(__file__))
+    if args.format == "sql":
+        output = args.output or os.path.join(project_dir, "sql", "populate_data.sql")
+    else:
+        output = args.output or os.path.join(project_dir, "bulk_data")
+
+    config = {
+        "seed": seed,
+        "today": args.today or date.today(),
+        "format": args.format,
+        "dialect": args.dialect,
+        "batch_size": args.batch_size,
+        "chunk_rows": args.chunk_rows,
+        "counts": {
+            "Location": max(2, scaled(args.locations, NUM_LOCATIONS)),
+            "Passenger": scaled(args.passengers, NUM_PASSENGERS),
+            "Employee": scaled(args.employees, NUM_EMPLOYEES),
+            "Accommodation": scaled(args.accommodations, NUM_ACCOMMODATIONS),
+            "Flight": scaled(args.flights, NUM_FLIGHTS),
+            "CarRental": scaled(args.car_rentals, NUM_CAR_RENTALS),
+            "Cruise": scaled(args.cruises, NUM_CRUISES),
+            "Booking": scaled(args.bookings, NUM_BOOKINGS),
+        },
+    }
+
+    print(f"Generating data into {output} (seed {seed}, {args.workers} worker(s)) ...")
+    began = time.perf_counter()
+    parts_dir = tempfile.mkdtemp(prefix="travel_agency_parts_")
+    config["parts_dir"] = parts_dir
+    try:
+        tasks = plan_chunks(config)
+        if args.workers > 1:
+            with ProcessPoolExecutor(max_workers=args.workers) as pool:
+                results = list(pool.map(run_chunk, [config] * len(tasks), tasks))
+        else:
+            results = [run_chunk(config, task) for task in tasks]
+
+        # Part files are stitched together in table order, then chunk order
+        parts_by_table = {table: [] for table in TABLE_COLUMNS}
+        stats = {}
+        for result in results:
+            for table_name, (part_path, rows, seconds) in result.items():
+                parts_by_table[table_name].append(part_path)
+                total_rows, chunks, total_seconds = stats.get(table_name, (0, 0, 0.0))
+                stats[table_name] = (total_rows + rows, chunks + 1, total_seconds + seconds)
+        for parts in parts_by_table.values():
+            parts.sort()
+        make_format(config).assemble(output, parts_by_table)
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+    print_timing_report(stats, time.perf_counter() - began, args.workers)
+    print("Data generation complete.")
 
-                booking_transportations.append((booking_id, transport_type, flight_id, car_id, cruise_id, cost))
-
-def generate_payments():
-    if not bookings:
-        print("Error: Need bookings to generate payments.")
-        return
-    booking_ids = list(range(1, len(bookings) + 1))
-    for booking_id in booking_ids:
-         if random.random() < AVG_PAYMENTS_PER_BOOKING:
-            payment_date = fake.date_between(start_date="-1y", end_date="today").isoformat()
-            # Find booking cost approx
-            booking_cost = next((b[4] for b in bookings if b == bookings[booking_id-1]), 1000) # Default if not found
-            amount = round(booking_cost * random.uniform(0.8, 1.1), 2) # Payment amount around booking cost
-            payment_type = random.choice(["Credit Card", "Debit Card", "Bank Transfer", "PayPal"])
-            card_number = fake.credit_card_number() if "Card" in payment_type else None
-            expiry_date = fake.credit_card_expire() if card_number else None
-            # Store only last 4 digits for safety
-            safe_card_number = f"**** **** **** {card_number[-4:]}" if card_number else None
-            payments.append((booking_id, payment_date, amount, payment_type, safe_card_number, expiry_date))
-
-def generate_reviews():
-    if not booking_passengers:
-        print("Error: Need booking_passengers link data.")
-        return
-    for booking_id, passenger_id in booking_passengers:
-        if random.random() < AVG_REVIEWS_PER_BOOKING:
-            rating = random.randint(1, 5)
-            text = fake.paragraph(nb_sentences=random.randint(2, 5))
-            review_date = fake.date_between(start_date="-6m", end_date="today").isoformat()
-            reviews.append((booking_id, passenger_id, rating, text, review_date))
-
-# --- Generate Data ---
-print("Generating data...")
-generate_locations(NUM_LOCATIONS)
-generate_passengers(NUM_PASSENGERS)
-generate_employees(NUM_EMPLOYEES)
-# Assign supervisors (simple hierarchy: managers supervise agents/support)
-manager_ids = [i + 1 for i, emp in enumerate(employees) if emp[1] == "Manager"]
-non_manager_ids = [i + 1 for i, emp in enumerate(employees) if emp[1] != "Manager"]
-if manager_ids:
-    for i in range(len(employees)):
-        if employees[i][1] != "Manager": # Assign supervisor only to non-managers
-            supervisor_id = random.choice(manager_ids)
-            # Create a new tuple with the supervisor ID
-            employees[i] = employees[i][:3] + (supervisor_id,)
-
-generate_accommodations(NUM_ACCOMMODATIONS)
-generate_flights(NUM_FLIGHTS)
-generate_car_rentals(NUM_CAR_RENTALS)
-generate_cruises(NUM_CRUISES)
-generate_bookings(NUM_BOOKINGS)
-generate_booking_passengers()
-generate_booking_accommodations()
-generate_booking_transportations()
-generate_payments()
-generate_reviews()
-print("Data generation complete.")
-
-# --- Write to SQL File ---
-print(f"Writing SQL INSERT statements to {output_sql_path}...")
-with open(output_sql_path, "w", encoding="utf-8") as f:
-    f.write("-- Travel Agency Data Population Script (SQLite)\n")
-    f.write("PRAGMA foreign_keys = OFF; -- Disable FKs during bulk insert\n\n")
-
-    # Helper to write inserts
-    def write_inserts(table_name, columns, data):
-        if not data: return
-        f.write(f"-- Data for {table_name}\n")
-        cols_str = ", ".join(columns)
-        for row in data:
-            # Prepare values with proper escaping for SQLite
-            sql_literals = []
-            for v in row:
-                if v is None:
-                    sql_literals.append("NULL")
-                else:
-                    # Convert to string and escape single quotes by doubling them
-                    escaped_v = str(v).replace("'", "''")
-                    sql_literals.append(f"'{escaped_v}'")
-            values_str = ", ".join(sql_literals)
-            f.write(f"INSERT INTO {table_name} ({cols_str}) VALUES ({values_str});\n")
-        f.write("\n")
-
-    write_inserts("Location", ["City", "State", "Country"], locations)
-    write_inserts("Passenger", ["Name", "Gender", "Age", "Email", "Phone"], passengers)
-    write_inserts("Employee", ["Name", "Role", "JoinDate", "SupervisorID"], employees)
-    write_inserts("Accommodation", ["Name", "Type", "Rate", "Facilities", "Discount", "LocationID"], accommodations)
-    # TransportationType already inserted in schema
-    write_inserts("Flight", ["FlightNumber", "Carrier", "SourceLocationID", "DestLocationID", "DepartureDateTime", "ArrivalDateTime", "Class", "Fare"], flights)
-    write_inserts("CarRental", ["Company", "CarType", "PickupLocationID", "DropoffLocationID", "PickupDateTime", "DropoffDateTime", "Rent"], car_rentals)
-    write_inserts("Cruise", ["CruiseName", "Line", "SourceLocationID", "DestLocationID", "DepartureDate", "ReturnDate", "Fare"], cruises)
-    write_inserts("Booking", ["GroupName", "Purpose", "BookingDate", "EmployeeID", "TotalCost"], bookings)
-    write_inserts("BookingPassenger", ["BookingID", "PassengerID"], booking_passengers)
-    write_inserts("BookingAccommodation", ["BookingID", "AccommodationID", "CheckInDate", "CheckOutDate", "Cost"], booking_accommodations)
-    write_inserts("BookingTransportation", ["BookingID", "TransportTypeID", "FlightID", "CarRentalID", "CruiseID", "Cost"], booking_transportations)
-    write_inserts("Payment", ["BookingID", "PaymentDate", "Amount", "PaymentType", "CardNumber", "ExpiryDate"], payments)
-    write_inserts("Review", ["BookingID", "PassengerID", "Rating", "Text", "ReviewDate"], reviews)
-
-    f.write("PRAGMA foreign_keys = ON; -- Re-enable FKs\n")
-
-print("SQL file generated successfully.")
-
-# --- Optional: Insert directly into DB for verification ---
-# print(f"Inserting data into {db_path}...")
-# try:
-#     conn = sqlite3.connect(db_path)
-#     cursor = conn.cursor()
-#     cursor.execute("PRAGMA foreign_keys = OFF;")
-#     with open(output_sql_path, "r", encoding="utf-8") as f:
-#         sql_script = f.read()
-#     cursor.executescript(sql_script) # Execute the generated script
-#     conn.commit()
-#     print("Data inserted into database successfully.")
-# except sqlite3.Error as e:
-#     print(f"SQLite Error during insertion: {e}")
-# finally:
-#     if conn:
-#         conn.close()
 
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+-- The reports from complex_queries.sql, reading the summary tables in analytics_rollups.sql
+-- File: analytics_reports.sql
+--
+-- Each report aggregates a few rows per day instead of scanning and joining the
+-- booking tables. Results are as fresh as the last rollup refresh (shown on /reports).
+-- Counts are per booking / stay rather than per joined payment or review row.
+
+--1. Top 5 Most Popular Destinations by Booking Count
+SELECT
+    l.Country,
+    l.City,
+    SUM(f.StayCount) AS BookingCount,
+    SUM(a.Rate * f.StayCount) / SUM(f.StayCount) AS AverageRate
+FROM FactAccommodationDaily f
+JOIN Accommodation a ON f.AccommodationID = a.AccommodationID
+JOIN Location l ON a.LocationID = l.LocationID
+GROUP BY l.Country, l.City
+ORDER BY BookingCount DESC
+LIMIT 5;
+
+--2. Employee Performance Analysis with Supervisor Information
+SELECT
+    e.EmployeeID,
+    e.Name AS EmployeeName,
+    e.Role,
+    IFNULL(f.TotalBookings, 0) AS TotalBookings,
+    f.TotalRevenue,
+    s.Name AS SupervisorName
+FROM Employee e
+LEFT JOIN (
+    SELECT EmployeeID, SUM(BookingCount) AS TotalBookings, SUM(RevenueSum) AS TotalRevenue
+    FROM FactBookingDaily
+    GROUP BY EmployeeID
+) f ON e.EmployeeID = f.EmployeeID
+LEFT JOIN Employee s ON e.SupervisorID = s.EmployeeID
+ORDER BY TotalRevenue DESC;
+
+--3. High-Value Customers (Passengers with Most Bookings and Highest Spending)
+SELECT
+    p.PassengerID,
+    p.Name,
+    p.Email,
+    f.TotalBookings,
+    f.TotalSpent,
+    f.AverageRatingGiven
+FROM (
+    SELECT PassengerID, SUM(BookingCount) AS TotalBookings, SUM(SpentSum) AS TotalSpent,
+           SUM(RatingSum) / NULLIF(SUM(RatingCount), 0) AS AverageRatingGiven
+    FROM FactPassengerSpend
+    GROUP BY PassengerID
+    ORDER BY TotalSpent DESC
+    LIMIT 10
+) f
+JOIN Passenger p ON f.PassengerID = p.PassengerID
+ORDER BY f.TotalSpent DESC;
+
+--4. Seasonal Booking Trends by Purpose
+SELECT
+    MONTH(BookingDay) AS Month,
+    NULLIF(Purpose, '') AS Purpose,
+    SUM(BookingCount) AS BookingCount,
+    SUM(RevenueSum) AS TotalRevenue,
+    SUM(RevenueSum) / NULLIF(SUM(RevenueCount), 0) AS AverageBookingValue
+FROM FactBookingDaily
+GROUP BY MONTH(BookingDay), Purpose
+ORDER BY Month, BookingCount DESC;
+
+--5. Transportation Type Analysis with Cost Comparison
+SELECT
+    tt.Name AS TransportType,
+    SUM(f.LegCount) AS BookingCount,
+    SUM(f.CostSum) / NULLIF(SUM(f.CostCount), 0) AS AverageCost,
+    MIN(f.CostMin) AS MinCost,
+    MAX(f.CostMax) AS MaxCost,
+    SUM(f.CostSum) AS TotalRevenue
+FROM FactTransportDaily f
+JOIN TransportationType tt ON f.TransportTypeID = tt.TransportTypeID
+GROUP BY tt.Name
+ORDER BY BookingCount DESC;
+
+--6. Accommodation Performance by Type and Location
+SELECT
+    a.Type,
+    l.Country,
+    l.City,
+    SUM(f.StayCount) AS BookingCount,
+    SUM(f.CostSum) / NULLIF(SUM(f.CostCount), 0) AS AverageRevenue,
+    SUM(f.NightsSum) / SUM(f.StayCount) AS AverageStayDuration,
+    SUM(f.RatingSum) / NULLIF(SUM(f.RatingCount), 0) AS AverageRating
+FROM FactAccommodationDaily f
+JOIN Accommodation a ON f.AccommodationID = a.AccommodationID
+JOIN Location l ON a.LocationID = l.LocationID
+GROUP BY a.Type, l.Country, l.City
+ORDER BY BookingCount DESC;
+
+--7. Cross-Selling Opportunities (Customers Who Booked One Service But Not Others)
+-- Lists individual passengers rather than aggregates, so it still reads the live tables.
+SELECT
+    p.PassengerID,
+    p.Name,
+    GROUP_CONCAT(DISTINCT
+        CASE
+            WHEN tt.Name IS NOT NULL THEN tt.Name
+            ELSE 'None'
+        END
+    ) AS TransportTypesUsed,
+    GROUP_CONCAT(DISTINCT a.Type) AS AccommodationTypesUsed
+FROM Passenger p
+JOIN BookingPassenger bp ON p.PassengerID = bp.PassengerID
+LEFT JOIN Booking b ON bp.BookingID = b.BookingID
+LEFT JOIN BookingTransportation bt ON b.BookingID = bt.BookingID
+LEFT JOIN TransportationType tt ON bt.TransportTypeID = tt.TransportTypeID
+LEFT JOIN BookingAccommodation ba ON b.BookingID = ba.BookingID
+LEFT JOIN Accommodation a ON ba.AccommodationID = a.AccommodationID
+GROUP BY p.PassengerID, p.Name
+ORDER BY p.Name;
+
+--8. Revenue Growth Analysis by Quarter
+WITH q AS (
+    SELECT
+        YEAR(BookingDay) AS Year,
+        QUARTER(BookingDay) AS Quarter,
+        SUM(BookingCount) AS BookingCount,
+        SUM(RevenueSum) AS TotalRevenue
+    FROM FactBookingDaily
+    GROUP BY YEAR(BookingDay), QUARTER(BookingDay)
+)
+SELECT
+    Year,
+    Quarter,
+    BookingCount,
+    TotalRevenue,
+    TotalRevenue - LAG(TotalRevenue, 1, 0) OVER (ORDER BY Year, Quarter) AS RevenueGrowth,
+    ROUND((TotalRevenue - LAG(TotalRevenue, 1, 0) OVER (ORDER BY Year, Quarter)) /
+    NULLIF(LAG(TotalRevenue, 1, 0) OVER (ORDER BY Year, Quarter), 0) * 100, 2) AS GrowthPercentage
+FROM q
+ORDER BY Year, Quarter;
+
+--9. Customer Demographics Analysis
+SELECT
+    p.Gender,
+    CASE
+        WHEN p.Age < 20 THEN 'Teen'
+        WHEN p.Age BETWEEN 20 AND 29 THEN '20s'
+        WHEN p.Age BETWEEN 30 AND 39 THEN '30s'
+        WHEN p.Age BETWEEN 40 AND 49 THEN '40s'
+        WHEN p.Age BETWEEN 50 AND 59 THEN '50s'
+        WHEN p.Age >= 60 THEN '60+'
+    END AS AgeGroup,
+    COUNT(*) AS CustomerCount,
+    IFNULL(SUM(f.BookingCount), 0) AS BookingCount,
+    SUM(f.SpentSum) / NULLIF(SUM(f.BookingCount), 0) AS AverageSpending,
+    SUM(f.RatingSum) / NULLIF(SUM(f.RatingCount), 0) AS AverageRating
+FROM Passenger p
+LEFT JOIN (
+    SELECT PassengerID, SUM(BookingCount) AS BookingCount, SUM(SpentSum) AS SpentSum,
+           SUM(RatingSum) AS RatingSum, SUM(RatingCount) AS RatingCount
+    FROM FactPassengerSpend
+    GROUP BY PassengerID
+) f ON p.PassengerID = f.PassengerID
+GROUP BY p.Gender, AgeGroup
+ORDER BY Gender, AgeGroup;
+
+--10. Booking Funnel Analysis (From Booking to Payment to Review)
+SELECT
+    NULLIF(Status, '') AS BookingStatus,
+    SUM(BookingCount) AS TotalBookings,
+    SUM(PaidBookings) AS PaidBookings,
+    SUM(ReviewedBookings) AS ReviewedBookings,
+    ROUND(SUM(PaidBookings) / SUM(BookingCount) * 100, 2) AS PaymentConversionRate,
+    ROUND(SUM(ReviewedBookings) / SUM(BookingCount) * 100, 2) AS ReviewConversionRate,
+    SUM(RatingSum) / NULLIF(SUM(RatingCount), 0) AS AverageRating
+FROM FactBookingDaily
+GROUP BY Status
+ORDER BY TotalBookings DESC;
@@ -0,0 +1,247 @@
+-- Summary tables behind the analytics reports (sql/analytics_reports.sql)
+-- File: analytics_rollups.sql
+--
+-- Apply after create_schema_mysql.sql. Every fact table is partitioned by the
+-- booking's calendar day (BookingDay = DATE(Booking.BookingDate)), so a refresh only
+-- rebuilds the days that changed:
+--   * new rows are found from a per-table high-water mark (RollupState), and
+--   * updates and deletes mark their booking's day in RollupDirtyDay via triggers.
+-- Refresh with `python -m src.rollups refresh` (or the button on /reports).
+
+USE travel_agency_db;
+
+-- Refresh bookkeeping: highest primary key already folded into the facts, per source table
+CREATE TABLE IF NOT EXISTS RollupState (
+    SourceTable VARCHAR(64) PRIMARY KEY,
+    HighWaterMark BIGINT NOT NULL DEFAULT 0,
+    RefreshedAt DATETIME NULL
+);
+
+INSERT IGNORE INTO RollupState (SourceTable) VALUES
+('Booking'), ('BookingAccommodation'), ('BookingTransportation'), ('Payment'), ('Review');
+
+-- Booking days touched by an UPDATE or DELETE since the last refresh
+CREATE TABLE IF NOT EXISTS RollupDirtyDay (
+    BookingDay DATE PRIMARY KEY,
+    MarkedAt DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Review aggregates per booking (feeds the rating columns of the other facts)
+CREATE TABLE IF NOT EXISTS FactReviewByBooking (
+    BookingID INT PRIMARY KEY,
+    BookingDay DATE NOT NULL,
+    ReviewCount INT NOT NULL,
+    RatingSum INT NOT NULL,
+    LastReviewDate DATETIME,
+    INDEX idx_frb_day (BookingDay)
+);
+
+-- Daily booking facts per purpose / agent / status ('' and 0 stand in for NULL)
+CREATE TABLE IF NOT EXISTS FactBookingDaily (
+    BookingDay DATE NOT NULL,
+    Purpose VARCHAR(20) NOT NULL DEFAULT '',
+    EmployeeID INT NOT NULL DEFAULT 0,
+    Status VARCHAR(20) NOT NULL DEFAULT '',
+    BookingCount INT NOT NULL,
+    RevenueSum DECIMAL(16, 2),
+    RevenueCount INT NOT NULL, -- bookings with a TotalCost, the divisor for averages
+    PaidBookings INT NOT NULL,
+    ReviewedBookings INT NOT NULL,
+    RatingSum INT NOT NULL,
+    RatingCount INT NOT NULL,
+    PRIMARY KEY (BookingDay, Purpose, EmployeeID, Status),
+    INDEX idx_fbd_employee (EmployeeID)
+);
+
+-- Daily stays per accommodation (location and type come from the small dimension tables)
+CREATE TABLE IF NOT EXISTS FactAccommodationDaily (
+    BookingDay DATE NOT NULL,
+    AccommodationID INT NOT NULL,
+    StayCount INT NOT NULL,
+    CostSum DECIMAL(16, 2),
+    CostCount INT NOT NULL,
+    NightsSum INT NOT NULL,
+    RatingSum INT NOT NULL,
+    RatingCount INT NOT NULL,
+    PRIMARY KEY (BookingDay, AccommodationID),
+    INDEX idx_fad_accommodation (AccommodationID)
+);
+
+-- Daily transport legs per transportation type
+CREATE TABLE IF NOT EXISTS FactTransportDaily (
+    BookingDay DATE NOT NULL,
+    TransportTypeID INT NOT NULL,
+    LegCount INT NOT NULL,
+    CostSum DECIMAL(16, 2),
+    CostCount INT NOT NULL,
+    CostMin DECIMAL(10, 2),
+    CostMax DECIMAL(10, 2),
+    PRIMARY KEY (BookingDay, TransportTypeID)
+);
+
+-- Daily spend per passenger, with the ratings that passenger gave
+CREATE TABLE IF NOT EXISTS FactPassengerSpend (
+    BookingDay DATE NOT NULL,
+    PassengerID INT NOT NULL,
+    BookingCount INT NOT NULL,
+    SpentSum DECIMAL(16, 2),
+    RatingSum INT NOT NULL,
+    RatingCount INT NOT NULL,
+    PRIMARY KEY (BookingDay, PassengerID),
+    INDEX idx_fps_passenger (PassengerID)
+);
+
+-- Dirty-day triggers. Inserts are picked up by the high-water marks, except on
+-- BookingPassenger, which has no increasing key of its own.
+DROP TRIGGER IF EXISTS RollupBookingUpdate;
+DROP TRIGGER IF EXISTS RollupBookingDelete;
+DROP TRIGGER IF EXISTS RollupBookingPassengerInsert;
+DROP TRIGGER IF EXISTS RollupBookingPassengerUpdate;
+DROP TRIGGER IF EXISTS RollupBookingPassengerDelete;
+DROP TRIGGER IF EXISTS RollupBookingAccommodationUpdate;
+DROP TRIGGER IF EXISTS RollupBookingAccommodationDelete;
+DROP TRIGGER IF EXISTS RollupBookingTransportationUpdate;
+DROP TRIGGER IF EXISTS RollupBookingTransportationDelete;
+DROP TRIGGER IF EXISTS RollupPaymentUpdate;
+DROP TRIGGER IF EXISTS RollupPaymentDelete;
+DROP TRIGGER IF EXISTS RollupReviewUpdate;
+DROP TRIGGER IF EXISTS RollupReviewDelete;
+
+DELIMITER //
+CREATE TRIGGER RollupBookingUpdate
+AFTER UPDATE ON Booking
+FOR EACH ROW
+BEGIN
+    INSERT IGNORE INTO RollupDirtyDay (BookingDay) VALUES (DATE(OLD.BookingDate));
+    IF DATE(NEW.BookingDate) <> DATE(OLD.BookingDate) THEN
+        INSERT IGNORE INTO RollupDirtyDay (BookingDay) VALUES (DATE(NEW.BookingDate));
+    END IF;
+END //
+
+CREATE TRIGGER RollupBookingDelete
+AFTER DELETE ON Booking
+FOR EACH ROW
+BEGIN
+    INSERT IGNORE INTO RollupDirtyDay (BookingDay) VALUES (DATE(OLD.BookingDate));
+END //
+
+CREATE TRIGGER RollupBookingPassengerInsert
+AFTER INSERT ON BookingPassenger
+FOR EACH ROW
+BEGIN
+    INSERT IGNORE INTO RollupDirtyDay (BookingDay)
+    SELECT DATE(BookingDate) FROM Booking WHERE BookingID = NEW.BookingID;
+END //
+
+CREATE TRIGGER RollupBookingPassengerUpdate
+AFTER UPDATE ON BookingPassenger
+FOR EACH ROW
+BEGIN
+    INSERT IGNORE INTO RollupDirtyDay (BookingDay)
+    SELECT DATE(BookingDate) FROM Booking WHERE BookingID IN (OLD.BookingID, NEW.BookingID);
+END //
+
+CREATE TRIGGER RollupBookingPassengerDelete
+AFTER DELETE ON BookingPassenger
+FOR EACH ROW
+BEGIN
+    INSERT IGNORE INTO RollupDirtyDay (BookingDay)
+    SELECT DATE(BookingDate) FROM Booking WHERE BookingID = OLD.BookingID;
+END //
+
+CREATE TRIGGER RollupBookingAccommodationUpdate
+AFTER UPDATE ON BookingAccommodation
+FOR EACH ROW
+BEGIN
+    INSERT IGNORE INTO RollupDirtyDay (BookingDay)
+    SELECT DATE(BookingDate) FROM Booking WHERE BookingID IN (OLD.BookingID, NEW.BookingID);
+END //
+
+CREATE TRIGGER RollupBookingAccommodationDelete
+AFTER DELETE ON BookingAccommodation
+FOR EACH ROW
+BEGIN
+    INSERT IGNORE INTO RollupDirtyDay (BookingDay)
+    SELECT DATE(BookingDate) FROM Booking WHERE BookingID = OLD.BookingID;
+END //
+
+CREATE TRIGGER RollupBookingTransportationUpdate
+AFTER UPDATE ON BookingTransportation
+FOR EACH ROW
+BEGIN
+    INSERT IGNORE INTO RollupDirtyDay (BookingDay)
+    SELECT DATE(BookingDate) FROM Booking WHERE BookingID IN (OLD.BookingID, NEW.BookingID);
+END //
+
+CREATE TRIGGER RollupBookingTransportationDelete
+AFTER DELETE ON BookingTransportation
+FOR EACH ROW
+BEGIN
+    INSERT IGNORE INTO RollupDirtyDay (BookingDay)
+    SELECT DATE(BookingDate) FROM Booking WHERE BookingID = OLD.BookingID;
+END //
+
+CREATE TRIGGER RollupPaymentUpdate
+AFTER UPDATE ON Payment
+FOR EACH ROW
+BEGIN
+    INSERT IGNORE INTO RollupDirtyDay (BookingDay)
+    SELECT DATE(BookingDate) FROM Booking WHERE BookingID IN (OLD.BookingID, NEW.BookingID);
+END //
+
+CREATE TRIGGER RollupPaymentDelete
+AFTER DELETE ON Payment
+FOR EACH ROW
+BEGIN
+    INSERT IGNORE INTO RollupDirtyDay (BookingDay)
+    SELECT DATE(BookingDate) FROM Booking WHERE BookingID = OLD.BookingID;
+END //
+
+CREATE TRIGGER RollupReviewUpdate
+AFTER UPDATE ON Review
+FOR EACH ROW
+BEGIN
+    INSERT IGNORE INTO RollupDirtyDay (BookingDay)
+    SELECT DATE(BookingDate) FROM Booking WHERE BookingID IN (OLD.BookingID, NEW.BookingID);
+END //
+
+CREATE TRIGGER RollupReviewDelete
+AFTER DELETE ON Review
+FOR EACH ROW
+BEGIN
+    INSERT IGNORE INTO RollupDirtyDay (BookingDay)
+    SELECT DATE(BookingDate) FROM Booking WHERE BookingID = OLD.BookingID;
+END //
+DELIMITER ;
+
+-- The schema views, rewritten to read the summary tables instead of the raw joins.
+-- Counts are per stay / per booking rather than per joined review row.
+CREATE OR REPLACE VIEW PopularDestinations AS
+SELECT
+    l.Country,
+    l.City,
+    SUM(f.StayCount) AS BookingCount,
+    SUM(f.RatingSum) / NULLIF(SUM(f.RatingCount), 0) AS AverageRating
+FROM FactAccommodationDaily f
+JOIN Accommodation a ON f.AccommodationID = a.AccommodationID
+JOIN Location l ON a.LocationID = l.LocationID
+GROUP BY l.Country, l.City
+ORDER BY BookingCount DESC, AverageRating DESC
+LIMIT 20;
+
+CREATE OR REPLACE VIEW EmployeePerformance AS
+SELECT
+    e.EmployeeID,
+    e.Name,
+    e.Role,
+    IFNULL(f.TotalBookings, 0) AS TotalBookings,
+    f.TotalRevenue,
+    f.RatingSum / NULLIF(f.RatingCount, 0) AS AverageRating
+FROM Employee e
+LEFT JOIN (
+    SELECT EmployeeID, SUM(BookingCount) AS TotalBookings, SUM(RevenueSum) AS TotalRevenue,
+           SUM(RatingSum) AS RatingSum, SUM(RatingCount) AS RatingCount
+    FROM FactBookingDaily
+    GROUP BY EmployeeID
+) f ON e.EmployeeID = f.EmployeeID
+ORDER BY TotalRevenue DESC;
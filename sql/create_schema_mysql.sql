@@ -126,7 +126,8 @@ CREATE TABLE IF NOT EXISTS Booking (
     TotalCost DECIMAL(12, 2) CHECK (TotalCost >= 0),
     Status ENUM('Pending', 'Confirmed', 'Cancelled', 'Completed') DEFAULT 'Pending',
     FOREIGN KEY (EmployeeID) REFERENCES Employee(EmployeeID) ON DELETE SET NULL,
-    INDEX idx_booking_date (BookingDate),
+    -- Covers the period reports: a BookingDate range with Purpose and TotalCost read from the index
+    INDEX idx_booking_date_purpose_cost (BookingDate, Purpose, TotalCost),
     INDEX idx_purpose (Purpose)
 );
 
@@ -232,7 +233,9 @@ LEFT JOIN Review r ON b.BookingID = r.BookingID
 GROUP BY e.EmployeeID, e.Name, e.Role
 ORDER BY TotalRevenue DESC;
 
--- Add stored procedure for monthly report
+-- Add stored procedure for monthly report. The month is a half-open BookingDate range,
+-- so idx_booking_date_purpose_cost finds its bookings instead of a scan of every
+-- booking through YEAR()/MONTH().
 DELIMITER //
 CREATE PROCEDURE GenerateMonthlyReport(IN year INT, IN month INT)
 BEGIN
@@ -251,58 +254,213 @@ BEGIN
         WHERE bp.IsPrimary = TRUE
     ) p ON b.BookingID = p.BookingID
     LEFT JOIN Employee e ON b.EmployeeID = e.EmployeeID
-    WHERE YEAR(b.BookingDate) = year AND MONTH(b.BookingDate) = month
+    WHERE b.BookingDate >= MAKEDATE(year, 1) + INTERVAL (month - 1) MONTH
+      AND b.BookingDate < MAKEDATE(year, 1) + INTERVAL month MONTH
     ORDER BY b.TotalCost DESC;
 END //
 DELIMITER ;
 
--- Add trigger for booking total cost calculation
+-- Booking totals are maintained incrementally: every insert, update or delete of a
+-- booking leg applies its cost delta to Booking.TotalCost, instead of re-summing all
+-- of the booking's legs on each row. Bulk loaders set @defer_booking_totals = 1 to
+-- skip the per-row updates and call RecalculateBookingTotals once at the end.
+-- Legs removed by ON DELETE CASCADE do not fire triggers, but their booking is gone too.
+DROP TRIGGER IF EXISTS CalculateBookingTotal;
+DROP TRIGGER IF EXISTS CalculateBookingTotalTransport;
+DROP TRIGGER IF EXISTS BookingAccommodationTotalInsert;
+DROP TRIGGER IF EXISTS BookingAccommodationTotalUpdate;
+DROP TRIGGER IF EXISTS BookingAccommodationTotalDelete;
+DROP TRIGGER IF EXISTS BookingTransportationTotalInsert;
+DROP TRIGGER IF EXISTS BookingTransportationTotalUpdate;
+DROP TRIGGER IF EXISTS BookingTransportationTotalDelete;
+DROP PROCEDURE IF EXISTS RecalculateBookingTotals;
+
 DELIMITER //
-CREATE TRIGGER CalculateBookingTotal
+CREATE TRIGGER BookingAccommodationTotalInsert
 AFTER INSERT ON BookingAccommodation
 FOR EACH ROW
 BEGIN
-    DECLARE total DECIMAL(12, 2);
-    
-    -- Calculate accommodation costs
-    SELECT SUM(Cost) INTO total
-    FROM BookingAccommodation
-    WHERE BookingID = NEW.BookingID;
-    
-    -- Add transportation costs
-    SELECT total + IFNULL(SUM(Cost), 0) INTO total
-    FROM BookingTransportation
-    WHERE BookingID = NEW.BookingID;
-    
-    -- Update booking total
-    UPDATE Booking
-    SET TotalCost = total
-    WHERE BookingID = NEW.BookingID;
+    IF @defer_booking_totals IS NULL THEN
+        UPDATE Booking
+        SET TotalCost = IFNULL(TotalCost, 0) + IFNULL(NEW.Cost, 0)
+        WHERE BookingID = NEW.BookingID;
+    END IF;
+END //
+
+CREATE TRIGGER BookingAccommodationTotalUpdate
+AFTER UPDATE ON BookingAccommodation
+FOR EACH ROW
+BEGIN
+    IF @defer_booking_totals IS NULL AND NOT (NEW.BookingID <=> OLD.BookingID AND NEW.Cost <=> OLD.Cost) THEN
+        -- GREATEST keeps an already drifted total from violating the CHECK; reconcile reports it
+        UPDATE Booking
+        SET TotalCost = GREATEST(IFNULL(TotalCost, 0) - IFNULL(OLD.Cost, 0), 0)
+        WHERE BookingID = OLD.BookingID;
+        UPDATE Booking
+        SET TotalCost = IFNULL(TotalCost, 0) + IFNULL(NEW.Cost, 0)
+        WHERE BookingID = NEW.BookingID;
+    END IF;
+END //
+
+CREATE TRIGGER BookingAccommodationTotalDelete
+AFTER DELETE ON BookingAccommodation
+FOR EACH ROW
+BEGIN
+    IF @defer_booking_totals IS NULL THEN
+        UPDATE Booking
+        SET TotalCost = GREATEST(IFNULL(TotalCost, 0) - IFNULL(OLD.Cost, 0), 0)
+        WHERE BookingID = OLD.BookingID;
+    END IF;
+END //
+
+CREATE TRIGGER BookingTransportationTotalInsert
+AFTER INSERT ON BookingTransportation
+FOR EACH ROW
+BEGIN
+    IF @defer_booking_totals IS NULL THEN
+        UPDATE Booking
+        SET TotalCost = IFNULL(TotalCost, 0) + IFNULL(NEW.Cost, 0)
+        WHERE BookingID = NEW.BookingID;
+    END IF;
+END //
+
+CREATE TRIGGER BookingTransportationTotalUpdate
+AFTER UPDATE ON BookingTransportation
+FOR EACH ROW
+BEGIN
+    IF @defer_booking_totals IS NULL AND NOT (NEW.BookingID <=> OLD.BookingID AND NEW.Cost <=> OLD.Cost) THEN
+        UPDATE Booking
+        SET TotalCost = GREATEST(IFNULL(TotalCost, 0) - IFNULL(OLD.Cost, 0), 0)
+        WHERE BookingID = OLD.BookingID;
+        UPDATE Booking
+        SET TotalCost = IFNULL(TotalCost, 0) + IFNULL(NEW.Cost, 0)
+        WHERE BookingID = NEW.BookingID;
+    END IF;
+END //
+
+CREATE TRIGGER BookingTransportationTotalDelete
+AFTER DELETE ON BookingTransportation
+FOR EACH ROW
+BEGIN
+    IF @defer_booking_totals IS NULL THEN
+        UPDATE Booking
+        SET TotalCost = GREATEST(IFNULL(TotalCost, 0) - IFNULL(OLD.Cost, 0), 0)
+        WHERE BookingID = OLD.BookingID;
+    END IF;
+END //
+
+-- Full recomputation from the component sums (NULL = every booking).
+-- Bookings without any legs get a NULL total, as they have no cost yet.
+CREATE PROCEDURE RecalculateBookingTotals(IN p_booking_id INT)
+BEGIN
+    UPDATE Booking b
+    LEFT JOIN (
+        SELECT BookingID, SUM(Cost) AS Total
+        FROM BookingAccommodation
+        WHERE p_booking_id IS NULL OR BookingID = p_booking_id
+        GROUP BY BookingID
+    ) acc ON b.BookingID = acc.BookingID
+    LEFT JOIN (
+        SELECT BookingID, SUM(Cost) AS Total
+        FROM BookingTransportation
+        WHERE p_booking_id IS NULL OR BookingID = p_booking_id
+        GROUP BY BookingID
+    ) trans ON b.BookingID = trans.BookingID
+    SET b.TotalCost = CASE
+        WHEN acc.BookingID IS NULL AND trans.BookingID IS NULL THEN NULL
+        ELSE IFNULL(acc.Total, 0) + IFNULL(trans.Total, 0)
+    END
+    WHERE p_booking_id IS NULL OR b.BookingID = p_booking_id;
 END //
 DELIMITER ;
 
--- Add similar trigger for transportation
+-- Management tree as a closure table: one row per (ancestor, descendant) pair of the
+-- Employee.SupervisorID tree, each employee included as its own ancestor at depth 0.
+-- A whole team (everyone under a manager, at any depth) is then the rows of one
+-- AncestorID, and team rollups are a single indexed join instead of a recursive walk.
+-- The triggers keep it current on inserts, supervisor changes and deletes; bulk
+-- loaders that insert employees before their supervisors call RebuildEmployeeClosure
+-- once at the end. Reporting to someone in one's own team is rejected.
+CREATE TABLE IF NOT EXISTS EmployeeClosure (
+    AncestorID INT NOT NULL,
+    DescendantID INT NOT NULL,
+    Depth INT NOT NULL,
+    PRIMARY KEY (AncestorID, DescendantID),
+    INDEX idx_closure_depth (AncestorID, Depth),
+    INDEX idx_closure_descendant (DescendantID, Depth)
+);
+
+DROP TRIGGER IF EXISTS EmployeeClosureInsert;
+DROP TRIGGER IF EXISTS EmployeeClosureCycleCheck;
+DROP TRIGGER IF EXISTS EmployeeClosureMove;
+DROP TRIGGER IF EXISTS EmployeeClosureDelete;
+DROP PROCEDURE IF EXISTS RebuildEmployeeClosure;
+
 DELIMITER //
-CREATE TRIGGER CalculateBookingTotalTransport
-AFTER INSERT ON BookingTransportation
+CREATE TRIGGER EmployeeClosureInsert
+AFTER INSERT ON Employee
+FOR EACH ROW
+BEGIN
+    INSERT INTO EmployeeClosure (AncestorID, DescendantID, Depth)
+    SELECT AncestorID, NEW.EmployeeID, Depth + 1 FROM EmployeeClosure WHERE DescendantID = NEW.SupervisorID
+    UNION ALL
+    SELECT NEW.EmployeeID, NEW.EmployeeID, 0;
+END //
+
+CREATE TRIGGER EmployeeClosureCycleCheck
+BEFORE UPDATE ON Employee
+FOR EACH ROW
+BEGIN
+    IF NEW.SupervisorID IS NOT NULL AND NOT (NEW.SupervisorID <=> OLD.SupervisorID)
+       AND EXISTS (SELECT 1 FROM EmployeeClosure
+                   WHERE AncestorID = NEW.EmployeeID AND DescendantID = NEW.SupervisorID) THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'An employee cannot report to a member of their own team';
+    END IF;
+END //
+
+-- Moving an employee moves their whole team: the paths from their old ancestors into
+-- the team are removed, and every new ancestor is linked to every team member.
+CREATE TRIGGER EmployeeClosureMove
+AFTER UPDATE ON Employee
 FOR EACH ROW
 BEGIN
-    DECLARE total DECIMAL(12, 2);
-    
-    -- Calculate transportation costs
-    SELECT SUM(Cost) INTO total
-    FROM BookingTransportation
-    WHERE BookingID = NEW.BookingID;
-    
-    -- Add accommodation costs
-    SELECT total + IFNULL(SUM(Cost), 0) INTO total
-    FROM BookingAccommodation
-    WHERE BookingID = NEW.BookingID;
-    
-    -- Update booking total
-    UPDATE Booking
-    SET TotalCost = total
-    WHERE BookingID = NEW.BookingID;
+    IF NOT (NEW.SupervisorID <=> OLD.SupervisorID) THEN
+        DELETE link FROM EmployeeClosure link
+        JOIN EmployeeClosure team ON team.DescendantID = link.DescendantID AND team.AncestorID = NEW.EmployeeID
+        JOIN EmployeeClosure above ON above.AncestorID = link.AncestorID AND above.DescendantID = NEW.EmployeeID
+        WHERE above.Depth > 0;
+        INSERT INTO EmployeeClosure (AncestorID, DescendantID, Depth)
+        SELECT above.AncestorID, team.DescendantID, above.Depth + team.Depth + 1
+        FROM EmployeeClosure above
+        JOIN EmployeeClosure team ON team.AncestorID = NEW.EmployeeID
+        WHERE above.DescendantID = NEW.SupervisorID;
+    END IF;
+END //
+
+-- ON DELETE SET NULL does not fire triggers, so the deleted employee's reports are
+-- detached here: every path through them goes, and their reports become roots.
+CREATE TRIGGER EmployeeClosureDelete
+BEFORE DELETE ON Employee
+FOR EACH ROW
+BEGIN
+    DELETE link FROM EmployeeClosure link
+    JOIN EmployeeClosure team ON team.DescendantID = link.DescendantID AND team.AncestorID = OLD.EmployeeID
+    JOIN EmployeeClosure above ON above.AncestorID = link.AncestorID AND above.DescendantID = OLD.EmployeeID;
+END //
+
+-- Full rebuild from Employee.SupervisorID
+CREATE PROCEDURE RebuildEmployeeClosure()
+BEGIN
+    DELETE FROM EmployeeClosure;
+    INSERT INTO EmployeeClosure (AncestorID, DescendantID, Depth)
+    WITH RECURSIVE paths (AncestorID, DescendantID, Depth) AS (
+        SELECT EmployeeID, EmployeeID, 0 FROM Employee
+        UNION ALL
+        SELECT paths.AncestorID, e.EmployeeID, paths.Depth + 1
+        FROM paths
+        JOIN Employee e ON e.SupervisorID = paths.DescendantID
+    )
+    SELECT AncestorID, DescendantID, Depth FROM paths;
 END //
 DELIMITER ;
 
@@ -314,4 +472,4 @@ CREATE INDEX idx_cruise_source ON Cruise(SourceLocationID);
 CREATE INDEX idx_cruise_dest ON Cruise(DestLocationID);
 CREATE INDEX idx_car_pickup ON CarRental(PickupLocationID);
 CREATE INDEX idx_car_dropoff ON CarRental(DropoffLocationID);
-CREATE INDEX idx_booking_employee ON Booking(EmployeeID);
\ No newline at end of file
+CREATE INDEX idx_booking_employee_cost ON Booking(EmployeeID, TotalCost); -- covers team revenue rollups
\ No newline at end of file
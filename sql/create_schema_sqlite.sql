@@ -0,0 +1,445 @@
+-- SQL Script to Create the Travel Agency Database Schema for SQLite
+-- File: create_schema_sqlite.sql
+--
+-- Same tables, keys, indexes, views and booking total triggers as
+-- create_schema_mysql.sql. ENUMs become CHECK constraints. InnoDB indexes every
+-- foreign key column implicitly; SQLite does not, so those indexes are created
+-- explicitly at the end. SQLite has no stored procedures: GenerateMonthlyReport
+-- and RecalculateBookingTotals are MySQL-only. The DimDate calendar of
+-- sql/date_dimension.sql is part of this script.
+
+PRAGMA foreign_keys = ON;
+
+-- 1. Location Table
+CREATE TABLE IF NOT EXISTS Location (
+    LocationID INTEGER PRIMARY KEY AUTOINCREMENT,
+    City VARCHAR(100) NOT NULL,
+    State VARCHAR(100),
+    Country VARCHAR(100) NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_country ON Location(Country);
+CREATE INDEX IF NOT EXISTS idx_city ON Location(City);
+
+-- 2. Passenger Table
+CREATE TABLE IF NOT EXISTS Passenger (
+    PassengerID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Name VARCHAR(255) NOT NULL,
+    Gender VARCHAR(10) CHECK (Gender IN ('Male', 'Female', 'Other')),
+    Age INT CHECK (Age > 0 AND Age < 120),
+    Email VARCHAR(255) UNIQUE,
+    Phone VARCHAR(20)
+);
+CREATE INDEX IF NOT EXISTS idx_name ON Passenger(Name);
+CREATE INDEX IF NOT EXISTS idx_age ON Passenger(Age);
+
+-- 3. Employee Table
+CREATE TABLE IF NOT EXISTS Employee (
+    EmployeeID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Name VARCHAR(255) NOT NULL,
+    Role VARCHAR(100),
+    JoinDate DATE,
+    SupervisorID INT NULL,
+    FOREIGN KEY (SupervisorID) REFERENCES Employee(EmployeeID) ON DELETE SET NULL
+);
+CREATE INDEX IF NOT EXISTS idx_role ON Employee(Role);
+CREATE INDEX IF NOT EXISTS idx_join_date ON Employee(JoinDate);
+
+-- 4. Accommodation Table
+CREATE TABLE IF NOT EXISTS Accommodation (
+    AccommodationID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Name VARCHAR(255) NOT NULL,
+    Type VARCHAR(20) CHECK (Type IN ('Hotel', 'Resort', 'Airbnb', 'Guesthouse', 'Inn', 'Suites')),
+    Rate DECIMAL(10, 2) CHECK (Rate >= 0),
+    Facilities TEXT,
+    Discount DECIMAL(4, 2) DEFAULT 0.00 CHECK (Discount >= 0 AND Discount <= 1),
+    LocationID INT NOT NULL,
+    FOREIGN KEY (LocationID) REFERENCES Location(LocationID) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_type ON Accommodation(Type);
+CREATE INDEX IF NOT EXISTS idx_rate ON Accommodation(Rate);
+
+-- 5. TransportationType Table
+CREATE TABLE IF NOT EXISTS TransportationType (
+    TransportTypeID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Name VARCHAR(50) NOT NULL UNIQUE
+);
+
+-- Insert base transportation types
+INSERT OR IGNORE INTO TransportationType (Name) VALUES
+('Flight'), ('Car Rental'), ('Bus'), ('Cruise'), ('Train'), ('Ferry');
+
+-- 6. Flight Table
+CREATE TABLE IF NOT EXISTS Flight (
+    FlightID INTEGER PRIMARY KEY AUTOINCREMENT,
+    FlightNumber VARCHAR(20) NOT NULL,
+    Carrier VARCHAR(100) NOT NULL,
+    SourceLocationID INT NOT NULL,
+    DestLocationID INT NOT NULL,
+    DepartureDateTime DATETIME NOT NULL,
+    ArrivalDateTime DATETIME NOT NULL,
+    Class VARCHAR(20) CHECK (Class IN ('Economy', 'Premium Economy', 'Business', 'First')),
+    Fare DECIMAL(10, 2) NOT NULL CHECK (Fare >= 0),
+    FOREIGN KEY (SourceLocationID) REFERENCES Location(LocationID) ON DELETE CASCADE,
+    FOREIGN KEY (DestLocationID) REFERENCES Location(LocationID) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_flight_number ON Flight(FlightNumber);
+CREATE INDEX IF NOT EXISTS idx_carrier ON Flight(Carrier);
+CREATE INDEX IF NOT EXISTS idx_departure ON Flight(DepartureDateTime);
+
+-- 7. CarRental Table
+CREATE TABLE IF NOT EXISTS CarRental (
+    CarRentalID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Company VARCHAR(100) NOT NULL,
+    CarType VARCHAR(100),
+    PickupLocationID INT NOT NULL,
+    DropoffLocationID INT NOT NULL,
+    PickupDateTime DATETIME NOT NULL,
+    DropoffDateTime DATETIME NOT NULL,
+    Rent DECIMAL(10, 2) NOT NULL CHECK (Rent >= 0),
+    FOREIGN KEY (PickupLocationID) REFERENCES Location(LocationID) ON DELETE CASCADE,
+    FOREIGN KEY (DropoffLocationID) REFERENCES Location(LocationID) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_company ON CarRental(Company);
+CREATE INDEX IF NOT EXISTS idx_pickup_date ON CarRental(PickupDateTime);
+
+-- 8. Cruise Table
+CREATE TABLE IF NOT EXISTS Cruise (
+    CruiseID INTEGER PRIMARY KEY AUTOINCREMENT,
+    CruiseName VARCHAR(255) NOT NULL,
+    Line VARCHAR(100),
+    SourceLocationID INT NOT NULL,
+    DestLocationID INT NOT NULL,
+    DepartureDate DATE NOT NULL,
+    ReturnDate DATE NOT NULL,
+    Fare DECIMAL(10, 2) NOT NULL CHECK (Fare >= 0),
+    FOREIGN KEY (SourceLocationID) REFERENCES Location(LocationID) ON DELETE CASCADE,
+    FOREIGN KEY (DestLocationID) REFERENCES Location(LocationID) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_cruise_name ON Cruise(CruiseName);
+CREATE INDEX IF NOT EXISTS idx_departure_date ON Cruise(DepartureDate);
+
+-- 9. Booking Table
+CREATE TABLE IF NOT EXISTS Booking (
+    BookingID INTEGER PRIMARY KEY AUTOINCREMENT,
+    GroupName VARCHAR(255),
+    Purpose VARCHAR(20) CHECK (Purpose IN ('Leisure', 'Business', 'Family', 'Honeymoon', 'Adventure', 'Other')),
+    BookingDate DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    EmployeeID INT NULL,
+    TotalCost DECIMAL(12, 2) CHECK (TotalCost >= 0),
+    Status VARCHAR(20) DEFAULT 'Pending' CHECK (Status IN ('Pending', 'Confirmed', 'Cancelled', 'Completed')),
+    FOREIGN KEY (EmployeeID) REFERENCES Employee(EmployeeID) ON DELETE SET NULL
+);
+-- Covers the period reports (src/period_reports.py): a BookingDate range with Purpose and
+-- TotalCost read from the index alone. It replaces idx_booking_date, a prefix of it.
+DROP INDEX IF EXISTS idx_booking_date;
+CREATE INDEX IF NOT EXISTS idx_booking_date_purpose_cost ON Booking(BookingDate, Purpose, TotalCost);
+CREATE INDEX IF NOT EXISTS idx_purpose ON Booking(Purpose);
+
+-- 10. BookingPassenger Table (Many-to-Many linking Bookings and Passengers)
+CREATE TABLE IF NOT EXISTS BookingPassenger (
+    BookingID INT NOT NULL,
+    PassengerID INT NOT NULL,
+    IsPrimary BOOLEAN DEFAULT FALSE,
+    PRIMARY KEY (BookingID, PassengerID),
+    FOREIGN KEY (BookingID) REFERENCES Booking(BookingID) ON DELETE CASCADE,
+    FOREIGN KEY (PassengerID) REFERENCES Passenger(PassengerID) ON DELETE CASCADE
+);
+
+-- 11. BookingAccommodation Table
+CREATE TABLE IF NOT EXISTS BookingAccommodation (
+    BookingAccommodationID INTEGER PRIMARY KEY AUTOINCREMENT,
+    BookingID INT NOT NULL,
+    AccommodationID INT NOT NULL,
+    CheckInDate DATE NOT NULL,
+    CheckOutDate DATE NOT NULL,
+    Cost DECIMAL(10, 2) CHECK (Cost >= 0),
+    FOREIGN KEY (BookingID) REFERENCES Booking(BookingID) ON DELETE CASCADE,
+    FOREIGN KEY (AccommodationID) REFERENCES Accommodation(AccommodationID) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_check_in ON BookingAccommodation(CheckInDate);
+
+-- 12. BookingTransportation Table
+CREATE TABLE IF NOT EXISTS BookingTransportation (
+    BookingTransportationID INTEGER PRIMARY KEY AUTOINCREMENT,
+    BookingID INT NOT NULL,
+    TransportTypeID INT NOT NULL,
+    FlightID INT NULL,
+    CarRentalID INT NULL,
+    CruiseID INT NULL,
+    Cost DECIMAL(10, 2) CHECK (Cost >= 0),
+    FOREIGN KEY (BookingID) REFERENCES Booking(BookingID) ON DELETE CASCADE,
+    FOREIGN KEY (TransportTypeID) REFERENCES TransportationType(TransportTypeID) ON DELETE CASCADE,
+    FOREIGN KEY (FlightID) REFERENCES Flight(FlightID),
+    FOREIGN KEY (CarRentalID) REFERENCES CarRental(CarRentalID),
+    FOREIGN KEY (CruiseID) REFERENCES Cruise(CruiseID),
+    CONSTRAINT chk_one_transport CHECK (
+        (CASE WHEN FlightID IS NOT NULL THEN 1 ELSE 0 END +
+         CASE WHEN CarRentalID IS NOT NULL THEN 1 ELSE 0 END +
+         CASE WHEN CruiseID IS NOT NULL THEN 1 ELSE 0 END) = 1
+    )
+);
+
+-- 13. Payment Table
+CREATE TABLE IF NOT EXISTS Payment (
+    PaymentID INTEGER PRIMARY KEY AUTOINCREMENT,
+    BookingID INT NOT NULL,
+    PaymentDate DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    Amount DECIMAL(12, 2) NOT NULL CHECK (Amount > 0),
+    PaymentType VARCHAR(20) CHECK (PaymentType IN ('Credit Card', 'Debit Card', 'Bank Transfer', 'Cash', 'Other')),
+    CardLastFour VARCHAR(4),
+    ExpiryDate VARCHAR(7), -- MM/YYYY format
+    FOREIGN KEY (BookingID) REFERENCES Booking(BookingID) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_payment_date ON Payment(PaymentDate);
+
+-- 14. Review Table
+CREATE TABLE IF NOT EXISTS Review (
+    ReviewID INTEGER PRIMARY KEY AUTOINCREMENT,
+    BookingID INT NOT NULL,
+    PassengerID INT NOT NULL,
+    Rating INT NOT NULL CHECK (Rating >= 1 AND Rating <= 5),
+    Text TEXT,
+    ReviewDate DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (BookingID) REFERENCES Booking(BookingID) ON DELETE CASCADE,
+    FOREIGN KEY (PassengerID) REFERENCES Passenger(PassengerID) ON DELETE CASCADE,
+    UNIQUE (BookingID, PassengerID)
+);
+CREATE INDEX IF NOT EXISTS idx_rating ON Review(Rating);
+
+-- Create indexes for performance (as in the MySQL schema)
+CREATE INDEX IF NOT EXISTS idx_accommodation_location ON Accommodation(LocationID);
+CREATE INDEX IF NOT EXISTS idx_flight_source ON Flight(SourceLocationID);
+CREATE INDEX IF NOT EXISTS idx_flight_dest ON Flight(DestLocationID);
+CREATE INDEX IF NOT EXISTS idx_cruise_source ON Cruise(SourceLocationID);
+CREATE INDEX IF NOT EXISTS idx_cruise_dest ON Cruise(DestLocationID);
+CREATE INDEX IF NOT EXISTS idx_car_pickup ON CarRental(PickupLocationID);
+CREATE INDEX IF NOT EXISTS idx_car_dropoff ON CarRental(DropoffLocationID);
+-- Covers team revenue rollups; replaces idx_booking_employee (EmployeeID)
+DROP INDEX IF EXISTS idx_booking_employee;
+CREATE INDEX IF NOT EXISTS idx_booking_employee_cost ON Booking(EmployeeID, TotalCost);
+
+-- Foreign key indexes InnoDB would have created implicitly
+CREATE INDEX IF NOT EXISTS idx_employee_supervisor ON Employee(SupervisorID);
+CREATE INDEX IF NOT EXISTS idx_bp_passenger ON BookingPassenger(PassengerID);
+CREATE INDEX IF NOT EXISTS idx_ba_booking ON BookingAccommodation(BookingID);
+CREATE INDEX IF NOT EXISTS idx_ba_accommodation ON BookingAccommodation(AccommodationID);
+CREATE INDEX IF NOT EXISTS idx_bt_booking ON BookingTransportation(BookingID);
+CREATE INDEX IF NOT EXISTS idx_bt_type ON BookingTransportation(TransportTypeID);
+CREATE INDEX IF NOT EXISTS idx_bt_flight ON BookingTransportation(FlightID);
+CREATE INDEX IF NOT EXISTS idx_bt_car_rental ON BookingTransportation(CarRentalID);
+CREATE INDEX IF NOT EXISTS idx_bt_cruise ON BookingTransportation(CruiseID);
+CREATE INDEX IF NOT EXISTS idx_payment_booking ON Payment(BookingID);
+CREATE INDEX IF NOT EXISTS idx_review_passenger ON Review(PassengerID);
+
+-- Create a view for popular destinations
+CREATE VIEW IF NOT EXISTS PopularDestinations AS
+SELECT
+    l.Country,
+    l.City,
+    COUNT(b.BookingID) AS BookingCount,
+    AVG(r.Rating) AS AverageRating
+FROM Location l
+JOIN Accommodation a ON l.LocationID = a.LocationID
+JOIN BookingAccommodation ba ON a.AccommodationID = ba.AccommodationID
+JOIN Booking b ON ba.BookingID = b.BookingID
+LEFT JOIN Review r ON b.BookingID = r.BookingID
+GROUP BY l.Country, l.City
+ORDER BY BookingCount DESC, AverageRating DESC
+LIMIT 20;
+
+-- Create a view for employee performance
+CREATE VIEW IF NOT EXISTS EmployeePerformance AS
+SELECT
+    e.EmployeeID,
+    e.Name,
+    e.Role,
+    COUNT(b.BookingID) AS TotalBookings,
+    SUM(b.TotalCost) AS TotalRevenue,
+    AVG(r.Rating) AS AverageRating
+FROM Employee e
+LEFT JOIN Booking b ON e.EmployeeID = b.EmployeeID
+LEFT JOIN Review r ON b.BookingID = r.BookingID
+GROUP BY e.EmployeeID, e.Name, e.Role
+ORDER BY TotalRevenue DESC;
+
+-- Calendar dimension for the period reports, as in sql/date_dimension.sql: one row per
+-- day from 1990 to 2050, filled once (the recursion has no start row when the table
+-- already has rows). DayOfWeek runs from 1 = Monday to 7 = Sunday.
+CREATE TABLE IF NOT EXISTS DimDate (
+    DateKey DATE PRIMARY KEY,
+    NextDate DATE NOT NULL,
+    Year SMALLINT NOT NULL,
+    Quarter TINYINT NOT NULL,
+    Month TINYINT NOT NULL,
+    MonthName VARCHAR(9) NOT NULL,
+    DayOfMonth TINYINT NOT NULL,
+    DayOfWeek TINYINT NOT NULL,
+    DayName VARCHAR(9) NOT NULL,
+    IsWeekend BOOLEAN NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_dimdate_month ON DimDate(Year, Month);
+CREATE INDEX IF NOT EXISTS idx_dimdate_quarter ON DimDate(Year, Quarter);
+
+WITH RECURSIVE days (d) AS (
+    SELECT '1990-01-01' WHERE NOT EXISTS (SELECT 1 FROM DimDate)
+    UNION ALL
+    SELECT date(d, '+1 day') FROM days WHERE d < '2050-12-31'
+)
+INSERT INTO DimDate (DateKey, NextDate, Year, Quarter, Month, MonthName, DayOfMonth, DayOfWeek, DayName, IsWeekend)
+SELECT
+    d,
+    date(d, '+1 day'),
+    CAST(strftime('%Y', d) AS INTEGER),
+    (CAST(strftime('%m', d) AS INTEGER) + 2) / 3,
+    CAST(strftime('%m', d) AS INTEGER),
+    CASE strftime('%m', d)
+        WHEN '01' THEN 'January' WHEN '02' THEN 'February' WHEN '03' THEN 'March'
+        WHEN '04' THEN 'April' WHEN '05' THEN 'May' WHEN '06' THEN 'June'
+        WHEN '07' THEN 'July' WHEN '08' THEN 'August' WHEN '09' THEN 'September'
+        WHEN '10' THEN 'October' WHEN '11' THEN 'November' ELSE 'December'
+    END,
+    CAST(strftime('%d', d) AS INTEGER),
+    (CAST(strftime('%w', d) AS INTEGER) + 6) % 7 + 1,
+    CASE strftime('%w', d)
+        WHEN '1' THEN 'Monday' WHEN '2' THEN 'Tuesday' WHEN '3' THEN 'Wednesday'
+        WHEN '4' THEN 'Thursday' WHEN '5' THEN 'Friday' WHEN '6' THEN 'Saturday' ELSE 'Sunday'
+    END,
+    strftime('%w', d) IN ('0', '6')
+FROM days;
+
+-- Booking totals are maintained incrementally, as in the MySQL schema. SQLite has
+-- no session variables, so @defer_booking_totals becomes a row in
+-- BookingTotalsDeferred: bulk loaders insert it inside their transaction, insert the
+-- legs, recompute the totals once and delete it again before committing (the app's
+-- SQLite connections translate SET @defer_booking_totals to exactly that). Sums are
+-- rounded to cents as the DECIMAL columns are in MySQL; SQLite stores them as REAL.
+CREATE TABLE IF NOT EXISTS BookingTotalsDeferred (
+    Deferred INTEGER PRIMARY KEY CHECK (Deferred = 1)
+);
+
+CREATE TRIGGER IF NOT EXISTS BookingAccommodationTotalInsert
+AFTER INSERT ON BookingAccommodation
+FOR EACH ROW WHEN NOT EXISTS (SELECT 1 FROM BookingTotalsDeferred)
+BEGIN
+    UPDATE Booking
+    SET TotalCost = ROUND(IFNULL(TotalCost, 0) + IFNULL(NEW.Cost, 0), 2)
+    WHERE BookingID = NEW.BookingID;
+END;
+
+CREATE TRIGGER IF NOT EXISTS BookingAccommodationTotalUpdate
+AFTER UPDATE ON BookingAccommodation
+FOR EACH ROW WHEN NOT EXISTS (SELECT 1 FROM BookingTotalsDeferred)
+    AND NOT (NEW.BookingID IS OLD.BookingID AND NEW.Cost IS OLD.Cost)
+BEGIN
+    -- MAX(..., 0) keeps an already drifted total from violating the CHECK; reconcile reports it
+    UPDATE Booking
+    SET TotalCost = MAX(ROUND(IFNULL(TotalCost, 0) - IFNULL(OLD.Cost, 0), 2), 0)
+    WHERE BookingID = OLD.BookingID;
+    UPDATE Booking
+    SET TotalCost = ROUND(IFNULL(TotalCost, 0) + IFNULL(NEW.Cost, 0), 2)
+    WHERE BookingID = NEW.BookingID;
+END;
+
+CREATE TRIGGER IF NOT EXISTS BookingAccommodationTotalDelete
+AFTER DELETE ON BookingAccommodation
+FOR EACH ROW WHEN NOT EXISTS (SELECT 1 FROM BookingTotalsDeferred)
+BEGIN
+    UPDATE Booking
+    SET TotalCost = MAX(ROUND(IFNULL(TotalCost, 0) - IFNULL(OLD.Cost, 0), 2), 0)
+    WHERE BookingID = OLD.BookingID;
+END;
+
+CREATE TRIGGER IF NOT EXISTS BookingTransportationTotalInsert
+AFTER INSERT ON BookingTransportation
+FOR EACH ROW WHEN NOT EXISTS (SELECT 1 FROM BookingTotalsDeferred)
+BEGIN
+    UPDATE Booking
+    SET TotalCost = ROUND(IFNULL(TotalCost, 0) + IFNULL(NEW.Cost, 0), 2)
+    WHERE BookingID = NEW.BookingID;
+END;
+
+CREATE TRIGGER IF NOT EXISTS BookingTransportationTotalUpdate
+AFTER UPDATE ON BookingTransportation
+FOR EACH ROW WHEN NOT EXISTS (SELECT 1 FROM BookingTotalsDeferred)
+    AND NOT (NEW.BookingID IS OLD.BookingID AND NEW.Cost IS OLD.Cost)
+BEGIN
+    UPDATE Booking
+    SET TotalCost = MAX(ROUND(IFNULL(TotalCost, 0) - IFNULL(OLD.Cost, 0), 2), 0)
+    WHERE BookingID = OLD.BookingID;
+    UPDATE Booking
+    SET TotalCost = ROUND(IFNULL(TotalCost, 0) + IFNULL(NEW.Cost, 0), 2)
+    WHERE BookingID = NEW.BookingID;
+END;
+
+CREATE TRIGGER IF NOT EXISTS BookingTransportationTotalDelete
+AFTER DELETE ON BookingTransportation
+FOR EACH ROW WHEN NOT EXISTS (SELECT 1 FROM BookingTotalsDeferred)
+BEGIN
+    UPDATE Booking
+    SET TotalCost = MAX(ROUND(IFNULL(TotalCost, 0) - IFNULL(OLD.Cost, 0), 2), 0)
+    WHERE BookingID = OLD.BookingID;
+END;
+
+-- Management tree as a closure table, maintained by triggers as in the MySQL schema.
+-- Databases that already have employees are filled once, when the table is first
+-- created; bulk loaders rebuild it after inserting employees (generate_data.py).
+CREATE TABLE IF NOT EXISTS EmployeeClosure (
+    AncestorID INT NOT NULL,
+    DescendantID INT NOT NULL,
+    Depth INT NOT NULL,
+    PRIMARY KEY (AncestorID, DescendantID)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_closure_depth ON EmployeeClosure(AncestorID, Depth);
+CREATE INDEX IF NOT EXISTS idx_closure_descendant ON EmployeeClosure(DescendantID, Depth);
+
+-- The depth bound stops a SupervisorID cycle from recursing forever; python -m src.hierarchy check reports it
+INSERT OR IGNORE INTO EmployeeClosure (AncestorID, DescendantID, Depth)
+WITH RECURSIVE paths (AncestorID, DescendantID, Depth) AS (
+    SELECT EmployeeID, EmployeeID, 0 FROM Employee
+    WHERE NOT EXISTS (SELECT 1 FROM EmployeeClosure)
+    UNION ALL
+    SELECT paths.AncestorID, e.EmployeeID, paths.Depth + 1 FROM paths JOIN Employee e ON e.SupervisorID = paths.DescendantID
+    WHERE paths.Depth < 1000
+)
+SELECT AncestorID, DescendantID, Depth FROM paths;
+
+CREATE TRIGGER IF NOT EXISTS EmployeeClosureInsert
+AFTER INSERT ON Employee
+FOR EACH ROW
+BEGIN
+    INSERT INTO EmployeeClosure (AncestorID, DescendantID, Depth)
+    SELECT AncestorID, NEW.EmployeeID, Depth + 1 FROM EmployeeClosure WHERE DescendantID = NEW.SupervisorID
+    UNION ALL
+    SELECT NEW.EmployeeID, NEW.EmployeeID, 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS EmployeeClosureCycleCheck
+BEFORE UPDATE OF SupervisorID ON Employee
+FOR EACH ROW WHEN NEW.SupervisorID IS NOT NULL AND NEW.SupervisorID IS NOT OLD.SupervisorID
+    AND EXISTS (SELECT 1 FROM EmployeeClosure WHERE AncestorID = NEW.EmployeeID AND DescendantID = NEW.SupervisorID)
+BEGIN
+    SELECT RAISE(ABORT, 'An employee cannot report to a member of their own team');
+END;
+
+CREATE TRIGGER IF NOT EXISTS EmployeeClosureMove
+AFTER UPDATE OF SupervisorID ON Employee
+FOR EACH ROW WHEN NEW.SupervisorID IS NOT OLD.SupervisorID
+BEGIN
+    DELETE FROM EmployeeClosure
+    WHERE DescendantID IN (SELECT DescendantID FROM EmployeeClosure WHERE AncestorID = NEW.EmployeeID)
+      AND AncestorID IN (SELECT AncestorID FROM EmployeeClosure WHERE DescendantID = NEW.EmployeeID AND Depth > 0);
+    INSERT INTO EmployeeClosure (AncestorID, DescendantID, Depth)
+    SELECT above.AncestorID, team.DescendantID, above.Depth + team.Depth + 1
+    FROM EmployeeClosure above
+    JOIN EmployeeClosure team ON team.AncestorID = NEW.EmployeeID
+    WHERE above.DescendantID = NEW.SupervisorID;
+END;
+
+CREATE TRIGGER IF NOT EXISTS EmployeeClosureDelete
+BEFORE DELETE ON Employee
+FOR EACH ROW
+BEGIN
+    DELETE FROM EmployeeClosure
+    WHERE DescendantID IN (SELECT DescendantID FROM EmployeeClosure WHERE AncestorID = OLD.EmployeeID)
+      AND AncestorID IN (SELECT AncestorID FROM EmployeeClosure WHERE DescendantID = OLD.EmployeeID);
+END;
@@ -0,0 +1,80 @@
+-- Calendar dimension behind the monthly and quarterly reports (src/period_reports.py)
+-- File: date_dimension.sql
+--
+-- Apply after create_schema_mysql.sql; every statement can be re-run. DimDate holds one
+-- row per day from 1990 to 2050 with its month, quarter and weekday. The reports look a
+-- period's [first day, day after) range up here, read Booking with a range on
+-- BookingDate and group through DimDate.DateKey = DATE(BookingDate), so only the
+-- bookings in the period are read. Databases created before create_schema_mysql.sql
+-- had the covering Booking index and the range-based GenerateMonthlyReport get both
+-- here as well. SQLite gets all of it from create_schema_sqlite.sql.
+
+USE travel_agency_db;
+
+CREATE TABLE IF NOT EXISTS DimDate (
+    DateKey DATE PRIMARY KEY,
+    NextDate DATE NOT NULL,
+    Year SMALLINT NOT NULL,
+    Quarter TINYINT NOT NULL,
+    Month TINYINT NOT NULL,
+    MonthName VARCHAR(9) NOT NULL,
+    DayOfMonth TINYINT NOT NULL,
+    DayOfWeek TINYINT NOT NULL, -- 1 = Monday ... 7 = Sunday
+    DayName VARCHAR(9) NOT NULL,
+    IsWeekend BOOLEAN NOT NULL,
+    INDEX idx_dimdate_month (Year, Month),
+    INDEX idx_dimdate_quarter (Year, Quarter)
+);
+
+-- To extend the calendar, re-run this with other bounds
+SET SESSION cte_max_recursion_depth = 100000;
+INSERT IGNORE INTO DimDate (DateKey, NextDate, Year, Quarter, Month, MonthName, DayOfMonth, DayOfWeek, DayName, IsWeekend)
+WITH RECURSIVE days (d) AS (
+    SELECT DATE('1990-01-01')
+    UNION ALL
+    SELECT d + INTERVAL 1 DAY FROM days WHERE d < '2050-12-31'
+)
+SELECT d, d + INTERVAL 1 DAY, YEAR(d), QUARTER(d), MONTH(d), MONTHNAME(d), DAYOFMONTH(d),
+       WEEKDAY(d) + 1, DAYNAME(d), WEEKDAY(d) >= 5
+FROM days;
+
+-- Covering index for the period reports. It starts with BookingDate, so it replaces
+-- idx_booking_date on databases that still have that one.
+SET @ddl = IF(
+    (SELECT COUNT(*) FROM information_schema.STATISTICS
+     WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Booking'
+       AND INDEX_NAME = 'idx_booking_date_purpose_cost') > 0,
+    'DO 0',
+    IF((SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Booking' AND INDEX_NAME = 'idx_booking_date') > 0,
+       'ALTER TABLE Booking ADD INDEX idx_booking_date_purpose_cost (BookingDate, Purpose, TotalCost), DROP INDEX idx_booking_date',
+       'ALTER TABLE Booking ADD INDEX idx_booking_date_purpose_cost (BookingDate, Purpose, TotalCost)'));
+PREPARE add_booking_index FROM @ddl;
+EXECUTE add_booking_index;
+DEALLOCATE PREPARE add_booking_index;
+
+-- The monthly report as a BookingDate range (same body as in create_schema_mysql.sql)
+DROP PROCEDURE IF EXISTS GenerateMonthlyReport;
+DELIMITER //
+CREATE PROCEDURE GenerateMonthlyReport(IN year INT, IN month INT)
+BEGIN
+    SELECT
+        b.BookingID,
+        b.GroupName,
+        b.BookingDate,
+        b.TotalCost,
+        p.Name AS PrimaryPassenger,
+        e.Name AS AgentName
+    FROM Booking b
+    JOIN (
+        SELECT bp.BookingID, p.Name
+        FROM BookingPassenger bp
+        JOIN Passenger p ON bp.PassengerID = p.PassengerID
+        WHERE bp.IsPrimary = TRUE
+    ) p ON b.BookingID = p.BookingID
+    LEFT JOIN Employee e ON b.EmployeeID = e.EmployeeID
+    WHERE b.BookingDate >= MAKEDATE(year, 1) + INTERVAL (month - 1) MONTH
+      AND b.BookingDate < MAKEDATE(year, 1) + INTERVAL month MONTH
+    ORDER BY b.TotalCost DESC;
+END //
+DELIMITER ;
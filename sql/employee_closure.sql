@@ -0,0 +1,116 @@
+-- Employee hierarchy closure table behind /team_performance (src/hierarchy.py)
+-- File: employee_closure.sql
+--
+-- For databases created before create_schema_mysql.sql had it; every statement can be
+-- re-run. Creates EmployeeClosure with its triggers and RebuildEmployeeClosure, adds
+-- the covering Booking (EmployeeID, TotalCost) index and fills the closure from the
+-- current Employee.SupervisorID tree. SQLite gets all of it from create_schema_sqlite.sql.
+
+USE travel_agency_db;
+
+-- Management tree as a closure table: one row per (ancestor, descendant) pair of the
+-- Employee.SupervisorID tree, each employee included as its own ancestor at depth 0.
+-- A whole team (everyone under a manager, at any depth) is then the rows of one
+-- AncestorID, and team rollups are a single indexed join instead of a recursive walk.
+-- The triggers keep it current on inserts, supervisor changes and deletes; bulk
+-- loaders that insert employees before their supervisors call RebuildEmployeeClosure
+-- once at the end. Reporting to someone in one's own team is rejected.
+CREATE TABLE IF NOT EXISTS EmployeeClosure (
+    AncestorID INT NOT NULL,
+    DescendantID INT NOT NULL,
+    Depth INT NOT NULL,
+    PRIMARY KEY (AncestorID, DescendantID),
+    INDEX idx_closure_depth (AncestorID, Depth),
+    INDEX idx_closure_descendant (DescendantID, Depth)
+);
+
+DROP TRIGGER IF EXISTS EmployeeClosureInsert;
+DROP TRIGGER IF EXISTS EmployeeClosureCycleCheck;
+DROP TRIGGER IF EXISTS EmployeeClosureMove;
+DROP TRIGGER IF EXISTS EmployeeClosureDelete;
+DROP PROCEDURE IF EXISTS RebuildEmployeeClosure;
+
+DELIMITER //
+CREATE TRIGGER EmployeeClosureInsert
+AFTER INSERT ON Employee
+FOR EACH ROW
+BEGIN
+    INSERT INTO EmployeeClosure (AncestorID, DescendantID, Depth)
+    SELECT AncestorID, NEW.EmployeeID, Depth + 1 FROM EmployeeClosure WHERE DescendantID = NEW.SupervisorID
+    UNION ALL
+    SELECT NEW.EmployeeID, NEW.EmployeeID, 0;
+END //
+
+CREATE TRIGGER EmployeeClosureCycleCheck
+BEFORE UPDATE ON Employee
+FOR EACH ROW
+BEGIN
+    IF NEW.SupervisorID IS NOT NULL AND NOT (NEW.SupervisorID <=> OLD.SupervisorID)
+       AND EXISTS (SELECT 1 FROM EmployeeClosure
+                   WHERE AncestorID = NEW.EmployeeID AND DescendantID = NEW.SupervisorID) THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'An employee cannot report to a member of their own team';
+    END IF;
+END //
+
+-- Moving an employee moves their whole team: the paths from their old ancestors into
+-- the team are removed, and every new ancestor is linked to every team member.
+CREATE TRIGGER EmployeeClosureMove
+AFTER UPDATE ON Employee
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.SupervisorID <=> OLD.SupervisorID) THEN
+        DELETE link FROM EmployeeClosure link
+        JOIN EmployeeClosure team ON team.DescendantID = link.DescendantID AND team.AncestorID = NEW.EmployeeID
+        JOIN EmployeeClosure above ON above.AncestorID = link.AncestorID AND above.DescendantID = NEW.EmployeeID
+        WHERE above.Depth > 0;
+        INSERT INTO EmployeeClosure (AncestorID, DescendantID, Depth)
+        SELECT above.AncestorID, team.DescendantID, above.Depth + team.Depth + 1
+        FROM EmployeeClosure above
+        JOIN EmployeeClosure team ON team.AncestorID = NEW.EmployeeID
+        WHERE above.DescendantID = NEW.SupervisorID;
+    END IF;
+END //
+
+-- ON DELETE SET NULL does not fire triggers, so the deleted employee's reports are
+-- detached here: every path through them goes, and their reports become roots.
+CREATE TRIGGER EmployeeClosureDelete
+BEFORE DELETE ON Employee
+FOR EACH ROW
+BEGIN
+    DELETE link FROM EmployeeClosure link
+    JOIN EmployeeClosure team ON team.DescendantID = link.DescendantID AND team.AncestorID = OLD.EmployeeID
+    JOIN EmployeeClosure above ON above.AncestorID = link.AncestorID AND above.DescendantID = OLD.EmployeeID;
+END //
+
+-- Full rebuild from Employee.SupervisorID
+CREATE PROCEDURE RebuildEmployeeClosure()
+BEGIN
+    DELETE FROM EmployeeClosure;
+    INSERT INTO EmployeeClosure (AncestorID, DescendantID, Depth)
+    WITH RECURSIVE paths (AncestorID, DescendantID, Depth) AS (
+        SELECT EmployeeID, EmployeeID, 0 FROM Employee
+        UNION ALL
+        SELECT paths.AncestorID, e.EmployeeID, paths.Depth + 1
+        FROM paths
+        JOIN Employee e ON e.SupervisorID = paths.DescendantID
+    )
+    SELECT AncestorID, DescendantID, Depth FROM paths;
+END //
+DELIMITER ;
+
+-- Covering index for team revenue. It starts with EmployeeID, so it replaces
+-- idx_booking_employee on databases that still have that one.
+SET @ddl = IF(
+    (SELECT COUNT(*) FROM information_schema.STATISTICS
+     WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Booking'
+       AND INDEX_NAME = 'idx_booking_employee_cost') > 0,
+    'DO 0',
+    IF((SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Booking' AND INDEX_NAME = 'idx_booking_employee') > 0,
+       'ALTER TABLE Booking ADD INDEX idx_booking_employee_cost (EmployeeID, TotalCost), DROP INDEX idx_booking_employee',
+       'ALTER TABLE Booking ADD INDEX idx_booking_employee_cost (EmployeeID, TotalCost)'));
+PREPARE add_booking_index FROM @ddl;
+EXECUTE add_booking_index;
+DEALLOCATE PREPARE add_booking_index;
+
+CALL RebuildEmployeeClosure();
@@ -5,6 +5,8 @@ USE travel_agency_db;
 
 -- Disable foreign key checks temporarily for easier population
 SET FOREIGN_KEY_CHECKS = 0;
+-- Skip the per-row booking total triggers; totals are recalculated once at the end
+SET @defer_booking_totals = 1;
 
 -- 1. Populate Location Table (40 entries)
 INSERT INTO Location (City, State, Country) VALUES
@@ -602,12 +604,8 @@ INSERT INTO Review (BookingID, PassengerID, Rating, Text, ReviewDate) VALUES
 -- Re-enable foreign key checks
 SET FOREIGN_KEY_CHECKS = 1;
 
--- Update booking totals (since they were NULL initially)
-UPDATE Booking b
-JOIN (
-    SELECT ba.BookingID, SUM(ba.Cost) + IFNULL(SUM(bt.Cost), 0) AS Total
-    FROM BookingAccommodation ba
-    LEFT JOIN BookingTransportation bt ON ba.BookingID = bt.BookingID
-    GROUP BY ba.BookingID
-) t ON b.BookingID = t.BookingID
-SET b.TotalCost = t.Total;
\ No newline at end of file
+-- Calculate booking totals once (they were NULL initially), then re-enable the triggers
+CALL RecalculateBookingTotals(NULL);
+-- Employees may have been inserted before their supervisors
+CALL RebuildEmployeeClosure();
+SET @defer_booking_totals = NULL;
@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""Which accommodations are free for a date range, from an in-memory index.
+
+In SQL, "free from X to Y" is an anti-join against every overlapping stay,
+and it gets slower as BookingAccommodation grows. Here each accommodation
+keeps its stays as two parallel arrays: check-in dates in ascending order,
+and the running maximum of check-out dates over that order. A stay overlaps
+[X, Y) when it checks in before Y and checks out after X, so:
+
+    i = bisect_left(check_ins, Y)          # stays checking in before Y
+    free = i == 0 or max_check_out[i - 1] <= X
+
+Every accommodation check is therefore one bisect. Accommodations are also
+listed per location in order of nightly price (Rate less Discount), so the
+cheapest free options in a city come from walking that list until enough free
+ones are found.
+
+Stays of cancelled bookings don't count, and only stays that check out on or
+after the index horizon (``AVAILABILITY_FROM``, default today) are loaded;
+earlier check-ins are refused. The index is built on first use and kept per
+process. A write to one of ``AVAILABILITY_TABLES`` marks it stale; the next
+query re-reads the stays and rebuilds only the accommodations whose stays
+changed. Only writes made by this process are seen that way, so the index is
+also caught up once it is AVAILABILITY_MAX_AGE seconds old: with several
+worker processes, a room booked through another worker is offered as free
+for at most that long.
+"""
+import heapq
+import os
+import threading
+import time
+from bisect import bisect_left
+from datetime import date
+from decimal import Decimal
+
+from src.write_events import subscribe
+
+AVAILABILITY_FROM = os.environ.get("AVAILABILITY_FROM")  # Index horizon (YYYY-MM-DD); default: today
+AVAILABILITY_MAX_AGE = float(os.environ.get("AVAILABILITY_MAX_AGE", 30))  # Seconds before a catch-up without a local write
+DEFAULT_RESULTS = 10  # Options returned per query unless the caller asks otherwise
+MAX_RESULTS = 100  # Most options one query returns
+MAX_BATCH_QUERIES = 100  # Most queries in one batch request
+MAX_NIGHTS = 365
+
+# Tables whose writes can change availability or prices (lower-cased, as write events report them)
+AVAILABILITY_TABLES = {"bookingaccommodation", "booking", "accommodation", "location"}
+
+ACCOMMODATIONS_SQL = """
+    SELECT a.AccommodationID, a.Name, a.Type, a.Rate, a.Discount, a.LocationID, l.City, l.Country
+    FROM Accommodation a
+    JOIN Location l ON a.LocationID = l.LocationID
+"""
+
+STAYS_SQL = """
+    SELECT ba.BookingAccommodationID, ba.AccommodationID, ba.CheckInDate, ba.CheckOutDate
+    FROM BookingAccommodation ba
+    JOIN Booking b ON ba.BookingID = b.BookingID
+    WHERE ba.CheckOutDate >= %s AND (b.Status IS NULL OR b.Status <> 'Cancelled')
+"""
+
+_index = None
+_index_lock = threading.Lock()
+_stale = True
+_generation = 0  # bumped on every invalidation, guards against marking a racing reload as fresh
+_loaded_at = 0.0  # time.monotonic() when the last load started
+
+
+class AvailabilityError(ValueError):
+    """Raised for invalid availability queries (bad dates, unknown city, ...)."""
+
+
+def nightly_price(rate, discount):
+    """Rate less the fractional Discount, to the cent; None when there is no rate."""
+    if rate is None:
+        return None
+    price = Decimal(str(rate)) * (1 - Decimal(str(discount or 0)))
+    return price.quantize(Decimal("0.01"))
+
+
+class AvailabilityIndex:
+    """Stays per accommodation as (sorted check-ins, running max check-out) arrays."""
+
+    def __init__(self, horizon):
+        self.horizon = horizon
+        self.accommodations = {}  # AccommodationID -> dict of its details and nightly price
+        self.by_location = {}     # LocationID -> AccommodationIDs by (nightly price, ID), priced ones only
+        self.cities = {}          # lower-cased City -> LocationIDs
+        self.stays = {}           # BookingAccommodationID -> (AccommodationID, check-in, check-out)
+        self._arrays = {}         # AccommodationID -> (sorted check-ins, running max of check-outs)
+
+    # --- Maintenance ---
+
+    def load_accommodations(self, rows):
+        accommodations, by_location, cities = {}, {}, {}
+        for acc_id, name, acc_type, rate, discount, location_id, city, country in rows:
+            price = nightly_price(rate, discount)
+            accommodations[acc_id] = {"accommodation_id": acc_id, "name": name, "type": acc_type,
+                                      "rate": rate, "discount": discount, "nightly_price": price,
+                                      "location_id": location_id, "city": city, "country": country}
+            if price is not None:
+                by_location.setdefault(location_id, []).append((price, acc_id))
+            if city:
+                cities.setdefault(city.lower(), set()).add(location_id)
+        for priced in by_location.values():
+            priced.sort()
+        # Swapped in whole; queries holding the old maps are unaffected
+        self.accommodations, self.by_location, self.cities = accommodations, by_location, cities
+
+    def apply(self, upserts=(), deletes=()):
+        """Adds or replaces stays and drops deleted ones.
+
+        ``upserts`` are (BookingAccommodationID, AccommodationID, check-in,
+        check-out) tuples, ``deletes`` BookingAccommodationIDs. Only the
+        accommodations they touch are rebuilt.
+        """
+        touched = set()
+        for stay_id in deletes:
+            old = self.stays.pop(stay_id, None)
+            if old is not None:
+                touched.add(old[0])
+        for stay_id, acc_id, check_in, check_out in upserts:
+            old = self.stays.get(stay_id)
+            if old is not None:
+                touched.add(old[0])
+            self.stays[stay_id] = (acc_id, check_in, check_out)
+            touched.add(acc_id)
+        if not touched:
+            return
+        per_accommodation = {acc_id: [] for acc_id in touched}
+        for acc_id, check_in, check_out in self.stays.values():
+            if acc_id in per_accommodation:
+                per_accommodation[acc_id].append((check_in, check_out))
+        for acc_id, stays in per_accommodation.items():
+            self._rebuild(acc_id, stays)
+
+    def _rebuild(self, acc_id, stays):
+        if not stays:
+            self._arrays.pop(acc_id, None)
+            return
+        stays.sort()
+        check_ins, max_check_out = [], []
+        latest = None
+        for check_in, check_out in stays:
+            latest = check_out if latest is None or check_out > latest else latest
+            check_ins.append(check_in)
+            max_check_out.append(latest)
+        # One assignment, so a query never sees the two arrays out of step
+        self._arrays[acc_id] = (check_ins, max_check_out)
+
+    def sync(self, stays):
+        """Makes the stays match ``stays``; returns (added, changed, removed) counts."""
+        seen = set()
+        upserts = []
+        added = 0
+        for stay in stays:
+            stay_id = stay[0]
+            seen.add(stay_id)
+            old = self.stays.get(stay_id)
+            if old != stay[1:]:
+                upserts.append(stay)
+                added += old is None
+        deletes = [stay_id for stay_id in self.stays if stay_id not in seen]
+        self.apply(upserts, deletes)
+        return added, len(upserts) - added, len(deletes)
+
+    def load(self, conn):
+        """Reads accommodations and current stays and syncs the index with them."""
+        cursor = conn.cursor()
+        try:
+            cursor.execute(ACCOMMODATIONS_SQL)
+            self.load_accommodations(cursor.fetchall())
+            cursor.execute(STAYS_SQL, (self.horizon,))
+            return self.sync(tuple(row) for row in cursor)
+        finally:
+            cursor.close()
+
+    # --- Queries ---
+
+    def is_free(self, acc_id, check_in, check_out):
+        arrays = self._arrays.get(acc_id)
+        if arrays is None:
+            return True
+        check_ins, max_check_out = arrays
+        i = bisect_left(check_ins, check_out)
+        return i == 0 or max_check_out[i - 1] <= check_in
+
+    def location_ids(self, city=None, location_id=None):
+        if location_id is not None:
+            return {location_id}
+        return self.cities.get((city or "").strip().lower(), set())
+
+    def cheapest(self, location_ids, check_in, check_out, limit=DEFAULT_RESULTS):
+        """Up to ``limit`` free accommodations in ``location_ids``, cheapest first."""
+        if check_in < self.horizon:
+            raise AvailabilityError(f"check_in must be on or after {self.horizon.isoformat()}")
+        found = []
+        lists = [self.by_location.get(location_id, ()) for location_id in location_ids]
+        for price, acc_id in heapq.merge(*lists):
+            if self.is_free(acc_id, check_in, check_out):
+                found.append(acc_id)
+                if len(found) == limit:
+                    break
+        return found
+
+
+# --- Shared index ---
+
+def index_horizon():
+    if AVAILABILITY_FROM:
+        return date.fromisoformat(AVAILABILITY_FROM)
+    return date.today()
+
+
+def get_availability_index(conn_factory):
+    """Returns the process-wide index, loading or catching it up first when needed.
+
+    ``conn_factory`` is only called when the index is stale. Returns None
+    when no connection could be obtained.
+    """
+    global _index, _stale, _loaded_at
+    if _is_fresh():
+        return _index
+    with _index_lock:
+        if _is_fresh():
+            return _index
+        generation, started_at = _generation, time.monotonic()
+        conn = conn_factory()
+        if conn is None:
+            return None
+        try:
+            index = _index if _index is not None else AvailabilityIndex(index_horizon())
+            started = time.perf_counter()
+            added, changed, removed = index.load(conn)
+            print(f"Availability index: {added} stays added, {changed} changed, {removed} removed "
+                  f"({len(index.stays)} stays) in {time.perf_counter() - started:.3f}s")
+        finally:
+            if conn.is_connected():
+                conn.close()
+        _index, _loaded_at = index, started_at
+        # A write committed during the load leaves the index stale for the next query
+        _stale = generation != _generation
+        return _index
+
+
+def _is_fresh():
+    return _index is not None and not _stale and time.monotonic() - _loaded_at < AVAILABILITY_MAX_AGE
+
+
+@subscribe
+def invalidate_availability(tables, passenger_ids):
+    """Write listener: flags the index for a catch-up when stays or prices may have changed."""
+    global _stale, _generation
+    if tables is not None and not (tables & AVAILABILITY_TABLES):
+        return
+    _generation += 1
+    _stale = True
+
+
+# --- Request helpers ---
+
+def parse_query(index, query):
+    """Validates one {city | location_id, check_in, check_out, limit} query."""
+    try:
+        check_in = date.fromisoformat(str(query.get("check_in", "")))
+        check_out = date.fromisoformat(str(query.get("check_out", "")))
+    except ValueError:
+        raise AvailabilityError("check_in and check_out must be dates (YYYY-MM-DD)")
+    nights = (check_out - check_in).days
+    if not 0 < nights <= MAX_NIGHTS:
+        raise AvailabilityError(f"check_out must be 1 to {MAX_NIGHTS} nights after check_in")
+    try:
+        limit = int(query.get("limit") or DEFAULT_RESULTS)
+    except (TypeError, ValueError):
+        raise AvailabilityError("limit must be a whole number")
+    limit = max(1, min(limit, MAX_RESULTS))
+
+    location_id = query.get("location_id")
+    if location_id not in (None, ""):
+        try:
+            location_ids = index.location_ids(location_id=int(location_id))
+        except (TypeError, ValueError):
+            raise AvailabilityError("location_id must be a whole number")
+    elif query.get("city"):
+        location_ids = index.location_ids(city=query["city"])
+        if not location_ids:
+            raise AvailabilityError(f"No location in a city named {query['city']!r}")
+    else:
+        raise AvailabilityError("Each query needs a city or a location_id")
+    return location_ids, check_in, check_out, nights, limit
+
+
+def run_query(index, query):
+    """Answers one query; returns a JSON-ready dict (with "error" if it was invalid)."""
+    result = {key: query.get(key) for key in ("city", "location_id", "check_in", "check_out") if key in query}
+    try:
+        location_ids, check_in, check_out, nights, limit = parse_query(index, query)
+        options = []
+        for acc_id in index.cheapest(location_ids, check_in, check_out, limit):
+            accommodation = index.accommodations[acc_id]
+            options.append(dict(accommodation,
+                                rate=str(accommodation["rate"]),
+                                discount=str(accommodation["discount"] or 0),
+                                nightly_price=str(accommodation["nightly_price"]),
+                                total_price=str(accommodation["nightly_price"] * nights)))
+        result.update(nights=nights, options=options)
+    except AvailabilityError as e:
+        result["error"] = str(e)
+    return result
+
+
+def search_availability(index, queries):
+    """Answers a batch of queries; invalid ones carry an "error" instead of options."""
+    if not isinstance(queries, list) or not queries:
+        raise AvailabilityError("Expected a non-empty list of queries")
+    if len(queries) > MAX_BATCH_QUERIES:
+        raise AvailabilityError(f"At most {MAX_BATCH_QUERIES} queries per request")
+    if not all(isinstance(query, dict) for query in queries):
+        raise AvailabilityError("Each query must be an object")
+    started = time.perf_counter()
+    results = [run_query(index, query) for query in queries]
+    return {"results": results, "search_ms": round((time.perf_counter() - started) * 1000, 3)}
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""Storage backends behind ``get_mysql_conn()``: a MySQL server, or an embedded SQLite file.
+
+Both hand out pooled connections with the mysql.connector surface the app
+uses, through ``connect(read_only, passenger_id)`` and report pool counters
+through ``stats()``, so the request handlers run unchanged on either:
+
+    * ``MySQLBackend`` wraps the primary/replica router (src/routing.py),
+    * ``SQLiteBackend`` opens one database file through src/sqlite_dialect.py,
+      for branch kiosks, demos and CI benchmarks with no server to run.
+
+SQLite tuning: the file runs in WAL mode, so readers never block the writer
+or each other, with ``synchronous=NORMAL`` (a commit is durable once the WAL
+is checkpointed; a power cut can lose the last transactions but never
+corrupts the file). Pages are read through a ``mmap_size`` memory map and
+``cache_size`` page cache, and each connection keeps ``cached_statements``
+prepared statements. Writes share a single connection, so concurrent writers
+queue in the pool instead of retrying on SQLITE_BUSY; reads get a pool of
+``query_only`` connections of their own. sql/create_schema_sqlite.sql is
+applied when the backend starts; every statement in it is idempotent, so a
+new file gets the whole schema and an older one the views and triggers it
+is missing.
+"""
+import os
+
+from src import sqlite_dialect
+from src.pool import ConnectionPool
+
+SQLITE_SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  "sql", "create_schema_sqlite.sql")
+
+
+class MySQLBackend:
+    """The MySQL primary, with reads spread over any configured replicas."""
+
+    name = "mysql"
+
+    def __init__(self, router):
+        self.router = router
+
+    def connect(self, read_only=False, passenger_id=None):
+        return self.router.connect(read_only, passenger_id)
+
+    def stats(self):
+        stats = self.router.primary.stats()
+        if self.router.replicas:
+            stats["routing"] = self.router.stats()
+        return stats
+
+
+class SQLiteBackend:
+    """One SQLite database file: a single writer connection and a pool of read-only ones."""
+
+    name = "sqlite"
+
+    def __init__(self, path, readers=4, mmap_size=256 * 1024 * 1024, cache_size=-64000,
+                 cached_statements=256, synchronous="NORMAL", busy_timeout=5.0, pool_timeout=10.0):
+        if path == ":memory:":
+            raise ValueError("The SQLite backend needs a database file; each connection to :memory: is a new database")
+        self.path = path
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
+        self.cached_statements = cached_statements
+        self.synchronous = synchronous
+        self.busy_timeout = busy_timeout
+        # WAL has to be switched on before the first reader opens the file
+        self.ensure_schema()
+        self.writer = ConnectionPool(self._open_writer, size=1, max_overflow=0, timeout=pool_timeout,
+                                     recycle=None, pre_ping=False)
+        self.readers = ConnectionPool(self._open_reader, size=readers, max_overflow=readers, timeout=pool_timeout,
+                                      recycle=None, pre_ping=False)
+
+    def connect(self, read_only=False, passenger_id=None):
+        # WAL readers see every committed write, so reads never need to go to the writer
+        return (self.readers if read_only else self.writer).connect()
+
+    def stats(self):
+        stats = self.readers.stats()
+        stats["backend"] = self.name
+        stats["path"] = self.path
+        stats["writer"] = self.writer.stats()
+        return stats
+
+    def open_connection(self, read_only=False):
+        """A new, unpooled, tuned connection to the database file."""
+        conn = sqlite_dialect.connect(self.path, cached_statements=self.cached_statements,
+                                      timeout=self.busy_timeout)
+        pragmas = [
+            "PRAGMA journal_mode = WAL",
+            f"PRAGMA synchronous = {self.synchronous}",
+            f"PRAGMA mmap_size = {int(self.mmap_size)}",
+            f"PRAGMA cache_size = {int(self.cache_size)}",
+            "PRAGMA temp_store = MEMORY",
+        ]
+        if read_only:
+            pragmas.append("PRAGMA query_only = ON")
+        conn.executescript(";\n".join(pragmas) + ";")
+        return conn
+
+    def ensure_schema(self):
+        """Creates whatever tables, indexes, views and triggers the database file does not have yet."""
+        conn = self.open_connection()
+        try:
+            with open(SQLITE_SCHEMA_PATH, "r") as f:
+                conn.executescript(f.read())
+        finally:
+            conn.close()
+
+    def _open_writer(self):
+        return self.open_connection()
+
+    def _open_reader(self):
+        return self.open_connection(read_only=True)
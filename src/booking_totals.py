@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""Keeps Booking.TotalCost equal to the sum of its accommodation and transport legs.
+
+Single-row changes are handled by the delta triggers in
+sql/create_schema_mysql.sql. Adding many legs at once goes through
+``add_legs_batch()`` instead: it switches the triggers off for the session via
+``@defer_booking_totals``, inserts every leg with executemany and then
+recomputes each affected booking exactly once.
+
+``reconcile()`` compares every stored total against the component sums and
+optionally repairs the bookings that drifted. From the command line:
+
+    python -m src.booking_totals reconcile           # report drift
+    python -m src.booking_totals reconcile --fix     # ...and recompute those bookings
+"""
+import argparse
+import sys
+
+ACCOMMODATION_INSERT_SQL = """
+    INSERT INTO BookingAccommodation (BookingID, AccommodationID, CheckInDate, CheckOutDate, Cost)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+TRANSPORTATION_INSERT_SQL = """
+    INSERT INTO BookingTransportation (BookingID, TransportTypeID, FlightID, CarRentalID, CruiseID, Cost)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+# Per-booking component sums joined onto Booking b; {where} restricts the legs summed
+_SUMS_JOIN = """
+    LEFT JOIN (
+        SELECT BookingID, SUM(Cost) AS Total FROM BookingAccommodation {where} GROUP BY BookingID
+    ) acc ON b.BookingID = acc.BookingID
+    LEFT JOIN (
+        SELECT BookingID, SUM(Cost) AS Total FROM BookingTransportation {where} GROUP BY BookingID
+    ) trans ON b.BookingID = trans.BookingID
+"""
+
+# No legs -> NULL total, matching the RecalculateBookingTotals procedure
+_EXPECTED = """CASE WHEN acc.BookingID IS NULL AND trans.BookingID IS NULL THEN NULL
+                    ELSE IFNULL(acc.Total, 0) + IFNULL(trans.Total, 0) END"""
+
+DRIFT_SQL = f"""
+    SELECT b.BookingID, b.TotalCost, {_EXPECTED} AS Expected
+    FROM Booking b {_SUMS_JOIN.format(where="")}
+    WHERE IFNULL(b.TotalCost, 0) <> IFNULL(acc.Total, 0) + IFNULL(trans.Total, 0)
+    ORDER BY b.BookingID
+"""
+
+RECOMPUTE_SQL = """
+    UPDATE Booking b {joins}
+    SET b.TotalCost = {expected}
+    WHERE b.BookingID IN ({ids})
+"""
+
+RECOMPUTE_BATCH = 1000  # booking IDs per recompute statement
+
+
+def recompute_totals(conn, booking_ids):
+    """Recalculates TotalCost of the given bookings from their legs, one statement per batch.
+
+    Does not commit. Returns the number of bookings whose total changed.
+    """
+    booking_ids = sorted(set(booking_ids))
+    changed = 0
+    cursor = conn.cursor()
+    try:
+        for i in range(0, len(booking_ids), RECOMPUTE_BATCH):
+            batch = booking_ids[i:i + RECOMPUTE_BATCH]
+            ids = ", ".join(["%s"] * len(batch))
+            sql = RECOMPUTE_SQL.format(joins=_SUMS_JOIN.format(where=f"WHERE BookingID IN ({ids})"),
+                                       expected=_EXPECTED, ids=ids)
+            cursor.execute(sql, tuple(batch) * 3)  # both sums and the outer WHERE
+            changed += cursor.rowcount
+    finally:
+        cursor.close()
+    return changed
+
+
+def add_legs_batch(conn, accommodations=(), transportations=()):
+    """Inserts many booking legs and recomputes each affected booking once.
+
+    ``accommodations`` rows are (BookingID, AccommodationID, CheckInDate,
+    CheckOutDate, Cost); ``transportations`` rows are (BookingID,
+    TransportTypeID, FlightID, CarRentalID, CruiseID, Cost). The per-row
+    triggers are deferred while the legs go in. Does not commit; returns the
+    set of BookingIDs whose totals were recomputed.
+    """
+    accommodations = list(accommodations)
+    transportations = list(transportations)
+    booking_ids = {row[0] for row in accommodations} | {row[0] for row in transportations}
+    if not booking_ids:
+        return booking_ids
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SET @defer_booking_totals = 1")
+        if accommodations:
+            cursor.executemany(ACCOMMODATION_INSERT_SQL, accommodations)
+        if transportations:
+            cursor.executemany(TRANSPORTATION_INSERT_SQL, transportations)
+        recompute_totals(conn, booking_ids)
+    finally:
+        # Pooled connections are reused, so never hand one back with the triggers off
+        cursor.execute("SET @defer_booking_totals = NULL")
+        cursor.close()
+    return booking_ids
+
+
+def find_drift(conn):
+    """Returns (BookingID, TotalCost, Expected) for every booking whose total is off."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(DRIFT_SQL)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def reconcile(conn, fix=False):
+    """Reports bookings whose TotalCost differs from their legs; with ``fix``, repairs and commits."""
+    drift = find_drift(conn)
+    if fix and drift:
+        recompute_totals(conn, [row[0] for row in drift])
+        conn.commit()
+    return drift
+
+
+def main(argv=None):
+    from src.database import create_connection
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    reconcile_parser = subcommands.add_parser("reconcile", help="compare Booking.TotalCost with the component sums")
+    reconcile_parser.add_argument("--fix", action="store_true", help="recompute the totals that drifted")
+    reconcile_parser.add_argument("--show", type=int, default=20, help="drifted bookings to list (0 = all)")
+    args = parser.parse_args(argv)
+
+    conn = create_connection()
+    try:
+        drift = reconcile(conn, fix=args.fix)
+    finally:
+        conn.close()
+
+    if not drift:
+        print("All booking totals match their accommodation and transportation costs.")
+        return 0
+    print(f"{len(drift)} booking(s) with a drifted TotalCost:")
+    print(f"{'BookingID':>10} {'TotalCost':>14} {'Expected':>14} {'Difference':>14}")
+    for booking_id, total, expected in drift[:args.show or None]:
+        difference = (total or 0) - (expected or 0)
+        print(f"{booking_id:>10} {str(total):>14} {str(expected):>14} {difference:>14.2f}")
+    if args.fix:
+        print(f"Recomputed {len(drift)} booking total(s).")
+        return 0
+    return 1  # non-zero so scheduled checks can alert on drift
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,452 @@
+# -*- coding: utf-8 -*-
+"""Creates many bookings, with their passengers, legs and payments, in one transaction.
+
+A batch is a list of booking objects:
+
+    {"group_name": "...", "purpose": "Business", "employee_id": 3, "status": "Confirmed",
+     "passengers": [{"email": "a@example.com", "name": "Ann", "primary": true}, {"passenger_id": 12}],
+     "accommodations": [{"accommodation_id": 4, "check_in": "2025-06-01", "check_out": "2025-06-05"}],
+     "transportations": [{"flight_id": 7}, {"car_rental_id": 2, "cost": "120.00"}],
+     "payments": [{"amount": "950.00", "payment_type": "Credit Card", "card_last_four": "4242"}]}
+
+``create_bookings()`` works in three steps, so the number of round trips
+depends on the number of tables rather than the number of rows:
+
+    1. every item is validated in Python, and every referenced row
+       (employees, passengers, accommodations, flights, ...) is looked up
+       with one IN query per table; problems are reported per item,
+    2. passengers given by email that don't exist yet are inserted with one
+       multi-row INSERT and their IDs read back in one query,
+    3. bookings, then BookingPassenger, the legs (``add_legs_batch``, which
+       recomputes each TotalCost once) and payments are inserted with
+       executemany, and the whole batch is committed at once.
+
+Booking rows are inserted one statement each: their generated IDs are
+needed, and a multi-row INSERT only reports the first. Leg costs default to
+the catalog price (Rate less Discount per night, Fare or Rent).
+"""
+import os
+import re
+import time
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from src.booking_totals import add_legs_batch
+from src.passenger_import import PassengerError, validate_passenger
+
+MAX_BATCH_BOOKINGS = int(os.environ.get("BOOKING_BATCH_MAX", 500))  # Bookings accepted per request
+LOOKUP_BATCH = 1000  # IDs per IN (...) lookup
+
+PURPOSES = {"Leisure", "Business", "Family", "Honeymoon", "Adventure", "Other"}
+STATUSES = {"Pending", "Confirmed", "Cancelled", "Completed"}
+PAYMENT_TYPES = {"Credit Card", "Debit Card", "Bank Transfer", "Cash", "Other"}
+
+# Transport leg key -> (TransportationType.Name, catalog table, ID column, price column)
+TRANSPORT_KINDS = {
+    "flight_id": ("Flight", "Flight", "FlightID", "Fare"),
+    "car_rental_id": ("Car Rental", "CarRental", "CarRentalID", "Rent"),
+    "cruise_id": ("Cruise", "Cruise", "CruiseID", "Fare"),
+}
+
+# Tables a batch writes to (for notify_write)
+BOOKING_TABLES = {"Passenger", "Booking", "BookingPassenger", "BookingAccommodation",
+                  "BookingTransportation", "Payment"}
+
+BOOKING_INSERT_SQL = """
+    INSERT INTO Booking (GroupName, Purpose, EmployeeID, Status) VALUES (%s, %s, %s, %s)
+"""
+
+PASSENGER_INSERT_SQL = """
+    INSERT INTO Passenger (Name, Gender, Age, Email, Phone) VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE PassengerID = PassengerID
+"""
+
+BOOKING_PASSENGER_INSERT_SQL = """
+    INSERT INTO BookingPassenger (BookingID, PassengerID, IsPrimary) VALUES (%s, %s, %s)
+"""
+
+PAYMENT_INSERT_SQL = """
+    INSERT INTO Payment (BookingID, Amount, PaymentType, CardLastFour, ExpiryDate) VALUES (%s, %s, %s, %s, %s)
+"""
+
+_EXPIRY_RE = re.compile(r"^(0[1-9]|1[0-2])/\d{4}$")
+
+
+class BookingBatchError(ValueError):
+    """Raised when a batch as a whole is malformed (not a list, too large, ...)."""
+
+
+# --- Validation ---
+
+def _text(value, field, errors, required=False, max_length=255):
+    if value is None or (isinstance(value, str) and not value.strip()):
+        if required:
+            errors.append(f"{field} is required")
+        return None
+    value = str(value).strip()
+    if len(value) > max_length:
+        errors.append(f"{field} must be at most {max_length} characters")
+    return value
+
+
+def _choice(value, field, choices, errors):
+    if value in (None, ""):
+        return None
+    if value not in choices:
+        errors.append(f"{field} must be one of {', '.join(sorted(choices))}")
+        return None
+    return value
+
+
+def _whole(value, field, errors, required=False):
+    if value in (None, ""):
+        if required:
+            errors.append(f"{field} is required")
+        return None
+    if isinstance(value, bool):
+        errors.append(f"{field} must be a whole number")
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        errors.append(f"{field} must be a whole number")
+        return None
+
+
+def _money(value, field, errors, required=False, positive=False):
+    if value in (None, ""):
+        if required:
+            errors.append(f"{field} is required")
+        return None
+    try:
+        amount = Decimal(str(value)).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        errors.append(f"{field} must be an amount")
+        return None
+    if amount < 0 or (positive and amount == 0):
+        errors.append(f"{field} must be {'greater than' if positive else 'at least'} 0")
+        return None
+    return amount
+
+
+def _date(value, field, errors):
+    try:
+        return date.fromisoformat(str(value))
+    except (TypeError, ValueError):
+        errors.append(f"{field} must be a date (YYYY-MM-DD)")
+        return None
+
+
+def _passenger(data, errors):
+    """A passenger reference: {"passenger_id"} or {"email", "name", ...} (same rules as add_passenger)."""
+    passenger_id = _whole(data.get("passenger_id"), "passenger_id", errors)
+    if passenger_id is not None:
+        return {"passenger_id": passenger_id, "primary": bool(data.get("primary"))}
+    if not data.get("email"):
+        errors.append("each passenger needs a passenger_id or an email")
+        return None
+    try:
+        # The name may be left out for passengers that already exist
+        name, gender, age, email, phone = validate_passenger(
+            data.get("name"), data.get("gender"), data.get("age"), str(data["email"]), data.get("phone"),
+            require_name=False)
+    except PassengerError as e:
+        errors.append(str(e))
+        return None
+    return {"email": email.lower(), "name": name, "gender": gender, "age": age, "phone": phone,
+            "primary": bool(data.get("primary"))}
+
+
+def _list(item, key, errors):
+    value = item.get(key) or []
+    if not isinstance(value, list) or not all(isinstance(entry, dict) for entry in value):
+        errors.append(f"{key} must be a list of objects")
+        return []
+    return value
+
+
+def validate_booking(item):
+    """Checks one booking object; returns (booking, errors) with values parsed."""
+    errors = []
+    if not isinstance(item, dict):
+        return None, ["each booking must be an object"]
+    booking = {
+        "group_name": _text(item.get("group_name"), "group_name", errors),
+        "purpose": _choice(item.get("purpose"), "purpose", PURPOSES, errors),
+        "employee_id": _whole(item.get("employee_id"), "employee_id", errors),
+        "status": _choice(item.get("status"), "status", STATUSES, errors) or "Pending",
+        "passengers": [], "accommodations": [], "transportations": [], "payments": [],
+    }
+
+    for data in _list(item, "passengers", errors):
+        passenger = _passenger(data, errors)
+        if passenger is not None:
+            booking["passengers"].append(passenger)
+    if not booking["passengers"] and not errors:
+        errors.append("a booking needs at least one passenger")
+    keys = [p.get("passenger_id") or p.get("email") for p in booking["passengers"]]
+    if len(set(keys)) != len(keys):
+        errors.append("a passenger is listed twice")
+    if sum(p["primary"] for p in booking["passengers"]) > 1:
+        errors.append("only one passenger can be primary")
+
+    for data in _list(item, "accommodations", errors):
+        check_in = _date(data.get("check_in"), "check_in", errors)
+        check_out = _date(data.get("check_out"), "check_out", errors)
+        if check_in and check_out and check_out <= check_in:
+            errors.append("check_out must be after check_in")
+        booking["accommodations"].append({
+            "accommodation_id": _whole(data.get("accommodation_id"), "accommodation_id", errors, required=True),
+            "check_in": check_in, "check_out": check_out,
+            "cost": _money(data.get("cost"), "cost", errors)})
+
+    for data in _list(item, "transportations", errors):
+        kinds = [key for key in TRANSPORT_KINDS if data.get(key) not in (None, "")]
+        if len(kinds) != 1:
+            errors.append(f"each transportation needs exactly one of {', '.join(TRANSPORT_KINDS)}")
+            continue
+        booking["transportations"].append({
+            "kind": kinds[0], "id": _whole(data.get(kinds[0]), kinds[0], errors),
+            "cost": _money(data.get("cost"), "cost", errors)})
+
+    for data in _list(item, "payments", errors):
+        card = _text(data.get("card_last_four"), "card_last_four", errors)
+        if card is not None and not (len(card) == 4 and card.isdigit()):
+            errors.append("card_last_four must be 4 digits")
+        expiry = _text(data.get("expiry_date"), "expiry_date", errors)
+        if expiry is not None and not _EXPIRY_RE.match(expiry):
+            errors.append("expiry_date must be MM/YYYY")
+        booking["payments"].append({
+            "amount": _money(data.get("amount"), "amount", errors, required=True, positive=True),
+            "payment_type": _choice(data.get("payment_type"), "payment_type", PAYMENT_TYPES, errors),
+            "card_last_four": card, "expiry_date": expiry})
+    return booking, errors
+
+
+# --- Lookups ---
+
+def _lookup(cursor, sql, ids):
+    """Runs ``sql`` (with an {ids} placeholder list) over ``ids`` in batches; returns {first column: row}."""
+    ids = sorted(set(ids))
+    found = {}
+    for i in range(0, len(ids), LOOKUP_BATCH):
+        batch = ids[i:i + LOOKUP_BATCH]
+        cursor.execute(sql.format(ids=", ".join(["%s"] * len(batch))), tuple(batch))
+        for row in cursor.fetchall():
+            found[row[0]] = row
+    return found
+
+
+def _emails(cursor, emails):
+    """Lower-cased Email -> PassengerID for the passengers that exist."""
+    # A bare column keeps the UNIQUE index on Email usable; its utf8mb4_unicode_ci collation
+    # already compares case-insensitively
+    rows = _lookup(cursor, "SELECT Email, PassengerID FROM Passenger WHERE Email IN ({ids})", emails)
+    return {email.lower(): row[1] for email, row in rows.items()}
+
+
+def _references(cursor, bookings):
+    """Looks up every row the valid bookings point at, one query per table."""
+    wanted = {"employee": set(), "passenger": set(), "email": set(), "accommodation": set(),
+              **{kind: set() for kind in TRANSPORT_KINDS}}
+    for booking in bookings:
+        if booking["employee_id"] is not None:
+            wanted["employee"].add(booking["employee_id"])
+        wanted["passenger"].update(p["passenger_id"] for p in booking["passengers"] if "passenger_id" in p)
+        wanted["email"].update(p["email"] for p in booking["passengers"] if "email" in p)
+        wanted["accommodation"].update(a["accommodation_id"] for a in booking["accommodations"])
+        for leg in booking["transportations"]:
+            wanted[leg["kind"]].add(leg["id"])
+
+    found = {
+        "employee": _lookup(cursor, "SELECT EmployeeID FROM Employee WHERE EmployeeID IN ({ids})",
+                            wanted["employee"]),
+        "passenger": _lookup(cursor, "SELECT PassengerID FROM Passenger WHERE PassengerID IN ({ids})",
+                             wanted["passenger"]),
+        "email": _emails(cursor, wanted["email"]),
+        "accommodation": _lookup(cursor, "SELECT AccommodationID, Rate, Discount FROM Accommodation "
+                                         "WHERE AccommodationID IN ({ids})", wanted["accommodation"]),
+    }
+    for kind, (_, table, id_column, price_column) in TRANSPORT_KINDS.items():
+        found[kind] = _lookup(cursor, f"SELECT {id_column}, {price_column} FROM {table} "
+                                      f"WHERE {id_column} IN ({{ids}})", wanted[kind])
+    cursor.execute("SELECT Name, TransportTypeID FROM TransportationType")
+    found["transport_type"] = dict(cursor.fetchall())
+    return found
+
+
+def _check_references(booking, found):
+    """Fills in default costs; returns the errors for rows that don't exist."""
+    errors = []
+    if booking["employee_id"] is not None and booking["employee_id"] not in found["employee"]:
+        errors.append(f"employee {booking['employee_id']} does not exist")
+    for passenger in booking["passengers"]:
+        if "passenger_id" in passenger and passenger["passenger_id"] not in found["passenger"]:
+            errors.append(f"passenger {passenger['passenger_id']} does not exist")
+    for stay in booking["accommodations"]:
+        row = found["accommodation"].get(stay["accommodation_id"])
+        if row is None:
+            errors.append(f"accommodation {stay['accommodation_id']} does not exist")
+        elif stay["cost"] is None:
+            if row[1] is None:
+                errors.append(f"accommodation {stay['accommodation_id']} has no rate; give a cost")
+                continue
+            nightly = Decimal(str(row[1])) * (1 - Decimal(str(row[2] or 0)))
+            nights = (stay["check_out"] - stay["check_in"]).days
+            stay["cost"] = (nightly * nights).quantize(Decimal("0.01"))
+    for leg in booking["transportations"]:
+        type_name = TRANSPORT_KINDS[leg["kind"]][0]
+        row = found[leg["kind"]].get(leg["id"])
+        if row is None:
+            errors.append(f"{leg['kind'][:-3].replace('_', ' ')} {leg['id']} does not exist")
+        elif type_name not in found["transport_type"]:
+            errors.append(f"transportation type {type_name!r} is missing")
+        elif leg["cost"] is None:
+            leg["cost"] = Decimal(str(row[1]))
+    return errors
+
+
+def _unnamed_passengers(bookings, known):
+    """Errors for bookings with a new passenger whose name no booking in the batch gives.
+
+    Dropping such a booking can take away the only name for another new
+    passenger, so this repeats until nothing changes. Returns {index: errors}.
+    """
+    errors = {}
+    while True:
+        named = {p["email"] for index, booking in bookings if index not in errors
+                 for p in booking["passengers"] if "email" in p and p["name"]}
+        found_more = False
+        for index, booking in bookings:
+            if index in errors:
+                continue
+            unnamed = [p["email"] for p in booking["passengers"]
+                       if "email" in p and p["email"] not in known and p["email"] not in named]
+            if unnamed:
+                errors[index] = [f"name is required for new passenger {email}" for email in unnamed]
+                found_more = True
+        if not found_more:
+            return errors
+
+
+# --- Writing ---
+
+def _insert_passengers(cursor, bookings, known):
+    """Inserts the passengers whose email is not in ``known`` with one multi-row INSERT.
+
+    Returns lower-cased Email -> PassengerID for every email in the batch.
+    """
+    details = {}
+    for booking in bookings:
+        for passenger in booking["passengers"]:
+            if "email" in passenger and passenger["email"] not in known and passenger["name"]:
+                details.setdefault(passenger["email"], passenger)
+    ids = dict(known)
+    if details:
+        cursor.executemany(PASSENGER_INSERT_SQL, [
+            (p["name"], p["gender"], p["age"], email, p["phone"]) for email, p in details.items()])
+        # Re-read rather than trust lastrowid: a concurrent batch may have added some of them first
+        ids.update(_emails(cursor, details))
+    return ids
+
+
+def _write(conn, bookings, found):
+    """Inserts checked bookings; returns (created, new passenger IDs, all passenger IDs). Does not commit."""
+    cursor = conn.cursor()
+    try:
+        emails = _insert_passengers(cursor, [booking for _, booking in bookings], found["email"])
+        existing = set(found["email"].values()) | set(found["passenger"])
+        type_ids = found["transport_type"]
+
+        links, stays, legs, payments, created = [], [], [], [], []
+        for index, booking in bookings:
+            cursor.execute(BOOKING_INSERT_SQL, (booking["group_name"], booking["purpose"],
+                                                booking["employee_id"], booking["status"]))
+            booking_id = cursor.lastrowid
+            created.append({"index": index, "booking_id": booking_id})
+            has_primary = any(p["primary"] for p in booking["passengers"])
+            for position, passenger in enumerate(booking["passengers"]):
+                passenger_id = passenger.get("passenger_id") or emails[passenger["email"]]
+                primary = passenger["primary"] or (not has_primary and position == 0)
+                links.append((booking_id, passenger_id, primary))
+            stays.extend((booking_id, s["accommodation_id"], s["check_in"], s["check_out"], s["cost"])
+                         for s in booking["accommodations"])
+            for leg in booking["transportations"]:
+                row = [booking_id, type_ids[TRANSPORT_KINDS[leg["kind"]][0]], None, None, None, leg["cost"]]
+                row[2 + list(TRANSPORT_KINDS).index(leg["kind"])] = leg["id"]
+                legs.append(tuple(row))
+            payments.extend((booking_id, p["amount"], p["payment_type"], p["card_last_four"], p["expiry_date"])
+                            for p in booking["payments"])
+
+        if links:
+            cursor.executemany(BOOKING_PASSENGER_INSERT_SQL, links)
+        add_legs_batch(conn, stays, legs)
+        if payments:
+            cursor.executemany(PAYMENT_INSERT_SQL, payments)
+
+        totals = _lookup(cursor, "SELECT BookingID, TotalCost FROM Booking WHERE BookingID IN ({ids})",
+                         [entry["booking_id"] for entry in created])
+        for entry in created:
+            total = totals[entry["booking_id"]][1]
+            entry["total_cost"] = None if total is None else str(total)
+        passenger_ids = {link[1] for link in links}
+        return created, passenger_ids - existing, passenger_ids
+    finally:
+        cursor.close()
+
+
+def create_bookings(conn, items, all_or_nothing=True):
+    """Validates and creates a batch of bookings in a single transaction.
+
+    With ``all_or_nothing`` (the default) any invalid item means nothing is
+    written; otherwise the valid items are created and the invalid ones
+    reported. Returns (result dict, passenger IDs touched); the latter is
+    None when nothing was committed. Database errors roll the whole batch
+    back and propagate.
+    """
+    if not isinstance(items, list) or not items:
+        raise BookingBatchError("Expected a non-empty list of bookings")
+    if len(items) > MAX_BATCH_BOOKINGS:
+        raise BookingBatchError(f"At most {MAX_BATCH_BOOKINGS} bookings per request")
+    started = time.perf_counter()
+
+    errors, valid = {}, []
+    for index, item in enumerate(items):
+        booking, problems = validate_booking(item)
+        if problems:
+            errors[index] = problems
+        else:
+            valid.append((index, booking))
+
+    cursor = conn.cursor()
+    try:
+        found = _references(cursor, [booking for _, booking in valid])
+    finally:
+        cursor.close()
+    checked = []
+    for index, booking in valid:
+        problems = _check_references(booking, found)
+        if problems:
+            errors[index] = problems
+        else:
+            checked.append((index, booking))
+    unnamed = _unnamed_passengers(checked, found["email"])
+    if unnamed:
+        errors.update(unnamed)
+        checked = [(index, booking) for index, booking in checked if index not in unnamed]
+
+    result = {"created": [], "errors": [{"index": index, "errors": errors[index]} for index in sorted(errors)],
+              "passengers_created": 0}
+    if not checked or (errors and all_or_nothing):
+        result["write_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return result, None
+
+    try:
+        created, new_passengers, passenger_ids = _write(conn, checked, found)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    result.update(created=created, passengers_created=len(new_passengers),
+                  write_ms=round((time.perf_counter() - started) * 1000, 3))
+    return result, passenger_ids
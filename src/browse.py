@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""Keyset-paginated table browsing for the data viewing routes.
+
+Instead of ``SELECT * ... LIMIT n`` (which can never get past row n, and gets
+slower the deeper an OFFSET goes), each page remembers the sort value and
+primary key of its last row and the next page starts right after it:
+
+    WHERE (sort_col > last_value OR (sort_col = last_value AND pk > last_pk))
+    ORDER BY sort_col, pk LIMIT page_size + 1
+
+Sorting is only allowed on indexed columns. InnoDB secondary indexes carry
+the primary key, so every page is a short index range scan no matter how
+deep into the table it is. Rows come off a plain tuple cursor and are
+yielded one at a time so the template can stream them out.
+"""
+import base64
+import json
+
+from mysql.connector import Error
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Browsable tables: primary key, full column list, indexed columns that can be sorted on,
+# and which of those may hold NULLs (they need special handling in the keyset predicate).
+TABLES = {
+    "Location": {
+        "pk": "LocationID",
+        "columns": ["LocationID", "City", "State", "Country"],
+        "sortable": ["City", "Country"],
+        "nullable": [],
+    },
+    "Passenger": {
+        "pk": "PassengerID",
+        "columns": ["PassengerID", "Name", "Gender", "Age", "Email", "Phone"],
+        "sortable": ["Name", "Age", "Email"],
+        "nullable": ["Age", "Email"],
+    },
+    "Employee": {
+        "pk": "EmployeeID",
+        "columns": ["EmployeeID", "Name", "Role", "JoinDate", "SupervisorID"],
+        "sortable": ["Role", "JoinDate", "SupervisorID"],
+        "nullable": ["Role", "JoinDate", "SupervisorID"],
+    },
+    "Accommodation": {
+        "pk": "AccommodationID",
+        "columns": ["AccommodationID", "Name", "Type", "Rate", "Facilities", "Discount", "LocationID"],
+        "sortable": ["Type", "Rate", "LocationID"],
+        "nullable": ["Type", "Rate"],
+    },
+    "Flight": {
+        "pk": "FlightID",
+        "columns": ["FlightID", "FlightNumber", "Carrier", "SourceLocationID", "DestLocationID",
+                    "DepartureDateTime", "ArrivalDateTime", "Class", "Fare"],
+        "sortable": ["FlightNumber", "Carrier", "DepartureDateTime", "SourceLocationID", "DestLocationID"],
+        "nullable": [],
+    },
+    "CarRental": {
+        "pk": "CarRentalID",
+        "columns": ["CarRentalID", "Company", "CarType", "PickupLocationID", "DropoffLocationID",
+                    "PickupDateTime", "DropoffDateTime", "Rent"],
+        "sortable": ["Company", "PickupDateTime", "PickupLocationID", "DropoffLocationID"],
+        "nullable": [],
+    },
+    "Cruise": {
+        "pk": "CruiseID",
+        "columns": ["CruiseID", "CruiseName", "Line", "SourceLocationID", "DestLocationID",
+                    "DepartureDate", "ReturnDate", "Fare"],
+        "sortable": ["CruiseName", "DepartureDate", "SourceLocationID", "DestLocationID"],
+        "nullable": [],
+    },
+    "Booking": {
+        "pk": "BookingID",
+        "columns": ["BookingID", "GroupName", "Purpose", "BookingDate", "EmployeeID", "TotalCost", "Status"],
+        "sortable": ["BookingDate", "Purpose", "EmployeeID"],
+        "nullable": ["Purpose", "EmployeeID"],
+    },
+}
+
+
+class BrowseError(ValueError):
+    """Raised for invalid browse parameters (unknown column, bad cursor, ...)."""
+
+
+def encode_cursor(sort_value, pk_value):
+    """Packs the last row's sort value and primary key into an opaque URL token."""
+    raw = json.dumps([sort_value, pk_value], default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        sort_value, pk_value = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError) as e:
+        raise BrowseError("Invalid page cursor.") from e
+    return sort_value, pk_value
+
+
+def parse_page_args(table_name, args):
+    """Validates request args (cols, sort, dir, after, limit) against the table registry."""
+    spec = TABLES[table_name]
+    pk = spec["pk"]
+
+    columns = spec["columns"]
+    if args.get("cols"):
+        requested = [c.strip() for c in args["cols"].split(",") if c.strip()]
+        unknown = [c for c in requested if c not in spec["columns"]]
+        if unknown:
+            raise BrowseError(f"Unknown column(s) for {table_name}: {', '.join(unknown)}")
+        # The primary key is always projected: it drives the keyset and the row links
+        columns = [pk] + [c for c in requested if c != pk]
+
+    sort = args.get("sort") or pk
+    if sort != pk and sort not in spec["sortable"]:
+        raise BrowseError(f"Cannot sort {table_name} by {sort}; sortable columns: {', '.join(spec['sortable'])}")
+    if sort not in columns:
+        columns = columns + [sort]
+
+    descending = args.get("dir", "asc").lower() == "desc"
+
+    try:
+        page_size = int(args.get("limit", DEFAULT_PAGE_SIZE))
+    except (TypeError, ValueError):
+        raise BrowseError("Page size must be a number.")
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+
+    after = decode_cursor(args["after"]) if args.get("after") else None
+    return {"columns": columns, "sort": sort, "descending": descending,
+            "page_size": page_size, "after": after}
+
+
+def build_page_query(table_name, columns, sort, descending=False, after=None, page_size=DEFAULT_PAGE_SIZE):
+    """Builds the keyset SQL and its parameters for one page (fetching one extra row)."""
+    spec = TABLES[table_name]
+    pk = spec["pk"]
+    select_list = ", ".join(f"`{c}`" for c in columns)
+    direction = "DESC" if descending else "ASC"
+    cmp = "<" if descending else ">"
+    params = []
+    where = ""
+
+    if after is not None:
+        last_sort, last_pk = after
+        if sort == pk:
+            where = f"WHERE `{pk}` {cmp} %s"
+            params = [last_pk]
+        elif sort in spec["nullable"]:
+            # MySQL sorts NULLs first ascending and last descending
+            if last_sort is None:
+                if descending:
+                    where = f"WHERE `{sort}` IS NULL AND `{pk}` < %s"
+                    params = [last_pk]
+                else:
+                    where = f"WHERE (`{sort}` IS NULL AND `{pk}` > %s) OR `{sort}` IS NOT NULL"
+                    params = [last_pk]
+            else:
+                where = f"WHERE (`{sort}` {cmp} %s OR (`{sort}` = %s AND `{pk}` {cmp} %s))"
+                params = [last_sort, last_sort, last_pk]
+                if descending:
+                    where += f" OR `{sort}` IS NULL"
+        else:
+            where = f"WHERE `{sort}` {cmp} %s OR (`{sort}` = %s AND `{pk}` {cmp} %s)"
+            params = [last_sort, last_sort, last_pk]
+
+    order = f"`{pk}` {direction}" if sort == pk else f"`{sort}` {direction}, `{pk}` {direction}"
+    sql = f"SELECT {select_list} FROM `{table_name}` {where} ORDER BY {order} LIMIT %s"
+    params.append(page_size + 1)
+    return sql, tuple(params)
+
+
+class TablePage:
+    """One page of a table, streamed row by row off an unbuffered tuple cursor.
+
+    ``columns`` is known as soon as the query has run; ``next_cursor`` and
+    ``row_count`` are filled in once the rows have been iterated, which lets a
+    streamed template print the "Next" link after the table body.
+    """
+
+    def __init__(self, conn, table_name, columns, sort, descending=False, after=None,
+                 page_size=DEFAULT_PAGE_SIZE):
+        self.table_name = table_name
+        self.pk = TABLES[table_name]["pk"]
+        self.sort = sort
+        self.descending = descending
+        self.page_size = page_size
+        self.is_first_page = after is None
+        self.next_cursor = None
+        self.row_count = 0
+        self._conn = conn
+        self._cursor = None
+        self._done = False
+
+        sql, params = build_page_query(table_name, columns, sort, descending, after, page_size)
+        self._cursor = conn.cursor()
+        self._cursor.execute(sql, params)
+        self.columns = [desc[0] for desc in self._cursor.description]
+        self._pk_index = self.columns.index(self.pk)
+        self._sort_index = self.columns.index(sort)
+
+    @property
+    def rows(self):
+        return iter(self)
+
+    def __iter__(self):
+        try:
+            last = None
+            for row in self._cursor:
+                if self.row_count == self.page_size:
+                    # The extra row only tells us there is another page
+                    self.next_cursor = encode_cursor(last[self._sort_index], last[self._pk_index])
+                    continue
+                self.row_count += 1
+                last = row
+                yield row
+        finally:
+            self.close()
+
+    def close(self):
+        """Releases the cursor and connection; safe to call more than once."""
+        if self._done:
+            return
+        self._done = True
+        clean = True
+        try:
+            if self._cursor is not None:
+                self._cursor.close()
+        except Error:
+            # Unread rows left on the wire (client went away mid-page): don't reuse this connection
+            clean = False
+        if clean or not hasattr(self._conn, "invalidate"):
+            self._conn.close()
+        else:
+            self._conn.invalidate()
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""Small key/value caches used for read models such as the itinerary page.
+
+``TTLCache`` is an in-process LRU with a per-entry time-to-live. Each worker
+process has its own copy, so an invalidation in one worker is only seen by
+the others once their entries expire.
+
+``FileCache`` is a local stand-in for a shared cache when several workers run
+on one host: entries are pickled into a directory, so an invalidation from any
+worker is visible to all of them immediately.
+
+Both expose the same get / set / delete / clear interface.
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize=1024, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or entry[0] < time.monotonic():
+                if entry is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"backend": "memory", "entries": len(self._data), "maxsize": self.maxsize,
+                    "ttl": self.ttl, "hits": self.hits, "misses": self.misses}
+
+
+class FileCache:
+    """Pickled entries in a directory, shared by every process on the host.
+
+    Writes go through a temporary file and an atomic rename so readers never
+    see a half-written entry. ``clear()`` bumps a generation number that is part
+    of every file name, so stale files are simply never read again (and are
+    swept lazily).
+    """
+
+    def __init__(self, directory, ttl=300.0, maxsize=None):
+        self.directory = directory
+        self.ttl = ttl
+        self.maxsize = maxsize  # accepted for interface parity; the directory is not size-capped
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._generation_path = os.path.join(directory, "GENERATION")
+
+    def _generation(self):
+        try:
+            with open(self._generation_path, "r") as f:
+                return f.read().strip() or "0"
+        except FileNotFoundError:
+            return "0"
+
+    def _path(self, key):
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{self._generation()}-{digest}.pickle")
+
+    def get(self, key, default=None):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                expires_at, value = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return default
+        if expires_at < time.time():
+            self._unlink(path)
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((time.time() + self.ttl, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception:
+            self._unlink(tmp_path)
+            raise
+
+    def delete(self, key):
+        self._unlink(self._path(key))
+
+    def clear(self):
+        old = self._generation()
+        new = str(int(old) + 1) if old.isdigit() else "1"
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(new)
+        os.replace(tmp_path, self._generation_path)
+        # Sweep files from older generations; other workers may race us, which is harmless
+        for name in os.listdir(self.directory):
+            if name.endswith(".pickle") and not name.startswith(f"{new}-"):
+                self._unlink(os.path.join(self.directory, name))
+
+    def stats(self):
+        entries = sum(1 for name in os.listdir(self.directory) if name.endswith(".pickle"))
+        return {"backend": "file", "directory": self.directory, "entries": entries,
+                "ttl": self.ttl, "hits": self.hits, "misses": self.misses}
+
+    @staticmethod
+    def _unlink(path):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""Bounded, streamed execution of ad-hoc SQL for the /execute_sql console.
+
+A console query runs on a plain (unbuffered) tuple cursor and its rows are
+handed to the template or a download one at a time, so memory stays flat
+however big the result is. Every query is bounded three ways:
+
+    * rows and bytes: iteration stops at ``max_rows`` / ``max_bytes`` and the
+      result is marked truncated,
+    * time: read-only statements run under a server-side statement timeout
+      (MySQL's max_execution_time, MariaDB's max_statement_time),
+    * cost, optionally: ``explain_estimate()`` asks the optimiser how many rows
+      a SELECT would examine so the console can refuse it up front.
+
+A read-only result that is not read to the end (truncated, timed out, or
+the client went away) is cancelled with KILL QUERY from a second connection,
+and its connection is dropped rather than returned to the pool. A statement
+that writes (e.g. CALL of a procedure that also returns rows) is never
+cancelled part way: the rows past the caps are read and dropped, and the
+statement is committed.
+"""
+import csv
+import io
+import json
+import os
+
+from mysql.connector import Error
+
+from src.write_events import is_read_only, notify_write, statement_keyword, tables_written
+
+MAX_ROWS = int(os.environ.get("CONSOLE_MAX_ROWS", 1000))  # Rows shown on the console page
+MAX_BYTES = int(os.environ.get("CONSOLE_MAX_BYTES", 2 * 1024 * 1024))  # Approximate cell bytes shown on the page
+DOWNLOAD_MAX_ROWS = int(os.environ.get("CONSOLE_DOWNLOAD_MAX_ROWS", 1000000))  # Rows in a CSV/JSON download
+TIMEOUT_MS = int(os.environ.get("CONSOLE_TIMEOUT_MS", 10000))  # Server-side limit for read-only statements
+EXPLAIN_MAX_ROWS = int(os.environ.get("CONSOLE_EXPLAIN_MAX_ROWS", 100000))  # "EXPLAIN first" refusal threshold
+
+DOWNLOAD_BATCH_ROWS = 500  # Rows encoded per chunk of a download
+
+# Statements EXPLAIN accepts
+EXPLAINABLE_KEYWORDS = {"select", "with", "insert", "replace", "update", "delete"}
+
+
+class ConsoleError(ValueError):
+    """Raised when a console query is refused before it runs."""
+
+
+def explain_estimate(conn, sql):
+    """Rows the optimiser expects ``sql`` to examine, or None if it cannot be explained.
+
+    Tables joined in one SELECT multiply (nested loops); separate SELECTs
+    (subqueries, UNION parts) add up. Raises ConsoleError when the database's
+    EXPLAIN has no row estimates (SQLite lists bytecode instead).
+    """
+    if statement_keyword(sql) not in EXPLAINABLE_KEYWORDS:
+        return None
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(f"EXPLAIN {sql}")
+        plan = cursor.fetchall()
+    finally:
+        cursor.close()
+    if plan and "rows" not in plan[0]:
+        raise ConsoleError("EXPLAIN first needs MySQL: this database's EXPLAIN gives no row estimates.")
+    per_select = {}
+    for step in plan:
+        rows = step.get("rows")
+        if rows is None:
+            continue
+        key = step.get("id")
+        per_select[key] = per_select.get(key, 1) * int(rows)
+    return sum(per_select.values())
+
+
+def check_estimate(conn, sql, max_rows=EXPLAIN_MAX_ROWS):
+    """Raises ConsoleError if EXPLAIN estimates more than ``max_rows`` examined rows."""
+    estimate = explain_estimate(conn, sql)
+    if estimate is not None and estimate > max_rows:
+        raise ConsoleError(f"Refused: EXPLAIN estimates about {estimate:,} rows examined "
+                           f"(limit {max_rows:,}). Add a more selective WHERE clause or a LIMIT.")
+    return estimate
+
+
+def _cell_bytes(row):
+    return sum(len(str(value)) for value in row if value is not None)
+
+
+class ConsoleQuery:
+    """One executed console statement whose rows are read lazily.
+
+    ``columns`` is None for statements without a result set: their
+    ``rowcount`` is set, and they are committed and closed right away. For
+    result sets, ``row_count``, ``truncated`` ("rows", "bytes" or None) and
+    ``error`` are filled in while iterating, so a streamed template can report
+    them after the table. ``kill_conn_factory`` returns a second connection used to
+    cancel an abandoned read-only query; one that is not read-only is drained
+    and committed by ``close()`` instead.
+    """
+
+    def __init__(self, conn, sql, max_rows=MAX_ROWS, max_bytes=MAX_BYTES, timeout_ms=TIMEOUT_MS,
+                 kill_conn_factory=None):
+        self.sql = sql
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.read_only = is_read_only(sql)
+        self.columns = None
+        self.rowcount = None
+        self.row_count = 0
+        self.bytes = 0
+        self.truncated = None
+        self.error = None
+        self._conn = conn
+        self._kill_conn_factory = kill_conn_factory
+        self._timeout_variable = None
+        self._exhausted = False
+        self._done = False
+
+        self._cursor = conn.cursor()
+        try:
+            if self.read_only and timeout_ms:
+                self._set_timeout(timeout_ms)
+            self._cursor.execute(sql)
+            if self._cursor.description is None:
+                self.rowcount = self._cursor.rowcount
+                self._exhausted = True
+                if not self.read_only:
+                    conn.commit()
+                    # Let caches and indexes drop whatever this statement may have changed
+                    notify_write(tables_written(sql))
+                self.close()
+            else:
+                self.columns = [desc[0] for desc in self._cursor.description]
+        except Exception:
+            self._exhausted = True
+            self.close()
+            raise
+
+    def _set_timeout(self, timeout_ms):
+        try:
+            self._cursor.execute("SET SESSION max_execution_time = %s", (int(timeout_ms),))
+            self._timeout_variable = "max_execution_time"
+        except Error:
+            # MariaDB names it differently and counts in seconds
+            self._cursor.execute("SET SESSION max_statement_time = %s", (timeout_ms / 1000.0,))
+            self._timeout_variable = "max_statement_time"
+
+    @property
+    def rows(self):
+        return iter(self)
+
+    def __iter__(self):
+        if self.columns is None:
+            return
+        try:
+            for row in self._cursor:
+                if self.row_count == self.max_rows:
+                    self.truncated = "rows"
+                    return
+                size = _cell_bytes(row)
+                if self.max_bytes and self.row_count and self.bytes + size > self.max_bytes:
+                    self.truncated = "bytes"
+                    return
+                self.row_count += 1
+                self.bytes += size
+                yield row
+            self._exhausted = True
+            if not self.read_only:
+                # e.g. CALL of a procedure that returns rows and writes
+                self._conn.commit()
+                notify_write(tables_written(self.sql))
+        except Error as e:
+            # Typically the statement timeout (MySQL 3024 / MariaDB 1969) hitting mid-result
+            self.error = str(e)
+        finally:
+            self.close()
+
+    def _finish_write(self):
+        """Reads and drops the rows that were not shown, then commits the statement."""
+        try:
+            for _ in self._cursor:
+                pass
+            self._conn.commit()
+        except Error as e:
+            self.error = str(e)
+            print(f"Console statement failed after its shown rows: {e}")
+            return
+        self._exhausted = True
+        notify_write(tables_written(self.sql))
+
+    def _kill(self):
+        if self._kill_conn_factory is None:
+            return
+        killer = None
+        try:
+            connection_id = self._conn.connection_id
+            killer = self._kill_conn_factory()
+            cursor = killer.cursor()
+            cursor.execute(f"KILL QUERY {int(connection_id)}")
+            cursor.close()
+        except Exception as e:
+            print(f"Could not cancel console query: {e}")
+        finally:
+            if killer is not None:
+                killer.close()
+
+    def close(self):
+        """Releases the cursor and connection; safe to call more than once."""
+        if self._done:
+            return
+        self._done = True
+        if not self._exhausted and not self.error and not self.read_only:
+            # Killing it would roll back a write the user asked for; only its output is capped
+            self._finish_write()
+        if not self._exhausted or self.error:
+            # Rows are still on the wire: stop the server producing them and don't reuse the connection
+            if not self._exhausted:
+                self._kill()
+            if hasattr(self._conn, "invalidate"):
+                self._conn.invalidate()
+            else:
+                self._conn.close()
+            return
+        try:
+            self._cursor.close()
+            if self._timeout_variable:
+                cursor = self._conn.cursor()
+                cursor.execute(f"SET SESSION {self._timeout_variable} = DEFAULT")
+                cursor.close()
+        except Error:
+            if hasattr(self._conn, "invalidate"):
+                self._conn.invalidate()
+                return
+        self._conn.close()
+
+
+def _json_default(value):
+    return str(value)
+
+
+def iter_csv(query):
+    """Streams a result set as CSV text, a batch of rows per chunk."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(query.columns)
+    for i, row in enumerate(query, 1):
+        writer.writerow(row)
+        if i % DOWNLOAD_BATCH_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_json(query):
+    """Streams a result set as {"columns", "rows", "row_count", "truncated", "error"}."""
+    yield '{"columns": ' + json.dumps(query.columns) + ', "rows": ['
+    batch = []
+    for i, row in enumerate(query):
+        batch.append(("," if i else "") + "\n" + json.dumps(list(row), default=_json_default))
+        if len(batch) == DOWNLOAD_BATCH_ROWS:
+            yield "".join(batch)
+            batch = []
+    yield "".join(batch) + "\n], " + json.dumps({
+        "row_count": query.row_count,
+        "truncated": query.truncated,
+        "error": query.error,
+    })[1:]
@@ -1,10 +1,13 @@
 # -*- coding: utf-8 -*-
 import os
-from flask_sqlalchemy import SQLAlchemy
+import threading
+from flask import current_app, has_app_context
 import mysql.connector # Import mysql connector
 from mysql.connector import Error
+from src.backend import MySQLBackend, SQLiteBackend
+from src.pool import ConnectionPool
+from src.routing import Replica, Router, parse_replicas
 
-db = SQLAlchemy()
 
 # --- IMPORTANT: Placeholder MySQL connection details --- 
 # --- The user MUST replace these with their actual credentials --- 
@@ -15,6 +18,37 @@ MYSQL_PORT = 3306 # Default MySQL port
 DATABASE_NAME = "travel_agency_db" # Choose a database name
 # --- End of Placeholder Credentials ---
 
+# --- Connection pool settings (override with environment variables) ---
+POOL_SIZE = int(os.environ.get("MYSQL_POOL_SIZE", 5)) # Idle connections kept open per process
+POOL_MAX_OVERFLOW = int(os.environ.get("MYSQL_POOL_MAX_OVERFLOW", 10)) # Extra connections allowed under bursts
+POOL_TIMEOUT = float(os.environ.get("MYSQL_POOL_TIMEOUT", 10)) # Seconds to wait for a free connection
+POOL_RECYCLE = float(os.environ.get("MYSQL_POOL_RECYCLE", 300)) # Close connections idle longer than this
+POOL_PRE_PING = os.environ.get("MYSQL_POOL_PRE_PING", "1") != "0" # Ping connections on checkout
+
+# --- Read replicas (see src/routing.py); same user, password and database as the primary ---
+MYSQL_REPLICAS = os.environ.get("MYSQL_REPLICAS", "") # "host[:port][*weight],..."; empty = primary only
+REPLICA_STRATEGY = os.environ.get("MYSQL_REPLICA_STRATEGY", "least_connections") # or "weighted"
+REPLICA_MAX_LAG = float(os.environ.get("MYSQL_REPLICA_MAX_LAG", 5)) # Seconds; also the read-your-writes window
+REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get("MYSQL_REPLICA_LAG_CHECK_INTERVAL", 2)) # Seconds between lag checks
+REPLICA_RETRY_AFTER = float(os.environ.get("MYSQL_REPLICA_RETRY_AFTER", 30)) # Seconds an unreachable replica is skipped
+
+# --- Storage backend (see src/backend.py) ---
+DB_BACKEND = os.environ.get("DB_BACKEND", "mysql") # "mysql", or "sqlite" for an embedded database file
+SQLITE_PATH = os.environ.get("SQLITE_PATH", "travel_agency.db") # Created with the schema if missing
+SQLITE_READERS = int(os.environ.get("SQLITE_READERS", 4)) # Idle read-only connections kept open
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)) # Bytes of the file memory-mapped
+SQLITE_CACHE_SIZE = int(os.environ.get("SQLITE_CACHE_SIZE", -64000)) # Page cache; negative = KiB per connection
+SQLITE_STATEMENT_CACHE = int(os.environ.get("SQLITE_STATEMENT_CACHE", 256)) # Prepared statements per connection
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL") # FULL to sync the WAL on every commit
+SQLITE_BUSY_TIMEOUT = float(os.environ.get("SQLITE_BUSY_TIMEOUT", 5)) # Seconds to wait for another process's write lock
+
+_pool = None
+_router = None
+_backend = None
+_backend_lock = threading.Lock()
+_database_checked = False # Set once check_and_create_database() succeeded in this process (or a parent)
+_db = None
+
 def check_and_create_database():
     """Checks if the database exists on the MySQL server, creates it if not."""
     conn = None
@@ -54,30 +88,118 @@ def check_and_create_database():
             conn.close()
             print("MySQL connection closed.")
 
-def init_app(app):
-    """Initialize the database connection for the Flask app using SQLAlchemy."""
-    # First, ensure the database exists on the server
-    try:
-        check_and_create_database()
-    except RuntimeError as e:
-         # If database check/creation fails, log the error and potentially stop the app
-         print(f"Critical error: {e}")
-         # Optionally, you could raise a more specific exception or use Flask's logging
-         # For now, we print and raise SystemExit to prevent the app from starting incorrectly
-         raise SystemExit("Database setup failed. Please check MySQL connection and credentials.")
-
-    # Configure SQLAlchemy to use the MySQL database
-    # Ensure mysql-connector-python is installed: pip install mysql-connector-python
-    # The mysql+mysqlconnector driver is recommended
-    app.config["SQLALCHEMY_DATABASE_URI"] = (
-        f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@" 
-        f"{MYSQL_HOST}:{MYSQL_PORT}/{DATABASE_NAME}"
+def create_connection(host=MYSQL_HOST, port=MYSQL_PORT):
+    """Opens a new raw connection to the application database (on the primary by default)."""
+    return mysql.connector.connect(
+        host=host,
+        user=MYSQL_USER,
+        password=MYSQL_PASSWORD,
+        database=DATABASE_NAME,
+        port=port
     )
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False # Recommended setting
-    
-    # Initialize SQLAlchemy with the Flask app instance
-    db.init_app(app)
 
-    # Note: MySQL generally handles foreign key constraints automatically if they are defined 
-    # in the table schema (using InnoDB engine). The SQLite-specific PRAGMA is removed.
+def create_pool(creator):
+    return ConnectionPool(
+        creator,
+        size=POOL_SIZE,
+        max_overflow=POOL_MAX_OVERFLOW,
+        timeout=POOL_TIMEOUT,
+        recycle=POOL_RECYCLE,
+        pre_ping=POOL_PRE_PING
+    )
+
+def get_pool():
+    """Returns the process-wide connection pool of the primary, creating it on first use."""
+    global _pool
+    if _pool is None:
+        _pool = create_pool(create_connection)
+    return _pool
+
+def get_router():
+    """Returns the process-wide primary/replica router, creating it on first use."""
+    global _router
+    if _router is None:
+        replicas = [
+            Replica(f"{host}:{port}", create_pool(lambda host=host, port=port: create_connection(host, port)), weight)
+            for host, port, weight in parse_replicas(MYSQL_REPLICAS, MYSQL_PORT)
+        ]
+        _router = Router(
+            get_pool(),
+            replicas,
+            strategy=REPLICA_STRATEGY,
+            max_lag=REPLICA_MAX_LAG,
+            lag_check_interval=REPLICA_LAG_CHECK_INTERVAL,
+            retry_after=REPLICA_RETRY_AFTER
+        )
+    return _router
+
+def ensure_database():
+    """Runs check_and_create_database() once per process, on first use instead of at import.
+
+    A failed check raises RuntimeError and is retried by the next caller.
+    """
+    global _database_checked
+    if not _database_checked:
+        check_and_create_database()
+        _database_checked = True
+
+def get_backend():
+    """Returns the process-wide storage backend (DB_BACKEND), creating it on first use.
+
+    Nothing is opened before the first call, so the app can be imported (and a
+    pre-fork server can fork) without touching the database.
+    """
+    global _backend
+    if _backend is not None:
+        return _backend
+    with _backend_lock:
+        if _backend is not None:
+            return _backend
+        if DB_BACKEND == "sqlite":
+            _backend = SQLiteBackend(
+                SQLITE_PATH,
+                readers=SQLITE_READERS,
+                mmap_size=SQLITE_MMAP_SIZE,
+                cache_size=SQLITE_CACHE_SIZE,
+                cached_statements=SQLITE_STATEMENT_CACHE,
+                synchronous=SQLITE_SYNCHRONOUS,
+                busy_timeout=SQLITE_BUSY_TIMEOUT,
+                pool_timeout=POOL_TIMEOUT
+            )
+        elif DB_BACKEND == "mysql":
+            ensure_database()
+            _backend = MySQLBackend(get_router())
+        else:
+            raise ValueError(f"Unknown DB_BACKEND {DB_BACKEND!r}; use mysql or sqlite")
+    return _backend
+
+def get_db():
+    """Returns the Flask-SQLAlchemy extension, importing SQLAlchemy on first use.
+
+    Inside an app context it is also bound to that app, so ``get_db().engine``
+    works there. The request handlers use get_mysql_conn() and never need it.
+    """
+    global _db
+    if _db is None:
+        from flask_sqlalchemy import SQLAlchemy
+        _db = SQLAlchemy()
+    if has_app_context() and "sqlalchemy" not in current_app.extensions:
+        _db.init_app(current_app._get_current_object())
+    return _db
+
+def init_app(app):
+    """Configures the database settings of the Flask app.
 
+    Nothing connects here: the MySQL database is checked (and created) by
+    the first get_backend() call of each process, and SQLAlchemy is only
+    imported by get_db().
+    """
+    if DB_BACKEND == "sqlite":
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.abspath(SQLITE_PATH)}"
+    else:
+        # The mysql+mysqlconnector driver is recommended
+        app.config["SQLALCHEMY_DATABASE_URI"] = (
+            f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@"
+            f"{MYSQL_HOST}:{MYSQL_PORT}/{DATABASE_NAME}"
+        )
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False # Recommended setting
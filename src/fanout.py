@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Runs a page's independent queries concurrently.
+
+A page made of several sections used to run their queries one after the
+other, so it took as long as all of them together. ``fan_out()`` hands each
+call to a shared thread pool and waits until every one has finished, which
+makes the page take as long as its slowest query:
+
+    results = fan_out({"accommodations": load_accommodations, "flights": (load_flights, 2.0)})
+    rows, error = results["flights"]
+
+Every call is isolated: its exception is returned as its ``error`` instead of
+being raised, and a call that has not finished within its timeout (its own,
+or FANOUT_TIMEOUT) gets a FanoutTimeout error while the others are still
+returned. A timed-out call cannot be stopped; it runs on in the background
+and its connection goes back to the pool when it finishes.
+
+Calls run in a copy of the caller's context, so ``flash()``, the session,
+read-your-writes routing and the per-request metrics work in them as in the
+request itself. Overlapping calls make the connect/query/fetch phase times of
+a request add up to more than its wall time.
+
+``fan_out_queries()`` does the same for functions of a connection, giving
+each its own pooled connection. The pool (MYSQL_POOL_SIZE plus overflow)
+should allow a few connections per concurrent page.
+"""
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+FANOUT_WORKERS = int(os.environ.get("FANOUT_WORKERS", 8))  # Threads shared by all requests of a process
+FANOUT_TIMEOUT = float(os.environ.get("FANOUT_TIMEOUT", 10))  # Default seconds a call may take
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+class FanoutTimeout(Exception):
+    """Returned as the error of a call that did not finish within its timeout."""
+
+
+def get_executor():
+    """Returns the process-wide thread pool, creating it on first use (and again after a fork)."""
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                # A forked worker does not inherit the parent's threads
+                _executor = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix="fanout")
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def fan_out(calls, timeout=FANOUT_TIMEOUT):
+    """Runs the calls concurrently and waits for all of them.
+
+    ``calls`` maps a name to a function taking no arguments, or to
+    (function, timeout) for a timeout of its own. Returns {name: (value, error)},
+    with error None for calls that succeeded.
+    """
+    executor = get_executor()
+    started = time.monotonic()
+    futures = {}
+    for name, call in calls.items():
+        call, call_timeout = call if isinstance(call, tuple) else (call, timeout)
+        context = contextvars.copy_context()
+        futures[name] = (executor.submit(context.run, call), started + call_timeout)
+
+    results = {}
+    for name, (future, deadline) in futures.items():
+        try:
+            results[name] = (future.result(timeout=max(0.0, deadline - time.monotonic())), None)
+        except FutureTimeoutError:
+            future.cancel()  # Only has an effect if it has not started yet
+            results[name] = (None, FanoutTimeout(f"{name} did not finish within "
+                                                 f"{deadline - started:g} seconds"))
+        except Exception as e:
+            results[name] = (None, e)
+    return results
+
+
+def fan_out_queries(conn_factory, queries, timeout=FANOUT_TIMEOUT):
+    """fan_out() for functions taking a connection; each runs on a connection of its own.
+
+    The first connection is checked out before anything starts, so when the
+    database is unreachable this returns None after a single attempt.
+    Connections the other calls fail to get are reported as ConnectionError.
+    """
+    first = conn_factory()
+    if first is None:
+        return None
+    calls = {}
+    for i, (name, query) in enumerate(queries.items()):
+        query, query_timeout = query if isinstance(query, tuple) else (query, timeout)
+        calls[name] = (_on_connection(conn_factory, query, first if i == 0 else None), query_timeout)
+    return fan_out(calls, timeout)
+
+
+def _on_connection(conn_factory, query, conn=None):
+    def run():
+        nonlocal conn
+        if conn is None:
+            conn = conn_factory()
+            if conn is None:
+                raise ConnectionError("No database connection available")
+        try:
+            return query(conn)
+        finally:
+            if conn.is_connected():
+                conn.close()
+    return run
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""Team rollups over the management tree (Employee.SupervisorID).
+
+EmployeePerformance and complex query 2 only look one level down. Everyone
+under a manager, at any depth, is kept in the EmployeeClosure table instead:
+one (AncestorID, DescendantID, Depth) row per pair, each employee being their
+own ancestor at depth 0. It is maintained by triggers on Employee (see the
+schema scripts, or sql/employee_closure.sql for existing MySQL databases), so
+a team's bookings, revenue and ratings are a join of one AncestorID's rows
+with Booking on idx_booking_employee_cost, however deep the tree is.
+
+``team_performance()`` gives a manager's totals split into their own bookings
+and those of each direct report's team. From the command line:
+
+    python -m src.hierarchy check          # compare EmployeeClosure with the tree
+    python -m src.hierarchy check --fix    # ...and rebuild it
+"""
+import argparse
+import sys
+from decimal import Decimal
+
+from src.rows import fetch_records
+
+EMPLOYEE_SQL = "SELECT EmployeeID, Name, Role, JoinDate, SupervisorID FROM Employee WHERE EmployeeID = %s"
+
+# The managers above an employee, top first
+CHAIN_SQL = """
+    SELECT e.EmployeeID, e.Name, e.Role
+    FROM EmployeeClosure c
+    JOIN Employee e ON e.EmployeeID = c.AncestorID
+    WHERE c.DescendantID = %s AND c.Depth > 0
+    ORDER BY c.Depth DESC
+"""
+
+# Grouped by team head: the manager (own bookings only) and each direct report (their whole team)
+_HEADS = """
+    FROM EmployeeClosure head
+    JOIN EmployeeClosure worker
+      ON worker.AncestorID = head.DescendantID AND (head.Depth = 1 OR worker.Depth = 0)
+"""
+
+TEAM_MEMBERS_SQL = f"""
+    SELECT head.DescendantID, COUNT(*) AS Members, MAX(worker.Depth) AS Levels
+    {_HEADS}
+    WHERE head.AncestorID = %s AND head.Depth <= 1
+    GROUP BY head.DescendantID
+"""
+
+# Answered from idx_booking_employee_cost (EmployeeID, TotalCost) without reading Booking rows
+TEAM_BOOKINGS_SQL = f"""
+    SELECT head.DescendantID, COUNT(*) AS Bookings, SUM(b.TotalCost) AS Revenue
+    {_HEADS}
+    JOIN Booking b ON b.EmployeeID = worker.DescendantID
+    WHERE head.AncestorID = %s AND head.Depth <= 1
+    GROUP BY head.DescendantID
+"""
+
+# A booking can have a review per passenger, so ratings are summed apart from revenue
+TEAM_RATINGS_SQL = f"""
+    SELECT head.DescendantID, COUNT(*) AS Reviews, SUM(r.Rating) AS RatingSum
+    {_HEADS}
+    JOIN Booking b ON b.EmployeeID = worker.DescendantID
+    JOIN Review r ON r.BookingID = b.BookingID
+    WHERE head.AncestorID = %s AND head.Depth <= 1
+    GROUP BY head.DescendantID
+"""
+
+MANAGERS_SQL = """
+    SELECT e.EmployeeID, e.Name, e.Role, COUNT(*) - 1 AS TeamSize, MAX(c.Depth) AS Levels
+    FROM EmployeeClosure c
+    JOIN Employee e ON e.EmployeeID = c.AncestorID
+    GROUP BY e.EmployeeID, e.Name, e.Role
+    HAVING COUNT(*) > 1
+    ORDER BY TeamSize DESC, e.Name
+"""
+
+_PATHS = """
+    WITH RECURSIVE paths (AncestorID, DescendantID, Depth) AS (
+        SELECT EmployeeID, EmployeeID, 0 FROM Employee
+        UNION ALL
+        SELECT paths.AncestorID, e.EmployeeID, paths.Depth + 1
+        FROM paths
+        JOIN Employee e ON e.SupervisorID = paths.DescendantID
+        WHERE paths.Depth < 1000
+    )
+"""
+
+REBUILD_SQL = f"INSERT INTO EmployeeClosure (AncestorID, DescendantID, Depth) {_PATHS} SELECT * FROM paths"
+
+# (AncestorID, DescendantID, expected depth, stored depth); None where the row is missing or extra
+DRIFT_SQL = f"""
+    {_PATHS}
+    SELECT p.AncestorID, p.DescendantID, p.Depth, c.Depth
+    FROM paths p
+    LEFT JOIN EmployeeClosure c ON c.AncestorID = p.AncestorID AND c.DescendantID = p.DescendantID
+    WHERE c.Depth IS NULL OR c.Depth <> p.Depth
+    UNION ALL
+    SELECT c.AncestorID, c.DescendantID, NULL, c.Depth
+    FROM EmployeeClosure c
+    LEFT JOIN paths p ON p.AncestorID = c.AncestorID AND p.DescendantID = c.DescendantID
+    WHERE p.AncestorID IS NULL
+    ORDER BY 1, 2
+"""
+
+
+def _fetch(conn, sql, params=(), records=False):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+        return fetch_records(cursor) if records else cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def _money(value):
+    return Decimal(str(value or 0)).quantize(Decimal("0.01"))
+
+
+def _totals(bookings=0, revenue=0, reviews=0, rating_sum=0):
+    return {
+        "bookings": bookings,
+        "revenue": _money(revenue),
+        "reviews": reviews,
+        "rating": round(Decimal(str(rating_sum)) / reviews, 2) if reviews else None,
+        "rating_sum": rating_sum,
+    }
+
+
+def team_performance(conn, employee_id):
+    """Bookings, revenue and ratings of everyone under an employee; None if there is no such employee.
+
+    ``own`` is the employee's own bookings and ``subteams`` holds each direct
+    report with their whole team; together they make up the team totals.
+    """
+    employees = _fetch(conn, EMPLOYEE_SQL, (employee_id,), records=True)
+    if not employees:
+        return None
+    bookings = {head: (count, revenue)
+                for head, count, revenue in _fetch(conn, TEAM_BOOKINGS_SQL, (employee_id,))}
+    ratings = {head: (reviews, rating_sum)
+               for head, reviews, rating_sum in _fetch(conn, TEAM_RATINGS_SQL, (employee_id,))}
+    own = _totals()
+    subteams = []
+    for head, members, levels in _fetch(conn, TEAM_MEMBERS_SQL, (employee_id,)):
+        totals = _totals(*bookings.get(head, (0, 0)), *ratings.get(head, (0, 0)))
+        if head == employee_id:
+            own = totals
+        else:
+            totals.update(EmployeeID=head, members=members, levels=levels)
+            subteams.append(totals)
+
+    names = {}
+    if subteams:
+        ids = [team["EmployeeID"] for team in subteams]
+        names = {row[0]: row[1:] for row in _fetch(
+            conn, f"SELECT EmployeeID, Name, Role FROM Employee WHERE EmployeeID IN ({', '.join(['%s'] * len(ids))})",
+            tuple(ids))}
+    for team in subteams:
+        team["Name"], team["Role"] = names.get(team["EmployeeID"], ("", ""))
+    subteams.sort(key=lambda team: (-team["revenue"], team["Name"]))
+
+    team = _totals(own["bookings"] + sum(t["bookings"] for t in subteams),
+                   own["revenue"] + sum((t["revenue"] for t in subteams), Decimal("0.00")),
+                   own["reviews"] + sum(t["reviews"] for t in subteams),
+                   own["rating_sum"] + sum(t["rating_sum"] for t in subteams))
+    team.update(
+        employee=employees[0],
+        chain=_fetch(conn, CHAIN_SQL, (employee_id,), records=True),
+        members=sum(t["members"] for t in subteams),
+        levels=max((t["levels"] + 1 for t in subteams), default=0),
+        own=own,
+        subteams=subteams,
+    )
+    return team
+
+
+def managers(conn):
+    """(EmployeeID, Name, Role, TeamSize, Levels) of everyone with reports, largest team first."""
+    return _fetch(conn, MANAGERS_SQL)
+
+
+def rebuild_closure(conn):
+    """Refills EmployeeClosure from Employee.SupervisorID. Does not commit; returns the row count."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM EmployeeClosure")
+        cursor.execute(REBUILD_SQL)
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+
+def find_drift(conn):
+    """Returns the EmployeeClosure rows that are missing, extra or at the wrong depth."""
+    return _fetch(conn, DRIFT_SQL)
+
+
+def main(argv=None):
+    from src.database import create_connection
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    check_parser = subcommands.add_parser("check", help="compare EmployeeClosure with Employee.SupervisorID")
+    check_parser.add_argument("--fix", action="store_true", help="rebuild EmployeeClosure if it drifted")
+    check_parser.add_argument("--show", type=int, default=20, help="drifted rows to list (0 = all)")
+    args = parser.parse_args(argv)
+
+    conn = create_connection()
+    try:
+        drift = find_drift(conn)
+        if args.fix and drift:
+            rows = rebuild_closure(conn)
+            conn.commit()
+    finally:
+        conn.close()
+
+    if not drift:
+        print("EmployeeClosure matches the management tree.")
+        return 0
+    print(f"{len(drift)} EmployeeClosure row(s) out of step with the management tree:")
+    print(f"{'AncestorID':>10} {'DescendantID':>12} {'Expected':>9} {'Stored':>9}")
+    for ancestor, descendant, expected, stored in drift[:args.show or None]:
+        print(f"{ancestor:>10} {descendant:>12} {str(expected):>9} {str(stored):>9}")
+    if args.fix:
+        print(f"Rebuilt EmployeeClosure ({rows} rows).")
+        return 0
+    return 1  # non-zero so scheduled checks can alert on drift
+
+
+if __name__ == "__main__":
+    sys.exit(main())
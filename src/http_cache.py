@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""Rendered-page caching with ETags and precompressed bodies.
+
+Two kinds of page are kept in memory once rendered:
+
+``sql_file_page()`` serves the SQL scripts behind /schema, /populate and
+/queries. A page is rendered once per version of its file (mtime and size),
+so a repeat view is a stat() call, and browsers may reuse it for
+SQL_PAGE_MAX_AGE seconds.
+
+The browse routes pass their streamed page through ``store_browse_page()``.
+The finished body is cached for BROWSE_PAGE_CACHE_TTL seconds, keyed by the
+table and the query string. Any write event naming the table, or a table
+whose triggers write it (see src/write_events.py), makes the table's cached
+pages unreachable. Like the
+itinerary cache, each worker process has its own copy, so a write seen by
+another worker only reaches this one once the TTL runs out.
+
+Every cached page gets a strong ETag, and gzip (and brotli, if the optional
+``brotli`` package is installed) copies compressed once when it is stored.
+``cached_response()`` sends the encoding the client accepts, or a 304 when
+its If-None-Match still matches. Pages rendered while flash messages are
+waiting are neither served from nor stored in the cache.
+"""
+import gzip
+import hashlib
+import os
+import threading
+
+from flask import current_app, render_template, request, session
+
+from src.cache import TTLCache
+from src.write_events import subscribe
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# --- HTTP cache settings (override with environment variables) ---
+SQL_PAGE_MAX_AGE = int(os.environ.get("SQL_PAGE_MAX_AGE", 300)) # Seconds browsers may reuse /schema etc. unchecked
+BROWSE_PAGE_CACHE_TTL = float(os.environ.get("BROWSE_PAGE_CACHE_TTL", 30)) # Seconds a browse page is served (0 = off)
+BROWSE_PAGE_CACHE_SIZE = int(os.environ.get("BROWSE_PAGE_CACHE_SIZE", 256)) # Browse pages kept per process
+COMPRESS_MIN_BYTES = 1024  # Smaller bodies are not worth compressing
+
+_file_pages = {}  # (path, title) -> ((mtime_ns, size), CachedBody)
+_file_pages_lock = threading.Lock()
+
+_browse_cache = None
+_browse_cache_lock = threading.Lock()
+_generation = 0  # bumped by writes to unknown tables
+_table_generations = {}  # lower-cased table name -> bumped by writes to that table
+
+
+class CachedBody:
+    """A rendered page with its ETag and compressed copies (by Content-Encoding)."""
+
+    __slots__ = ("body", "etag", "encoded", "mimetype")
+
+    def __init__(self, body, mimetype="text/html"):
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.mimetype = mimetype
+        self.encoded = {}
+        if len(body) >= COMPRESS_MIN_BYTES:
+            # mtime=0 keeps the gzip bytes (and so their ETag) the same across processes
+            self.encoded["gzip"] = gzip.compress(body, compresslevel=6, mtime=0)
+            if brotli is not None:
+                self.encoded["br"] = brotli.compress(body)
+
+
+def flashes_pending():
+    # Without a session cookie there is nothing to flash (and the response need not vary on Cookie)
+    if current_app.config["SESSION_COOKIE_NAME"] not in request.cookies:
+        return False
+    return bool(session.get("_flashes"))
+
+
+def cached_response(cached, cache_control):
+    """Response for a CachedBody in the best encoding the client accepts; 304 if its ETag matches."""
+    encoding = request.accept_encodings.best_match([e for e in ("br", "gzip") if e in cached.encoded])
+    # A strong ETag names one exact byte sequence, so each encoding has its own
+    etag = cached.etag if encoding is None else f"{cached.etag}-{encoding}"
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(cached.encoded.get(encoding, cached.body), mimetype=cached.mimetype)
+        if encoding is not None:
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+# --- SQL file pages ---
+
+def sql_file_page(path, title):
+    """Serves a SQL file through view_sql.html, rendering it again only when the file changes.
+
+    Raises FileNotFoundError when the file does not exist.
+    """
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    if flashes_pending():
+        with open(path, "r") as f:
+            return render_template("view_sql.html", title=title, sql_content=f.read())
+
+    key = (path, title)
+    entry = _file_pages.get(key)
+    if entry is None or entry[0] != version:
+        with open(path, "r") as f:
+            body = render_template("view_sql.html", title=title, sql_content=f.read()).encode("utf-8")
+        entry = (version, CachedBody(body))
+        with _file_pages_lock:
+            _file_pages[key] = entry
+    return cached_response(entry[1], f"public, max-age={SQL_PAGE_MAX_AGE}")
+
+
+# --- Browse pages ---
+
+def get_browse_cache():
+    """Returns the browse page cache, or None when it is turned off."""
+    global _browse_cache
+    if BROWSE_PAGE_CACHE_TTL <= 0:
+        return None
+    if _browse_cache is None:
+        with _browse_cache_lock:
+            if _browse_cache is None:
+                _browse_cache = TTLCache(maxsize=BROWSE_PAGE_CACHE_SIZE, ttl=BROWSE_PAGE_CACHE_TTL)
+    return _browse_cache
+
+
+def browse_page_key(table_name):
+    """Cache key for the current request's page of a table; None when it must not be cached.
+
+    The key carries the table's write generation, so after a write the old
+    pages are never looked up again (they age out of the LRU).
+    """
+    if get_browse_cache() is None or flashes_pending():
+        return None
+    table = table_name.lower()
+    return ("browse", table, _generation, _table_generations.get(table, 0), request.query_string)
+
+
+def get_browse_page(key):
+    """A cached browse page as a response, or None on a miss."""
+    cached = get_browse_cache().get(key)
+    if cached is None:
+        return None
+    # Browsers must check back, since a write elsewhere may have changed the table
+    return cached_response(cached, "private, no-cache")
+
+
+def store_browse_page(key, chunks):
+    """Passes the chunks of a streamed page through and caches the page once all were sent.
+
+    Nothing is stored if rendering fails or the client goes away part way.
+    """
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    get_browse_cache().set(key, CachedBody("".join(parts).encode("utf-8")))
+
+
+@subscribe
+def invalidate_browse_pages(tables, passenger_ids):
+    """Write listener: retires the cached pages of the written tables (all of them if unknown)."""
+    global _generation
+    if tables is None:
+        _generation += 1
+        return
+    for table in tables:
+        _table_generations[table] = _table_generations.get(table, 0) + 1
+
+
+def clear():
+    """Drops every cached page (SQL files and browse pages)."""
+    with _file_pages_lock:
+        _file_pages.clear()
+    cache = get_browse_cache()
+    if cache is not None:
+        cache.clear()
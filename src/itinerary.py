@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""Loads a passenger's itinerary one component at a time.
+
+A single query that LEFT JOINs both BookingAccommodation and
+BookingTransportation onto a booking returns accommodations x transports rows
+per booking, which then have to be de-duplicated in Python. Here every
+component is fetched by its own indexed query, driven from
+BookingPassenger(PassengerID), so each row comes back exactly once:
+
+    1. the passenger's bookings (+ agent name)
+    2. their accommodations (+ accommodation and location)
+    3. their transportation legs (+ transport type)
+    4. flight / car rental / cruise details, only for the kinds actually present
+
+Assembly is a single pass over each result set, keyed by BookingID and
+BookingTransportationID. Rows stay the named tuples the queries return
+(src/rows.py): accommodations are used as they are, and a transport leg and
+its details become one record, instead of copying every row into dicts.
+
+Steps 1-4 run in one read-only transaction on one connection, so they all
+see the same snapshot: a booking committed in between cannot show up in one
+result and not in another. The page looks up the passenger row alongside
+them on a second pooled connection (``load_itinerary_concurrently``).
+
+Assembled itineraries are cached per passenger (see ``get_cached_itinerary``)
+and dropped whenever a write touches a table the page shows.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+
+from src.cache import FileCache, TTLCache
+from src.fanout import fan_out_queries
+from src.rows import fetch_record, fetch_records, merge_records
+from src.write_events import subscribe
+
+# --- Itinerary cache settings (override with environment variables) ---
+ITINERARY_CACHE = os.environ.get("ITINERARY_CACHE", "memory") # "memory", "file" or "off"
+ITINERARY_CACHE_TTL = float(os.environ.get("ITINERARY_CACHE_TTL", 300)) # Seconds an entry may be served
+ITINERARY_CACHE_SIZE = int(os.environ.get("ITINERARY_CACHE_SIZE", 2048)) # Passengers kept (memory backend)
+ITINERARY_CACHE_DIR = os.environ.get("ITINERARY_CACHE_DIR",
+                                     os.path.join(tempfile.gettempdir(), "travel_agency_itinerary_cache"))
+
+# Every table whose rows appear on the itinerary page (lower-cased, as write events report them)
+ITINERARY_TABLES = {
+    "passenger", "booking", "bookingpassenger", "bookingaccommodation", "bookingtransportation",
+    "employee", "accommodation", "location", "transportationtype", "flight", "carrental", "cruise",
+}
+
+_cache = None
+_cache_lock = threading.Lock()
+_generation = 0  # bumped on every invalidation, guards against caching a load that raced a write
+
+BOOKINGS_SQL = """
+    SELECT b.BookingID, b.GroupName, b.Purpose, b.BookingDate, b.TotalCost, b.Status,
+           e.Name AS AgentName
+    FROM BookingPassenger bp
+    JOIN Booking b ON bp.BookingID = b.BookingID
+    LEFT JOIN Employee e ON b.EmployeeID = e.EmployeeID
+    WHERE bp.PassengerID = %s
+    ORDER BY b.BookingDate DESC, b.BookingID
+"""
+
+ACCOMMODATIONS_SQL = """
+    SELECT ba.BookingID, ba.BookingAccommodationID, ba.CheckInDate, ba.CheckOutDate, ba.Cost,
+           acc.Name, acc.Type, loc.City, loc.Country
+    FROM BookingPassenger bp
+    JOIN BookingAccommodation ba ON bp.BookingID = ba.BookingID
+    LEFT JOIN Accommodation acc ON ba.AccommodationID = acc.AccommodationID
+    LEFT JOIN Location loc ON acc.LocationID = loc.LocationID
+    WHERE bp.PassengerID = %s
+    ORDER BY ba.BookingID, ba.CheckInDate, ba.BookingAccommodationID
+"""
+
+TRANSPORTATIONS_SQL = """
+    SELECT bt.BookingID, bt.BookingTransportationID, bt.Cost, tt.Name AS TransportType
+    FROM BookingPassenger bp
+    JOIN BookingTransportation bt ON bp.BookingID = bt.BookingID
+    LEFT JOIN TransportationType tt ON bt.TransportTypeID = tt.TransportTypeID
+    WHERE bp.PassengerID = %s
+    ORDER BY bt.BookingTransportationID
+"""
+
+FLIGHTS_SQL = """
+    SELECT bt.BookingTransportationID,
+           f.FlightNumber, f.Carrier, f.DepartureDateTime, f.ArrivalDateTime, f.Class, f.Fare,
+           src.City AS SourceCity, src.Country AS SourceCountry,
+           dst.City AS DestCity, dst.Country AS DestCountry
+    FROM BookingPassenger bp
+    JOIN BookingTransportation bt ON bp.BookingID = bt.BookingID
+    JOIN Flight f ON bt.FlightID = f.FlightID
+    LEFT JOIN Location src ON f.SourceLocationID = src.LocationID
+    LEFT JOIN Location dst ON f.DestLocationID = dst.LocationID
+    WHERE bp.PassengerID = %s
+"""
+
+CAR_RENTALS_SQL = """
+    SELECT bt.BookingTransportationID,
+           cr.Company, cr.CarType, cr.PickupDateTime, cr.DropoffDateTime, cr.Rent,
+           pick.City AS PickupCity, pick.Country AS PickupCountry,
+           dropoff.City AS DropoffCity, dropoff.Country AS DropoffCountry
+    FROM BookingPassenger bp
+    JOIN BookingTransportation bt ON bp.BookingID = bt.BookingID
+    JOIN CarRental cr ON bt.CarRentalID = cr.CarRentalID
+    LEFT JOIN Location pick ON cr.PickupLocationID = pick.LocationID
+    LEFT JOIN Location dropoff ON cr.DropoffLocationID = dropoff.LocationID
+    WHERE bp.PassengerID = %s
+"""
+
+CRUISES_SQL = """
+    SELECT bt.BookingTransportationID,
+           cru.CruiseName, cru.Line, cru.DepartureDate, cru.ReturnDate, cru.Fare,
+           src.City AS SourceCity, src.Country AS SourceCountry,
+           dst.City AS DestCity, dst.Country AS DestCountry
+    FROM BookingPassenger bp
+    JOIN BookingTransportation bt ON bp.BookingID = bt.BookingID
+    JOIN Cruise cru ON bt.CruiseID = cru.CruiseID
+    LEFT JOIN Location src ON cru.SourceLocationID = src.LocationID
+    LEFT JOIN Location dst ON cru.DestLocationID = dst.LocationID
+    WHERE bp.PassengerID = %s
+"""
+
+# Transport type name -> query returning that kind's details keyed by BookingTransportationID
+DETAIL_QUERIES = {
+    "Flight": FLIGHTS_SQL,
+    "Car Rental": CAR_RENTALS_SQL,
+    "Cruise": CRUISES_SQL,
+}
+
+
+def load_passenger(conn, passenger_id):
+    """Returns the Passenger row as a record, or None if it does not exist."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT * FROM Passenger WHERE PassengerID = %s", (passenger_id,))
+        return fetch_record(cursor)
+    finally:
+        cursor.close()
+
+
+def _fetch_all(conn, sql, passenger_id, extra=()):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, (passenger_id,))
+        return fetch_records(cursor, extra)
+    finally:
+        cursor.close()
+
+
+def load_bookings(conn, passenger_id):
+    """Booking records with empty "accommodations" and "transportations" lists for assembly."""
+    return _fetch_all(conn, BOOKINGS_SQL, passenger_id, extra=("accommodations", "transportations"))
+
+
+def load_accommodations(conn, passenger_id):
+    return _fetch_all(conn, ACCOMMODATIONS_SQL, passenger_id)
+
+
+def load_transportations(conn, passenger_id):
+    """Returns (legs, {(transport type, BookingTransportationID): details})."""
+    legs = _fetch_all(conn, TRANSPORTATIONS_SQL, passenger_id)
+    # Only query the detail tables for kinds this passenger actually travels on
+    details = {}
+    for kind in {leg.TransportType for leg in legs} & DETAIL_QUERIES.keys():
+        for row in _fetch_all(conn, DETAIL_QUERIES[kind], passenger_id):
+            details[(kind, row.BookingTransportationID)] = row
+    return legs, details
+
+
+def assemble_itinerary(bookings, accommodation_rows, transportations):
+    """Files the component rows under the bookings from load_bookings(), one pass over each.
+
+    Accommodations are the query's records; a transport leg with details is
+    the leg's fields followed by those of its detail row.
+    """
+    if not bookings:
+        return []
+    by_id = {booking.BookingID: booking for booking in bookings}
+
+    # Rows of a booking that is not in the list (only possible if the results came
+    # from different snapshots) are left out rather than failing the page
+    for row in accommodation_rows:
+        booking = by_id.get(row.BookingID)
+        if booking is not None:
+            booking.accommodations.append(row)
+
+    legs, details = transportations
+    for leg in legs:
+        booking = by_id.get(leg.BookingID)
+        if booking is None:
+            continue
+        extra = details.get((leg.TransportType, leg.BookingTransportationID))
+        # The detail row starts with BookingTransportationID, which the leg already has
+        booking.transportations.append(leg if extra is None else merge_records(leg, extra, skip=1))
+
+    return bookings
+
+
+
+def load_itinerary(conn, passenger_id):
+    """Returns the passenger's bookings, each with its accommodations and transportations.
+
+    The result has the shape the itinerary template has always used: a list of booking
+    records (newest first) carrying "accommodations" and "transportations" lists.
+    The queries run in one read-only transaction (or in the caller's, if one is open).
+    """
+    own_transaction = not conn.in_transaction
+    if own_transaction:
+        conn.start_transaction(consistent_snapshot=True, readonly=True)
+    try:
+        booking_rows = load_bookings(conn, passenger_id)
+        if not booking_rows:
+            return []
+        return assemble_itinerary(booking_rows, load_accommodations(conn, passenger_id),
+                                  load_transportations(conn, passenger_id))
+    finally:
+        if own_transaction:
+            conn.rollback()  # nothing was written; just ends the snapshot
+
+
+def load_itinerary_concurrently(conn_factory, passenger_id):
+    """(passenger, bookings) like load_passenger() + load_itinerary(), run side by side.
+
+    The passenger row and the itinerary each run on their own connection from
+    ``conn_factory`` (see src/fanout.py). Returns None when no connection could
+    be obtained; the first error is raised.
+    """
+    results = fan_out_queries(conn_factory, {
+        "passenger": lambda conn: load_passenger(conn, passenger_id),
+        "bookings": lambda conn: load_itinerary(conn, passenger_id),
+    })
+    if results is None:
+        return None
+    for value, error in results.values():
+        if error is not None:
+            raise error
+    passenger = results["passenger"][0]
+    if not passenger:
+        return None, []
+    return passenger, results["bookings"][0]
+
+
+# --- Cached read model ---
+
+def get_itinerary_cache():
+    """Returns the configured itinerary cache, or None when caching is off."""
+    global _cache
+    if ITINERARY_CACHE == "off":
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                if ITINERARY_CACHE == "file":
+                    _cache = FileCache(ITINERARY_CACHE_DIR, ttl=ITINERARY_CACHE_TTL)
+                else:
+                    _cache = TTLCache(maxsize=ITINERARY_CACHE_SIZE, ttl=ITINERARY_CACHE_TTL)
+    return _cache
+
+
+def itinerary_etag(passenger, bookings):
+    """Validator for the rendered page: changes whenever the underlying data does."""
+    return hashlib.sha1(repr((passenger, bookings)).encode("utf-8")).hexdigest()
+
+
+def get_cached_itinerary(conn_factory, passenger_id):
+    """Returns {"passenger", "bookings", "etag"} for a passenger, from cache when possible.
+
+    ``conn_factory`` is only called on a cache miss. Returns None when no
+    connection could be obtained; for an unknown passenger the entry's
+    "passenger" is None (that outcome is not cached).
+    """
+    cache = get_itinerary_cache()
+    key = ("itinerary", passenger_id)
+    if cache is not None:
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+
+    generation = _generation
+    loaded = load_itinerary_concurrently(conn_factory, passenger_id)
+    if loaded is None:
+        return None
+    passenger, bookings = loaded
+    if not passenger:
+        return {"passenger": None, "bookings": [], "etag": None}
+
+    entry = {"passenger": passenger, "bookings": bookings, "etag": itinerary_etag(passenger, bookings)}
+    # Skip the store if a write was committed while we were reading
+    if cache is not None and generation == _generation:
+        cache.set(key, entry)
+    return entry
+
+
+@subscribe
+def invalidate_itineraries(tables, passenger_ids):
+    """Write listener: drops cached itineraries a write may have changed."""
+    global _generation
+    if tables is not None and not (tables & ITINERARY_TABLES):
+        return
+    _generation += 1
+    cache = get_itinerary_cache()
+    if cache is None:
+        return
+    if passenger_ids is not None:
+        for passenger_id in passenger_ids:
+            cache.delete(("itinerary", passenger_id))
+    else:
+        # A free-form write (e.g. via /execute_sql) can affect any passenger
+        cache.clear()
@@ -1,58 +1,97 @@
 # -*- coding: utf-8 -*-
+import csv
 import sys
 import os
-from collections import defaultdict
+import re
+import tempfile
+import uuid
 
 # Ensure the project root is in the Python path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from flask import Flask, render_template, request, redirect, url_for, flash, abort
-from src.database import db, init_app, MYSQL_USER, MYSQL_PASSWORD, MYSQL_HOST, MYSQL_PORT, DATABASE_NAME
-from sqlalchemy.sql import text
-import mysql.connector
+from flask import (Flask, render_template, stream_template, request, redirect, url_for, flash, abort, jsonify,
+                   make_response, send_from_directory, session, get_flashed_messages)
+from src.database import (init_app, get_backend, get_db, MYSQL_HOST, MYSQL_PORT, DATABASE_NAME,
+                          DB_BACKEND, SQLITE_PATH)
+from src.pool import PoolTimeout
+from src.browse import TABLES as BROWSE_TABLES, BrowseError, TablePage, parse_page_args
+from src.console import (ConsoleError, ConsoleQuery, check_estimate, iter_csv, iter_json,
+                         MAX_ROWS as CONSOLE_MAX_ROWS, MAX_BYTES as CONSOLE_MAX_BYTES,
+                         DOWNLOAD_MAX_ROWS as CONSOLE_DOWNLOAD_MAX_ROWS, TIMEOUT_MS as CONSOLE_TIMEOUT_MS,
+                         EXPLAIN_MAX_ROWS as CONSOLE_EXPLAIN_MAX_ROWS)
+from src.bookings import BOOKING_TABLES, BookingBatchError, create_bookings
+from src.itinerary import get_cached_itinerary
+from src.http_cache import browse_page_key, get_browse_page, sql_file_page, store_browse_page
+from src.fanout import FanoutTimeout, fan_out
+from src.passenger_import import ImportStats, PassengerError, guess_format, import_file, validate_passenger
+from src.metrics import (init_app as init_metrics, instrument_connection, render_prometheus, timed,
+                         slow_queries as recent_slow_queries)
+from src.availability import AvailabilityError, get_availability_index, search_availability
+from src.route_search import RouteSearchError, get_flight_graph, search_routes
+from src.routing import read_own_writes
+from src.rollups import get_freshness, refresh as refresh_rollups, run_reports
+from src import hierarchy, period_reports
+from src.period_reports import PeriodError, parse_period_args
+from src.write_events import is_read_only, notify_write
 from mysql.connector import Error
 
-app = Flask(__name__, template_folder="templates", static_folder="static")
-app.secret_key = os.urandom(24)
+# NumPy-backed modules (src/quotes.py, src/search.py) are imported by the routes that use them
 
-# Initialize database
-try:
+# Session cookie signing key; set it when several worker processes serve the app,
+# or a flash message set by one worker cannot be read by the next
+SECRET_KEY = os.environ.get("SECRET_KEY")
+
+def _build_app():
+    """Creates and configures the Flask app without touching the database.
+
+    The database is checked (and created) and the connection pool opened by
+    the first request of each process, so importing this module is cheap and
+    a pre-fork server (e.g. ``gunicorn --preload -w 4 src.main:app``) forks
+    workers that share no connections.
+    """
+    app = Flask(__name__, template_folder="templates", static_folder="static")
+    app.secret_key = SECRET_KEY or os.urandom(24)
     init_app(app)
-except SystemExit as e:
-    print(f"Failed to initialize database connection: {e}")
-    sys.exit(1)
-
-# --- SQLAlchemy Models (Keep for reference/potential future use, but direct SQL used for transactions) ---
-class Location(db.Model):
-    __tablename__ = "Location"
-    LocationID = db.Column(db.Integer, primary_key=True)
-    City = db.Column(db.String(100), nullable=False)
-    State = db.Column(db.String(100))
-    Country = db.Column(db.String(100), nullable=False)
-
-class Passenger(db.Model):
-    __tablename__ = "Passenger"
-    PassengerID = db.Column(db.Integer, primary_key=True)
-    Name = db.Column(db.String(255), nullable=False)
-    Gender = db.Column(db.String(10))
-    Age = db.Column(db.Integer)
-    Email = db.Column(db.String(255), unique=True)
-    Phone = db.Column(db.String(20))
+    # Per-request timings, query counts and the slow-query log behind /metrics
+    init_metrics(app)
+    return app
+
+# The routes below are registered on this instance
+app = _build_app()
+
+def create_app():
+    """Returns the application, for factory-style servers (``gunicorn 'src.main:create_app()'``) and tests.
+
+    The routes are registered on the module-level ``app``, so there is one app
+    per process and every call returns that same instance, not a new one.
+    """
+    return app
+
+# Shown on the console page; SQLite's EXPLAIN has no row estimates, so "EXPLAIN first" is MySQL only
+CONSOLE_LIMITS = {"rows": CONSOLE_MAX_ROWS, "bytes": CONSOLE_MAX_BYTES, "timeout_ms": CONSOLE_TIMEOUT_MS,
+                  "explain_rows": CONSOLE_EXPLAIN_MAX_ROWS if DB_BACKEND == "mysql" else None}
+
+# Reject files of uploaded passenger imports, offered for download on the result page
+IMPORT_REJECTS_DIR = os.environ.get("PASSENGER_IMPORT_REJECTS_DIR",
+                                    os.path.join(tempfile.gettempdir(), "passenger_import_rejects"))
 
 # --- Helper Functions ---
-def get_mysql_conn():
-    """Establishes a direct connection to the MySQL database."""
+def get_mysql_conn(read_only=False, passenger_id=None):
+    """Checks out a pooled connection from the DB_BACKEND in use (conn.close() returns it).
+
+    Pass read_only=True for work that only reads: on MySQL it may then be
+    served by a replica (see src/routing.py), unless this session or
+    ``passenger_id`` wrote something recently; on SQLite it gets one of the
+    read-only connections.
+    """
     try:
-        conn = mysql.connector.connect(
-            host=MYSQL_HOST,
-            user=MYSQL_USER,
-            password=MYSQL_PASSWORD,
-            database=DATABASE_NAME,
-            port=MYSQL_PORT
-        )
-        return conn
-    except Error as e:
-        print(f"Error connecting to MySQL Database: {e}")
+        with timed("connect"):
+            conn = get_backend().connect(read_only, passenger_id)
+        # Queries on it are timed and counted against the current request
+        return instrument_connection(conn)
+    except (Error, PoolTimeout, RuntimeError) as e:
+        # RuntimeError: the first-use database check failed (retried on the next request)
+        print(f"Error connecting to the database: {e}")
         flash(f"Database connection error: {e}", "error")
         return None
 
@@ -63,17 +102,15 @@ def fetch_table_data(table_name, limit=100):
     rows = []
     columns = []
     try:
-        conn = get_mysql_conn()
+        conn = get_mysql_conn(read_only=True)
         if conn is None: return [], []
         
-        cursor = conn.cursor(dictionary=True)
+        # Tuple cursor: rows are already in column order, no per-row dict to rebuild
+        cursor = conn.cursor()
         # Use backticks for table names to handle potential reserved keywords
         cursor.execute(f"SELECT * FROM `{table_name}` LIMIT %s", (limit,))
-        rows_dict = cursor.fetchall()
-        if rows_dict:
-            columns = list(rows_dict[0].keys())
-            # Convert each row dictionary to a list of values in column order
-            rows = [[row[col] for col in columns] for row in rows_dict]
+        rows = cursor.fetchall()
+        columns = [desc[0] for desc in cursor.description]
     except Error as e:
         flash(f"Error fetching data from {table_name}: {e}", "error")
     finally:
@@ -83,19 +120,74 @@ def fetch_table_data(table_name, limit=100):
             conn.close()
     return rows, columns
 
+def browse_table(table_name, title):
+    """Streams one keyset-paginated page of a table into view_table.html.
+
+    Supports ?cols= (projection), ?sort= / ?dir= (indexed columns only),
+    ?limit= (page size) and ?after= (cursor returned by the previous page).
+    Finished pages are cached briefly, until a write to the table (see
+    src/http_cache.py).
+    """
+    spec = BROWSE_TABLES[table_name]
+    try:
+        page_args = parse_page_args(table_name, request.args)
+    except BrowseError as e:
+        flash(str(e), "error")
+        return redirect(url_for(request.endpoint))
+    cache_key = browse_page_key(table_name)
+    if cache_key is not None:
+        cached = get_browse_page(cache_key)
+        if cached is not None:
+            return cached
+
+    conn = get_mysql_conn(read_only=True)
+    if conn is None:
+        return render_template("view_table.html", title=title, page=None, rows=[], columns=[],
+                               table_name=table_name, pk_column=spec["pk"])
+    try:
+        page = TablePage(conn, table_name, **page_args)
+    except Error as e:
+        conn.close()
+        flash(f"Error fetching data from {table_name}: {e}", "error")
+        return render_template("view_table.html", title=title, page=None, rows=[], columns=[],
+                               table_name=table_name, pk_column=spec["pk"])
+
+    # The session cookie goes out before the streamed body shows any flash messages, so take
+    # them off the session now (the template gets the same list back)
+    get_flashed_messages(with_categories=True)
+    # Rows are pulled off the cursor while the template is being sent
+    chunks = stream_template("view_table.html", title=title, page=page, rows=page.rows, columns=page.columns,
+                             table_name=table_name, pk_column=spec["pk"], sortable=spec["sortable"],
+                             all_columns=spec["columns"])
+    if cache_key is not None:
+        chunks = store_browse_page(cache_key, chunks)
+    response = app.response_class(chunks, mimetype="text/html")
+    response.call_on_close(page.close)
+    return response
+
+@app.template_global()
+def page_url(**overrides):
+    """URL for the current page with some query args replaced (None drops an arg)."""
+    args = request.args.to_dict()
+    for key, value in overrides.items():
+        if value is None:
+            args.pop(key, None)
+        else:
+            args[key] = value
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
+
 # --- Routes ---
 @app.route("/")
 def index():
     return render_template("index.html")
 
+# The SQL scripts shown below are re-rendered only when the file changes (see src/http_cache.py)
+SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sql")
+
 @app.route("/schema")
 def view_schema():
     try:
-        schema_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 
-                        "sql", "create_schema_mysql.sql")
-        with open(schema_path, "r") as f:
-            schema_sql = f.read()
-        return render_template("view_sql.html", title="Database Schema (MySQL)", sql_content=schema_sql)
+        return sql_file_page(os.path.join(SQL_DIR, "create_schema_mysql.sql"), "Database Schema (MySQL)")
     except FileNotFoundError:
         flash("MySQL Schema file not found.", "error")
         return redirect(url_for("index"))
@@ -103,11 +195,7 @@ def view_schema():
 @app.route("/populate")
 def view_populate():
     try:
-        populate_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 
-                          "sql", "populate_data_mysql.sql")
-        with open(populate_path, "r") as f:
-            populate_sql = f.read()
-        return render_template("view_sql.html", title="Database Population Data (MySQL)", sql_content=populate_sql)
+        return sql_file_page(os.path.join(SQL_DIR, "populate_data_mysql.sql"), "Database Population Data (MySQL)")
     except FileNotFoundError:
         flash("MySQL Population script not found.", "error")
         return redirect(url_for("index"))
@@ -115,85 +203,90 @@ def view_populate():
 @app.route("/queries")
 def view_queries():
     try:
-        queries_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 
-                         "sql", "complex_queries.sql")
-        with open(queries_path, "r") as f:
-            queries_sql = f.read()
-        return render_template("view_sql.html", title="Complex Queries", sql_content=queries_sql)
+        return sql_file_page(os.path.join(SQL_DIR, "complex_queries.sql"), "Complex Queries")
     except FileNotFoundError:
         flash("Complex queries file not found.", "error")
         return redirect(url_for("index"))
 
 @app.route("/execute_sql", methods=["GET", "POST"])
 def execute_sql():
-    result = None
-    error = None
-    sql_command = ""
-    columns = []
-
-    if request.method == "POST":
-        sql_command = request.form.get("sql_command", "").strip()
-        action = request.form.get("action", "")
-        
-        if not sql_command:
-            flash("No SQL command provided.", "warning")
-            return render_template("execute_sql.html", 
-                                 result=result, 
-                                 error=error, 
-                                 sql_command=sql_command, 
-                                 columns=columns)
-
-        conn = None
-        cursor = None
-        try:
-            conn = get_mysql_conn()
-            if conn is None:
-                return render_template("execute_sql.html", 
-                                     result=result, 
-                                     error="Database connection failed", 
-                                     sql_command=sql_command, 
-                                     columns=columns)
-
-            cursor = conn.cursor(dictionary=True)
-
-            if action == "execute_script":
-                flash("Multi-statement execution not supported via this interface.", "warning")
-            elif action == "execute_query" and sql_command:
-                # Basic check for potentially modifying commands
-                is_select = sql_command.lower().strip().startswith("select") or sql_command.lower().strip().startswith("show") or sql_command.lower().strip().startswith("describe")
-                
-                cursor.execute(sql_command)
-                
-                if is_select and cursor.description:
-                    result = cursor.fetchall()
-                    if result:
-                        columns = list(result[0].keys())
-                        flash(f"Query executed successfully. Found {len(result)} rows.", "success")
-                    else:
-                        columns = [desc[0] for desc in cursor.description]
-                        flash("Query executed, but returned no results.", "info")
-                else:
-                    conn.commit()
-                    flash(f"Command executed successfully. Rows affected: {cursor.rowcount}", "success")
-            else:
-                flash("Invalid action or empty command.", "warning")
-
-        except Error as e:
-            error = f"MySQL Error: {e}"
-            flash(error, "error")
-            if conn:
-                conn.rollback()
-        finally:
-            if cursor:
-                cursor.close()
-            if conn and conn.is_connected():
-                conn.close()
+    """Runs one statement; result rows are streamed, capped and subject to a statement timeout.
 
-    return render_template("execute_sql.html", 
-                         result=result, 
-                         error=error, 
-                         sql_command=sql_command, 
-                         columns=columns)
+    action=download_csv / download_json streams the whole result (up to
+    CONSOLE_DOWNLOAD_MAX_ROWS) as a file instead, and explain_first=1 refuses
+    queries EXPLAIN expects to examine more than CONSOLE_EXPLAIN_MAX_ROWS rows.
+    """
+    sql_command = ""
+    explain_first = False
+
+    def render_console(query=None, error=None):
+        return render_template("execute_sql.html", query=query, error=error, sql_command=sql_command,
+                               explain_first=explain_first, limits=CONSOLE_LIMITS)
+
+    if request.method == "GET":
+        return render_console()
+
+    sql_command = request.form.get("sql_command", "").strip().rstrip(";").strip()
+    action = request.form.get("action", "")
+    explain_first = request.form.get("explain_first") == "1"
+
+    if not sql_command:
+        flash("No SQL command provided.", "warning")
+        return render_console()
+    if action == "execute_script":
+        flash("Multi-statement execution not supported via this interface.", "warning")
+        return render_console()
+    if action not in ("execute_query", "download_csv", "download_json"):
+        flash("Invalid action or empty command.", "warning")
+        return render_console()
+
+    # Statements that only read can run on a replica; the KILL for an abandoned one goes to the same server
+    conn = get_mysql_conn(read_only=is_read_only(sql_command))
+    if conn is None:
+        return render_console(error="Database connection failed")
+
+    download = action != "execute_query"
+    try:
+        if explain_first:
+            check_estimate(conn, sql_command)
+        query = ConsoleQuery(conn, sql_command,
+                             max_rows=CONSOLE_DOWNLOAD_MAX_ROWS if download else CONSOLE_MAX_ROWS,
+                             max_bytes=0 if download else CONSOLE_MAX_BYTES,
+                             kill_conn_factory=conn.pool.connect)
+    except ConsoleError as e:
+        conn.close()
+        flash(str(e), "warning")
+        return render_console()
+    except Error as e:
+        if conn.is_connected():
+            conn.close()
+        error = f"Database Error: {e}"
+        flash(error, "error")
+        return render_console(error=error)
+
+    if query.columns is None:
+        flash(f"Command executed successfully. Rows affected: {query.rowcount}", "success")
+        return render_console()
+
+    if not query.read_only:
+        # The statement commits while the body is streamed, after the session cookie has gone out
+        read_own_writes()
+    if download:
+        extension, mimetype, body = (("csv", "text/csv", iter_csv(query)) if action == "download_csv"
+                                     else ("json", "application/json", iter_json(query)))
+        response = app.response_class(body, mimetype=mimetype)
+        response.headers["Content-Disposition"] = f'attachment; filename="query_result.{extension}"'
+    else:
+        # Rows go out as they are read; the row count and any truncation are shown after the table.
+        # Flash messages are taken off the session now, as for the browse pages
+        get_flashed_messages(with_categories=True)
+        response = app.response_class(
+            stream_template("execute_sql.html", query=query, error=None, sql_command=sql_command,
+                            explain_first=explain_first, limits=CONSOLE_LIMITS),
+            mimetype="text/html")
+    # Abandoned streams (client went away) cancel the query
+    response.call_on_close(query.close)
+    return response
 
 # --- Transaction Operations ---
 @app.route("/add_passenger", methods=["GET", "POST"])
@@ -205,21 +298,12 @@ def add_passenger():
         email = request.form.get("email")
         phone = request.form.get("phone")
 
-        # Basic Validation
-        if not name:
-            flash("Passenger name is required.", "error")
+        # Same rules as the bulk import and the booking API
+        try:
+            val = validate_passenger(name, gender, age_str, email, phone)
+        except PassengerError as e:
+            flash(str(e), "error")
             return render_template("add_passenger.html", form_data=request.form)
-        
-        age = None
-        if age_str:
-            try:
-                age = int(age_str)
-                if not (0 < age < 120):
-                    flash("Invalid age provided.", "error")
-                    return render_template("add_passenger.html", form_data=request.form)
-            except ValueError:
-                flash("Age must be a number.", "error")
-                return render_template("add_passenger.html", form_data=request.form)
 
         conn = None
         cursor = None
@@ -231,10 +315,9 @@ def add_passenger():
             
             cursor = conn.cursor()
             sql = "INSERT INTO Passenger (Name, Gender, Age, Email, Phone) VALUES (%s, %s, %s, %s, %s)"
-            # Handle potentially empty optional fields
-            val = (name, gender if gender else None, age, email if email else None, phone if phone else None)
             cursor.execute(sql, val)
             conn.commit()
+            notify_write({"Passenger"}, passenger_ids={cursor.lastrowid})
             flash(f"Passenger ", "success")
             return redirect(url_for("view_passengers"))
 
@@ -256,12 +339,72 @@ def add_passenger():
     # GET request
     return render_template("add_passenger.html", form_data={})
 
+@app.route("/import_passengers", methods=["GET", "POST"])
+def import_passengers():
+    """Bulk passenger import: upserts an uploaded CSV / JSON Lines file on Email."""
+    if request.method == "GET":
+        return render_template("import_passengers.html", result=None)
+    upload = request.files.get("file")
+    if upload is None or not upload.filename:
+        flash("Choose a CSV or JSON Lines file to import.", "error")
+        return render_template("import_passengers.html", result=None)
+    fmt = request.form.get("format") or guess_format(upload.filename)
+    if fmt not in ("csv", "jsonl"):
+        flash("Unknown file format.", "error")
+        return render_template("import_passengers.html", result=None)
+
+    conn = get_mysql_conn()
+    if conn is None:
+        return render_template("import_passengers.html", result=None)
+    os.makedirs(IMPORT_REJECTS_DIR, exist_ok=True)
+    rejects_name = f"rejects-{uuid.uuid4().hex}.csv"
+    rejects_path = os.path.join(IMPORT_REJECTS_DIR, rejects_name)
+    stats = ImportStats()
+
+    def progress(stats):
+        print(f"Passenger import {upload.filename}: {stats.read:,} read, {stats.rejected:,} rejected")
+
+    try:
+        with open(rejects_path, "w", newline="") as rejects:
+            import_file(conn, upload.stream, fmt, rejects, progress=progress, stats=stats)
+    except PassengerError as e:
+        flash(str(e), "error")
+    except (Error, UnicodeDecodeError, csv.Error) as e:
+        # csv.Error: e.g. an unclosed quote running into the field size limit; the rest of the file can't be trusted
+        flash(f"Import stopped after {stats.batches} saved batch(es): {e}", "error")
+    finally:
+        if conn.is_connected():
+            conn.close()
+        if stats.batches:
+            notify_write({"Passenger"})
+    if not stats.rejected and os.path.exists(rejects_path):
+        os.remove(rejects_path)
+        rejects_name = None
+    return render_template("import_passengers.html", result=stats.as_dict(), filename=upload.filename,
+                           rejects_name=rejects_name)
+
+@app.route("/import_passengers/rejects/<name>")
+def import_rejects(name):
+    """Downloads the reject file of an earlier import."""
+    if not re.fullmatch(r"rejects-[0-9a-f]{32}\.csv", name):
+        abort(404)
+    return send_from_directory(IMPORT_REJECTS_DIR, name, mimetype="text/csv", as_attachment=True)
+
 @app.route("/available_options")
 def available_options():
     """Lists available accommodations and flights."""
-    accommodations_rows, accommodations_columns = fetch_table_data("Accommodation", limit=200) # Increase limit if needed
-    flights_rows, flights_columns = fetch_table_data("Flight", limit=200) # Increase limit if needed
-    
+    # Both sections are loaded concurrently; one that fails or times out is shown empty
+    sections = fan_out({
+        "accommodations": lambda: fetch_table_data("Accommodation", limit=200), # Increase limit if needed
+        "flights": lambda: fetch_table_data("Flight", limit=200), # Increase limit if needed
+    })
+    for name, (result, error) in sections.items():
+        if error is not None:
+            flash(f"Error fetching {name}: {error}", "error")
+            sections[name] = ([], []), None
+    (accommodations_rows, accommodations_columns), _ = sections["accommodations"]
+    (flights_rows, flights_columns), _ = sections["flights"]
+
     return render_template("available_options.html", 
                            accommodations_rows=accommodations_rows, 
                            accommodations_columns=accommodations_columns,
@@ -271,208 +414,349 @@ def available_options():
 @app.route("/passenger_itinerary/<int:passenger_id>")
 def passenger_itinerary(passenger_id):
     """Displays the full itinerary for a given passenger."""
-    conn = None
-    cursor = None
-    passenger = None
-    bookings_data = defaultdict(lambda: {"details": None, "accommodations": [], "transportations": []})
+    try:
+        # Bookings, accommodations and each transport kind are fetched with separate indexed
+        # queries, run concurrently (see src/itinerary.py), and cached per passenger until a
+        # write touches them
+        itinerary = get_cached_itinerary(lambda: get_mysql_conn(read_only=True, passenger_id=passenger_id),
+                                         passenger_id)
+    except (Error, FanoutTimeout, ConnectionError) as e:
+        flash(f"Error fetching itinerary: {e}", "error")
+        # Optionally log the error
+        print(f"Database error fetching itinerary for passenger {passenger_id}: {e}")
+        return redirect(url_for("view_passengers"))
 
+    if itinerary is None:
+        return redirect(url_for("view_passengers")) # Redirect if DB connection fails
+    if itinerary["passenger"] is None:
+        flash(f"Passenger with ID {passenger_id} not found.", "error")
+        return redirect(url_for("view_passengers"))
+
+    # Repeat views of unchanged data cost a 304 (unless there are flash messages to show)
+    etag = itinerary["etag"]
+    if request.if_none_match.contains_weak(etag) and not session.get("_flashes"):
+        response = app.response_class(status=304)
+    else:
+        response = make_response(render_template("passenger_itinerary.html",
+                                                 passenger=itinerary["passenger"],
+                                                 bookings=itinerary["bookings"]))
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@app.route("/api/routes")
+def api_routes():
+    """Flight itineraries between two locations (IDs or city names), with connections.
+
+    ?from=&to=&depart_after= are required; optional depart_before,
+    optimize=earliest|cheapest, max_connections, min_layover / max_layover
+    (minutes) and limit.
+    """
     try:
-        conn = get_mysql_conn()
-        if conn is None:
-            return redirect(url_for("view_passengers")) # Redirect if DB connection fails
+        graph = get_flight_graph(get_mysql_conn)
+    except Error as e:
+        return jsonify({"error": f"Error loading flights: {e}"}), 500
+    if graph is None:
+        return jsonify({"error": "Database connection failed"}), 503
+    try:
+        return jsonify(search_routes(graph, request.args))
+    except RouteSearchError as e:
+        return jsonify({"error": str(e)}), 400
 
-        cursor = conn.cursor(dictionary=True)
 
-        # 1. Fetch Passenger Details
-        cursor.execute("SELECT * FROM Passenger WHERE PassengerID = %s", (passenger_id,))
-        passenger = cursor.fetchone()
-        if not passenger:
-            flash(f"Passenger with ID {passenger_id} not found.", "error")
-            return redirect(url_for("view_passengers"))
+@app.route("/api/availability", methods=["GET", "POST"])
+def api_availability():
+    """Cheapest free accommodations for a city (or location) and date range.
+
+    GET takes one query as ?city= (or ?location_id=), ?check_in=, ?check_out=
+    and ?limit=; POST takes a batch as {"queries": [{...}, ...]}.
+    """
+    if request.method == "POST":
+        queries = (request.get_json(silent=True) or {}).get("queries")
+    else:
+        queries = [request.args.to_dict()]
+    try:
+        index = get_availability_index(get_mysql_conn)
+    except Error as e:
+        return jsonify({"error": f"Error loading availability: {e}"}), 500
+    if index is None:
+        return jsonify({"error": "Database connection failed"}), 503
+    try:
+        return jsonify(search_availability(index, queries))
+    except AvailabilityError as e:
+        return jsonify({"error": str(e)}), 400
 
-        # 2. Fetch Itinerary Details (Bookings, Accommodations, Transportations)
-        # This complex query joins all relevant tables to get a flat list of itinerary components
-        sql = """
-        SELECT 
-            b.BookingID, b.GroupName, b.Purpose, b.BookingDate, b.TotalCost, b.Status,
-            e.Name AS AgentName,
-            ba.BookingAccommodationID, ba.CheckInDate, ba.CheckOutDate, ba.Cost AS AccommodationCost,
-            acc.Name AS AccommodationName, acc.Type AS AccommodationType,
-            acc_loc.City AS AccommodationCity, acc_loc.Country AS AccommodationCountry,
-            bt.BookingTransportationID, bt.Cost AS TransportCost,
-            tt.Name AS TransportType,
-            f.FlightID, f.FlightNumber, f.Carrier, f.DepartureDateTime AS FlightDeparture, f.ArrivalDateTime AS FlightArrival, f.Class AS FlightClass, f.Fare AS FlightFare,
-            fl_src.City AS FlightSourceCity, fl_src.Country AS FlightSourceCountry,
-            fl_dest.City AS FlightDestCity, fl_dest.Country AS FlightDestCountry,
-            cr.CarRentalID, cr.Company AS CarCompany, cr.CarType, cr.PickupDateTime AS CarPickup, cr.DropoffDateTime AS CarDropoff, cr.Rent AS CarRent,
-            cr_pick.City AS CarPickupCity, cr_pick.Country AS CarPickupCountry,
-            cr_drop.City AS CarDropoffCity, cr_drop.Country AS CarDropoffCountry,
-            cru.CruiseID, cru.CruiseName, cru.Line AS CruiseLine, cru.DepartureDate AS CruiseDeparture, cru.ReturnDate AS CruiseReturn, cru.Fare AS CruiseFare,
-            cru_src.City AS CruiseSourceCity, cru_src.Country AS CruiseSourceCountry,
-            cru_dest.City AS CruiseDestCity, cru_dest.Country AS CruiseDestCountry
-        FROM Passenger p
-        JOIN BookingPassenger bp ON p.PassengerID = bp.PassengerID
-        JOIN Booking b ON bp.BookingID = b.BookingID
-        LEFT JOIN Employee e ON b.EmployeeID = e.EmployeeID
-        LEFT JOIN BookingAccommodation ba ON b.BookingID = ba.BookingID
-        LEFT JOIN Accommodation acc ON ba.AccommodationID = acc.AccommodationID
-        LEFT JOIN Location acc_loc ON acc.LocationID = acc_loc.LocationID
-        LEFT JOIN BookingTransportation bt ON b.BookingID = bt.BookingID
-        LEFT JOIN TransportationType tt ON bt.TransportTypeID = tt.TransportTypeID
-        LEFT JOIN Flight f ON bt.FlightID = f.FlightID
-        LEFT JOIN Location fl_src ON f.SourceLocationID = fl_src.LocationID
-        LEFT JOIN Location fl_dest ON f.DestLocationID = fl_dest.LocationID
-        LEFT JOIN CarRental cr ON bt.CarRentalID = cr.CarRentalID
-        LEFT JOIN Location cr_pick ON cr.PickupLocationID = cr_pick.LocationID
-        LEFT JOIN Location cr_drop ON cr.DropoffLocationID = cr_drop.LocationID
-        LEFT JOIN Cruise cru ON bt.CruiseID = cru.CruiseID
-        LEFT JOIN Location cru_src ON cru.SourceLocationID = cru_src.LocationID
-        LEFT JOIN Location cru_dest ON cru.DestLocationID = cru_dest.LocationID
-        WHERE p.PassengerID = %s
-        ORDER BY b.BookingDate DESC, b.BookingID, ba.CheckInDate, bt.BookingTransportationID;
-        """
-        cursor.execute(sql, (passenger_id,))
-        results = cursor.fetchall()
-
-        # 3. Process and Structure the Results
-        processed_acc_ids = set()
-        processed_trans_ids = set()
-
-        for row in results:
-            booking_id = row["BookingID"]
-            
-            # Store booking details (only once per booking)
-            if bookings_data[booking_id]["details"] is None:
-                bookings_data[booking_id]["details"] = {
-                    "BookingID": booking_id,
-                    "GroupName": row["GroupName"],
-                    "Purpose": row["Purpose"],
-                    "BookingDate": row["BookingDate"],
-                    "TotalCost": row["TotalCost"],
-                    "Status": row["Status"],
-                    "AgentName": row["AgentName"]
-                }
-
-            # Add accommodation details (avoid duplicates)
-            acc_id = row["BookingAccommodationID"]
-            if acc_id is not None and acc_id not in processed_acc_ids:
-                bookings_data[booking_id]["accommodations"].append({
-                    "Name": row["AccommodationName"],
-                    "Type": row["AccommodationType"],
-                    "City": row["AccommodationCity"],
-                    "Country": row["AccommodationCountry"],
-                    "CheckInDate": row["CheckInDate"],
-                    "CheckOutDate": row["CheckOutDate"],
-                    "Cost": row["AccommodationCost"]
-                })
-                processed_acc_ids.add(acc_id)
-
-            # Add transportation details (avoid duplicates)
-            trans_id = row["BookingTransportationID"]
-            if trans_id is not None and trans_id not in processed_trans_ids:
-                transport_details = {
-                    "TransportType": row["TransportType"],
-                    "Cost": row["TransportCost"]
-                }
-                if row["TransportType"] == "Flight" and row["FlightID"] is not None:
-                    transport_details.update({
-                        "FlightNumber": row["FlightNumber"],
-                        "Carrier": row["Carrier"],
-                        "SourceCity": row["FlightSourceCity"], "SourceCountry": row["FlightSourceCountry"],
-                        "DestCity": row["FlightDestCity"], "DestCountry": row["FlightDestCountry"],
-                        "DepartureDateTime": row["FlightDeparture"],
-                        "ArrivalDateTime": row["FlightArrival"],
-                        "Class": row["FlightClass"],
-                        "Fare": row["FlightFare"]
-                    })
-                elif row["TransportType"] == "Car Rental" and row["CarRentalID"] is not None:
-                     transport_details.update({
-                        "Company": row["CarCompany"],
-                        "CarType": row["CarType"],
-                        "PickupCity": row["CarPickupCity"], "PickupCountry": row["CarPickupCountry"],
-                        "DropoffCity": row["CarDropoffCity"], "DropoffCountry": row["CarDropoffCountry"],
-                        "PickupDateTime": row["CarPickup"],
-                        "DropoffDateTime": row["CarDropoff"],
-                        "Rent": row["CarRent"]
-                    })
-                elif row["TransportType"] == "Cruise" and row["CruiseID"] is not None:
-                     transport_details.update({
-                        "CruiseName": row["CruiseName"],
-                        "Line": row["CruiseLine"],
-                        "SourceCity": row["CruiseSourceCity"], "SourceCountry": row["CruiseSourceCountry"],
-                        "DestCity": row["CruiseDestCity"], "DestCountry": row["CruiseDestCountry"],
-                        "DepartureDate": row["CruiseDeparture"],
-                        "ReturnDate": row["CruiseReturn"],
-                        "Fare": row["CruiseFare"]
-                    })
-                # Add other transport types if necessary
-                
-                bookings_data[booking_id]["transportations"].append(transport_details)
-                processed_trans_ids.add(trans_id)
 
+@app.route("/api/quotes")
+def api_quotes():
+    """Cheapest flight + hotel (+ car, + cruise) packages to a destination.
+
+    ?from=&to=&depart_from= are required; optional depart_to, nights,
+    car=1, cruise=1 and limit. Hotels already booked for the stay are skipped.
+    """
+    from src.quotes import QuoteError, get_quote_catalog, quote_packages
+    try:
+        catalog = get_quote_catalog(get_mysql_conn)
+        availability = get_availability_index(get_mysql_conn)
     except Error as e:
-        flash(f"Error fetching itinerary: {e}", "error")
-        # Optionally log the error
-        print(f"Database error fetching itinerary for passenger {passenger_id}: {e}")
-        return redirect(url_for("view_passengers"))
-    finally:
-        if cursor:
-            cursor.close()
-        if conn and conn.is_connected():
-            conn.close()
+        return jsonify({"error": f"Error loading fares: {e}"}), 500
+    if catalog is None or availability is None:
+        return jsonify({"error": "Database connection failed"}), 503
+    try:
+        return jsonify(quote_packages(catalog, request.args, availability.is_free))
+    except QuoteError as e:
+        return jsonify({"error": str(e)}), 400
+
 
-    # Convert defaultdict to a list of booking dictionaries for the template
-    structured_bookings = [data["details"] | {"accommodations": data["accommodations"], "transportations": data["transportations"]} 
-                           for data in bookings_data.values() if data["details"]]
+@app.route("/search")
+def search():
+    """Ranked search over reviews, accommodations, passengers and flights (?q=&type=&page=)."""
+    from src.search import SOURCE_NAMES as SEARCH_TYPES, SearchError, get_search_index, run_search
+    if not request.args.get("q", "").strip():
+        return render_template("search.html", search=None, types=SEARCH_TYPES)
+    try:
+        index = get_search_index(get_mysql_conn)
+        if index is None:
+            return render_template("search.html", search=None, types=SEARCH_TYPES)
+        result = run_search(index, request.args, lambda: get_mysql_conn(read_only=True))
+    except SearchError as e:
+        flash(str(e), "warning")
+        result = None
+    except ConnectionError:
+        result = None  # Flash message already set by get_mysql_conn
+    except Error as e:
+        flash(f"Error searching: {e}", "error")
+        result = None
+    return render_template("search.html", search=result, types=SEARCH_TYPES)
 
-    return render_template("passenger_itinerary.html", passenger=passenger, bookings=structured_bookings)
+
+@app.route("/api/search")
+def api_search():
+    """BM25-ranked matches for ?q= with prefix and typo tolerance.
+
+    Optional type (comma-separated: review, accommodation, passenger,
+    flight), page and per_page.
+    """
+    from src.search import SearchError, get_search_index, run_search
+    try:
+        index = get_search_index(get_mysql_conn)
+    except Error as e:
+        return jsonify({"error": f"Error loading the search index: {e}"}), 500
+    if index is None:
+        return jsonify({"error": "Database connection failed"}), 503
+    try:
+        return jsonify(run_search(index, request.args, lambda: get_mysql_conn(read_only=True)))
+    except SearchError as e:
+        return jsonify({"error": str(e)}), 400
+    except ConnectionError as e:
+        return jsonify({"error": str(e)}), 503
+    except Error as e:
+        return jsonify({"error": f"Error loading results: {e}"}), 500
+
+
+@app.route("/api/bookings", methods=["POST"])
+def api_bookings():
+    """Creates one booking, or {"bookings": [...]}, with passengers, legs and payments.
+
+    Everything is written in one transaction. Per-item problems are listed
+    under "errors"; unless "all_or_nothing" is false, any of them means
+    nothing is written.
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
+    items = payload["bookings"] if "bookings" in payload else [payload]
+    conn = get_mysql_conn()
+    if conn is None:
+        return jsonify({"error": "Database connection failed"}), 503
+    try:
+        result, passenger_ids = create_bookings(conn, items, payload.get("all_or_nothing", True) is not False)
+    except BookingBatchError as e:
+        return jsonify({"error": str(e)}), 400
+    except Error as e:
+        return jsonify({"error": f"Failed to create bookings: {e}"}), 500
+    finally:
+        if conn.is_connected():
+            conn.close()
+    if passenger_ids is not None:
+        notify_write(BOOKING_TABLES, passenger_ids=passenger_ids)
+    return jsonify(result), 201 if result["created"] else 400
+
+
+@app.route("/pool_stats")
+def pool_stats():
+    """Connection pool counters (in-use, waits, wait time) for sizing the pool."""
+    return jsonify(get_backend().stats())
+
+@app.route("/metrics")
+def metrics():
+    """Request, query and pool counters in the Prometheus text format."""
+    return app.response_class(render_prometheus(get_backend().stats()),
+                              mimetype="text/plain; version=0.0.4")
+
+@app.route("/metrics/slow_queries")
+def slow_queries():
+    """The most recent statements slower than SLOW_QUERY_MS, with their parameters."""
+    return jsonify(recent_slow_queries())
+
+
+@app.route("/reports")
+def reports():
+    """Analytics reports read from the rollup fact tables, with when they were last refreshed."""
+    conn = get_mysql_conn(read_only=True)
+    if conn is None:
+        return render_template("reports.html", reports=[], freshness=None)
+    try:
+        freshness = get_freshness(conn)
+        results = run_reports(conn)
+    except Error as e:
+        flash(f"Error loading reports (has sql/analytics_rollups.sql been applied?): {e}", "error")
+        freshness, results = None, []
+    finally:
+        if conn.is_connected():
+            conn.close()
+    return render_template("reports.html", reports=results, freshness=freshness)
+
+@app.route("/reports/monthly")
+def monthly_report():
+    """One month's bookings by purpose and weekday and its largest bookings (?year=&month=)."""
+    conn = get_mysql_conn(read_only=True)
+    if conn is None:
+        return render_template("monthly_report.html", report=None)
+    report = None
+    try:
+        year, month = parse_period_args(request.args, conn)
+        report = period_reports.monthly_report(conn, year, month)
+    except PeriodError as e:
+        flash(str(e), "warning")
+    except Error as e:
+        flash(f"Error loading the monthly report (has sql/date_dimension.sql been applied?): {e}", "error")
+    finally:
+        if conn.is_connected():
+            conn.close()
+    return render_template("monthly_report.html", report=report)
+
+@app.route("/reports/quarterly")
+def quarterly_report():
+    """A year's bookings and revenue per quarter and month, with quarter-on-quarter growth (?year=)."""
+    conn = get_mysql_conn(read_only=True)
+    if conn is None:
+        return render_template("quarterly_report.html", report=None)
+    report = None
+    try:
+        year, _ = parse_period_args(request.args, conn, monthly=False)
+        report = period_reports.quarterly_report(conn, year)
+    except PeriodError as e:
+        flash(str(e), "warning")
+    except Error as e:
+        flash(f"Error loading the quarterly report (has sql/date_dimension.sql been applied?): {e}", "error")
+    finally:
+        if conn.is_connected():
+            conn.close()
+    return render_template("quarterly_report.html", report=report)
+
+@app.route("/reports/refresh", methods=["POST"])
+def refresh_reports():
+    """Folds every change since the last refresh into the fact tables (?full=1 rebuilds them)."""
+    conn = get_mysql_conn()
+    if conn is None:
+        return redirect(url_for("reports"))
+    try:
+        summary = refresh_rollups(conn, full=request.form.get("full") == "1")
+        read_own_writes()  # the redirect must not read the old report data from a replica
+        if summary["full"]:
+            flash(f"Rebuilt all report data in {summary['seconds']:.2f}s.", "success")
+        else:
+            flash(f"Refreshed {summary['days']} booking day(s) in {summary['seconds']:.2f}s.", "success")
+    except Error as e:
+        flash(f"Error refreshing reports: {e}", "error")
+    finally:
+        if conn.is_connected():
+            conn.close()
+    return redirect(url_for("reports"))
+
+@app.route("/team_performance")
+def team_overview():
+    """Lists everyone with reports, with the size and depth of their team."""
+    conn = get_mysql_conn(read_only=True)
+    if conn is None:
+        return render_template("team_performance.html", team=None, managers=[])
+    managers = []
+    try:
+        managers = hierarchy.managers(conn)
+    except Error as e:
+        flash(f"Error loading teams (has sql/employee_closure.sql been applied?): {e}", "error")
+    finally:
+        if conn.is_connected():
+            conn.close()
+    return render_template("team_performance.html", team=None, managers=managers)
+
+@app.route("/team_performance/<int:employee_id>")
+def team_performance(employee_id):
+    """Bookings, revenue and ratings of an employee's whole team, split by direct report."""
+    conn = get_mysql_conn(read_only=True)
+    if conn is None:
+        return redirect(url_for("view_employees"))
+    try:
+        # One join of the employee's EmployeeClosure rows with Booking, at any depth
+        team = hierarchy.team_performance(conn, employee_id)
+    except Error as e:
+        flash(f"Error loading team performance (has sql/employee_closure.sql been applied?): {e}", "error")
+        return redirect(url_for("team_overview"))
+    finally:
+        if conn.is_connected():
+            conn.close()
+    if team is None:
+        flash(f"Employee with ID {employee_id} not found.", "error")
+        return redirect(url_for("view_employees"))
+    return render_template("team_performance.html", team=team, managers=[])
 
 
 # --- Data Viewing Routes ---
 @app.route("/locations")
 def view_locations():
-    rows, columns = fetch_table_data("Location")
-    return render_template("view_table.html", title="Locations", rows=rows, columns=columns)
+    return browse_table("Location", "Locations")
 
 @app.route("/passengers")
 def view_passengers():
-    rows, columns = fetch_table_data("Passenger")
-    # Pass table name and primary key column name for itinerary link generation
-    return render_template("view_table.html", title="Passengers", rows=rows, columns=columns, table_name="Passenger", pk_column="PassengerID")
+    # Passenger rows get an itinerary link (keyed on the PassengerID column)
+    return browse_table("Passenger", "Passengers")
 
 @app.route("/employees")
 def view_employees():
-    rows, columns = fetch_table_data("Employee")
-    return render_template("view_table.html", title="Employees", rows=rows, columns=columns)
+    return browse_table("Employee", "Employees")
 
 @app.route("/flights")
 def view_flights():
-    rows, columns = fetch_table_data("Flight")
-    return render_template("view_table.html", title="Flights", rows=rows, columns=columns)
+    return browse_table("Flight", "Flights")
 
 @app.route("/bookings")
 def view_bookings():
-    rows, columns = fetch_table_data("Booking")
-    return render_template("view_table.html", title="Bookings", rows=rows, columns=columns)
+    return browse_table("Booking", "Bookings")
 
 # Add routes for other tables if needed (e.g., Accommodation, CarRental, Cruise)
 @app.route("/accommodations")
 def view_accommodations():
-    rows, columns = fetch_table_data("Accommodation")
-    return render_template("view_table.html", title="Accommodations", rows=rows, columns=columns)
+    return browse_table("Accommodation", "Accommodations")
 
 @app.route("/car_rentals")
 def view_car_rentals():
-    rows, columns = fetch_table_data("CarRental")
-    return render_template("view_table.html", title="Car Rentals", rows=rows, columns=columns)
+    return browse_table("CarRental", "Car Rentals")
 
 @app.route("/cruises")
 def view_cruises():
-    rows, columns = fetch_table_data("Cruise")
-    return render_template("view_table.html", title="Cruises", rows=rows, columns=columns)
+    return browse_table("Cruise", "Cruises")
 
 if __name__ == "__main__":
+    # The development server checks the database up front instead of on the first request
+    try:
+        get_backend()
+    except RuntimeError as e:
+        print(f"Failed to initialize database connection: {e}")
+        sys.exit(1)
     with app.app_context():
+        db = get_db()
         inspector = db.inspect(db.engine)
         if not inspector.has_table("Location"):
             print("Database tables not found!")
@@ -483,6 +767,9 @@ if __name__ == "__main__":
             print("Database tables exist. Starting application.")
 
     print(f"Flask app running on http://0.0.0.0:5000")
-    print(f"Connect to MySQL DB: {DATABASE_NAME} on {MYSQL_HOST}:{MYSQL_PORT}")
+    if DB_BACKEND == "sqlite":
+        print(f"Using SQLite database file: {SQLITE_PATH}")
+    else:
+        print(f"Connect to MySQL DB: {DATABASE_NAME} on {MYSQL_HOST}:{MYSQL_PORT}")
     # Turn off debug mode for production/safer testing
     app.run(host="0.0.0.0", port=5000, debug=False)
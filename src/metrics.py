@@ -0,0 +1,402 @@
+# -*- coding: utf-8 -*-
+"""Per-request timing, query counters and a slow-query log.
+
+``init_app()`` starts a ``RequestMetrics`` for every request and folds it
+into process-wide totals when the request ends (for streamed pages, once the
+last chunk has been sent). Each request's wall time is split into phases:
+
+    connect  checking a connection out of the pool (``timed("connect")``)
+    query    cursor.execute() / executemany()
+    fetch    reading result rows off the cursor
+    render   Jinja template rendering, minus any fetching done while streaming
+    python   everything else: request parsing, restructuring rows, ...
+
+Connections handed out by ``get_mysql_conn()`` are wrapped with
+``instrument_connection()`` so their cursors report into the current request.
+Totals are served in the Prometheus text format by ``render_prometheus()``,
+and statements slower than ``SLOW_QUERY_MS`` are printed and kept, with their
+parameters, in a small in-memory log.
+"""
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import g, request, template_rendered, before_render_template
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 200))  # Log statements slower than this
+SLOW_QUERY_LOG_SIZE = int(os.environ.get("SLOW_QUERY_LOG_SIZE", 100))  # Slow statements kept for /metrics/slow_queries
+SLOW_QUERY_SQL_CHARS = 2000  # Longer statements are truncated in the log
+
+PHASES = ("connect", "query", "fetch", "render", "python")
+
+# Upper bounds (seconds) of the request duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Endpoints not worth recording (and /metrics would otherwise count its own scrapes)
+SKIP_ENDPOINTS = {"static", "metrics", "slow_queries"}
+
+_current = contextvars.ContextVar("request_metrics", default=None)
+
+_lock = threading.Lock()
+_totals = {}  # route -> aggregated counters, see _route_totals()
+_slow_queries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+_slow_query_count = 0
+
+
+class RequestMetrics:
+    """Counters for one request; the cursors and template hooks add to it."""
+
+    def __init__(self, route):
+        self.route = route
+        self.started = time.perf_counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.queries = 0
+        self.rows = 0
+        self.bytes = 0
+        self.status = None
+        self.streamed = False
+        self._render_started = None
+
+    def add(self, phase, seconds):
+        self.phases[phase] += seconds
+
+    def start_render(self):
+        # Streamed templates fetch rows while rendering; that time is not rendering
+        self._render_started = (time.perf_counter(), self.phases["query"] + self.phases["fetch"])
+
+    def end_render(self):
+        if self._render_started is None:
+            return
+        started, db_before = self._render_started
+        self._render_started = None
+        db_during = self.phases["query"] + self.phases["fetch"] - db_before
+        self.phases["render"] += max(0.0, time.perf_counter() - started - db_during)
+
+    def finish(self):
+        """Total wall time; what no other phase accounts for is charged to "python"."""
+        total = time.perf_counter() - self.started
+        measured = sum(seconds for phase, seconds in self.phases.items() if phase != "python")
+        self.phases["python"] = max(0.0, total - measured)
+        return total
+
+
+def current():
+    """The metrics of the request being handled, or None outside a request."""
+    return _current.get()
+
+
+@contextmanager
+def timed(phase):
+    """Charges the time spent in the block to ``phase`` of the current request."""
+    metrics = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.add(phase, time.perf_counter() - started)
+
+
+def _log_slow_query(route, sql, params, seconds, rows):
+    global _slow_query_count
+    if len(sql) > SLOW_QUERY_SQL_CHARS:
+        sql = sql[:SLOW_QUERY_SQL_CHARS] + " ..."
+    entry = {
+        "at": datetime.now().isoformat(sep=" ", timespec="seconds"),
+        "route": route,
+        "ms": round(seconds * 1000, 3),
+        "rows": rows,
+        "sql": sql,
+        "params": [repr(p) for p in params] if params is not None else None,
+    }
+    with _lock:
+        _slow_queries.append(entry)
+        _slow_query_count += 1
+    print(f"Slow query ({entry['ms']:.1f} ms, {rows} rows, route {route}): {' '.join(sql.split())} "
+          f"params={entry['params']}")
+
+
+class InstrumentedCursor:
+    """Cursor proxy that times execute and fetch calls and counts rows.
+
+    A statement's time is its execute plus all fetches of its result; it is
+    checked against SLOW_QUERY_MS when the next statement starts or the
+    cursor is closed.
+    """
+
+    def __init__(self, raw, metrics):
+        self._raw = raw
+        self._metrics = metrics
+        self._statement = None  # [sql, params, seconds, rows]
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def _charge(self, phase, seconds, rows=0):
+        if self._metrics is not None:
+            self._metrics.add(phase, seconds)
+            self._metrics.rows += rows
+        if self._statement is not None:
+            self._statement[2] += seconds
+            self._statement[3] += rows
+
+    def _finish_statement(self):
+        statement, self._statement = self._statement, None
+        if statement is not None and statement[2] * 1000 >= SLOW_QUERY_MS:
+            route = self._metrics.route if self._metrics is not None else None
+            _log_slow_query(route, *statement)
+
+    def _start_statement(self, sql, params):
+        self._finish_statement()
+        self._statement = [sql, params, 0.0, 0]
+        if self._metrics is not None:
+            self._metrics.queries += 1
+
+    def execute(self, sql, params=None, *args, **kwargs):
+        self._start_statement(sql, params)
+        started = time.perf_counter()
+        try:
+            return self._raw.execute(sql, params, *args, **kwargs)
+        finally:
+            self._charge("query", time.perf_counter() - started)
+
+    def executemany(self, sql, seq_params, *args, **kwargs):
+        seq_params = list(seq_params)
+        self._start_statement(sql, seq_params[:5])
+        started = time.perf_counter()
+        try:
+            return self._raw.executemany(sql, seq_params, *args, **kwargs)
+        finally:
+            self._charge("query", time.perf_counter() - started)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._raw.fetchone()
+        self._charge("fetch", time.perf_counter() - started, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=1):
+        started = time.perf_counter()
+        rows = self._raw.fetchmany(size)
+        self._charge("fetch", time.perf_counter() - started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self._raw.fetchall()
+        self._charge("fetch", time.perf_counter() - started, len(rows))
+        return rows
+
+    def __iter__(self):
+        # Time each row read only, not the caller's work between rows
+        rows = iter(self._raw)
+        while True:
+            started = time.perf_counter()
+            try:
+                row = next(rows)
+            except StopIteration:
+                self._charge("fetch", time.perf_counter() - started)
+                return
+            self._charge("fetch", time.perf_counter() - started, 1)
+            yield row
+
+    def close(self):
+        self._finish_statement()
+        return self._raw.close()
+
+
+class InstrumentedConnection:
+    """Connection proxy whose cursors report into the request that checked it out."""
+
+    def __init__(self, raw, metrics):
+        self._raw = raw
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._raw.cursor(*args, **kwargs), self._metrics)
+
+    def close(self):
+        return self._raw.close()
+
+
+def instrument_connection(conn):
+    """Wraps ``conn`` so its queries are counted against the current request."""
+    return InstrumentedConnection(conn, _current.get())
+
+
+# --- Aggregation and export ---
+
+def _route_totals(route):
+    totals = _totals.get(route)
+    if totals is None:
+        totals = _totals[route] = {
+            "requests": {},  # status -> count
+            "buckets": [0] * len(DURATION_BUCKETS),
+            "seconds": 0.0,
+            "phases": dict.fromkeys(PHASES, 0.0),
+            "queries": 0,
+            "rows": 0,
+            "bytes": 0,
+        }
+    return totals
+
+
+def record(metrics):
+    """Folds one finished request into the process-wide totals."""
+    total = metrics.finish()
+    with _lock:
+        totals = _route_totals(metrics.route)
+        status = str(metrics.status or 500)
+        totals["requests"][status] = totals["requests"].get(status, 0) + 1
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if total <= bound:
+                totals["buckets"][i] += 1
+        totals["seconds"] += total
+        for phase, seconds in metrics.phases.items():
+            totals["phases"][phase] += seconds
+        totals["queries"] += metrics.queries
+        totals["rows"] += metrics.rows
+        totals["bytes"] += metrics.bytes
+
+
+def slow_queries():
+    """The most recent slow statements, newest first."""
+    with _lock:
+        return list(reversed(_slow_queries))
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus(pool_stats=None):
+    """All counters in the Prometheus text exposition format."""
+    with _lock:
+        snapshot = {route: {key: (dict(value) if isinstance(value, dict) else
+                                  list(value) if isinstance(value, list) else value)
+                            for key, value in totals.items()}
+                    for route, totals in _totals.items()}
+        slow_count = _slow_query_count
+
+    lines = []
+
+    def family(name, kind, help_text):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    family("travel_agency_requests_total", "counter", "Requests handled, by route and HTTP status.")
+    for route, totals in sorted(snapshot.items()):
+        for status, count in sorted(totals["requests"].items()):
+            lines.append(f'travel_agency_requests_total{{route="{_label(route)}",status="{status}"}} {count}')
+
+    family("travel_agency_request_duration_seconds", "histogram", "Request wall time, by route.")
+    for route, totals in sorted(snapshot.items()):
+        route_label = _label(route)
+        for bound, count in zip(DURATION_BUCKETS, totals["buckets"]):
+            lines.append(f'travel_agency_request_duration_seconds_bucket{{route="{route_label}",le="{bound}"}} {count}')
+        count = sum(totals["requests"].values())
+        lines.append(f'travel_agency_request_duration_seconds_bucket{{route="{route_label}",le="+Inf"}} {count}')
+        lines.append(f'travel_agency_request_duration_seconds_sum{{route="{route_label}"}} {totals["seconds"]:.6f}')
+        lines.append(f'travel_agency_request_duration_seconds_count{{route="{route_label}"}} {count}')
+
+    family("travel_agency_request_phase_seconds_total", "counter",
+           "Request wall time split into connect, query, fetch, render and python, by route.")
+    for route, totals in sorted(snapshot.items()):
+        for phase in PHASES:
+            lines.append(f'travel_agency_request_phase_seconds_total{{route="{_label(route)}",phase="{phase}"}} '
+                         f'{totals["phases"][phase]:.6f}')
+
+    for name, key, help_text in (
+            ("travel_agency_queries_total", "queries", "SQL statements executed, by route."),
+            ("travel_agency_rows_fetched_total", "rows", "Result rows read from the database, by route."),
+            ("travel_agency_response_bytes_total", "bytes", "Response body bytes sent, by route.")):
+        family(name, "counter", help_text)
+        for route, totals in sorted(snapshot.items()):
+            lines.append(f'{name}{{route="{_label(route)}"}} {totals[key]}')
+
+    family("travel_agency_slow_queries_total", "counter", f"Statements slower than {SLOW_QUERY_MS:g} ms.")
+    lines.append(f"travel_agency_slow_queries_total {slow_count}")
+
+    if pool_stats is not None:
+        for key in ("open", "idle", "in_use", "overflow"):
+            family(f"travel_agency_pool_{key}", "gauge", f"Connection pool: {key.replace('_', ' ')} connections.")
+            lines.append(f"travel_agency_pool_{key} {pool_stats[key]}")
+        for key in ("checkouts", "created", "recycled", "failed_pings", "waits", "timeouts"):
+            family(f"travel_agency_pool_{key}_total", "counter", f"Connection pool: {key.replace('_', ' ')}.")
+            lines.append(f"travel_agency_pool_{key}_total {pool_stats[key]}")
+        family("travel_agency_pool_wait_seconds_total", "counter", "Connection pool: time spent waiting.")
+        lines.append(f"travel_agency_pool_wait_seconds_total {pool_stats['wait_time_total']}")
+    return "\n".join(lines) + "\n"
+
+
+# --- Flask hooks ---
+
+def _count_bytes(chunks, metrics):
+    for chunk in chunks:
+        metrics.bytes += len(chunk)
+        yield chunk
+
+
+def _before_request():
+    if request.endpoint in SKIP_ENDPOINTS:
+        return
+    metrics = RequestMetrics(request.endpoint or "unmatched")
+    g.request_metrics = metrics
+    g.request_metrics_token = _current.set(metrics)
+
+
+def _after_request(response):
+    metrics = g.get("request_metrics")
+    if metrics is not None:
+        metrics.status = response.status_code
+        if response.is_streamed:
+            # The body (and the fetching inside it) is produced after the view returns:
+            # count it as it goes out and record once the server closes the response
+            metrics.streamed = True
+            response.response = _count_bytes(response.response, metrics)
+            response.call_on_close(lambda: record(metrics))
+        else:
+            metrics.bytes += response.calculate_content_length() or 0
+    return response
+
+
+def _teardown_request(exc):
+    metrics = g.get("request_metrics")
+    if metrics is None:
+        return
+    token = g.pop("request_metrics_token", None)
+    if token is not None:
+        try:
+            _current.reset(token)
+        except ValueError:
+            _current.set(None)
+    if not metrics.streamed:
+        record(metrics)
+
+
+def _on_before_render(sender, **extra):
+    metrics = g.get("request_metrics")
+    if metrics is not None:
+        metrics.start_render()
+
+
+def _on_rendered(sender, **extra):
+    metrics = g.get("request_metrics")
+    if metrics is not None:
+        metrics.end_render()
+
+
+def init_app(app):
+    """Registers the request hooks and template signals on ``app``."""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    before_render_template.connect(_on_before_render, app)
+    template_rendered.connect(_on_rendered, app)
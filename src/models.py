@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""SQLAlchemy models (kept for reference/potential future use, but direct SQL is used for transactions).
+
+Importing this module imports SQLAlchemy; the app itself never does.
+"""
+from src.database import get_db
+
+db = get_db()
+
+class Location(db.Model):
+    __tablename__ = "Location"
+    LocationID = db.Column(db.Integer, primary_key=True)
+    City = db.Column(db.String(100), nullable=False)
+    State = db.Column(db.String(100))
+    Country = db.Column(db.String(100), nullable=False)
+
+class Passenger(db.Model):
+    __tablename__ = "Passenger"
+    PassengerID = db.Column(db.Integer, primary_key=True)
+    Name = db.Column(db.String(255), nullable=False)
+    Gender = db.Column(db.String(10))
+    Age = db.Column(db.Integer)
+    Email = db.Column(db.String(255), unique=True)
+    Phone = db.Column(db.String(20))
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""Passenger validation, and bulk import of passengers from CSV or JSON Lines files.
+
+``validate_passenger()`` holds the rules /add_passenger applies (name
+required, age 1-119, known gender); the booking API and the importer use it
+too.
+
+An import reads its input as a stream and works through it in batches of
+``batch_size`` records, so memory does not grow with the file:
+
+    * each record is validated; invalid ones are written to a reject file
+      (line number, error and the original fields) instead of stopping the
+      import. Unlike /add_passenger, the importer needs an email: without
+      one a record has no key to be matched on,
+    * each batch is upserted on the unique Email with one multi-row
+      ``INSERT ... ON DUPLICATE KEY UPDATE`` and committed, so a failure
+      part-way leaves the earlier batches in place and the file can simply be
+      imported again. Blank fields never overwrite stored values.
+
+CSV files need a header row with at least name and email; column names are
+matched case-insensitively (name, gender, age, email, phone). From the command line:
+
+    python -m src.passenger_import travellers.csv --rejects rejects.csv
+    python -m src.passenger_import travellers.jsonl --batch-size 5000
+"""
+import argparse
+import codecs
+import csv
+import json
+import os
+import sys
+import time
+
+GENDERS = ("Male", "Female", "Other")
+FIELDS = ("name", "gender", "age", "email", "phone")
+
+BATCH_SIZE = int(os.environ.get("PASSENGER_IMPORT_BATCH", 1000))  # Records per upsert and commit
+PROGRESS_EVERY = 10000  # Records between progress reports
+
+UPSERT_SQL = """
+    INSERT INTO Passenger (Name, Gender, Age, Email, Phone) VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        Name = VALUES(Name),
+        Gender = COALESCE(VALUES(Gender), Gender),
+        Age = COALESCE(VALUES(Age), Age),
+        Phone = COALESCE(VALUES(Phone), Phone)
+"""
+
+EXISTING_SQL = "SELECT LOWER(Email) FROM Passenger WHERE Email IN ({emails})"
+
+
+class PassengerError(ValueError):
+    """Raised when passenger details break the validation rules."""
+
+
+def _clean(value):
+    value = "" if value is None else str(value).strip()
+    return value or None
+
+
+def validate_passenger(name, gender=None, age=None, email=None, phone=None, require_name=True):
+    """Checks one passenger's details; returns (Name, Gender, Age, Email, Phone) with blanks as None.
+
+    Raises PassengerError with a message fit to show the user.
+    """
+    name = _clean(name)
+    if name is None and require_name:
+        raise PassengerError("Passenger name is required.")
+    if name is not None and len(name) > 255:
+        raise PassengerError("Passenger name must be at most 255 characters.")
+    gender = _clean(gender)
+    if gender is not None:
+        matches = [known for known in GENDERS if known.lower() == gender.lower()]
+        if not matches:
+            raise PassengerError(f"Gender must be one of {', '.join(GENDERS)}.")
+        gender = matches[0]
+    if age in (None, ""):
+        age = None
+    else:
+        try:
+            age = int(age)
+        except (TypeError, ValueError):
+            raise PassengerError("Age must be a number.")
+        if not 0 < age < 120:
+            raise PassengerError("Invalid age provided.")
+    email = _clean(email)
+    if email is not None and ("@" not in email or len(email) > 255):
+        raise PassengerError("Invalid email address.")
+    phone = _clean(phone)
+    if phone is not None and len(phone) > 20:
+        raise PassengerError("Phone must be at most 20 characters.")
+    return name, gender, age, email, phone
+
+
+# --- Reading ---
+
+def _fields(record):
+    lowered = {str(key).strip().lower(): value for key, value in record.items() if key is not None}
+    return {field: None if lowered.get(field) is None else str(lowered[field]) for field in FIELDS}
+
+
+def read_csv(stream):
+    """Yields (line number, record, parse error or None) from CSV text lines."""
+    reader = csv.DictReader(stream)
+    if reader.fieldnames is None or not {"name", "email"} <= {f.strip().lower() for f in reader.fieldnames}:
+        raise PassengerError("The CSV file needs a header row with at least name and email columns.")
+    for record in reader:
+        if None in record:
+            yield reader.line_num, record, "Too many fields on this line."
+        else:
+            yield reader.line_num, record, None
+
+
+def read_jsonl(stream):
+    """Yields (line number, record, parse error or None) from JSON Lines text lines."""
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, {"raw": line.rstrip("\r\n")}, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield line_number, {"raw": line.rstrip("\r\n")}, "Each line must be a JSON object."
+        else:
+            yield line_number, record, None
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl}
+
+
+def guess_format(filename):
+    return "jsonl" if filename.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+# --- Importing ---
+
+class ImportStats:
+    """Counters for one import; ``as_dict()`` is what the route and CLI report."""
+
+    def __init__(self):
+        self.read = 0
+        self.inserted = 0
+        self.updated = 0
+        self.rejected = 0
+        self.batches = 0
+        self.started = time.perf_counter()
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def as_dict(self):
+        return {"read": self.read, "inserted": self.inserted, "updated": self.updated,
+                "rejected": self.rejected, "batches": self.batches, "seconds": round(self.elapsed(), 3)}
+
+
+class RejectWriter:
+    """Writes rejected records as CSV: line, error, the record's fields, and unparseable lines as raw."""
+
+    def __init__(self, stream):
+        self._writer = csv.writer(stream) if stream is not None else None
+        self._header_written = False
+
+    def write(self, line_number, record, error):
+        if self._writer is None:
+            return
+        if not self._header_written:
+            self._writer.writerow(("line", "error") + FIELDS + ("raw",))
+            self._header_written = True
+        fields = _fields(record)
+        self._writer.writerow((line_number, error) + tuple(fields[field] or "" for field in FIELDS)
+                              + (record.get("raw", ""),))
+
+
+def _upsert(conn, rows, stats):
+    # Emails repeated within a batch: the last one wins, as it would row by row
+    by_email = {row[3].lower(): row for row in rows}
+    rows = list(by_email.values())
+    cursor = conn.cursor()
+    try:
+        emails = [row[3] for row in rows]
+        cursor.execute(EXISTING_SQL.format(emails=", ".join(["%s"] * len(emails))), tuple(emails))
+        existing = {row[0] for row in cursor.fetchall()}
+        cursor.executemany(UPSERT_SQL, rows)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    stats.updated += len(existing)
+    stats.inserted += len(rows) - len(existing)
+    stats.batches += 1
+
+
+def import_passengers(conn, records, rejects=None, batch_size=BATCH_SIZE, progress=None, stats=None):
+    """Validates and upserts ``records`` from read_csv/read_jsonl, a batch per commit.
+
+    ``rejects`` is a text stream for the reject file (or None); ``progress``
+    is called with the ImportStats every PROGRESS_EVERY records. Returns the
+    ImportStats (``stats`` if given, so callers keep the counts when an error
+    propagates). A database error stops the import; the batches committed
+    before it stay.
+    """
+    stats = stats if stats is not None else ImportStats()
+    reject_writer = RejectWriter(rejects)
+    batch = []
+    for line_number, record, error in records:
+        stats.read += 1
+        if error is None:
+            fields = _fields(record)
+            try:
+                row = validate_passenger(**fields)
+                if row[3] is None:
+                    # Inserted again by every re-import: there is nothing to match it on
+                    raise PassengerError("An email is needed to import a passenger.")
+                batch.append(row)
+            except PassengerError as e:
+                error = str(e)
+        if error is not None:
+            stats.rejected += 1
+            reject_writer.write(line_number, record, error)
+        if len(batch) >= batch_size:
+            _upsert(conn, batch, stats)
+            batch = []
+        if progress is not None and stats.read % PROGRESS_EVERY == 0:
+            progress(stats)
+    if batch:
+        _upsert(conn, batch, stats)
+    return stats
+
+
+def import_file(conn, stream, fmt, rejects=None, batch_size=BATCH_SIZE, progress=None, stats=None):
+    """Imports a binary stream (e.g. an upload) in ``fmt`` ("csv" or "jsonl"), decoding it line by line."""
+    lines = codecs.iterdecode(stream, "utf-8-sig")
+    return import_passengers(conn, READERS[fmt](lines), rejects, batch_size, progress, stats)
+
+
+def main(argv=None):
+    from src.database import create_connection
+    from src.write_events import notify_write
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="CSV or JSON Lines file ('-' for standard input)")
+    parser.add_argument("--format", choices=sorted(READERS), help="default: from the file extension")
+    parser.add_argument("--rejects", help="write rejected records to this CSV file")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="records per upsert and commit")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or guess_format(args.path)
+    conn = create_connection()
+    source = sys.stdin if args.path == "-" else open(args.path, "r", encoding="utf-8-sig", newline="")
+    rejects = open(args.rejects, "w", newline="") if args.rejects else None
+
+    def report(stats):
+        print(f"{stats.read:,} records read, {stats.rejected:,} rejected ({stats.read / stats.elapsed():,.0f}/s)")
+
+    try:
+        stats = import_passengers(conn, READERS[fmt](source), rejects, args.batch_size, report)
+    finally:
+        conn.close()
+        if source is not sys.stdin:
+            source.close()
+        if rejects is not None:
+            rejects.close()
+    notify_write({"Passenger"})
+    summary = stats.as_dict()
+    print(f"Done: {summary['inserted']:,} inserted, {summary['updated']:,} updated, "
+          f"{summary['rejected']:,} rejected in {summary['seconds']}s")
+    return 1 if stats.rejected else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
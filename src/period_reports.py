@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""Monthly and quarterly booking reports over the DimDate calendar.
+
+GenerateMonthlyReport used to filter on ``YEAR(BookingDate) = ... AND
+MONTH(BookingDate) = ...``, and queries 4 and 8 of complex_queries.sql group
+by MONTH()/QUARTER(). A function of the column cannot use an index on it, so
+each of them reads every booking. These reports instead:
+
+    * look the period up in DimDate (one row per day, sql/date_dimension.sql),
+      which gives its [first day, day after) range and its month and weekday
+      labels,
+    * read Booking with ``BookingDate >= start AND BookingDate < end``, a range
+      on idx_booking_date_purpose_cost (BookingDate, Purpose, TotalCost), so
+      only the bookings of the period are touched and the aggregates are
+      answered from the index alone,
+    * group through ``DimDate.DateKey = DATE(BookingDate)``, a primary key
+      lookup per booking in range, instead of MONTH()/QUARTER() in GROUP BY.
+
+Months and quarters without bookings are listed with zeros, from the calendar.
+"""
+from datetime import date
+from decimal import Decimal
+
+from src.rows import fetch_records
+
+MONTHLY_TOP_BOOKINGS = 50  # Largest bookings listed on the monthly report
+
+PERIOD_SQL = "SELECT MIN(DateKey), MAX(NextDate) FROM DimDate WHERE Year = %s"
+CALENDAR_YEARS_SQL = "SELECT MIN(Year), MAX(Year) FROM DimDate"
+LATEST_BOOKING_SQL = "SELECT MAX(BookingDate) FROM Booking"
+
+MONTH_BY_PURPOSE_SQL = """
+    SELECT b.Purpose, COUNT(*) AS Bookings, SUM(b.TotalCost) AS Revenue, AVG(b.TotalCost) AS AverageValue
+    FROM Booking b
+    WHERE b.BookingDate >= %s AND b.BookingDate < %s
+    GROUP BY b.Purpose
+    ORDER BY Bookings DESC, b.Purpose
+"""
+
+MONTH_BY_WEEKDAY_SQL = """
+    SELECT d.DayOfWeek, d.DayName, COUNT(*) AS Bookings, SUM(b.TotalCost) AS Revenue
+    FROM Booking b
+    JOIN DimDate d ON d.DateKey = DATE(b.BookingDate)
+    WHERE b.BookingDate >= %s AND b.BookingDate < %s
+    GROUP BY d.DayOfWeek, d.DayName
+    ORDER BY d.DayOfWeek
+"""
+
+# GenerateMonthlyReport's query, with the period as a range
+MONTH_TOP_BOOKINGS_SQL = """
+    SELECT b.BookingID, b.GroupName, b.BookingDate, b.TotalCost,
+           p.Name AS PrimaryPassenger, e.Name AS AgentName
+    FROM Booking b
+    JOIN BookingPassenger bp ON bp.BookingID = b.BookingID AND bp.IsPrimary = TRUE
+    JOIN Passenger p ON bp.PassengerID = p.PassengerID
+    LEFT JOIN Employee e ON b.EmployeeID = e.EmployeeID
+    WHERE b.BookingDate >= %s AND b.BookingDate < %s
+    ORDER BY b.TotalCost DESC, b.BookingID
+    LIMIT %s
+"""
+
+CALENDAR_MONTHS_SQL = """
+    SELECT Year, Quarter, Month, MIN(MonthName)
+    FROM DimDate
+    WHERE DateKey >= %s AND DateKey < %s
+    GROUP BY Year, Quarter, Month
+    ORDER BY Year, Month
+"""
+
+MONTHS_BY_PURPOSE_SQL = """
+    SELECT d.Year, d.Month, b.Purpose, COUNT(*) AS Bookings, SUM(b.TotalCost) AS Revenue
+    FROM Booking b
+    JOIN DimDate d ON d.DateKey = DATE(b.BookingDate)
+    WHERE b.BookingDate >= %s AND b.BookingDate < %s
+    GROUP BY d.Year, d.Month, b.Purpose
+"""
+
+
+class PeriodError(ValueError):
+    """Raised for a month or year that is malformed or outside the calendar."""
+
+
+def _fetch(conn, sql, params):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def _money(value):
+    return Decimal(str(value or 0)).quantize(Decimal("0.01"))
+
+
+def latest_booking_month(conn):
+    """(year, month) of the most recent booking, or of today when there are none."""
+    latest = _fetch(conn, LATEST_BOOKING_SQL, ())[0][0]
+    if latest is None:
+        latest = date.today()
+    elif isinstance(latest, str):
+        latest = date.fromisoformat(latest[:10])
+    return latest.year, latest.month
+
+
+def parse_period_args(args, conn, monthly=True):
+    """(year, month) for a monthly report, (year, None) for a quarterly one, from ?year=&month=."""
+    default_year, default_month = latest_booking_month(conn)
+    try:
+        year = int(args.get("year") or default_year)
+        month = int(args.get("month") or default_month) if monthly else None
+    except ValueError:
+        raise PeriodError("Year and month must be numbers.")
+    if month is not None and not 1 <= month <= 12:
+        raise PeriodError("Month must be between 1 and 12.")
+    return year, month
+
+
+def period_range(conn, year, month=None):
+    """[first day, day after) of a month (or of the whole year) from the calendar."""
+    if month is None:
+        start, end = _fetch(conn, PERIOD_SQL, (year,))[0]
+    else:
+        start, end = _fetch(conn, PERIOD_SQL + " AND Month = %s", (year, month))[0]
+    if start is None:
+        first, last = _fetch(conn, CALENDAR_YEARS_SQL, ())[0]
+        if first is None:
+            raise PeriodError("The DimDate calendar is empty; apply sql/date_dimension.sql.")
+        raise PeriodError(f"{year} is outside the calendar, which covers {first} to {last}.")
+    return start, end
+
+
+def monthly_report(conn, year, month, top=MONTHLY_TOP_BOOKINGS):
+    """Bookings and revenue of one month by purpose and weekday, plus its largest bookings."""
+    start, end = period_range(conn, year, month)
+    by_purpose = [{"purpose": purpose or "Unspecified", "bookings": bookings, "revenue": _money(revenue),
+                   "average": _money(average)}
+                  for purpose, bookings, revenue, average in _fetch(conn, MONTH_BY_PURPOSE_SQL, (start, end))]
+    weekdays = {day: (name, bookings, revenue)
+                for day, name, bookings, revenue in _fetch(conn, MONTH_BY_WEEKDAY_SQL, (start, end))}
+    by_weekday = []
+    for day, name in enumerate(("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"), 1):
+        _, bookings, revenue = weekdays.get(day, (name, 0, 0))
+        by_weekday.append({"day": name, "weekend": day >= 6, "bookings": bookings, "revenue": _money(revenue)})
+    cursor = conn.cursor()
+    try:
+        cursor.execute(MONTH_TOP_BOOKINGS_SQL, (start, end, top))
+        top_bookings = fetch_records(cursor)
+    finally:
+        cursor.close()
+    bookings = sum(row["bookings"] for row in by_purpose)
+    revenue = sum((row["revenue"] for row in by_purpose), Decimal("0.00"))
+    return {
+        "year": year,
+        "month": month,
+        "month_name": date(year, month, 1).strftime("%B"),
+        "start": start,
+        "end": end,
+        "bookings": bookings,
+        "revenue": revenue,
+        "average": _money(revenue / bookings) if bookings else None,
+        "by_purpose": by_purpose,
+        "by_weekday": by_weekday,
+        "top_bookings": top_bookings,
+    }
+
+
+def quarterly_report(conn, year):
+    """A year's bookings and revenue per quarter and month, with growth over the previous quarter."""
+    year_start, year_end = period_range(conn, year)
+    # The previous year's fourth quarter is read too, for the first quarter's growth
+    try:
+        start = period_range(conn, year - 1, 10)[0]
+    except PeriodError:
+        start = year_start
+    months = {}
+    for row_year, quarter, month, name in _fetch(conn, CALENDAR_MONTHS_SQL, (start, year_end)):
+        months[(row_year, month)] = {"year": row_year, "quarter": quarter, "month": month, "name": name,
+                                     "bookings": 0, "revenue": Decimal("0.00"), "by_purpose": {}}
+    for row_year, month, purpose, bookings, revenue in _fetch(conn, MONTHS_BY_PURPOSE_SQL, (start, year_end)):
+        entry = months[(row_year, month)]
+        purpose = purpose or "Unspecified"
+        entry["bookings"] += bookings
+        entry["revenue"] += _money(revenue)
+        entry["by_purpose"][purpose] = {"bookings": bookings, "revenue": _money(revenue)}
+
+    quarters = []
+    previous = None
+    for (row_year, _), entry in sorted(months.items()):
+        if previous is None or (previous["year"], previous["quarter"]) != (row_year, entry["quarter"]):
+            previous = {"year": row_year, "quarter": entry["quarter"], "bookings": 0,
+                        "revenue": Decimal("0.00"), "months": [], "by_purpose": {}}
+            quarters.append(previous)
+        previous["bookings"] += entry["bookings"]
+        previous["revenue"] += entry["revenue"]
+        previous["months"].append(entry)
+        for purpose, totals in entry["by_purpose"].items():
+            sums = previous["by_purpose"].setdefault(purpose, {"bookings": 0, "revenue": Decimal("0.00")})
+            sums["bookings"] += totals["bookings"]
+            sums["revenue"] += totals["revenue"]
+    for before, quarter in zip([None] + quarters, quarters):
+        quarter["average"] = _money(quarter["revenue"] / quarter["bookings"]) if quarter["bookings"] else None
+        quarter["growth"] = quarter["revenue"] - before["revenue"] if before else None
+        quarter["growth_pct"] = (round(quarter["growth"] / before["revenue"] * 100, 2)
+                                 if before and before["revenue"] else None)
+    quarters = [quarter for quarter in quarters if quarter["year"] == year]
+    return {
+        "year": year,
+        "start": year_start,
+        "end": year_end,
+        "bookings": sum(quarter["bookings"] for quarter in quarters),
+        "revenue": sum((quarter["revenue"] for quarter in quarters), Decimal("0.00")),
+        "quarters": quarters,
+        "purposes": sorted({purpose for quarter in quarters for purpose in quarter["by_purpose"]}),
+    }
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""Connection pool shared by the request handlers.
+
+Opening a new MySQL connection per request means paying the TCP and auth
+handshake on every page view. The pool keeps up to ``size`` idle connections
+around, allows ``max_overflow`` extra ones under bursts, pings connections
+before handing them out and recycles ones that sat idle for too long.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+class PooledConnection:
+    """Thin proxy around a raw connection that returns it to the pool on close().
+
+    Existing code calls ``conn.close()`` in its ``finally`` blocks, so the proxy
+    keeps that contract: closing hands the connection back instead of
+    dropping it.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._closed = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    @property
+    def pool(self):
+        """The pool this connection came from (e.g. for a second connection to the same server)."""
+        return self._pool
+
+    def is_connected(self):
+        return not self._closed and self._raw.is_connected()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._pool._release(self._raw)
+
+    def invalidate(self):
+        """Drop the underlying connection instead of returning it to the pool."""
+        if self._closed:
+            return
+        self._closed = True
+        self._pool._discard(self._raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """A small thread-safe pool with overflow, pre-ping and idle recycling."""
+
+    def __init__(self, creator, size=5, max_overflow=10, timeout=30.0,
+                 recycle=300.0, pre_ping=True):
+        self._creator = creator
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+
+        self._lock = threading.Condition()
+        self._idle = deque()  # (raw_connection, returned_at)
+        self._open = 0        # connections currently alive (idle + checked out)
+        self._pid = os.getpid()
+
+        # Counters exposed through stats()
+        self._in_use = 0
+        self._checkouts = 0
+        self._created = 0
+        self._recycled = 0
+        self._failed_pings = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+
+    # --- Public API ---
+
+    def connect(self):
+        """Check out a connection, waiting up to ``timeout`` seconds if the pool is exhausted."""
+        self._check_fork()
+        raw = self._checkout()
+        return PooledConnection(self, raw)
+
+    def stats(self):
+        """Returns a snapshot of the pool counters (used for sizing the pool)."""
+        with self._lock:
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "overflow": max(0, self._open - self.size),
+                "checkouts": self._checkouts,
+                "created": self._created,
+                "recycled": self._recycled,
+                "failed_pings": self._failed_pings,
+                "waits": self._waits,
+                "wait_time_total": round(self._wait_time, 6),
+                "wait_time_avg": round(self._wait_time / self._waits, 6) if self._waits else 0.0,
+                "timeouts": self._timeouts,
+            }
+
+    def dispose(self):
+        """Closes every idle connection; checked-out ones are closed when released."""
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+            self._lock.notify_all()
+        for raw, _ in idle:
+            self._close_raw(raw)
+
+    # --- Internals ---
+
+    def _check_fork(self):
+        # Connections must never be shared across a fork (e.g. gunicorn pre-fork workers):
+        # the child forgets the parent's sockets and starts with an empty pool.
+        if self._pid != os.getpid():
+            with self._lock:
+                self._idle.clear()
+                self._open = 0
+                self._in_use = 0
+                self._pid = os.getpid()
+
+    def _checkout(self):
+        deadline = None
+        waited_since = None
+        while True:
+            stale = []
+            with self._lock:
+                raw = None
+                while self._idle:
+                    candidate, returned_at = self._idle.pop()  # LIFO keeps hot connections hot
+                    if self.recycle is not None and time.monotonic() - returned_at > self.recycle:
+                        self._open -= 1
+                        self._recycled += 1
+                        stale.append(candidate)
+                        continue
+                    raw = candidate
+                    break
+                # Anything older than the one we popped is older still
+                if self.recycle is not None:
+                    now = time.monotonic()
+                    while self._idle and now - self._idle[0][1] > self.recycle:
+                        stale.append(self._idle.popleft()[0])
+                        self._open -= 1
+                        self._recycled += 1
+
+                if raw is None and self._open < self.size + self.max_overflow:
+                    self._open += 1  # reserve the slot before connecting outside the lock
+                    create = True
+                elif raw is None:
+                    if waited_since is None:
+                        waited_since = time.monotonic()
+                        deadline = waited_since + self.timeout
+                        self._waits += 1
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        self._wait_time += time.monotonic() - waited_since
+                        raise PoolTimeout(
+                            f"Connection pool exhausted ({self._open} open, timeout {self.timeout}s)")
+                    self._lock.wait(remaining)
+                    continue
+                else:
+                    create = False
+
+                if waited_since is not None:
+                    self._wait_time += time.monotonic() - waited_since
+                    waited_since = None
+
+            for old in stale:
+                self._close_raw(old)
+
+            if create:
+                try:
+                    raw = self._creator()
+                except Exception:
+                    with self._lock:
+                        self._open -= 1
+                        self._lock.notify()
+                    raise
+                with self._lock:
+                    self._created += 1
+            elif self.pre_ping and not self._ping(raw):
+                with self._lock:
+                    self._open -= 1
+                    self._failed_pings += 1
+                self._close_raw(raw)
+                continue  # try the next idle connection or open a new one
+
+            with self._lock:
+                self._in_use += 1
+                self._checkouts += 1
+            return raw
+
+    def _release(self, raw):
+        if self._pid != os.getpid():
+            return
+        try:
+            # Never hand a half-finished transaction to the next request
+            if raw.is_connected():
+                if getattr(raw, "in_transaction", False):
+                    raw.rollback()
+            else:
+                self._discard(raw)
+                return
+        except Exception:
+            self._discard(raw)
+            return
+
+        with self._lock:
+            self._in_use -= 1
+            if len(self._idle) < self.size:
+                self._idle.append((raw, time.monotonic()))
+                self._lock.notify()
+                return
+            # Overflow connection: close it rather than keeping it idle
+            self._open -= 1
+            self._lock.notify()
+        self._close_raw(raw)
+
+    def _discard(self, raw):
+        if self._pid != os.getpid():
+            return
+        with self._lock:
+            self._in_use -= 1
+            self._open -= 1
+            self._lock.notify()
+        self._close_raw(raw)
+
+    @staticmethod
+    def _ping(raw):
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_raw(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""Bulk package quotes: outbound flight + hotel stay (+ car) (+ cruise).
+
+The fare and rate catalogs are held as NumPy column arrays (IDs, locations,
+times, prices), so pricing every candidate package for a request is a few
+array operations instead of a loop over combinations:
+
+    1. the outbound flights from the origin to the destination departing in
+       the requested window are selected with one mask,
+    2. every other component gets a price matrix with one row per flight,
+       +inf where the combination is not allowed (hotel booked on those
+       nights, car picked up before the flight lands, cruise outside the
+       stay),
+    3. since those rules each involve only the flight, the K cheapest
+       packages use, for each flight, only that flight's K cheapest options
+       of every component; those are broadcast together and the overall K
+       cheapest taken with argpartition.
+
+A hotel stay starts on the flight's arrival date and lasts ``nights``
+nights at Rate less the fractional Discount; cars must be picked up at the
+destination within CAR_PICKUP_HOURS of landing and returned by check-out;
+cruises must sail from the destination and return within the stay.
+
+The catalog is loaded on first use and reloaded after writes to any table
+in ``QUOTE_TABLES``, or, for writes made by other worker processes, once it
+is QUOTE_CATALOG_MAX_AGE seconds old. Hotel bookings come from the
+availability index (src/availability.py), which has its own bound.
+"""
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from src.write_events import subscribe
+
+CAR_PICKUP_HOURS = int(os.environ.get("QUOTE_CAR_PICKUP_HOURS", 12))  # Car must be collected this soon after landing
+QUOTE_CATALOG_MAX_AGE = float(os.environ.get("QUOTE_CATALOG_MAX_AGE", 300))  # Seconds before a reload without a local write
+DEFAULT_NIGHTS = 3
+MAX_NIGHTS = 60
+DEFAULT_RESULTS = 10
+MAX_RESULTS = 100
+
+# Tables the catalog is built from (lower-cased, as write events report them)
+QUOTE_TABLES = {"accommodation", "flight", "carrental", "cruise", "location"}
+
+LOCATIONS_SQL = "SELECT LocationID, City, Country FROM Location"
+
+ACCOMMODATIONS_SQL = """
+    SELECT AccommodationID, Name, Type, LocationID, Rate * (1 - IFNULL(Discount, 0))
+    FROM Accommodation
+    WHERE Rate IS NOT NULL
+"""
+
+FLIGHTS_SQL = """
+    SELECT FlightID, FlightNumber, Carrier, SourceLocationID, DestLocationID,
+           DepartureDateTime, ArrivalDateTime, Fare
+    FROM Flight
+"""
+
+CARS_SQL = """
+    SELECT CarRentalID, Company, CarType, PickupLocationID, PickupDateTime, DropoffDateTime, Rent
+    FROM CarRental
+"""
+
+CRUISES_SQL = """
+    SELECT CruiseID, CruiseName, Line, SourceLocationID, DepartureDate, ReturnDate, Fare
+    FROM Cruise
+"""
+
+_catalog = None
+_catalog_lock = threading.Lock()
+_stale = True
+_generation = 0  # bumped on every invalidation, guards against marking a racing reload as fresh
+_loaded_at = 0.0  # time.monotonic() when the last load started
+
+
+class QuoteError(ValueError):
+    """Raised for invalid quote requests (unknown city, bad dates, ...)."""
+
+
+def _times(values):
+    return np.array([np.datetime64(datetime.fromisoformat(str(v)), "s") for v in values],
+                    dtype="datetime64[s]")
+
+
+class QuoteCatalog:
+    """Fares and rates as column arrays, plus the rows themselves for describing quotes."""
+
+    def __init__(self, locations, accommodations, flights, cars, cruises):
+        self.locations = {row[0]: (row[1], row[2]) for row in locations}
+        self.cities = {}
+        for location_id, (city, _) in self.locations.items():
+            if city:
+                self.cities.setdefault(city.lower(), set()).add(location_id)
+
+        self.accommodation_rows = list(accommodations)
+        self.acc_id = np.array([r[0] for r in self.accommodation_rows], dtype=np.int64)
+        self.acc_location = np.array([r[3] for r in self.accommodation_rows], dtype=np.int64)
+        self.acc_nightly = np.array([float(r[4]) for r in self.accommodation_rows], dtype=np.float64)
+
+        self.flight_rows = list(flights)
+        self.flight_source = np.array([r[3] for r in self.flight_rows], dtype=np.int64)
+        self.flight_dest = np.array([r[4] for r in self.flight_rows], dtype=np.int64)
+        self.flight_departure = _times(r[5] for r in self.flight_rows)
+        self.flight_arrival = _times(r[6] for r in self.flight_rows)
+        self.flight_fare = np.array([float(r[7]) for r in self.flight_rows], dtype=np.float64)
+
+        self.car_rows = list(cars)
+        self.car_location = np.array([r[3] for r in self.car_rows], dtype=np.int64)
+        self.car_pickup = _times(r[4] for r in self.car_rows)
+        self.car_dropoff = _times(r[5] for r in self.car_rows)
+        self.car_rent = np.array([float(r[6]) for r in self.car_rows], dtype=np.float64)
+
+        self.cruise_rows = list(cruises)
+        self.cruise_source = np.array([r[3] for r in self.cruise_rows], dtype=np.int64)
+        self.cruise_departure = _times(r[4] for r in self.cruise_rows)
+        self.cruise_return = _times(r[5] for r in self.cruise_rows)
+        self.cruise_fare = np.array([float(r[6]) for r in self.cruise_rows], dtype=np.float64)
+
+    @classmethod
+    def load(cls, conn):
+        cursor = conn.cursor()
+        try:
+            tables = []
+            for sql in (LOCATIONS_SQL, ACCOMMODATIONS_SQL, FLIGHTS_SQL, CARS_SQL, CRUISES_SQL):
+                cursor.execute(sql)
+                tables.append(cursor.fetchall())
+        finally:
+            cursor.close()
+        return cls(*tables)
+
+    def size(self):
+        return {"accommodations": len(self.accommodation_rows), "flights": len(self.flight_rows),
+                "cars": len(self.car_rows), "cruises": len(self.cruise_rows)}
+
+    def quote(self, origins, destinations, depart_from, depart_to, nights=DEFAULT_NIGHTS,
+              car=False, cruise=False, limit=DEFAULT_RESULTS, is_free=None):
+        """The ``limit`` cheapest packages; ``is_free(acc_id, check_in, check_out)`` filters hotels.
+
+        Returns (packages, candidates), where each package is a dict of row
+        indexes and prices and ``candidates`` is how many combinations were priced.
+        """
+        origins = np.fromiter(origins, dtype=np.int64)
+        destinations = np.fromiter(destinations, dtype=np.int64)
+        start = np.datetime64(datetime.combine(depart_from, datetime.min.time()), "s")
+        end = np.datetime64(datetime.combine(depart_to + timedelta(days=1), datetime.min.time()), "s")
+
+        flights = np.flatnonzero(np.isin(self.flight_source, origins) & np.isin(self.flight_dest, destinations)
+                                 & (self.flight_departure >= start) & (self.flight_departure < end))
+        hotels = np.flatnonzero(np.isin(self.acc_location, destinations))
+        if not len(flights) or not len(hotels):
+            return [], 0
+
+        arrival = self.flight_arrival[flights]
+        check_in = arrival.astype("datetime64[D]")
+        check_out = check_in + np.timedelta64(nights, "D")
+        fares = self.flight_fare[flights]
+
+        # Hotels: nightly price x nights, +inf where booked (looked up once per distinct check-in day)
+        hotel_prices = np.broadcast_to(self.acc_nightly[hotels] * nights, (len(flights), len(hotels))).copy()
+        if is_free is not None:
+            for day in np.unique(check_in):
+                day_in = day.astype(date)
+                day_out = day_in + timedelta(days=nights)
+                booked = np.array([not is_free(int(acc_id), day_in, day_out) for acc_id in self.acc_id[hotels]])
+                hotel_prices[np.ix_(check_in == day, booked)] = np.inf
+        components = [("accommodation", hotels, hotel_prices)]
+
+        if car:
+            cars = np.flatnonzero(np.isin(self.car_location, destinations))
+            pickup, dropoff = self.car_pickup[cars][None, :], self.car_dropoff[cars][None, :]
+            allowed = ((pickup >= arrival[:, None])
+                       & (pickup <= arrival[:, None] + np.timedelta64(CAR_PICKUP_HOURS, "h"))
+                       & (dropoff <= (check_out + np.timedelta64(1, "D")).astype("datetime64[s]")[:, None]))
+            components.append(("car", cars, np.where(allowed, self.car_rent[cars][None, :], np.inf)))
+        if cruise:
+            cruises = np.flatnonzero(np.isin(self.cruise_source, destinations))
+            sail, back = self.cruise_departure[cruises][None, :], self.cruise_return[cruises][None, :]
+            allowed = ((sail >= check_in.astype("datetime64[s]")[:, None])
+                       & (back <= check_out.astype("datetime64[s]")[:, None]))
+            components.append(("cruise", cruises, np.where(allowed, self.cruise_fare[cruises][None, :], np.inf)))
+
+        candidates = len(flights)
+        for _, rows, _ in components:
+            candidates *= len(rows)
+        if not candidates:
+            return [], 0
+
+        # Per flight, only its `limit` cheapest options of each component can make the overall top `limit`
+        total = fares.reshape((-1,) + (1,) * len(components))
+        picks = []
+        for axis, (_, rows, prices) in enumerate(components):
+            k = min(limit, prices.shape[1])
+            best = np.argpartition(prices, k - 1, axis=1)[:, :k] if k < prices.shape[1] else \
+                np.broadcast_to(np.arange(prices.shape[1]), prices.shape)
+            shape = [len(flights)] + [1] * len(components)
+            shape[axis + 1] = k
+            total = total + np.take_along_axis(prices, best, axis=1).reshape(shape)
+            picks.append(best)
+
+        flat = total.reshape(-1)
+        k = min(limit, int(np.isfinite(flat).sum()))
+        if k == 0:
+            return [], candidates
+        top = np.argpartition(flat, k - 1)[:k] if k < flat.size else np.arange(flat.size)
+        top = top[np.argsort(flat[top], kind="stable")][:k]
+
+        packages = []
+        for position in np.array(np.unravel_index(top, total.shape)).T:
+            f = position[0]
+            package = {"flight": int(flights[f]), "flight_price": float(fares[f]),
+                       "check_in": check_in[f].astype(date), "check_out": check_out[f].astype(date),
+                       "total": float(total[tuple(position)])}
+            for axis, (name, rows, prices) in enumerate(components):
+                column = picks[axis][f, position[axis + 1]]
+                package[name] = int(rows[column])
+                package[f"{name}_price"] = float(prices[f, column])
+            packages.append(package)
+        return packages, candidates
+
+    # --- Describing results ---
+
+    def place(self, location_id):
+        city, country = self.locations.get(location_id, (None, None))
+        return {"location_id": location_id, "city": city, "country": country}
+
+    def describe(self, package):
+        flight = self.flight_rows[package["flight"]]
+        hotel = self.accommodation_rows[package["accommodation"]]
+        quote = {
+            "total": f"{package['total']:.2f}",
+            "check_in": package["check_in"].isoformat(),
+            "check_out": package["check_out"].isoformat(),
+            "flight": {"flight_id": flight[0], "flight_number": flight[1], "carrier": flight[2],
+                       "from": self.place(flight[3]), "to": self.place(flight[4]),
+                       "departure": str(flight[5]), "arrival": str(flight[6]),
+                       "price": f"{package['flight_price']:.2f}"},
+            "accommodation": {"accommodation_id": hotel[0], "name": hotel[1], "type": hotel[2],
+                              "nightly_price": f"{float(hotel[4]):.2f}",
+                              "price": f"{package['accommodation_price']:.2f}"},
+            "car": None,
+            "cruise": None,
+        }
+        if "car" in package:
+            car = self.car_rows[package["car"]]
+            quote["car"] = {"car_rental_id": car[0], "company": car[1], "car_type": car[2],
+                            "pickup": str(car[4]), "dropoff": str(car[5]), "price": f"{package['car_price']:.2f}"}
+        if "cruise" in package:
+            cruise = self.cruise_rows[package["cruise"]]
+            quote["cruise"] = {"cruise_id": cruise[0], "name": cruise[1], "line": cruise[2],
+                               "departure": str(cruise[4]), "return": str(cruise[5]),
+                               "price": f"{package['cruise_price']:.2f}"}
+        return quote
+
+
+# --- Shared catalog ---
+
+def get_quote_catalog(conn_factory):
+    """Returns the process-wide catalog, (re)loading it first when needed.
+
+    ``conn_factory`` is only called when the catalog is stale. Returns None
+    when no connection could be obtained.
+    """
+    global _catalog, _stale, _loaded_at
+    if _is_fresh():
+        return _catalog
+    with _catalog_lock:
+        if _is_fresh():
+            return _catalog
+        generation, started_at = _generation, time.monotonic()
+        conn = conn_factory()
+        if conn is None:
+            return None
+        try:
+            started = time.perf_counter()
+            catalog = QuoteCatalog.load(conn)
+            print(f"Quote catalog loaded {catalog.size()} in {time.perf_counter() - started:.3f}s")
+        finally:
+            if conn.is_connected():
+                conn.close()
+        _catalog, _loaded_at = catalog, started_at
+        # A write committed during the load leaves the catalog stale for the next request
+        _stale = generation != _generation
+        return _catalog
+
+
+def _is_fresh():
+    return _catalog is not None and not _stale and time.monotonic() - _loaded_at < QUOTE_CATALOG_MAX_AGE
+
+
+@subscribe
+def invalidate_quote_catalog(tables, passenger_ids):
+    """Write listener: flags the catalog for a reload when fares or rates may have changed."""
+    global _stale, _generation
+    if tables is not None and not (tables & QUOTE_TABLES):
+        return
+    _generation += 1
+    _stale = True
+
+
+# --- Request helpers ---
+
+def _locations(catalog, value, name):
+    value = (value or "").strip()
+    if not value:
+        raise QuoteError(f"{name} is required")
+    if value.isdigit():
+        return {int(value)}
+    matches = catalog.cities.get(value.lower())
+    if not matches:
+        raise QuoteError(f"No location in a city named {value!r}")
+    return matches
+
+
+def _date(value, name):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise QuoteError(f"{name} must be a date (YYYY-MM-DD)")
+
+
+def _bounded_int(value, name, default, low, high):
+    if value in (None, ""):
+        return default
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise QuoteError(f"{name} must be a whole number")
+    if not low <= number <= high:
+        raise QuoteError(f"{name} must be between {low} and {high}")
+    return number
+
+
+def quote_packages(catalog, args, is_free=None):
+    """Runs the quote described by request ``args``; returns a JSON-ready dict."""
+    origins = _locations(catalog, args.get("from"), "from")
+    destinations = _locations(catalog, args.get("to"), "to")
+    depart_from = _date(args.get("depart_from"), "depart_from")
+    depart_to = _date(args.get("depart_to"), "depart_to") if args.get("depart_to") else depart_from
+    if depart_to < depart_from:
+        raise QuoteError("depart_to must not be before depart_from")
+    if (depart_to - depart_from).days > 31:
+        raise QuoteError("The departure window can be at most 31 days")
+    nights = _bounded_int(args.get("nights"), "nights", DEFAULT_NIGHTS, 1, MAX_NIGHTS)
+    limit = _bounded_int(args.get("limit"), "limit", DEFAULT_RESULTS, 1, MAX_RESULTS)
+    car = args.get("car") in ("1", "true", "yes")
+    cruise = args.get("cruise") in ("1", "true", "yes")
+
+    started = time.perf_counter()
+    packages, candidates = catalog.quote(origins, destinations, depart_from, depart_to, nights,
+                                         car, cruise, limit, is_free)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    return {"quotes": [catalog.describe(package) for package in packages],
+            "candidates": candidates, "quote_ms": round(elapsed_ms, 3)}
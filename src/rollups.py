@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""Incrementally refreshed summary tables for the analytics reports.
+
+The fact tables in sql/analytics_rollups.sql are keyed by booking day. A
+refresh works out which days changed since the last run and rebuilds only
+those days:
+
+    * rows added since the last refresh are found from a high-water mark on each
+      source table's primary key (RollupState), and
+    * rows updated or deleted since then have their booking day recorded in
+      RollupDirtyDay by triggers.
+
+Each changed range of days is deleted from every fact table and re-aggregated
+from the live tables with a sargable range on Booking.BookingDate. The reports in
+sql/analytics_reports.sql then read the small fact tables instead of scanning
+the booking tables. From the command line:
+
+    python -m src.rollups refresh          # fold in what changed
+    python -m src.rollups refresh --full   # rebuild everything
+
+A row whose transaction was still open when a refresh read the high-water mark
+is only picked up if its day changes again; a periodic --full run covers that.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from datetime import date, timedelta
+
+from mysql.connector import Error
+
+REPORTS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sql", "analytics_reports.sql")
+
+# Source tables tracked by high-water mark: (table, increasing key, booking days of keys in (low, high])
+SOURCES = [
+    ("Booking", "BookingID",
+     "SELECT DISTINCT DATE(BookingDate) FROM Booking WHERE BookingID > %s AND BookingID <= %s"),
+]
+for _table, _key in (("BookingAccommodation", "BookingAccommodationID"),
+                     ("BookingTransportation", "BookingTransportationID"),
+                     ("Payment", "PaymentID"),
+                     ("Review", "ReviewID")):
+    SOURCES.append((_table, _key,
+                    f"SELECT DISTINCT DATE(b.BookingDate) FROM {_table} x "
+                    f"JOIN Booking b ON x.BookingID = b.BookingID "
+                    f"WHERE x.{_key} > %s AND x.{_key} <= %s"))
+
+# Fact table -> INSERT ... SELECT for bookings made in [%s, %s). Order matters:
+# FactReviewByBooking feeds the rating columns of the facts after it.
+FACTS = [
+    ("FactReviewByBooking", """
+        INSERT INTO FactReviewByBooking (BookingID, BookingDay, ReviewCount, RatingSum, LastReviewDate)
+        SELECT b.BookingID, DATE(b.BookingDate), COUNT(*), SUM(r.Rating), MAX(r.ReviewDate)
+        FROM Booking b
+        JOIN Review r ON r.BookingID = b.BookingID
+        WHERE b.BookingDate >= %s AND b.BookingDate < %s
+        GROUP BY b.BookingID, DATE(b.BookingDate)
+    """),
+    ("FactBookingDaily", """
+        INSERT INTO FactBookingDaily (BookingDay, Purpose, EmployeeID, Status, BookingCount, RevenueSum,
+                                      RevenueCount, PaidBookings, ReviewedBookings, RatingSum, RatingCount)
+        SELECT DATE(b.BookingDate), IFNULL(b.Purpose, ''), IFNULL(b.EmployeeID, 0), IFNULL(b.Status, ''),
+               COUNT(*), SUM(b.TotalCost), COUNT(b.TotalCost),
+               SUM(EXISTS (SELECT 1 FROM Payment p WHERE p.BookingID = b.BookingID)),
+               COUNT(rv.BookingID), IFNULL(SUM(rv.RatingSum), 0), IFNULL(SUM(rv.ReviewCount), 0)
+        FROM Booking b
+        LEFT JOIN FactReviewByBooking rv ON rv.BookingID = b.BookingID
+        WHERE b.BookingDate >= %s AND b.BookingDate < %s
+        GROUP BY DATE(b.BookingDate), IFNULL(b.Purpose, ''), IFNULL(b.EmployeeID, 0), IFNULL(b.Status, '')
+    """),
+    ("FactAccommodationDaily", """
+        INSERT INTO FactAccommodationDaily (BookingDay, AccommodationID, StayCount, CostSum, CostCount,
+                                            NightsSum, RatingSum, RatingCount)
+        SELECT DATE(b.BookingDate), ba.AccommodationID, COUNT(*), SUM(ba.Cost), COUNT(ba.Cost),
+               SUM(DATEDIFF(ba.CheckOutDate, ba.CheckInDate)),
+               IFNULL(SUM(rv.RatingSum), 0), IFNULL(SUM(rv.ReviewCount), 0)
+        FROM Booking b
+        JOIN BookingAccommodation ba ON ba.BookingID = b.BookingID
+        LEFT JOIN FactReviewByBooking rv ON rv.BookingID = b.BookingID
+        WHERE b.BookingDate >= %s AND b.BookingDate < %s
+        GROUP BY DATE(b.BookingDate), ba.AccommodationID
+    """),
+    ("FactTransportDaily", """
+        INSERT INTO FactTransportDaily (BookingDay, TransportTypeID, LegCount, CostSum, CostCount, CostMin, CostMax)
+        SELECT DATE(b.BookingDate), bt.TransportTypeID, COUNT(*), SUM(bt.Cost), COUNT(bt.Cost),
+               MIN(bt.Cost), MAX(bt.Cost)
+        FROM Booking b
+        JOIN BookingTransportation bt ON bt.BookingID = b.BookingID
+        WHERE b.BookingDate >= %s AND b.BookingDate < %s
+        GROUP BY DATE(b.BookingDate), bt.TransportTypeID
+    """),
+    ("FactPassengerSpend", """
+        INSERT INTO FactPassengerSpend (BookingDay, PassengerID, BookingCount, SpentSum, RatingSum, RatingCount)
+        SELECT DATE(b.BookingDate), bp.PassengerID, COUNT(*), SUM(b.TotalCost),
+               IFNULL(SUM(r.Rating), 0), COUNT(r.Rating)
+        FROM Booking b
+        JOIN BookingPassenger bp ON bp.BookingID = b.BookingID
+        LEFT JOIN Review r ON r.BookingID = bp.BookingID AND r.PassengerID = bp.PassengerID
+        WHERE b.BookingDate >= %s AND b.BookingDate < %s
+        GROUP BY DATE(b.BookingDate), bp.PassengerID
+    """),
+]
+
+REPORT_ROW_LIMIT = 200  # rows of each report shown on /reports
+
+# Range used by a full rebuild: every booking date MySQL can store
+FULL_RANGE = (date(1000, 1, 1), date(9999, 12, 31))
+
+_reports = None
+
+
+def day_ranges(days):
+    """Collapses a set of dates into sorted half-open [start, end) runs of consecutive days."""
+    ranges = []
+    for day in sorted(days):
+        if ranges and ranges[-1][1] == day:
+            ranges[-1][1] = day + timedelta(days=1)
+        else:
+            ranges.append([day, day + timedelta(days=1)])
+    return [tuple(r) for r in ranges]
+
+
+def refresh(conn, full=False):
+    """Brings the fact tables up to date in one transaction; returns a summary dict."""
+    started = time.perf_counter()
+    cursor = conn.cursor()
+    try:
+        # Locking the state rows keeps two refreshes from interleaving
+        cursor.execute("SELECT SourceTable, HighWaterMark FROM RollupState FOR UPDATE")
+        marks = dict(cursor.fetchall())
+
+        days = set()
+        new_marks = {}
+        for table, key, days_sql in SOURCES:
+            cursor.execute(f"SELECT IFNULL(MAX({key}), 0) FROM {table}")
+            new_marks[table] = cursor.fetchone()[0]
+            low = marks.get(table, 0)
+            if not full and new_marks[table] > low:
+                cursor.execute(days_sql, (low, new_marks[table]))
+                days.update(row[0] for row in cursor.fetchall())
+
+        # Days dirtied after this point stay in the table for the next refresh
+        cursor.execute("SELECT BookingDay FROM RollupDirtyDay")
+        dirty = [row[0] for row in cursor.fetchall()]
+        if dirty:
+            placeholders = ", ".join(["%s"] * len(dirty))
+            cursor.execute(f"DELETE FROM RollupDirtyDay WHERE BookingDay IN ({placeholders})", dirty)
+        days.update(dirty)
+
+        ranges = [FULL_RANGE] if full else day_ranges(days)
+        # Clear every range before re-inserting any: a booking moved between two
+        # dirty days must not meet its own old FactReviewByBooking row
+        for fact, _ in FACTS:
+            for start, end in ranges:
+                cursor.execute(f"DELETE FROM {fact} WHERE BookingDay >= %s AND BookingDay < %s", (start, end))
+        for fact, insert_sql in FACTS:
+            for start, end in ranges:
+                cursor.execute(insert_sql, (start, end))
+
+        for table, mark in new_marks.items():
+            cursor.execute("UPDATE RollupState SET HighWaterMark = %s, RefreshedAt = NOW() WHERE SourceTable = %s",
+                           (mark, table))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return {"full": full, "days": None if full else len(days), "ranges": len(ranges),
+            "seconds": time.perf_counter() - started}
+
+
+def get_freshness(conn):
+    """When the facts were last refreshed, and how many edited days are waiting."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT MIN(RefreshedAt) FROM RollupState")
+        refreshed_at = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) FROM RollupDirtyDay")
+        pending_days = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+    return {"refreshed_at": refreshed_at, "pending_days": pending_days}
+
+
+def parse_numbered_sql(text):
+    """Splits a script of "--N. Title" blocks (the complex_queries.sql layout) into dicts."""
+    queries = []
+    blocks = re.split(r"^--(\d+)\.\s*(.+)$", text, flags=re.M)
+    for number, title, body in zip(blocks[1::3], blocks[2::3], blocks[3::3]):
+        queries.append({"number": int(number), "title": title.strip(), "sql": body.strip().rstrip(";").strip()})
+    return queries
+
+
+def load_reports(path=REPORTS_PATH):
+    """The reports of analytics_reports.sql (parsed once, then cached)."""
+    global _reports
+    if _reports is None:
+        with open(path, "r") as f:
+            reports = parse_numbered_sql(f.read())
+        for report in reports:
+            # Reports that touch no fact table read the live data
+            report["live"] = not re.search(r"\bFact\w+", report["sql"])
+        _reports = reports
+    return _reports
+
+
+def run_reports(conn, row_limit=REPORT_ROW_LIMIT):
+    """Runs every report; each result carries its columns, first rows, total row count and any error."""
+    results = []
+    for report in load_reports():
+        result = dict(report, columns=[], rows=[], row_count=0, error=None)
+        cursor = conn.cursor()
+        try:
+            cursor.execute(report["sql"])
+            rows = cursor.fetchall()
+            result["rows"] = rows[:row_limit]
+            result["row_count"] = len(rows)
+            result["columns"] = [d[0] for d in cursor.description]
+        except Error as e:
+            result["error"] = str(e)
+        finally:
+            cursor.close()
+        results.append(result)
+    return results
+
+
+def main(argv=None):
+    from src.database import create_connection
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    refresh_parser = subcommands.add_parser("refresh", help="update the analytics fact tables")
+    refresh_parser.add_argument("--full", action="store_true", help="rebuild every day instead of only changed ones")
+    args = parser.parse_args(argv)
+
+    conn = create_connection()
+    try:
+        summary = refresh(conn, full=args.full)
+    finally:
+        conn.close()
+    if summary["full"]:
+        print(f"Rebuilt all analytics facts in {summary['seconds']:.2f}s.")
+    else:
+        print(f"Refreshed {summary['days']} booking day(s) in {summary['ranges']} range(s) "
+              f"in {summary['seconds']:.2f}s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+"""Multi-leg flight search over an in-memory index of the Flight table.
+
+Each location keeps its departing flights sorted by departure time, so "the
+flights leaving X between t1 and t2" is a bisect plus a slice. A search is a
+Dijkstra over flights rather than over cities: a flight fixes both where and
+when a traveller is, so the state (flight, legs used so far) is exact even
+though the graph is time-dependent. From a flight arriving at A at time t the
+next candidates are A's departures in [t + min layover, t + max layover].
+
+    earliest  orders states by (arrival, fare)
+    cheapest  orders states by (total fare, arrival)
+
+The first state popped that lands at the destination is the best itinerary;
+popping on gives the next best ones. Revisiting a city within one itinerary
+is not allowed.
+
+The index is built on first use and kept per process. A write touching
+Flight (or Location, whose deletes cascade to it) marks it stale; the next
+search re-reads the table and applies only the flights that were added,
+changed or removed, leaving the rest of the index untouched. Writes made by
+other worker processes are picked up the same way once the index is
+ROUTE_GRAPH_MAX_AGE seconds old.
+"""
+import heapq
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from src.write_events import subscribe
+
+MIN_LAYOVER_MINUTES = int(os.environ.get("ROUTE_MIN_LAYOVER_MINUTES", 45))  # Default minimum connection time
+MAX_LAYOVER_MINUTES = int(os.environ.get("ROUTE_MAX_LAYOVER_MINUTES", 24 * 60))  # Default longest wait between legs
+ROUTE_GRAPH_MAX_AGE = float(os.environ.get("ROUTE_GRAPH_MAX_AGE", 300))  # Seconds before a catch-up without a local write
+DEFAULT_MAX_CONNECTIONS = 2  # Connections (legs - 1) allowed unless the caller asks otherwise
+MAX_CONNECTIONS_LIMIT = 4  # Hard cap on requested connections
+DEFAULT_WINDOW_HOURS = 24  # First leg departs within this many hours of depart_after
+MAX_RESULTS = 10  # Most itineraries one search returns
+
+OPTIMIZE = ("earliest", "cheapest")
+
+# Only flights that touch these tables can change the index (lower-cased, as write events report them)
+ROUTE_TABLES = {"flight", "location"}
+
+FLIGHTS_SQL = """
+    SELECT FlightID, FlightNumber, Carrier, SourceLocationID, DestLocationID,
+           DepartureDateTime, ArrivalDateTime, Class, Fare
+    FROM Flight
+"""
+
+LOCATIONS_SQL = "SELECT LocationID, City, Country FROM Location"
+
+# One flight as indexed (fare as a Decimal whatever the driver returned)
+Leg = namedtuple("Leg", "flight_id flight_number carrier source dest departure arrival flight_class fare")
+
+_graph = None
+_graph_lock = threading.Lock()
+_stale = True
+_generation = 0  # bumped on every invalidation, guards against marking a racing reload as fresh
+_loaded_at = 0.0  # time.monotonic() when the last load started
+
+
+class RouteSearchError(ValueError):
+    """Raised for invalid search parameters (unknown location, bad date, ...)."""
+
+
+class FlightGraph:
+    """Departures indexed per source location, sorted by (departure, FlightID).
+
+    Per-location lists are replaced rather than modified in place, so a
+    search running while the index is updated keeps a consistent view.
+    """
+
+    def __init__(self):
+        self.flights = {}      # FlightID -> Leg
+        self._keys = {}        # source -> sorted [(departure, FlightID)]
+        self._legs = {}        # source -> Legs in the same order as _keys
+        self.locations = {}    # LocationID -> (City, Country)
+
+    def __len__(self):
+        return len(self.flights)
+
+    # --- Maintenance ---
+
+    def apply(self, upserts=(), deletes=()):
+        """Adds or replaces the ``upserts`` Legs and drops the ``deletes`` FlightIDs.
+
+        Only the departure lists of the affected sources are rebuilt, each
+        with one sort.
+        """
+        touched = {}  # source -> FlightIDs leaving it that change
+        for flight_id in deletes:
+            leg = self.flights.pop(flight_id, None)
+            if leg is not None:
+                touched.setdefault(leg.source, set()).add(flight_id)
+        new_by_source = {}
+        for leg in upserts:
+            old = self.flights.pop(leg.flight_id, None)
+            if old is not None:
+                touched.setdefault(old.source, set()).add(leg.flight_id)
+            if leg.arrival <= leg.departure:
+                continue  # bad data; a leg that arrives before it departs would break time ordering
+            self.flights[leg.flight_id] = leg
+            touched.setdefault(leg.source, set())
+            new_by_source.setdefault(leg.source, []).append(leg)
+
+        for source, dropped in touched.items():
+            legs = [leg for leg in self._legs.get(source, ()) if leg.flight_id not in dropped]
+            legs.extend(new_by_source.get(source, ()))
+            legs.sort(key=lambda leg: (leg.departure, leg.flight_id))
+            keys = [(leg.departure, leg.flight_id) for leg in legs]
+            # Swap both lists in together; searches holding the old ones are unaffected
+            self._keys[source], self._legs[source] = keys, legs
+
+    def sync(self, legs):
+        """Makes the index match ``legs``; returns (added, changed, removed) counts."""
+        seen = set()
+        upserts = []
+        added = 0
+        for leg in legs:
+            seen.add(leg.flight_id)
+            old = self.flights.get(leg.flight_id)
+            if old != leg:
+                upserts.append(leg)
+                added += old is None
+        deletes = [flight_id for flight_id in self.flights if flight_id not in seen]
+        self.apply(upserts, deletes)
+        return added, len(upserts) - added, len(deletes)
+
+    def load(self, conn):
+        """Reads Flight and Location and syncs the index with them."""
+        cursor = conn.cursor()
+        try:
+            cursor.execute(LOCATIONS_SQL)
+            self.locations = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+            cursor.execute(FLIGHTS_SQL)
+            return self.sync(Leg(*row[:8], Decimal(str(row[8]))) for row in cursor)
+        finally:
+            cursor.close()
+
+    # --- Queries ---
+
+    def departures(self, source, earliest, latest):
+        """Legs leaving ``source`` with earliest <= departure <= latest, in departure order."""
+        keys = self._keys.get(source)
+        if not keys:
+            return ()
+        legs = self._legs[source]
+        lo = bisect_left(keys, (earliest,))
+        hi = bisect_right(keys, (latest, float("inf")))
+        return legs[lo:hi]
+
+    def search(self, origins, destinations, depart_after, depart_before=None, optimize="earliest",
+               max_connections=DEFAULT_MAX_CONNECTIONS, min_layover=MIN_LAYOVER_MINUTES,
+               max_layover=MAX_LAYOVER_MINUTES, limit=3):
+        """Best itineraries (lists of Legs) from any of ``origins`` to any of ``destinations``."""
+        if optimize not in OPTIMIZE:
+            raise RouteSearchError(f"optimize must be one of {', '.join(OPTIMIZE)}")
+        if depart_before is None:
+            depart_before = depart_after + timedelta(hours=DEFAULT_WINDOW_HOURS)
+        origins, destinations = set(origins), set(destinations)
+        min_wait, max_wait = timedelta(minutes=min_layover), timedelta(minutes=max_layover)
+        max_legs = max_connections + 1
+        cheapest = optimize == "cheapest"
+
+        # Heap entries: (primary, secondary, tiebreak, leg, legs used, parent entry)
+        heap = []
+        counter = 0
+        for origin in origins:
+            if origin in destinations:
+                continue
+            for leg in self.departures(origin, depart_after, depart_before):
+                entry = (leg.fare, leg.arrival) if cheapest else (leg.arrival, leg.fare)
+                heap.append((*entry, counter, leg, 1, None))
+                counter += 1
+        heapq.heapify(heap)
+
+        settled = {}  # FlightID -> fewest legs it has been settled with
+        results = []
+        while heap and len(results) < limit:
+            state = heapq.heappop(heap)
+            primary, secondary, _, leg, used, _parent = state
+            if settled.get(leg.flight_id, max_legs + 1) <= used:
+                continue  # reached earlier with no more legs: dominated
+            settled[leg.flight_id] = used
+            if leg.dest in destinations:
+                results.append(_unwind(state))
+                continue
+            if used == max_legs or leg.dest in origins:
+                continue
+            visited = _cities(state)
+            fare = primary if cheapest else secondary
+            for nxt in self.departures(leg.dest, leg.arrival + min_wait, leg.arrival + max_wait):
+                if nxt.dest in visited or settled.get(nxt.flight_id, max_legs + 1) <= used + 1:
+                    continue
+                total = fare + nxt.fare
+                entry = (total, nxt.arrival) if cheapest else (nxt.arrival, total)
+                heapq.heappush(heap, (*entry, counter, nxt, used + 1, state))
+                counter += 1
+        return results
+
+
+def _unwind(state):
+    legs = []
+    while state is not None:
+        legs.append(state[3])
+        state = state[5]
+    legs.reverse()
+    return legs
+
+
+def _cities(state):
+    cities = set()
+    while state is not None:
+        cities.add(state[3].source)
+        cities.add(state[3].dest)
+        state = state[5]
+    return cities
+
+
+# --- Shared index ---
+
+def get_flight_graph(conn_factory):
+    """Returns the process-wide index, loading or catching it up first when needed.
+
+    ``conn_factory`` is only called when the index is stale. Returns None
+    when no connection could be obtained.
+    """
+    global _graph, _stale, _loaded_at
+    if _is_fresh():
+        return _graph
+    with _graph_lock:
+        if _is_fresh():
+            return _graph
+        generation, started_at = _generation, time.monotonic()
+        conn = conn_factory()
+        if conn is None:
+            return None
+        try:
+            graph = _graph if _graph is not None else FlightGraph()
+            started = time.perf_counter()
+            added, changed, removed = graph.load(conn)
+            print(f"Flight route index: {added} added, {changed} changed, {removed} removed "
+                  f"({len(graph)} flights) in {time.perf_counter() - started:.3f}s")
+        finally:
+            if conn.is_connected():
+                conn.close()
+        _graph, _loaded_at = graph, started_at
+        # A write committed during the load leaves the index stale for the next search
+        _stale = generation != _generation
+        return _graph
+
+
+def _is_fresh():
+    return _graph is not None and not _stale and time.monotonic() - _loaded_at < ROUTE_GRAPH_MAX_AGE
+
+
+@subscribe
+def invalidate_flight_graph(tables, passenger_ids):
+    """Write listener: flags the index for a catch-up when flights may have changed."""
+    global _stale, _generation
+    if tables is not None and not (tables & ROUTE_TABLES):
+        return
+    _generation += 1
+    _stale = True
+
+
+# --- Request helpers ---
+
+def parse_datetime(value, name):
+    """Accepts YYYY-MM-DD or an ISO date-time without a UTC offset (flight times are stored without one)."""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise RouteSearchError(f"{name} must be a date (YYYY-MM-DD) or date-time (YYYY-MM-DDTHH:MM)")
+    if parsed.tzinfo is not None:
+        raise RouteSearchError(f"{name} must not have a UTC offset; flight times are local times (YYYY-MM-DDTHH:MM)")
+    return parsed
+
+
+def resolve_locations(graph, value, name):
+    """A LocationID, or a city name matching every location in that city."""
+    value = (value or "").strip()
+    if not value:
+        raise RouteSearchError(f"{name} is required")
+    if value.isdigit():
+        if int(value) not in graph.locations:
+            raise RouteSearchError(f"Unknown location {value}")
+        return {int(value)}
+    matches = {location_id for location_id, (city, _) in graph.locations.items()
+               if city and city.lower() == value.lower()}
+    if not matches:
+        raise RouteSearchError(f"No location in a city named {value!r}")
+    return matches
+
+
+def parse_int(value, name, default, low, high):
+    if value in (None, ""):
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise RouteSearchError(f"{name} must be a whole number")
+    if not low <= number <= high:
+        raise RouteSearchError(f"{name} must be between {low} and {high}")
+    return number
+
+
+def search_routes(graph, args):
+    """Runs the search described by request ``args``; returns a JSON-ready dict."""
+    origins = resolve_locations(graph, args.get("from"), "from")
+    destinations = resolve_locations(graph, args.get("to"), "to")
+    depart_after = parse_datetime(args.get("depart_after"), "depart_after")
+    depart_before = (parse_datetime(args["depart_before"], "depart_before")
+                     if args.get("depart_before") else None)
+    optimize = args.get("optimize", "earliest")
+    max_connections = parse_int(args.get("max_connections"), "max_connections",
+                                DEFAULT_MAX_CONNECTIONS, 0, MAX_CONNECTIONS_LIMIT)
+    min_layover = parse_int(args.get("min_layover"), "min_layover", MIN_LAYOVER_MINUTES, 0, 24 * 60)
+    max_layover = parse_int(args.get("max_layover"), "max_layover", MAX_LAYOVER_MINUTES, min_layover, 7 * 24 * 60)
+    limit = parse_int(args.get("limit"), "limit", 3, 1, MAX_RESULTS)
+
+    started = time.perf_counter()
+    itineraries = graph.search(origins, destinations, depart_after, depart_before, optimize,
+                               max_connections, min_layover, max_layover, limit)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    def place(location_id):
+        city, country = graph.locations.get(location_id, (None, None))
+        return {"location_id": location_id, "city": city, "country": country}
+
+    routes = []
+    for legs in itineraries:
+        routes.append({
+            "departure": legs[0].departure.isoformat(),
+            "arrival": legs[-1].arrival.isoformat(),
+            "duration_minutes": int((legs[-1].arrival - legs[0].departure).total_seconds() // 60),
+            "connections": len(legs) - 1,
+            "fare": str(sum(leg.fare for leg in legs)),
+            "legs": [{
+                "flight_id": leg.flight_id,
+                "flight_number": leg.flight_number,
+                "carrier": leg.carrier,
+                "class": leg.flight_class,
+                "from": place(leg.source),
+                "to": place(leg.dest),
+                "departure": leg.departure.isoformat(),
+                "arrival": leg.arrival.isoformat(),
+                "fare": str(leg.fare),
+            } for leg in legs],
+        })
+    return {"optimize": optimize, "routes": routes, "flights_indexed": len(graph),
+            "search_ms": round(elapsed_ms, 3)}
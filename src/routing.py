@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""Sends read-only work to replicas and everything else to the primary.
+
+``Router.connect(read_only, passenger_id)`` returns a pooled connection:
+
+    * writes, and anything not marked read-only, always go to the primary,
+    * reads go to a replica chosen by ``strategy``: "weighted" (smooth
+      weighted round-robin over the configured weights) or
+      "least_connections" (fewest checked-out connections per unit of
+      weight),
+    * a replica whose replication lag is above ``max_lag`` seconds, or that
+      could not be reached in the last ``retry_after`` seconds, is skipped;
+      with no usable replica the read goes to the primary.
+
+Read-your-writes: every committed write (through ``write_events``) is
+remembered for ``max_lag`` seconds, for the passengers it touched, for the
+browser session that made it, and for everyone when the write does not say
+which passengers changed. Reads for those go to the primary until then, and
+since no replica more than ``max_lag`` seconds behind is used, by then the
+replicas have the write.
+
+With no replicas configured the router only hands out primary connections.
+To see what the router sees:
+
+    python -m src.routing status
+"""
+import argparse
+import sys
+import threading
+import time
+
+from mysql.connector import Error
+from flask import has_request_context, session
+
+from src.pool import PoolTimeout
+from src.write_events import subscribe
+
+STRATEGIES = ("weighted", "least_connections")
+SESSION_KEY = "_primary_reads_until"  # Flask session key: read from the primary until this time
+
+LAG_SQL = ("SHOW REPLICA STATUS", "SHOW SLAVE STATUS")  # MySQL 8.0.22+ name first
+LAG_COLUMNS = ("Seconds_Behind_Source", "Seconds_Behind_Master")
+
+_recent_writes = {}  # PassengerID -> time.monotonic() of its last write
+_recent_writes_lock = threading.Lock()
+_last_unknown_write = float("-inf")  # last write that didn't say which passengers it touched
+_write_window = 5.0  # seconds reads stay on the primary after a write; set by the router
+_routing = False  # True once a router with replicas exists; until then writes need no bookkeeping
+
+
+def parse_replicas(spec, default_port=3306):
+    """Parses "host[:port][*weight],..." into [(host, port, weight)]."""
+    replicas = []
+    for entry in (spec or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        address, _, weight = entry.partition("*")
+        host, _, port = address.partition(":")
+        try:
+            replicas.append((host, int(port or default_port), int(weight or 1)))
+        except ValueError:
+            raise ValueError(f"Invalid replica {entry!r}; expected host[:port][*weight]")
+        if replicas[-1][2] < 1:
+            raise ValueError(f"Replica weight must be at least 1 in {entry!r}")
+    return replicas
+
+
+class Replica:
+    """One replica: its pool, weight and last known lag."""
+
+    def __init__(self, name, pool, weight=1):
+        self.name = name
+        self.pool = pool
+        self.weight = weight
+        self.lag = None             # seconds behind the primary at the last check (None = unknown)
+        self.lag_checked = float("-inf")
+        self.down_until = float("-inf")
+        self.reads = 0
+        self.failures = 0
+        self.current_weight = 0     # smooth weighted round-robin state
+        self._checking = threading.Lock()
+
+    def check_lag(self):
+        """Asks the replica how far behind it is; returns the lag in seconds (inf if replication is stopped)."""
+        conn = self.pool.connect()
+        try:
+            cursor = conn.cursor(dictionary=True)
+            try:
+                for sql in LAG_SQL:
+                    try:
+                        cursor.execute(sql)
+                        break
+                    except Error:
+                        continue
+                status = cursor.fetchall()
+            finally:
+                cursor.close()
+        finally:
+            conn.close()
+        if not status:
+            return 0.0  # not set up as a replica (e.g. a second local instance used for testing)
+        for column in LAG_COLUMNS:
+            if column in status[0]:
+                lag = status[0][column]
+                return float("inf") if lag is None else float(lag)
+        return 0.0
+
+    def stats(self):
+        return {"name": self.name, "weight": self.weight, "lag": self.lag, "reads": self.reads,
+                "failures": self.failures, "down": self.down_until > time.monotonic(),
+                "pool": self.pool.stats()}
+
+
+class Router:
+    """Picks the primary or a replica pool for each checkout."""
+
+    def __init__(self, primary, replicas=(), strategy="least_connections", max_lag=5.0,
+                 lag_check_interval=2.0, retry_after=30.0):
+        global _write_window, _routing
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown replica strategy {strategy!r}; use one of {', '.join(STRATEGIES)}")
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.strategy = strategy
+        self.max_lag = max_lag
+        self.lag_check_interval = lag_check_interval
+        self.retry_after = retry_after
+        self.primary_reads = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+        _write_window = max_lag
+        _routing = _routing or bool(self.replicas)
+
+    def connect(self, read_only=False, passenger_id=None):
+        """Checks out a connection for a write (default) or a read."""
+        if not read_only or not self.replicas or must_read_primary(passenger_id):
+            if read_only:
+                self.primary_reads += 1
+            return self.primary.connect()
+        tried = set()
+        while True:
+            replica = self._choose(tried)
+            if replica is None:
+                self.fallbacks += 1
+                return self.primary.connect()
+            try:
+                conn = replica.pool.connect()
+            except (Error, PoolTimeout) as e:
+                self._mark_down(replica, e)
+                tried.add(replica.name)
+                continue
+            replica.reads += 1
+            return conn
+
+    def _mark_down(self, replica, error):
+        replica.failures += 1
+        replica.down_until = time.monotonic() + self.retry_after
+        print(f"Replica {replica.name} unavailable, reading from the primary for {self.retry_after:.0f}s: {error}")
+
+    def _refresh_lag(self, replica, now):
+        # Only one request re-checks a replica; the others use the last known lag
+        if now - replica.lag_checked < self.lag_check_interval or not replica._checking.acquire(blocking=False):
+            return
+        try:
+            replica.lag = replica.check_lag()
+        except (Error, PoolTimeout) as e:
+            self._mark_down(replica, e)
+        finally:
+            replica.lag_checked = time.monotonic()
+            replica._checking.release()
+
+    def _choose(self, exclude=()):
+        now = time.monotonic()
+        candidates = []
+        for replica in self.replicas:
+            if replica.name in exclude or replica.down_until > now:
+                continue
+            self._refresh_lag(replica, now)
+            if replica.down_until > now or replica.lag is None or replica.lag > self.max_lag:
+                continue
+            candidates.append(replica)
+        if not candidates:
+            return None
+        if self.strategy == "least_connections":
+            return min(candidates, key=lambda r: (r.pool.stats()["in_use"] / r.weight, -r.weight))
+        with self._lock:
+            # Smooth weighted round-robin: spreads picks evenly instead of in bursts per replica
+            total = sum(r.weight for r in candidates)
+            for replica in candidates:
+                replica.current_weight += replica.weight
+            chosen = max(candidates, key=lambda r: r.current_weight)
+            chosen.current_weight -= total
+        return chosen
+
+    def stats(self):
+        return {"strategy": self.strategy, "max_lag": self.max_lag, "primary_reads": self.primary_reads,
+                "fallbacks": self.fallbacks, "replicas": [replica.stats() for replica in self.replicas]}
+
+
+# --- Read-your-writes ---
+
+def must_read_primary(passenger_id=None):
+    """True while a recent write could still be missing from the replicas for this read."""
+    now = time.monotonic()
+    if now - _last_unknown_write < _write_window:
+        return True
+    if passenger_id is not None:
+        written = _recent_writes.get(passenger_id)
+        if written is not None and now - written < _write_window:
+            return True
+    if has_request_context() and session.get(SESSION_KEY, 0) > time.time():
+        return True
+    return False
+
+
+@subscribe
+def note_write(tables, passenger_ids):
+    """Write listener: keeps the writer's and the passengers' next reads on the primary."""
+    global _last_unknown_write
+    if not _routing:
+        return
+    now = time.monotonic()
+    if passenger_ids is None:
+        _last_unknown_write = now
+    else:
+        with _recent_writes_lock:
+            for passenger_id in passenger_ids:
+                _recent_writes[passenger_id] = now
+            if len(_recent_writes) > 10000:
+                # Forget writes old enough that every usable replica has them
+                for passenger_id, written in list(_recent_writes.items()):
+                    if now - written >= _write_window:
+                        del _recent_writes[passenger_id]
+    read_own_writes()
+
+
+def read_own_writes():
+    """Sends the current browser session's reads to the primary for the next ``max_lag`` seconds.
+
+    Called for every write that goes through ``notify_write``; write paths
+    that don't notify (the report refresh) call it directly.
+    """
+    if _routing and has_request_context():
+        session[SESSION_KEY] = time.time() + _write_window
+
+
+def main(argv=None):
+    from src.database import get_router
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    subcommands.add_parser("status", help="show each replica's lag and where reads would go")
+    parser.parse_args(argv)
+
+    router = get_router()
+    if not router.replicas:
+        print("No replicas configured (MYSQL_REPLICAS); every read goes to the primary.")
+        return 0
+    print(f"strategy {router.strategy}, max lag {router.max_lag}s")
+    for replica in router.replicas:
+        try:
+            lag = replica.check_lag()
+            print(f"  {replica.name:<24} weight {replica.weight}  lag {lag}s"
+                  f"{'  (too far behind: skipped)' if lag > router.max_lag else ''}")
+        except (Error, PoolTimeout) as e:
+            print(f"  {replica.name:<24} weight {replica.weight}  unreachable: {e}")
+    picks = {}
+    for _ in range(20):
+        replica = router._choose()
+        name = replica.name if replica else "primary"
+        picks[name] = picks.get(name, 0) + 1
+    print("next 20 reads: " + ", ".join(f"{name} x{count}" for name, count in picks.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,622 @@
+# -*- coding: utf-8 -*-
+"""Ranked full-text search over reviews, accommodations, passengers and flights.
+
+Searched text, as one document per row:
+
+    review          Review.Text
+    accommodation   Accommodation.Name and Facilities
+    passenger       Passenger.Name and Email
+    flight          Flight.Carrier
+
+The index is an in-process inverted index (it works the same on MySQL and
+SQLite, where FULLTEXT does not exist). Text is lower-cased, accents are
+dropped and it is split into words. Each word's postings are a NumPy array of
+document numbers with a parallel array of term frequencies, so a query scores
+every matching document with BM25 in a few vectorised passes:
+
+    * every query word must match (AND); the last word also matches as a
+      prefix ("poo" finds "pool"), so the box can search as you type,
+    * words of TYPO_MIN_LENGTH letters or more also match vocabulary words one
+      edit away (insert, delete, replace or swap two neighbours), found by
+      looking every such variant of the word up in the vocabulary (a few
+      hundred dictionary lookups) rather than by scanning it. Prefix and typo
+      matches score a little less than exact ones,
+    * the rarest word picks the candidate documents and every other word
+      is only looked up (binary search) at those candidates, so a query
+      mixing a rare word with very common ones costs what the rare one does,
+    * results are ranked by score and returned a page at a time.
+
+Keeping it in sync: documents added since the last merge sit in a small
+"delta" segment of flat arrays, merged into the per-word postings once it
+holds MERGE_DOCS documents. A changed or deleted row marks its old document
+dead; dead documents are filtered at query time and dropped from the
+postings when they make up a quarter of the index. A write to one of the
+indexed tables flags that table for a catch-up on the next search: the
+table is re-read and only rows whose text changed are re-indexed. Writes
+that say which passengers they touched re-read just those passengers.
+Writes made by other worker processes are not announced here, so every
+table is also caught up once the index is SEARCH_MAX_AGE seconds old.
+"""
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+
+import numpy as np
+
+from src.write_events import subscribe
+
+DEFAULT_PER_PAGE = 20  # Results per page unless the caller asks otherwise
+MAX_PER_PAGE = 100
+MAX_QUERY_WORDS = 10
+MAX_QUERY_LENGTH = 200
+PREFIX_MIN_LENGTH = 3  # Shorter last words only match exactly
+PREFIX_SCAN = 1000  # Vocabulary words looked at for completions of the last word
+PREFIX_EXPANSIONS = int(os.environ.get("SEARCH_PREFIX_EXPANSIONS", 30))  # Most frequent completions of the last word
+TYPO_MIN_LENGTH = 4  # Shorter words must be spelled right
+TYPO_EXPANSIONS = 10  # Most frequent one-edit neighbours per word
+TYPO_ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789"  # Letters tried for replacements and inserts
+MERGE_DOCS = int(os.environ.get("SEARCH_MERGE_DOCS", 5000))  # Delta documents before they are merged into the postings
+SEARCH_MAX_AGE = float(os.environ.get("SEARCH_MAX_AGE", 60))  # Seconds before a catch-up of every table without a local write
+SNIPPET_CHARS = 160
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+PREFIX_WEIGHT = 0.9  # Score factor of a prefix completion
+TYPO_WEIGHT = 0.7  # Score factor of a one-edit match
+DENSE_FRACTION = 16  # Forms of a word matching over 1/16 of the index are combined in a dense array
+
+# Searched rows: type -> (table, key column, text columns)
+SOURCES = {
+    "review": ("Review", "ReviewID", ("Text",)),
+    "accommodation": ("Accommodation", "AccommodationID", ("Name", "Facilities")),
+    "passenger": ("Passenger", "PassengerID", ("Name", "Email")),
+    "flight": ("Flight", "FlightID", ("Carrier",)),
+}
+SOURCE_NAMES = tuple(SOURCES)
+
+# What a result shows, per type: one query per type on the page
+DETAILS_SQL = {
+    "review": """
+        SELECT ReviewID AS id, BookingID, PassengerID, Rating, ReviewDate, Text
+        FROM Review WHERE ReviewID IN ({ids})
+    """,
+    "accommodation": """
+        SELECT a.AccommodationID AS id, a.Name, a.Type, a.Rate, a.Facilities, l.City, l.Country
+        FROM Accommodation a JOIN Location l ON a.LocationID = l.LocationID
+        WHERE a.AccommodationID IN ({ids})
+    """,
+    "passenger": """
+        SELECT PassengerID AS id, Name, Email, Phone FROM Passenger WHERE PassengerID IN ({ids})
+    """,
+    "flight": """
+        SELECT f.FlightID AS id, f.FlightNumber, f.Carrier, f.DepartureDateTime, f.Fare,
+               src.City AS SourceCity, dst.City AS DestCity
+        FROM Flight f
+        JOIN Location src ON f.SourceLocationID = src.LocationID
+        JOIN Location dst ON f.DestLocationID = dst.LocationID
+        WHERE f.FlightID IN ({ids})
+    """,
+}
+
+REFRESH_BATCH = 1000  # Keys per IN (...) when re-reading single rows
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+_index = None
+_index_lock = threading.Lock()
+_pending_lock = threading.Lock()
+_stale_sources = set(SOURCES)  # types to re-read on the next search
+_pending_passengers = set()    # PassengerIDs to re-read on the next search
+_synced_at = 0.0  # time.monotonic() when every table was last caught up
+
+
+class SearchError(ValueError):
+    """Raised for invalid search requests (empty query, unknown type, ...)."""
+
+
+def tokenize(text):
+    """Lower-cased words of ``text`` with accents removed."""
+    if not text:
+        return []
+    text = str(text).lower()
+    if not text.isascii():
+        text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    return _TOKEN_RE.findall(text)
+
+
+def one_edit_variants(word):
+    """Every string one insert, delete, replace or adjacent swap away from ``word``."""
+    splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
+    variants = {head + tail[1:] for head, tail in splits if tail}
+    variants.update(head + tail[1] + tail[0] + tail[2:] for head, tail in splits if len(tail) > 1)
+    variants.update(head + c + tail[1:] for head, tail in splits if tail for c in TYPO_ALPHABET)
+    variants.update(head + c + tail for head, tail in splits for c in TYPO_ALPHABET)
+    variants.discard(word)
+    return variants
+
+
+class SearchIndex:
+    """Inverted index of the searched rows; see the module docstring."""
+
+    def __init__(self):
+        self.term_ids = {}        # word -> term number
+        self.terms = []           # term number -> word
+        self.sorted_terms = []    # vocabulary in order as of the last merge, for prefix lookups
+        self.new_terms = []       # words added since, also in order
+        self.postings = {}        # term number -> (document numbers, term frequencies) merged so far
+        # Documents added since the last merge, one entry per (term, document)
+        self.delta_terms = array("i")
+        self.delta_docs = array("i")
+        self.delta_tfs = array("f")
+        self.delta_start = 0      # first document number not merged yet
+        # Per document number
+        self.doc_source = array("b")
+        self.doc_key = array("q")
+        self.doc_len = array("i")
+        self.doc_fingerprint = array("q")
+        self.alive = bytearray()
+        self.keys = {name: {} for name in SOURCES}  # type -> row key -> document number
+        self.live_docs = 0
+        self.dead_docs = 0
+        self.total_len = 0
+        self._lock = threading.RLock()
+
+    # --- Maintenance ---
+
+    def _term_id(self, word):
+        term_id = self.term_ids.get(word)
+        if term_id is None:
+            term_id = self.term_ids[word] = len(self.terms)
+            self.terms.append(word)
+            insort(self.new_terms, word)
+        return term_id
+
+    def upsert(self, source, key, fields):
+        """Indexes one row's text fields; a row whose text did not change is left alone.
+
+        Returns True if the row was (re-)indexed.
+        """
+        fingerprint = hash(tuple(fields))
+        with self._lock:
+            doc = self.keys[source].get(key)
+            if doc is not None:
+                if self.doc_fingerprint[doc] == fingerprint:
+                    return False
+                self._kill(doc)
+            words = []
+            for value in fields:
+                words.extend(tokenize(value))
+            doc = len(self.doc_len)
+            self.doc_source.append(SOURCE_NAMES.index(source))
+            self.doc_key.append(key)
+            self.doc_len.append(len(words))
+            self.doc_fingerprint.append(fingerprint)
+            self.alive.append(1)
+            self.keys[source][key] = doc
+            self.live_docs += 1
+            self.total_len += len(words)
+            for word, tf in Counter(words).items():
+                self.delta_terms.append(self._term_id(word))
+                self.delta_docs.append(doc)
+                self.delta_tfs.append(tf)
+            return True
+
+    def remove(self, source, key):
+        with self._lock:
+            doc = self.keys[source].pop(key, None)
+            if doc is not None:
+                self._kill(doc)
+
+    def _kill(self, doc):
+        self.alive[doc] = 0
+        self.live_docs -= 1
+        self.dead_docs += 1
+        self.total_len -= self.doc_len[doc]
+
+    def merge(self):
+        """Moves the delta segment into the per-term postings, dropping dead documents if there are many."""
+        with self._lock:
+            alive = np.frombuffer(self.alive, dtype=np.uint8).astype(bool)
+            if len(self.delta_docs):
+                terms = np.frombuffer(self.delta_terms, dtype=np.int32)
+                docs = np.frombuffer(self.delta_docs, dtype=np.int32)
+                tfs = np.frombuffer(self.delta_tfs, dtype=np.float32)
+                # Stable sort by term keeps each term's documents in ascending order
+                order = np.argsort(terms, kind="stable")
+                terms, docs, tfs = terms[order], docs[order], tfs[order]
+                bounds = np.flatnonzero(np.diff(terms)) + 1
+                starts = np.concatenate(([0], bounds))
+                ends = np.concatenate((bounds, [len(terms)]))
+                for start, end in zip(starts.tolist(), ends.tolist()):
+                    term_id = int(terms[start])
+                    old = self.postings.get(term_id)
+                    if old is None:
+                        self.postings[term_id] = (docs[start:end].copy(), tfs[start:end].copy())
+                    else:
+                        self.postings[term_id] = (np.concatenate((old[0], docs[start:end])),
+                                                  np.concatenate((old[1], tfs[start:end])))
+                del terms, docs, tfs
+                self.delta_terms = array("i")
+                self.delta_docs = array("i")
+                self.delta_tfs = array("f")
+            self.delta_start = len(self.doc_len)
+            if self.new_terms:
+                self.sorted_terms = sorted(self.terms)
+                self.new_terms = []
+            if self.dead_docs and self.dead_docs * 4 >= self.live_docs + self.dead_docs:
+                for term_id, (docs, tfs) in list(self.postings.items()):
+                    keep = alive[docs]
+                    if keep.all():
+                        continue
+                    if keep.any():
+                        self.postings[term_id] = (docs[keep], tfs[keep])
+                    else:
+                        del self.postings[term_id]
+                self.dead_docs = 0
+
+    def merge_if_needed(self):
+        if len(self.doc_len) - self.delta_start >= MERGE_DOCS:
+            self.merge()
+
+    def sync_source(self, conn, source):
+        """Makes the documents of ``source`` match its table; returns (indexed, removed) counts."""
+        table, key_column, columns = SOURCES[source]
+        cursor = conn.cursor()
+        indexed = 0
+        seen = set()
+        try:
+            cursor.execute(f"SELECT {key_column}, {', '.join(columns)} FROM {table}")
+            for row in cursor:
+                seen.add(row[0])
+                indexed += self.upsert(source, row[0], row[1:])
+        finally:
+            cursor.close()
+        removed = [key for key in self.keys[source] if key not in seen]
+        for key in removed:
+            self.remove(source, key)
+        return indexed, len(removed)
+
+    def refresh_keys(self, conn, source, keys):
+        """Re-reads just the rows ``keys`` of ``source``; returns (indexed, removed) counts."""
+        table, key_column, columns = SOURCES[source]
+        keys = sorted(keys)
+        indexed = 0
+        seen = set()
+        cursor = conn.cursor()
+        try:
+            for i in range(0, len(keys), REFRESH_BATCH):
+                batch = keys[i:i + REFRESH_BATCH]
+                cursor.execute(f"SELECT {key_column}, {', '.join(columns)} FROM {table} "
+                               f"WHERE {key_column} IN ({', '.join(['%s'] * len(batch))})", tuple(batch))
+                for row in cursor.fetchall():
+                    seen.add(row[0])
+                    indexed += self.upsert(source, row[0], row[1:])
+        finally:
+            cursor.close()
+        removed = [key for key in keys if key not in seen and key in self.keys[source]]
+        for key in removed:
+            self.remove(source, key)
+        return indexed, len(removed)
+
+    # --- Queries ---
+
+    def _document_frequency(self, term_id):
+        merged = self.postings.get(term_id)
+        return len(merged[0]) if merged is not None else 0
+
+    def expand(self, word, prefix=False):
+        """Vocabulary terms a query word matches, as [(term number, score factor)]."""
+        matches = {}
+        term_id = self.term_ids.get(word)
+        if term_id is not None:
+            matches[term_id] = 1.0
+        if prefix and len(word) >= PREFIX_MIN_LENGTH:
+            completions = []
+            for vocabulary in (self.sorted_terms, self.new_terms):
+                i = bisect_left(vocabulary, word)
+                stop = min(len(vocabulary), i + PREFIX_SCAN)
+                while i < stop and vocabulary[i].startswith(word):
+                    if vocabulary[i] != word:
+                        completions.append(self.term_ids[vocabulary[i]])
+                    i += 1
+            completions.sort(key=self._document_frequency, reverse=True)
+            for completion in completions[:PREFIX_EXPANSIONS]:
+                matches.setdefault(completion, PREFIX_WEIGHT)
+        if len(word) >= TYPO_MIN_LENGTH:
+            neighbours = [self.term_ids[variant] for variant in one_edit_variants(word)
+                          if variant in self.term_ids]
+            neighbours = [term_id for term_id in neighbours if term_id not in matches]
+            neighbours.sort(key=self._document_frequency, reverse=True)
+            for neighbour in neighbours[:TYPO_EXPANSIONS]:
+                matches[neighbour] = TYPO_WEIGHT
+        return list(matches.items())
+
+    def _postings(self, term_id, delta_terms, delta_docs, delta_tfs):
+        merged = self.postings.get(term_id)
+        if len(delta_terms):
+            in_delta = delta_terms == term_id
+            if in_delta.any():
+                if merged is None:
+                    return delta_docs[in_delta], delta_tfs[in_delta]
+                return (np.concatenate((merged[0], delta_docs[in_delta])),
+                        np.concatenate((merged[1], delta_tfs[in_delta])))
+        if merged is None:
+            return None
+        return merged
+
+    def search(self, query, sources=None, offset=0, limit=DEFAULT_PER_PAGE):
+        """Ranks the documents matching every word of ``query``.
+
+        Returns (total matches, [(type, key, score)] for the requested page,
+        vocabulary terms that matched).
+        """
+        words = tokenize(query)[:MAX_QUERY_WORDS]
+        if not words:
+            return 0, [], []
+        with self._lock:
+            if not self.live_docs:
+                return 0, [], []
+            doc_len = np.frombuffer(self.doc_len, dtype=np.int32)
+            alive = np.frombuffer(self.alive, dtype=np.uint8)
+            doc_source = np.frombuffer(self.doc_source, dtype=np.int8)
+            delta_terms = np.frombuffer(self.delta_terms, dtype=np.int32)
+            delta_docs = np.frombuffer(self.delta_docs, dtype=np.int32)
+            delta_tfs = np.frombuffer(self.delta_tfs, dtype=np.float32)
+            total_docs = self.live_docs + self.dead_docs
+            average_len = max(self.total_len / self.live_docs, 1.0)
+
+            matched_terms = []
+            matches = []
+            for position, word in enumerate(words):
+                forms = []
+                for term_id, factor in self.expand(word, prefix=position == len(words) - 1):
+                    postings = self._postings(term_id, delta_terms, delta_docs, delta_tfs)
+                    if postings is None:
+                        continue
+                    matched_terms.append(self.terms[term_id])
+                    docs, tfs = postings
+                    df = len(docs)
+                    idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+                    forms.append((docs, tfs, factor * idf * (BM25_K1 + 1)))
+                if not forms:
+                    return 0, [], matched_terms
+                matches.append(forms)
+
+            def bm25(docs, tfs, weight):
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len[docs] / average_len)
+                return weight * tfs / (tfs + norm)
+
+            # The rarest word picks the candidates; every other word only looks those up
+            matches.sort(key=lambda forms: sum(len(docs) for docs, _, _ in forms))
+            first = matches[0]
+            if len(first) == 1:
+                docs, tfs, weight = first[0]
+                ids, scores = docs, bm25(docs, tfs, weight)
+            elif sum(len(docs) for docs, _, _ in first) * DENSE_FRACTION >= total_docs:
+                # A document matching several forms of one word counts its best one
+                best = np.zeros(total_docs, dtype=np.float32)
+                for docs, tfs, weight in first:
+                    best[docs] = np.maximum(best[docs], bm25(docs, tfs, weight))
+                ids = np.flatnonzero(best).astype(np.int32)
+                scores = best[ids]
+            else:
+                ids = np.concatenate([docs for docs, _, _ in first])
+                scores = np.concatenate([bm25(docs, tfs, weight) for docs, tfs, weight in first])
+                order = np.lexsort((-scores, ids))
+                ids, scores = ids[order], scores[order]
+                keep = np.ones(len(ids), dtype=bool)
+                keep[1:] = ids[1:] != ids[:-1]
+                ids, scores = ids[keep], scores[keep]
+            for forms in matches[1:]:
+                best = np.zeros(len(ids), dtype=np.float32)
+                for docs, tfs, weight in forms:
+                    # Postings are in ascending document order
+                    at = np.minimum(np.searchsorted(docs, ids), len(docs) - 1)
+                    hit = docs[at] == ids
+                    best[hit] = np.maximum(best[hit], bm25(ids[hit], tfs[at[hit]], weight))
+                found = best > 0
+                ids, scores = ids[found], scores[found] + best[found]
+                if not len(ids):
+                    return 0, [], matched_terms
+
+            keep = alive[ids].astype(bool)
+            if sources:
+                keep &= np.isin(doc_source[ids], [SOURCE_NAMES.index(source) for source in sources])
+            ids, scores = ids[keep], scores[keep]
+            total = len(ids)
+            wanted = min(offset + limit, total)
+            if wanted <= 0 or offset >= total:
+                return total, [], matched_terms
+            top = np.argpartition(-scores, wanted - 1)[:wanted] if wanted < total else np.arange(total)
+            # Best score first; ties in the order the rows were indexed
+            top = top[np.lexsort((ids[top], -scores[top]))][offset:offset + limit]
+            page = [(SOURCE_NAMES[self.doc_source[doc]], self.doc_key[doc], round(float(score), 4))
+                    for doc, score in zip(ids[top].tolist(), scores[top].tolist())]
+            return total, page, matched_terms
+
+    def describe(self):
+        with self._lock:
+            return {"documents": self.live_docs, "dead": self.dead_docs, "terms": len(self.terms),
+                    "unmerged": len(self.doc_len) - self.delta_start,
+                    "by_type": {name: len(keys) for name, keys in self.keys.items()}}
+
+
+# --- Shared index ---
+
+def get_search_index(conn_factory):
+    """Returns the process-wide index, building or catching it up first when needed.
+
+    ``conn_factory`` is only called when a table was written since the last
+    search. Returns None when no connection could be obtained.
+    """
+    global _index, _synced_at
+    expired = time.monotonic() - _synced_at >= SEARCH_MAX_AGE
+    if _index is not None and not _stale_sources and not _pending_passengers and not expired:
+        return _index
+    with _index_lock:
+        with _pending_lock:
+            if time.monotonic() - _synced_at >= SEARCH_MAX_AGE:
+                _stale_sources.update(SOURCES)
+            stale, passengers = set(_stale_sources), set(_pending_passengers)
+            _stale_sources.clear()
+            _pending_passengers.clear()
+        if _index is not None and not stale and not passengers:
+            return _index
+
+        def retry_later():
+            # Whatever was not caught up is retried by the next search
+            with _pending_lock:
+                _stale_sources.update(stale)
+                _pending_passengers.update(passengers)
+
+        started_at = time.monotonic()
+        conn = conn_factory()
+        if conn is None:
+            retry_later()
+            return None
+        try:
+            index = _index if _index is not None else SearchIndex()
+            started = time.perf_counter()
+            indexed = removed = 0
+            for source in SOURCE_NAMES:
+                if source in stale:
+                    counts = index.sync_source(conn, source)
+                elif source == "passenger" and passengers:
+                    counts = index.refresh_keys(conn, source, passengers)
+                else:
+                    continue
+                indexed += counts[0]
+                removed += counts[1]
+            if _index is None:
+                index.merge()  # one bulk merge after the initial build
+            else:
+                index.merge_if_needed()
+            print(f"Search index: {indexed} documents indexed, {removed} removed "
+                  f"({index.live_docs} documents) in {time.perf_counter() - started:.3f}s")
+        except BaseException:
+            retry_later()
+            raise
+        finally:
+            if conn.is_connected():
+                conn.close()
+        _index = index
+        if stale == set(SOURCES):
+            _synced_at = started_at
+        return _index
+
+
+@subscribe
+def invalidate_search(tables, passenger_ids):
+    """Write listener: flags the written tables (or just the written passengers) for a catch-up."""
+    with _pending_lock:
+        for source, (table, _, _) in SOURCES.items():
+            if tables is not None and table.lower() not in tables:
+                continue
+            if source == "passenger" and tables is not None and passenger_ids is not None:
+                _pending_passengers.update(passenger_ids)
+            else:
+                _stale_sources.add(source)
+
+
+# --- Request helpers ---
+
+def _snippet(text, terms):
+    """Up to SNIPPET_CHARS of ``text`` around the first matched term."""
+    text = " ".join(str(text or "").split())
+    if len(text) <= SNIPPET_CHARS:
+        return text
+    lowered = text.lower()
+    positions = [p for p in (lowered.find(term) for term in terms) if p >= 0]
+    start = max(0, min(positions) - SNIPPET_CHARS // 4) if positions else 0
+    end = min(len(text), start + SNIPPET_CHARS)
+    return ("..." if start else "") + text[start:end] + ("..." if end < len(text) else "")
+
+
+def _result(source, row, score, terms):
+    if source == "review":
+        title = f"Review {row['id']} ({row['Rating']}/5)"
+        snippet = _snippet(row["Text"], terms)
+    elif source == "accommodation":
+        title = row["Name"]
+        snippet = _snippet(f"{row['Type'] or 'Accommodation'} in {row['City']}, {row['Country']}. "
+                           f"{row['Facilities'] or ''}", terms)
+    elif source == "passenger":
+        title = row["Name"]
+        snippet = row["Email"] or ""
+    else:
+        title = f"{row['FlightNumber']} {row['Carrier']}"
+        snippet = f"{row['SourceCity']} to {row['DestCity']}, departs {row['DepartureDateTime']}"
+    fields = {key: value if value is None or isinstance(value, (int, float, str)) else str(value)
+              for key, value in row.items() if key not in ("id", "Text")}
+    return {"type": source, "id": row["id"], "score": score, "title": title, "snippet": snippet,
+            "fields": fields}
+
+
+def load_results(conn, hits, terms):
+    """Fetches what each hit shows, one query per type; keeps the ranking order."""
+    keys_by_source = {}
+    for source, key, _ in hits:
+        keys_by_source.setdefault(source, []).append(key)
+    rows = {}
+    cursor = conn.cursor(dictionary=True)
+    try:
+        for source, keys in keys_by_source.items():
+            cursor.execute(DETAILS_SQL[source].format(ids=", ".join(["%s"] * len(keys))), tuple(keys))
+            for row in cursor.fetchall():
+                rows[(source, row["id"])] = row
+    finally:
+        cursor.close()
+    # A row deleted since the last catch-up has no details; it drops out of the page
+    return [_result(source, rows[(source, key)], score, terms)
+            for source, key, score in hits if (source, key) in rows]
+
+
+def parse_search_args(args):
+    """Validates ?q=&type=&page=&per_page=; returns (query, types, page, per_page)."""
+    query = (args.get("q") or "").strip()
+    if not query:
+        raise SearchError("Enter something to search for.")
+    if len(query) > MAX_QUERY_LENGTH:
+        raise SearchError(f"Searches are limited to {MAX_QUERY_LENGTH} characters.")
+    types = [t.strip().lower() for t in (args.get("type") or "").split(",") if t.strip()]
+    unknown = [t for t in types if t not in SOURCES]
+    if unknown:
+        raise SearchError(f"Unknown type {unknown[0]!r}; use {', '.join(SOURCE_NAMES)}")
+    try:
+        page = int(args.get("page") or 1)
+        per_page = int(args.get("per_page") or DEFAULT_PER_PAGE)
+    except (TypeError, ValueError):
+        raise SearchError("page and per_page must be whole numbers")
+    if page < 1:
+        raise SearchError("page must be 1 or more")
+    return query, types, page, max(1, min(per_page, MAX_PER_PAGE))
+
+
+def run_search(index, args, conn_factory):
+    """Answers one search request; returns a JSON-ready dict.
+
+    ``conn_factory`` supplies the connection the page's rows are read from.
+    """
+    query, types, page, per_page = parse_search_args(args)
+    started = time.perf_counter()
+    total, hits, terms = index.search(query, types, (page - 1) * per_page, per_page)
+    search_ms = round((time.perf_counter() - started) * 1000, 3)
+    results = []
+    if hits:
+        conn = conn_factory()
+        if conn is None:
+            raise ConnectionError("Database connection failed")
+        try:
+            results = load_results(conn, hits, terms)
+        finally:
+            if conn.is_connected():
+                conn.close()
+    return {"query": query, "types": types or list(SOURCE_NAMES), "total": total, "page": page,
+            "per_page": per_page, "pages": (total + per_page - 1) // per_page, "results": results,
+            "terms": sorted(set(terms)), "search_ms": search_ms}
@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+"""Runs the application's MySQL-flavoured SQL against SQLite.
+
+``connect()`` returns a connection that behaves like a mysql.connector one
+for the parts the app uses (``cursor(dictionary=True)``, ``%s`` parameters,
+commit / rollback / close), so code such as ``load_itinerary`` or
+``TablePage`` runs unchanged against a local SQLite file.
+
+Most of the MySQL-only syntax in the queries is function calls, which are
+registered as SQLite functions (YEAR, MONTH, QUARTER, DATEDIFF, NOW, ...);
+``translate()`` rewrites the little that is left (``%s`` placeholders,
+backtick quoting, and ``INSERT ... ON DUPLICATE KEY UPDATE``, which becomes an
+``ON CONFLICT DO UPDATE`` upsert; that needs SQLite 3.35 or newer). Integer division still follows SQLite rules, so
+percentages computed as COUNT(...) / COUNT(...) come out truncated.
+
+The session statements the app sends are emulated per connection:
+
+    * ``SET SESSION max_execution_time = N`` interrupts statements (and the
+      reading of their rows) after N ms, ``= DEFAULT`` lifts the limit,
+    * ``SET @defer_booking_totals = 1 / NULL`` switches the booking total
+      triggers off and on through the BookingTotalsDeferred table,
+    * ``KILL QUERY <connection_id>`` interrupts another connection of this
+      process.
+
+sqlite3 errors are raised as the mysql.connector error classes with the
+matching MySQL error numbers (1062 duplicate entry, 1452 foreign key, 3024
+timeout, ...), so ``except Error`` blocks and errno checks work unchanged.
+"""
+import itertools
+import re
+import sqlite3
+import time
+import weakref
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import lru_cache
+
+from mysql.connector import errors
+
+
+def _to_date(value):
+    if value is None:
+        return None
+    return date.fromisoformat(str(value)[:10])
+
+
+def _quarter(value):
+    d = _to_date(value)
+    return None if d is None else (d.month - 1) // 3 + 1
+
+
+def _datediff(end, start):
+    if end is None or start is None:
+        return None
+    return (_to_date(end) - _to_date(start)).days
+
+
+def _addtime(value, delta):
+    # ADDTIME(datetime, 'HH:MM:SS'); hours may exceed 24 as in MySQL
+    if value is None or delta is None:
+        return None
+    hours, minutes, seconds = (int(part) for part in str(delta).split(":"))
+    moved = datetime.fromisoformat(str(value)) + timedelta(hours=hours, minutes=minutes, seconds=seconds)
+    return moved.isoformat(sep=" ")
+
+
+# MySQL functions used by the app's queries, as SQLite user functions: name -> (arity, function)
+FUNCTIONS = {
+    "YEAR": (1, lambda v: None if v is None else _to_date(v).year),
+    "MONTH": (1, lambda v: None if v is None else _to_date(v).month),
+    "DAY": (1, lambda v: None if v is None else _to_date(v).day),
+    "QUARTER": (1, _quarter),
+    "DATEDIFF": (2, _datediff),
+    "ADDTIME": (2, _addtime),
+    "NOW": (0, lambda: datetime.now().replace(microsecond=0).isoformat(sep=" ")),
+    "CURDATE": (0, lambda: date.today().isoformat()),
+    "CONCAT": (-1, lambda *parts: None if None in parts else "".join(str(p) for p in parts)),
+}
+
+# Column types read back as Python dates, like mysql.connector returns them
+sqlite3.register_converter("DATETIME", lambda b: datetime.fromisoformat(b.decode()))
+sqlite3.register_converter("DATE", lambda b: date.fromisoformat(b.decode()[:10]))
+sqlite3.register_adapter(datetime, lambda d: d.isoformat(sep=" "))
+sqlite3.register_adapter(date, lambda d: d.isoformat())
+sqlite3.register_adapter(Decimal, str)  # stored as NUMERIC, like the DECIMAL columns
+
+TIMEOUT_CHECK_STEPS = 1000  # Virtual machine steps between statement timeout checks
+
+_SET_TIMEOUT_RE = re.compile(r"^\s*SET\s+(?:SESSION\s+)?max_execution_time\s*=\s*(\S+)\s*$", re.I)
+_SET_DEFER_RE = re.compile(r"^\s*SET\s+@defer_booking_totals\s*=\s*(\S+)\s*$", re.I)
+_KILL_RE = re.compile(r"^\s*KILL\s+QUERY\s+(\d+)\s*$", re.I)
+_ON_DUPLICATE_RE = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.I)
+_VALUES_OF_RE = re.compile(r"\bVALUES\s*\(\s*`?(\w+)`?\s*\)", re.I)  # VALUES(col) in the UPDATE list
+
+_connection_ids = itertools.count(1)
+_live_connections = weakref.WeakValueDictionary()  # connection_id -> SQLiteConnection, for KILL QUERY
+
+# (message fragment, MySQL error class, errno): the first match wins
+_ERRORS = (
+    ("UNIQUE constraint failed", errors.IntegrityError, 1062),
+    ("PRIMARY KEY constraint failed", errors.IntegrityError, 1062),
+    ("FOREIGN KEY constraint failed", errors.IntegrityError, 1452),
+    ("NOT NULL constraint failed", errors.IntegrityError, 1048),
+    ("CHECK constraint failed", errors.IntegrityError, 3819),
+    ("no such table", errors.ProgrammingError, 1146),
+    ("no such column", errors.ProgrammingError, 1054),
+    ("syntax error", errors.ProgrammingError, 1064),
+    ("database is locked", errors.OperationalError, 1205),
+)
+
+
+def _mysql_error(error, conn=None):
+    """The mysql.connector error for a sqlite3 one."""
+    message = str(error)
+    if message == "interrupted":
+        if conn is not None and conn._timed_out():
+            return errors.DatabaseError("Query execution was interrupted, maximum statement execution time exceeded",
+                                        errno=3024)
+        return errors.DatabaseError("Query execution was interrupted", errno=1317)
+    for fragment, error_class, errno in _ERRORS:
+        if fragment in message:
+            return error_class(message, errno=errno)
+    if isinstance(error, sqlite3.IntegrityError):
+        return errors.IntegrityError(message)
+    if isinstance(error, sqlite3.ProgrammingError):
+        return errors.ProgrammingError(message)
+    if isinstance(error, sqlite3.OperationalError):
+        return errors.OperationalError(message)
+    return errors.DatabaseError(message)
+
+
+@lru_cache(maxsize=1024)
+def translate(sql):
+    """Rewrites MySQL placeholder and identifier quoting, and upserts, for SQLite.
+
+    ``ON DUPLICATE KEY UPDATE a = VALUES(a)`` becomes ``ON CONFLICT DO UPDATE
+    SET a = excluded.a``; without a conflict target it applies to any unique
+    key, as in MySQL. Cached: the app sends the same few statement texts over
+    and over, and the translated text is also the key of sqlite3's prepared
+    statement cache.
+    """
+    match = _ON_DUPLICATE_RE.search(sql)
+    if match:
+        assignments = _VALUES_OF_RE.sub(r"excluded.\1", sql[match.end():])
+        sql = f"{sql[:match.start()]}ON CONFLICT DO UPDATE SET{assignments}"
+    sql = re.sub(r"%\((\w+)\)s", r":\1", sql)
+    return sql.replace("%s", "?").replace("`", '"')
+
+
+class SQLiteCursor:
+    """Cursor with the mysql.connector surface the app relies on."""
+
+    def __init__(self, conn, raw, dictionary=False):
+        self._conn = conn
+        self._raw = raw
+        self._dictionary = dictionary
+        self.description = None
+        self.rowcount = -1
+        self.lastrowid = None
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip((d[0] for d in self.description), row))
+
+    def execute(self, sql, params=()):
+        params = params if isinstance(params, dict) else tuple(params or ())
+        if sql.lstrip()[:4].upper() in ("SET ", "KILL"):
+            self.description = None
+            self.rowcount = 0
+            self._conn._session_statement(self._raw, sql, params)
+            return
+        self._conn._start_statement()
+        try:
+            self._raw.execute(translate(sql), params)
+        except sqlite3.Error as e:
+            raise _mysql_error(e, self._conn) from e
+        self.description = self._raw.description
+        self.rowcount = self._raw.rowcount
+        self.lastrowid = self._raw.lastrowid
+
+    def executemany(self, sql, seq_of_params):
+        self._conn._start_statement()
+        try:
+            self._raw.executemany(translate(sql), [tuple(p) for p in seq_of_params])
+        except sqlite3.Error as e:
+            raise _mysql_error(e, self._conn) from e
+        self.description = None
+        self.rowcount = self._raw.rowcount
+
+    def fetchone(self):
+        try:
+            return self._row(self._raw.fetchone())
+        except sqlite3.Error as e:
+            raise _mysql_error(e, self._conn) from e
+
+    def fetchmany(self, size=1):
+        try:
+            return [self._row(r) for r in self._raw.fetchmany(size)]
+        except sqlite3.Error as e:
+            raise _mysql_error(e, self._conn) from e
+
+    def fetchall(self):
+        try:
+            return [self._row(r) for r in self._raw.fetchall()]
+        except sqlite3.Error as e:
+            raise _mysql_error(e, self._conn) from e
+
+    def __iter__(self):
+        try:
+            for row in self._raw:
+                yield self._row(row)
+        except sqlite3.Error as e:
+            raise _mysql_error(e, self._conn) from e
+
+    def close(self):
+        self._raw.close()
+
+
+class SQLiteConnection:
+    """sqlite3 connection wrapped to look like a mysql.connector connection."""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.connection_id = next(_connection_ids)
+        self._timeout_ms = None     # SET SESSION max_execution_time
+        self._deadline = None
+        self._progress = None       # (handler, n) from set_progress_handler()
+        _live_connections[self.connection_id] = self
+
+    @property
+    def in_transaction(self):
+        return self._raw.in_transaction
+
+    def cursor(self, dictionary=False, buffered=None):
+        return SQLiteCursor(self, self._raw.cursor(), dictionary=dictionary)
+
+    def commit(self):
+        try:
+            self._raw.commit()
+        except sqlite3.Error as e:
+            raise _mysql_error(e, self) from e
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def start_transaction(self, consistent_snapshot=False, isolation_level=None, readonly=None):
+        """BEGIN; with consistent_snapshot the read snapshot is taken now rather than at the first read."""
+        if self._raw.in_transaction:
+            raise errors.ProgrammingError("Transaction already in progress")
+        try:
+            self._raw.execute("BEGIN")
+            if consistent_snapshot:
+                self._raw.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        except sqlite3.Error as e:
+            raise _mysql_error(e, self) from e
+
+    def is_connected(self):
+        return self._raw is not None
+
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        pass
+
+    def close(self):
+        if self._raw is not None:
+            _live_connections.pop(self.connection_id, None)
+            self._raw.close()
+            self._raw = None
+
+    def set_progress_handler(self, handler, n):
+        self._progress = None if handler is None else (handler, n)
+        self._install_progress_handler()
+
+    def interrupt(self):
+        if self._raw is not None:
+            self._raw.interrupt()
+
+    # --- Session statements and the statement timeout ---
+
+    def _session_statement(self, raw_cursor, sql, params):
+        sql = sql % tuple(repr(p) for p in params) if params else sql
+        match = _SET_TIMEOUT_RE.match(sql)
+        if match:
+            value = match.group(1)
+            if value.upper() == "DEFAULT":
+                value = 0
+            elif not value.isdigit():
+                raise errors.ProgrammingError("Incorrect argument type to variable 'max_execution_time'",
+                                              errno=1232)
+            self._timeout_ms = int(value) or None
+            self._deadline = None
+            self._install_progress_handler()
+            return
+        match = _SET_DEFER_RE.match(sql)
+        if match:
+            # A table rather than a connection setting, so the triggers also work from the sqlite3 shell;
+            # SQLite allows one writer at a time, so no other session sees the row before it is deleted
+            defer = match.group(1).upper() != "NULL"
+            try:
+                raw_cursor.execute("INSERT OR IGNORE INTO BookingTotalsDeferred (Deferred) VALUES (1)" if defer
+                                   else "DELETE FROM BookingTotalsDeferred")
+            except sqlite3.Error as e:
+                raise _mysql_error(e, self) from e
+            return
+        match = _KILL_RE.match(sql)
+        if match:
+            target = _live_connections.get(int(match.group(1)))
+            if target is None:
+                raise errors.DatabaseError(f"Unknown thread id: {match.group(1)}", errno=1094)
+            target.interrupt()
+            return
+        raise errors.ProgrammingError(f"Unsupported session statement on SQLite: {sql}", errno=1193)
+
+    def _start_statement(self):
+        if self._timeout_ms is not None:
+            self._deadline = time.monotonic() + self._timeout_ms / 1000.0
+
+    def _timed_out(self):
+        return self._deadline is not None and time.monotonic() >= self._deadline
+
+    def _install_progress_handler(self):
+        if self._raw is None:
+            return
+        if self._timeout_ms is None:
+            if self._progress is None:
+                self._raw.set_progress_handler(None, 0)
+            else:
+                self._raw.set_progress_handler(*self._progress)
+            return
+        handler, n = self._progress or (None, TIMEOUT_CHECK_STEPS)
+
+        def check():
+            # A non-zero return makes SQLite abort the running statement ("interrupted")
+            if handler is not None and handler():
+                return 1
+            return 1 if self._timed_out() else 0
+
+        self._raw.set_progress_handler(check, min(n, TIMEOUT_CHECK_STEPS))
+
+    def executescript(self, script):
+        self._raw.executescript(script)
+
+
+def register_functions(raw):
+    for name, (arity, function) in FUNCTIONS.items():
+        raw.create_function(name, arity, function, deterministic=name not in ("NOW", "CURDATE"))
+
+
+def connect(path, check_same_thread=False, cached_statements=128, timeout=5.0):
+    """Opens (creating if needed) a SQLite database that speaks the app's SQL.
+
+    ``cached_statements`` sizes sqlite3's per-connection prepared statement
+    cache; ``timeout`` is how long to wait for another writer's lock.
+    """
+    raw = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=check_same_thread,
+                          cached_statements=cached_statements, timeout=timeout)
+    raw.execute("PRAGMA foreign_keys = ON")
+    register_functions(raw)
+    return SQLiteConnection(raw)
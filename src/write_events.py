@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""Tells read-side caches and indexes which tables a request just wrote to.
+
+Write paths call ``notify_write()`` after a successful commit; anything that
+keeps derived state (the itinerary cache, in-memory indexes, ...) registers a
+listener with ``subscribe()`` and drops whatever the write may have made
+stale.
+
+For free-form SQL from /execute_sql we cannot know which rows changed, only
+which tables the statement names, so ``tables_written()`` extracts those.
+When a statement cannot be parsed it returns None, which listeners must treat
+as "anything may have changed".
+
+Tables that triggers write are added by ``notify_write()`` (see
+``TRIGGER_WRITES``), so a listener sees e.g. a BookingAccommodation cost
+change as a write to Booking too, since TotalCost follows it.
+"""
+import re
+
+_listeners = []
+
+# Statement keywords that only read
+READ_KEYWORDS = {"select", "show", "describe", "desc", "explain", "with", "help"}
+
+# Statements that run outside the read path but never change table contents
+NO_DATA_KEYWORDS = {"set", "use", "begin", "start", "commit", "rollback", "savepoint", "release",
+                    "lock", "unlock", "kill", "analyze", "check", "checksum", "flush"}
+
+# Lower-cased table -> tables its triggers write (sql/create_schema_*.sql, employee_closure.sql,
+# analytics_rollups.sql)
+TRIGGER_WRITES = {
+    "bookingaccommodation": {"booking", "rollupdirtyday"},  # Booking.TotalCost
+    "bookingtransportation": {"booking", "rollupdirtyday"},
+    "booking": {"rollupdirtyday"},
+    "bookingpassenger": {"rollupdirtyday"},
+    "payment": {"rollupdirtyday"},
+    "review": {"rollupdirtyday"},
+    "employee": {"employeeclosure"},
+}
+
+_COMMENT_RE = re.compile(r"/\*.*?\*/|--[^\n]*|#[^\n]*", re.S)
+_IDENT = r"`?([A-Za-z_][A-Za-z0-9_$]*)`?(?:\s*\.\s*`?([A-Za-z_][A-Za-z0-9_$]*)`?)?"
+_TABLE_AFTER_RE = re.compile(r"\b(?:INTO|UPDATE|FROM|JOIN|TABLE|USING)\s+" + _IDENT, re.I)
+_TRUNCATE_RE = re.compile(r"^\s*TRUNCATE\s+(?:TABLE\s+)?" + _IDENT, re.I)
+_ON_TABLE_RE = re.compile(r"\bON\s+" + _IDENT + r"\s*\(", re.I)  # CREATE INDEX ... ON t (...)
+_NOT_TABLES = {"select", "set", "values", "value", "where", "dual", "lateral", "if"}
+
+
+def subscribe(listener):
+    """Registers ``listener(tables, passenger_ids)`` to be called after every write.
+
+    ``tables`` is a set of lower-cased table names, or None when unknown;
+    ``passenger_ids`` is the set of passengers whose data changed, or None when
+    not known.
+    """
+    if listener not in _listeners:
+        _listeners.append(listener)
+    return listener
+
+
+def with_trigger_writes(tables):
+    """Lower-cased ``tables`` plus every table their triggers write, in turn."""
+    pending = [t.lower() for t in tables]
+    written = set()
+    while pending:
+        table = pending.pop()
+        if table not in written:
+            written.add(table)
+            pending.extend(TRIGGER_WRITES.get(table, ()))
+    return written
+
+
+def notify_write(tables, passenger_ids=None):
+    """Informs every listener that ``tables`` (None = unknown) and the tables their triggers write were just written."""
+    tables = with_trigger_writes(tables) if tables is not None else None
+    passenger_ids = set(passenger_ids) if passenger_ids is not None else None
+    for listener in list(_listeners):
+        try:
+            listener(tables, passenger_ids)
+        except Exception as e:
+            # A broken cache must never fail the write that already committed
+            print(f"Write listener {listener!r} failed: {e}")
+
+
+def strip_comments(sql):
+    return _COMMENT_RE.sub(" ", sql).strip()
+
+
+def statement_keyword(sql):
+    """First keyword of the statement, lower-cased ('' for an empty statement)."""
+    stripped = strip_comments(sql).lstrip("(")
+    match = re.match(r"[A-Za-z]+", stripped)
+    return match.group(0).lower() if match else ""
+
+
+def is_read_only(sql):
+    """True for statements that cannot modify data (SELECT, SHOW, DESCRIBE, ...)."""
+    keyword = statement_keyword(sql)
+    if keyword not in READ_KEYWORDS:
+        return False
+    body = strip_comments(sql).upper()
+    # SELECT ... INTO OUTFILE / FOR UPDATE and CTEs feeding DML are not plain reads
+    if keyword == "with" and re.search(r"\b(INSERT|UPDATE|DELETE|REPLACE)\b", body):
+        return False
+    return not re.search(r"\bFOR\s+UPDATE\b|\bINTO\s+(OUTFILE|DUMPFILE)\b", body)
+
+
+def tables_written(sql):
+    """Names of the tables a write statement mentions, or None if it cannot be told.
+
+    Errs on the side of including too much (e.g. tables only read by an
+    INSERT ... SELECT) -- listeners will just invalidate a little more.
+    """
+    body = strip_comments(sql)
+    if not body:
+        return set()
+    keyword = statement_keyword(body)
+    if keyword in NO_DATA_KEYWORDS:
+        return set()
+    if keyword in ("call", "do", "handler", "load", "source") and not re.search(r"\bINTO\s+TABLE\b", body, re.I):
+        return None  # stored procedures and friends can touch anything
+    if keyword in ("drop", "rename") and re.search(r"\bDATABASE\b|\bSCHEMA\b", body, re.I):
+        return None
+
+    tables = set()
+    for pattern in (_TABLE_AFTER_RE, _TRUNCATE_RE, _ON_TABLE_RE):
+        for first, second in pattern.findall(body):
+            name = second or first  # db.table -> table
+            if name.lower() not in _NOT_TABLES:
+                tables.add(name)
+    # "DROP TABLE a, b" / "DELETE a, b FROM ..." list several tables after one keyword
+    for match in re.finditer(r"\b(?:TABLE|TABLES)\s+((?:`?\w+`?\s*,\s*)+`?\w+`?)", body, re.I):
+        tables.update(t.strip(" `") for t in match.group(1).split(","))
+    return tables or None